@@ -3,10 +3,14 @@
 
 import os
 import sys
-from flask import Flask, render_template, request, jsonify, session
-from flask_socketio import SocketIO, emit
+from flask import (Flask, render_template, request, jsonify, session, Response, stream_with_context, g,
+                   has_request_context)
+from flask_socketio import SocketIO, emit, join_room, leave_room
+import hmac
 import json
+import threading
 from datetime import datetime
+from types import SimpleNamespace
 
 # 🔧 FIX 1: Setup proper Python paths
 def setup_python_paths():
@@ -118,12 +122,28 @@ def setup_flask_app():
 # Create Flask app
 app = setup_flask_app()
 
+# 🆕 Serve JSON (responses, request bodies, Socket.IO packets) through the fastest installed encoder
+def setup_fast_json():
+    """Install the fast JSON provider; returns the json module Socket.IO should use"""
+    try:
+        from enhanced_models.fast_json import BACKEND, FastJSONProvider, socketio_json
+    except ImportError as e:
+        print(f"⚠️ Fast JSON not available, using stdlib json: {e}")
+        return json
+    if FastJSONProvider is not None:
+        app.json = FastJSONProvider(app)
+    print(f"⚡ JSON encoder: {BACKEND}")
+    return socketio_json
+
+socketio_json = setup_fast_json()
+
 # 🔧 FIX 4: Setup SocketIO with proper configuration
 socketio = SocketIO(
     app, 
     cors_allowed_origins="*",
     logger=True,
-    engineio_logger=False  # Reduce noise in logs
+    engineio_logger=False,  # Reduce noise in logs
+    json=socketio_json
 )
 
 # 🔧 FIX 5: Initialize game systems with error handling
@@ -165,9 +185,406 @@ def initialize_game_systems():
 # Initialize game systems
 coffee_menu, shop_info, bakery_menu, money_machine = initialize_game_systems()
 
+# 🆕 Catalog hot reload: build the new catalog off the request path, then swap
+def setup_catalog_reload():
+    """Watch the menu catalog file and swap in new versions atomically"""
+    try:
+        from enhanced_models.menu_catalog import CatalogManager, get_default_catalog
+        manager = CatalogManager(catalog=get_default_catalog())
+    except Exception as e:
+        print(f"⚠️ Catalog hot reload disabled: {e}")
+        return None
+    
+    def on_catalog_reloaded(catalog):
+        # Orders must not see storage, stats and feasibility half rebuilt
+        with default_shop.lock:
+            for system in (coffee_menu, bakery_menu, shop_info):
+                if hasattr(system, 'apply_catalog'):
+                    system.apply_catalog(catalog)
+        if shop_registry:
+            shop_registry.apply_catalog(catalog)
+        try:
+            if wire_codec and wire_codec.add_ingredients(shop_info.storage):
+                socketio.emit('wire_format', wire_codec.schema(), to=WIRE_ROOM)
+            socketio.emit('menu_updated', {'menu_version': catalog.version})
+            emit_inventory()
+        except Exception as e:
+            print(f"⚠️ WebSocket emit failed: {e}, but catalog was reloaded")
+    
+    manager.add_listener(on_catalog_reloaded)
+    
+    interval = float(os.environ.get('CATALOG_RELOAD_INTERVAL', 2.0))
+    if interval > 0:
+        socketio.start_background_task(manager.watch, interval, socketio.sleep)
+        print(f"👀 Watching menu catalog: {manager.path}")
+    return manager
+
+catalog_manager = setup_catalog_reload()
+
+def get_menu_version():
+    return catalog_manager.version if catalog_manager else 0
+
+# 🆕 Multi-shop hosting: the original shop is 'default', franchises live under /api/shops/<shop_id>
+def setup_shop_registry():
+    try:
+        from enhanced_models.shop_registry import ShopRegistry, ShopStore, DEFAULT_SHOP_ID
+    except ImportError as e:
+        print(f"⚠️ Multi-shop hosting disabled: {e}")
+        return None
+    
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    store_dir = os.environ.get('SHOP_STORE_DIR', os.path.join(project_root, 'shop_data'))
+    registry = ShopRegistry(
+        ShopStore(store_dir),
+        max_loaded=int(os.environ.get('MAX_LOADED_SHOPS', 1000)),
+        idle_seconds=float(os.environ.get('SHOP_IDLE_SECONDS', 900)),
+        snapshot_every=int(os.environ.get('SNAPSHOT_EVERY', 1000))
+    )
+    # 🆕 DURABLE_DEFAULT_SHOP=1 journals the original shop too and restores it on restart
+    durable = os.environ.get('DURABLE_DEFAULT_SHOP', '').lower() in ('1', 'true', 'yes')
+    registry.register(DEFAULT_SHOP_ID, coffee_menu, bakery_menu, shop_info, money_machine, durable=durable)
+    if durable:
+        print(f"💾 Default shop restored from {store_dir} ({registry.replayed} events replayed)")
+    socketio.start_background_task(registry.watch_idle, 60, socketio.sleep)
+    return registry
+
+shop_registry = setup_shop_registry()
+
+if shop_registry:
+    default_shop = shop_registry.shops['default']
+else:
+    default_shop = SimpleNamespace(shop_id='default', coffee_menu=coffee_menu, bakery_menu=bakery_menu,
+                                   shop_info=shop_info, money_machine=money_machine, lock=threading.RLock(),
+                                   bootstrap_cache=None)
+
+# 🆕 Shard workers (started by shard_router.py with WORKER_ID and SHARD_RING) only serve their slice
+def shard_owner(node, ring_data):
+    """Ownership predicate for one worker under a ring ({'nodes': [...], 'replicas': n})"""
+    from enhanced_models.sharding import HashRing, DEFAULT_SHOP_ID
+    ring = HashRing.from_dict(ring_data)
+    return lambda shop_id: shop_id == DEFAULT_SHOP_ID or ring.node_for(shop_id) == node
+
+if shop_registry and os.environ.get('WORKER_ID') and os.environ.get('SHARD_RING'):
+    shop_registry.owns = shard_owner(os.environ['WORKER_ID'], json.loads(os.environ['SHARD_RING']))
+
+def shop_error_status(error):
+    """421 Misdirected Request for a shop another worker owns, else 400"""
+    from enhanced_models.shop_registry import ShopNotOwned
+    return 421 if isinstance(error, ShopNotOwned) else 400
+
+def shop_room(shop):
+    """Socket.IO target for a shop's updates: everyone for the default shop, else its room"""
+    return None if shop is default_shop else shop.room
+
 # Game state tracking
 game_sessions = {}
 
+def new_game_session():
+    return {
+        'start_time': datetime.now(),
+        'orders_completed': 0,
+        'total_earnings': 0.0,
+        'quality_scores': []
+    }
+
+# 🆕 Streaming shift analytics (per-minute/hour/day rollups)
+def setup_shift_analytics():
+    try:
+        from enhanced_models.shift_analytics import ShiftAnalytics
+        return ShiftAnalytics()
+    except ImportError as e:
+        print(f"⚠️ Shift analytics disabled: {e}")
+        return None
+
+shift_analytics = setup_shift_analytics()
+
+# 🆕 Live best sellers (Space-Saving heavy hitters, constant memory)
+def setup_best_sellers():
+    try:
+        from enhanced_models.best_sellers import BestSellerTracker
+        return BestSellerTracker()
+    except ImportError as e:
+        print(f"⚠️ Best seller tracking disabled: {e}")
+        return None
+
+best_sellers = setup_best_sellers()
+
+# 🆕 Server-side leaderboard of sessions by earnings (all time, last hour, last day)
+def setup_leaderboard():
+    try:
+        from enhanced_models.leaderboard import Leaderboard
+        return Leaderboard()
+    except ImportError as e:
+        print(f"⚠️ Leaderboard disabled: {e}")
+        return None
+
+leaderboard = setup_leaderboard()
+
+# 🆕 Columnar history export (Parquet/Arrow), periodic when HISTORY_EXPORT_DIR is set
+def setup_history_export():
+    try:
+        from enhanced_models.history_export import HistoryExportJob, PYARROW_AVAILABLE
+    except ImportError as e:
+        print(f"⚠️ History export disabled: {e}")
+        return None
+    
+    out_dir = os.environ.get('HISTORY_EXPORT_DIR', 'exports')
+    fmt = os.environ.get('HISTORY_EXPORT_FORMAT', 'parquet')
+    interval = float(os.environ.get('HISTORY_EXPORT_INTERVAL', 3600))
+    job = HistoryExportJob([shop_info, money_machine], out_dir, fmt, interval)
+    
+    if os.environ.get('HISTORY_EXPORT_DIR') and PYARROW_AVAILABLE:
+        socketio.start_background_task(job.run_forever, socketio.sleep)
+        print(f"📦 Exporting history to {out_dir} every {interval:.0f}s")
+    return job
+
+history_export_job = setup_history_export()
+
+# 🆕 Idempotency keys: a retried order or purchase is answered from cache, not charged again
+def setup_idempotency():
+    try:
+        from enhanced_models.idempotency import IdempotencyCache
+    except ImportError as e:
+        print(f"⚠️ Idempotency keys disabled: {e}")
+        return None
+    return IdempotencyCache(
+        max_keys=int(os.environ.get('IDEMPOTENCY_MAX_KEYS', 10000)),
+        ttl_seconds=float(os.environ.get('IDEMPOTENCY_TTL', 600))
+    )
+
+request_keys = setup_idempotency()
+
+def run_idempotent(shop, action, data, handler):
+    """Run a charging handler at most once per Idempotency-Key header"""
+    key = request.headers.get('Idempotency-Key')
+    if not key or not request_keys:
+        return handler()
+    
+    from enhanced_models.idempotency import (MAX_KEY_LENGTH, REPLAY, IN_PROGRESS, MISMATCH,
+                                             fingerprint)
+    if len(key) > MAX_KEY_LENGTH:
+        return jsonify({'error': f'Idempotency-Key longer than {MAX_KEY_LENGTH} characters'}), 400
+    
+    # Keys are only unique per client: another session's key never replays this one's response
+    cache_key = (shop.shop_id, session.get('session_id'), action, key)
+    outcome, stored = request_keys.begin(cache_key, fingerprint(data))
+    if outcome == REPLAY:
+        body, status = stored
+        response = Response(body, status=status, mimetype='application/json')
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+    if outcome == IN_PROGRESS:
+        response = jsonify({'error': 'A request with this Idempotency-Key is still being processed'})
+        response.headers['Retry-After'] = '1'
+        return response, 409
+    if outcome == MISMATCH:
+        return jsonify({'error': 'Idempotency-Key was already used for a different request'}), 422
+    
+    try:
+        response = app.make_response(handler())
+    except Exception:
+        request_keys.release(cache_key)
+        raise
+    
+    if response.status_code >= 500:
+        # Nothing final happened; let the retry run for real
+        request_keys.release(cache_key)
+    else:
+        request_keys.complete(cache_key, response.get_data(as_text=True), response.status_code)
+    return response
+
+# 🆕 Traffic capture (RECORD_TRAFFIC=<file>): every /api/* request and Socket.IO event,
+# to replay locally with backend/traffic_replay.py
+def setup_traffic_recorder():
+    path = os.environ.get('RECORD_TRAFFIC')
+    if not path:
+        return None
+    try:
+        from enhanced_models.traffic_recorder import TrafficRecorder
+    except ImportError as e:
+        print(f"⚠️ Traffic capture disabled: {e}")
+        return None
+    import atexit
+    import time
+    
+    recorder = TrafficRecorder(path, redact=('card_number',))
+    atexit.register(recorder.close)
+    socketio.start_background_task(recorder.watch, 1.0, socketio.sleep)
+    
+    @app.before_request
+    def start_traffic_timer():
+        g.traffic_start = time.perf_counter()
+    
+    @app.after_request
+    def record_traffic(response):
+        path = request.path
+        if path.startswith('/api/') and not path.startswith('/api/admin/') and 'traffic_start' in g:
+            recorder.record_http(
+                session.get('session_id'), request.method, path, request.query_string.decode('latin-1'),
+                request.get_data(cache=True), response.status_code,
+                (time.perf_counter() - g.traffic_start) * 1000, request.headers.get('Idempotency-Key')
+            )
+        return response
+    
+    print(f"🎙️ Recording traffic to {path}")
+    return recorder
+
+traffic_recorder = setup_traffic_recorder()
+
+def on_socket_event(message):
+    """socketio.on() that also records the event to the traffic capture, when RECORD_TRAFFIC is set"""
+    def decorator(handler):
+        if traffic_recorder:
+            handler = recording_socket_handler(message, handler)
+        return socketio.on(message)(handler)
+    return decorator
+
+def recording_socket_handler(message, handler):
+    """Record a Socket.IO event once its handler has run, inside its request context"""
+    def wrapper(*args):
+        result = handler(*args)
+        query = request.query_string.decode('latin-1') if message == 'connect' else ''
+        traffic_recorder.record_socket(session.get('session_id'), request.sid, message,
+                                       [] if message == 'connect' else args, query)
+        return result
+    wrapper.__name__ = handler.__name__
+    return wrapper
+
+# 🆕 Memory accounting on demand; TRACEMALLOC=<frames> starts allocation tracing at boot
+def setup_memory_report():
+    try:
+        from enhanced_models.memory_report import AllocationTracker
+    except ImportError as e:
+        print(f"⚠️ Memory accounting disabled: {e}")
+        return None
+    
+    tracker = AllocationTracker()
+    frames = os.environ.get('TRACEMALLOC')
+    if frames:
+        tracker.start(int(frames) if frames.isdigit() else 1)
+        print(f"🧠 tracemalloc tracing {tracker.stats()['frames']} frame(s) per allocation")
+    return tracker
+
+allocation_tracker = setup_memory_report()
+
+# 🆕 Live event tail for dashboards (push instead of polling)
+def setup_event_tail():
+    try:
+        from enhanced_models.event_tail import EventTail
+    except ImportError as e:
+        print(f"⚠️ Event tail disabled: {e}")
+        return None
+    
+    tail = EventTail()
+    
+    def pump():
+        """Deliver queued events; each subscriber waits for its ack before the next batch"""
+        def send(subscriber, events):
+            sid = subscriber.sid
+            socketio.emit('tail_events', {
+                'events': events,
+                'last_seq': subscriber.last_seq,
+                'dropped': subscriber.dropped
+            }, to=sid, callback=lambda *args: tail.acknowledge(sid))
+        
+        while True:
+            try:
+                tail.drain(send)
+            except Exception as e:
+                print(f"⚠️ Event tail pump error: {e}")
+            socketio.sleep(0.05)
+    
+    socketio.start_background_task(pump)
+    return tail
+
+event_tail = setup_event_tail()
+
+# 🆕 Compact MessagePack events for clients that ask for them at connect (?wire=msgpack)
+WIRE_ROOM = 'wire:msgpack'   # every MessagePack client
+JSON_ROOM = 'wire:json'      # every other client
+wire_clients = set()  # sids receiving MessagePack
+
+def wire_rooms(room=None):
+    """(JSON room, MessagePack room) splitting a room (None: everyone) by wire format"""
+    if room is None:
+        return JSON_ROOM, WIRE_ROOM
+    return f"{room}|{JSON_ROOM}", f"{room}|{WIRE_ROOM}"
+
+def join_wire_room(room=None):
+    """Put this client in the half of a room matching its wire format"""
+    json_room, msgpack_room = wire_rooms(room)
+    join_room(msgpack_room if request.sid in wire_clients else json_room)
+
+def setup_wire_codec():
+    try:
+        from enhanced_models.wire_codec import WireCodec, MSGPACK_AVAILABLE
+    except ImportError as e:
+        print(f"⚠️ Compact wire format disabled: {e}")
+        return None
+    if not MSGPACK_AVAILABLE:
+        print("⚠️ msgpack not installed, Socket.IO events stay JSON (pip install msgpack)")
+        return None
+    return WireCodec(getattr(shop_info, 'storage', {}))
+
+wire_codec = setup_wire_codec()
+
+def emit_compact(event, data, to=None, pack=None):
+    """Emit a high-fanout event: MessagePack to clients that negotiated it, JSON to the rest
+
+    `to` is None (everyone), a shop room or the current client's sid; a room
+    takes one emit per wire format, however many clients are in it.
+    """
+    if not wire_clients:
+        socketio.emit(event, data, to=to)
+        return
+    if to is not None and has_request_context() and to == getattr(request, 'sid', None):
+        socketio.emit(event, (pack() if pack else wire_codec.encode(data)) if to in wire_clients else data, to=to)
+        return
+    json_room, msgpack_room = wire_rooms(to)
+    socketio.emit(event, data, to=json_room)
+    socketio.emit(event, pack() if pack else wire_codec.encode(data), to=msgpack_room)
+
+def emit_inventory(shop=None, to=None):
+    """Send a shop's inventory snapshot (packed once per stock change for MessagePack clients)"""
+    shop_info_obj = (shop or default_shop).shop_info
+    pack = None
+    if wire_codec and hasattr(shop_info_obj, 'get_real_time_stats_packed'):
+        pack = lambda: shop_info_obj.get_real_time_stats_packed(wire_codec)
+    emit_compact('inventory_updated', shop_info_obj.get_real_time_stats(), to=to, pack=pack)
+
+def publish_stock_events(ingredients, source):
+    """Publish usage events for the ingredients an action touched"""
+    if not event_tail or not hasattr(shop_info, 'storage'):
+        return
+    for item, quantity in ingredients.items():
+        if not quantity or item not in shop_info.storage:
+            continue
+        remaining = shop_info.storage[item]
+        event_tail.publish('usage', {'item': item, 'quantity': quantity, 'remaining': remaining,
+                                     'source': source}, key=item)
+
+def emit_stock_alerts(shop=None):
+    """Push stock alert state changes; nothing is sent while states hold steady"""
+    shop = shop or default_shop
+    if not hasattr(shop.shop_info, 'pop_alert_transitions'):
+        return
+    transitions = shop.shop_info.pop_alert_transitions()
+    if not transitions:
+        return
+    if event_tail and shop is default_shop:
+        for transition in transitions:
+            event_tail.publish('alert', transition, key=transition['item'])
+    socketio.emit('stock_alert', {'transitions': transitions}, to=shop_room(shop))
+
+def emit_availability_changes(shop=None):
+    """Push the menu items whose makeable servings changed since the last push"""
+    shop = shop or default_shop
+    if not hasattr(shop.shop_info, 'pop_feasibility_changes'):
+        return
+    changes = shop.shop_info.pop_feasibility_changes()
+    if changes:
+        socketio.emit('availability_updated', {'changed': changes}, to=shop_room(shop))
+
 # 🔧 FIX 6: Add error handling decorator
 def safe_route(func):
     """Decorator to add error handling to routes"""
@@ -187,6 +604,24 @@ def safe_route(func):
     wrapper.__name__ = func.__name__
     return wrapper
 
+# 🆕 Admin routes need ADMIN_TOKEN (X-Admin-Token or Authorization: Bearer); without it they are off
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def admin_required(func):
+    """Decorator that rejects admin calls without the configured token"""
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'error': 'Admin API disabled (set ADMIN_TOKEN)'}), 403
+        supplied = request.headers.get('X-Admin-Token', '')
+        authorization = request.headers.get('Authorization', '')
+        if authorization.startswith('Bearer '):
+            supplied = authorization[len('Bearer '):]
+        if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+            return jsonify({'error': 'Admin token required'}), 401
+        return func(*args, **kwargs)
+    wrapper.__name__ = func.__name__
+    return wrapper
+
 # === MAIN ROUTES ===
 @app.route('/')
 @safe_route
@@ -214,16 +649,85 @@ def test_api():
         'timestamp': datetime.now().isoformat(),
         'coffee_items': coffee_count,
         'bakery_items': bakery_count,
-        'enhanced_models': 'CoffeeMenuWeb' in str(type(coffee_menu))
+        'enhanced_models': 'CoffeeMenuWeb' in str(type(coffee_menu)),
+        'menu_version': get_menu_version()
     })
 
+# 🆕 One round trip for a joining player: menus, inventory, availability and config
+def flatten_menu(categorized_menu):
+    try:
+        from priority1_fixes import flatten_menu_response
+    except ImportError:
+        return [item for items in categorized_menu.values() for item in items]
+    return flatten_menu_response(categorized_menu)
+
+def build_bootstrap(shop):
+    menu_version = get_menu_version() if shop is default_shop else getattr(shop.coffee_menu, 'menu_version', 1)
+    money = shop.money_machine
+    return {
+        'status': 'working',
+        'menu_version': menu_version,
+        'menu': {
+            'coffee': flatten_menu(shop.coffee_menu.get_menu_by_category()),
+            'bakery': flatten_menu(shop.bakery_menu.get_menu_by_category())
+        },
+        'inventory': shop.shop_info.get_real_time_stats(),
+        'availability': shop.shop_info.get_feasibility() if hasattr(shop.shop_info, 'get_feasibility') else {},
+        'config': {
+            'shop_id': shop.shop_id,
+            'currency': getattr(money, 'currency', '$'),
+            'target_earnings': getattr(money, 'target_earnings', 100.0),
+            'payment_methods': ['cash', 'card']
+        },
+        'generated_at': datetime.now().isoformat()
+    }
+
+def bootstrap_response(shop):
+    if not session.get('session_id'):
+        session['session_id'] = f"session_{datetime.now().timestamp()}"
+    
+    try:
+        from enhanced_models.bootstrap import BootstrapCache
+    except ImportError:
+        return jsonify(build_bootstrap(shop))
+    if not hasattr(shop.shop_info, 'stock_version'):
+        return jsonify(build_bootstrap(shop))
+    
+    cache = shop.bootstrap_cache  # kept on the shop, so it goes when the registry unloads the shop
+    if cache is None:
+        cache = shop.bootstrap_cache = BootstrapCache(lambda: build_bootstrap(shop))
+    menu_version = get_menu_version() if shop is default_shop else getattr(shop.coffee_menu, 'menu_version', 1)
+    payload = cache.get((menu_version, shop.shop_info.stock_version,
+                         getattr(shop.money_machine, 'target_earnings', 0)))
+    
+    if request.if_none_match.contains(payload.etag):
+        response = Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        response = Response(payload.gzipped, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(payload.body, mimetype='application/json')
+    response.set_etag(payload.etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Menu-Version'] = str(menu_version)
+    return response
+
+@app.route('/api/bootstrap')
+@safe_route
+def bootstrap():
+    """Everything the game needs at startup, replacing four separate requests"""
+    return bootstrap_response(default_shop)
+
 @app.route('/api/menu/coffee')
 @safe_route
 def get_coffee_menu():
     """Get complete coffee menu in JSON format"""
     try:
         menu_data = coffee_menu.get_menu_by_category()
-        return jsonify(menu_data)
+        response = jsonify(menu_data)
+        response.headers['X-Menu-Version'] = str(get_menu_version())
+        return response
     except Exception as e:
         print(f"❌ Error getting coffee menu: {e}")
         # Return minimal fallback
@@ -239,7 +743,9 @@ def get_bakery_menu():
     """Get complete bakery menu in JSON format"""
     try:
         menu_data = bakery_menu.get_menu_by_category()
-        return jsonify(menu_data)
+        response = jsonify(menu_data)
+        response.headers['X-Menu-Version'] = str(get_menu_version())
+        return response
     except Exception as e:
         print(f"❌ Error getting bakery menu: {e}")
         return jsonify({
@@ -248,12 +754,150 @@ def get_bakery_menu():
             ]
         })
 
+@app.route('/api/menu/search')
+@safe_route
+def search_menu():
+    """Ranked menu search with typo tolerance, autocomplete and pagination"""
+    query = request.args.get('q', '').strip()
+    item_type = request.args.get('type')  # 'coffee', 'food' or omitted for both
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+    
+    if not query:
+        return jsonify({'error': 'Query parameter q required'}), 400
+    if item_type not in (None, 'coffee', 'food'):
+        return jsonify({'error': 'Invalid item type'}), 400
+    
+    catalog = getattr(coffee_menu, 'catalog', None)
+    if catalog is None:
+        return jsonify({'error': 'Search not available'}), 503
+    
+    index = catalog.search_index
+    results = index.search(query, item_type, page, per_page)
+    if request.args.get('suggest'):
+        results['suggestions'] = index.suggest(query)
+    results['menu_version'] = get_menu_version()
+    return jsonify(results)
+
+@app.route('/api/menu/filter')
+@safe_route
+def filter_menu():
+    """Faceted menu filtering, e.g. ?milk=oat&temp=iced&prep_time_max=90"""
+    catalog = getattr(coffee_menu, 'catalog', None)
+    if catalog is None:
+        return jsonify({'error': 'Filtering not available'}), 503
+    
+    index = catalog.facet_index
+    filters = {}
+    prep_time_max = None
+    for key in request.args:
+        if key == 'prep_time_max':
+            prep_time_max = request.args.get(key, type=int)
+            if prep_time_max is None:
+                return jsonify({'error': 'prep_time_max must be an integer'}), 400
+        elif key in index.facets:
+            # Comma-separated or repeated values within a facet are OR'd
+            values = []
+            for raw in request.args.getlist(key):
+                values.extend(v.strip().lower() for v in raw.split(',') if v.strip())
+            filters[key] = values
+        else:
+            return jsonify({
+                'error': f'Unknown facet: {key}',
+                'available_facets': sorted(index.facets) + ['prep_time_max']
+            }), 400
+    
+    results = index.filter(filters, prep_time_max)
+    results['menu_version'] = get_menu_version()
+    return jsonify(results)
+
+@app.route('/api/menu/best-sellers')
+@safe_route
+def get_best_sellers():
+    """Get live top sellers, e.g. ?k=5&window=recent|all&scope=shop|session"""
+    if not best_sellers:
+        return jsonify({'error': 'Best seller tracking not available'}), 503
+    
+    k = max(1, min(request.args.get('k', 5, type=int), 50))
+    window = request.args.get('window', 'recent')
+    scope = request.args.get('scope', 'shop')
+    if window not in ('recent', 'all'):
+        return jsonify({'error': 'window must be recent or all'}), 400
+    
+    session_id = session.get('session_id', 'default') if scope == 'session' else None
+    top = best_sellers.top(k, window, session_id)
+    
+    result = {
+        'window': window,
+        'window_seconds': best_sellers.window_seconds if window == 'recent' else None,
+        'scope': scope,
+        'top': [{'item_id': item_id, 'sales': sales} for item_id, sales in top]
+    }
+    if hasattr(coffee_menu, 'get_featured_items'):
+        result['featured_coffee'] = coffee_menu.get_featured_items(3, best_sellers)
+    if hasattr(bakery_menu, 'get_popular_items'):
+        result['popular_bakery'] = bakery_menu.get_popular_items(3, best_sellers)
+    return jsonify(result)
+
+# 🆕 LEADERBOARD
+@app.route('/api/leaderboard')
+@safe_route
+def get_leaderboard():
+    """Top sessions by earnings, e.g. ?limit=10&window=all|hour|day"""
+    if not leaderboard:
+        return jsonify({'error': 'Leaderboard not available'}), 503
+    
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    try:
+        return jsonify(leaderboard.top(limit, request.args.get('window', 'all')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/leaderboard/standing')
+@safe_route
+def get_leaderboard_standing():
+    """This session's rank and the sessions around it, e.g. ?window=hour&radius=2"""
+    if not leaderboard:
+        return jsonify({'error': 'Leaderboard not available'}), 503
+    
+    session_id = session.get('session_id')
+    if not session_id:
+        return jsonify({'error': 'No session'}), 400
+    radius = max(0, min(request.args.get('radius', 2, type=int), 50))
+    window = request.args.get('window', 'all')
+    try:
+        standing = leaderboard.standing(session_id, window, radius)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if standing is None:
+        return jsonify({'session_id': session_id, 'window': window, 'rank': None,
+                        'message': 'No orders in this window yet'})
+    return jsonify(standing)
+
+@app.route('/api/menu/catalog')
+@safe_route
+def get_catalog_info():
+    """Get the live catalog version and load status"""
+    if not catalog_manager:
+        return jsonify({'version': 0, 'hot_reload': False})
+    
+    info = catalog_manager.catalog.summary()
+    info['hot_reload'] = True
+    info['last_error'] = catalog_manager.last_error
+    return jsonify(info)
+
 @app.route('/api/shop/inventory')
 @safe_route
 def get_inventory():
     """Get real-time inventory status"""
+    return inventory_response(default_shop)
+
+def inventory_response(shop):
     try:
-        inventory_data = shop_info.get_real_time_stats()
+        if hasattr(shop.shop_info, 'get_real_time_stats_json'):
+            # Serialized once per stock change, not once per request
+            return Response(shop.shop_info.get_real_time_stats_json(), mimetype='application/json')
+        inventory_data = shop.shop_info.get_real_time_stats()
         return jsonify(inventory_data)
     except Exception as e:
         print(f"❌ Error getting inventory: {e}")
@@ -267,8 +911,15 @@ def get_inventory():
 @safe_route
 def purchase_ingredient():
     """Purchase ingredients to refill inventory"""
+    data = request.get_json()
+    return run_idempotent(default_shop, 'purchase', data, lambda: handle_purchase(default_shop, data))
+
+def handle_purchase(shop, data):
+    """Refill one ingredient for a shop and push the updates to its clients
+
+    Stock and money change under shop.lock, for the default shop and per-shop routes alike.
+    """
     try:
-        data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
@@ -284,20 +935,36 @@ def purchase_ingredient():
         print(f"💰 Purchase request: {item_name} with ${player_money}")
         
         # Process the purchase through shop_info
-        purchase_result = shop_info.purchase_refill(item_name, player_money)
+        with shop.lock:
+            purchase_result = shop.shop_info.purchase_refill(item_name, player_money)
         
         if purchase_result['success']:
             print(f"✅ Purchase successful: {purchase_result['message']}")
             
+            if shift_analytics and shop is default_shop:
+                shift_analytics.record_purchase(item_name, purchase_result['money_spent'],
+                                                purchase_result['amount_added'])
+            if event_tail and shop is default_shop:
+                event_tail.publish('purchase', {
+                    'item': item_name,
+                    'cost': purchase_result['money_spent'],
+                    'amount_added': purchase_result['amount_added'],
+                    'new_inventory': purchase_result['new_inventory']
+                }, key=item_name)
+            
             # Emit real-time inventory update
             try:
-                socketio.emit('inventory_updated', shop_info.get_real_time_stats())
-                socketio.emit('purchase_completed', {
+                room = shop_room(shop)
+                with shop.lock:
+                    emit_inventory(shop, to=room)
+                    emit_availability_changes(shop)
+                    emit_stock_alerts(shop)
+                emit_compact('purchase_completed', {
                     'item': item_name,
                     'cost': purchase_result['money_spent'],
                     'new_inventory': purchase_result['new_inventory'],
                     'money_remaining': purchase_result['money_remaining']
-                })
+                }, to=room)
             except Exception as e:
                 print(f"⚠️ WebSocket emit failed: {e}, but purchase was successful")
             
@@ -335,10 +1002,25 @@ def get_shopping_list():
         print(f"❌ Error getting shopping list: {e}")
         return jsonify({'error': f'Failed to get shopping list: {str(e)}'}), 500
 
+@app.route('/api/shop/availability')
+@safe_route
+def get_availability():
+    """Get how many of each menu item can be made with current stock"""
+    return availability_response(default_shop)
+
+def availability_response(shop):
+    if not hasattr(shop.shop_info, 'get_feasibility'):
+        return jsonify({'servings': {}, 'unavailable': []})
+    return jsonify(shop.shop_info.get_feasibility())
+
 @app.route('/api/shop/alerts')
 @safe_route
 def get_inventory_alerts():
-    """Get current inventory alerts"""
+    """Get current inventory alerts (maintained as stock changes, not rescanned)"""
+    return alerts_response(default_shop)
+
+def alerts_response(shop):
+    shop_info = shop.shop_info
     try:
         if hasattr(shop_info, 'get_inventory_alerts'):
             alerts = shop_info.get_inventory_alerts()
@@ -350,11 +1032,16 @@ def get_inventory_alerts():
         else:
             low_stock_items = []
         
+        if hasattr(shop_info, 'alert_engine'):
+            critical_alerts = len(shop_info.alert_engine.critical)
+        else:
+            critical_alerts = len([a for a in alerts if a.get('level') == 'critical'])
+        
         return jsonify({
             'alerts': alerts,
             'low_stock_items': low_stock_items,
             'total_alerts': len(alerts),
-            'critical_alerts': len([a for a in alerts if a.get('level') == 'critical'])
+            'critical_alerts': critical_alerts
         })
         
     except Exception as e:
@@ -365,107 +1052,320 @@ def get_inventory_alerts():
 @safe_route
 def process_order():
     """Process a customer order with enhanced item matching and inventory deduction"""
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-        
-        order_type = data.get('type')
-        item_id = data.get('item_id')
-        payment_method = data.get('payment_method', 'cash')
-        payment_details = data.get('payment_details', {})
-        session_id = session.get('session_id', 'default')
-        
-        print(f"🛒 Processing order: {order_type} - {item_id}")
+    data = request.get_json()
+    session_id = session.get('session_id', 'default')
+    return run_idempotent(default_shop, 'order', data, lambda: handle_order(default_shop, data, session_id))
+
+# 🆕 ORDER PIPELINE: validate → reserve → charge → fulfil commit in the request;
+# notify and analytics run on a background pump after the response is sent
+def order_validate(order):
+    """Find the ordered item"""
+    data = order['data']
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    shop = order['shop']
+    coffee_menu, bakery_menu = shop.coffee_menu, shop.bakery_menu
+    order_type = order['order_type'] = data.get('type')
+    item_id = data.get('item_id')
+    order['payment_method'] = data.get('payment_method', 'cash')
+    order['payment_details'] = data.get('payment_details', {})
+    
+    print(f"🛒 Processing order: {order_type} - {item_id}")
+    
+    # Find the item with enhanced matching
+    if order_type == 'coffee':
+        # Try enhanced matching first
+        item = coffee_menu.get_coffee_by_id_enhanced(item_id)
+        # Fallback to original method
+        if not item:
+            item = coffee_menu.get_coffee_by_id(item_id)
+        # Final fallback - search by name components
+        if not item:
+            item = coffee_menu.find_coffee(item_id.replace('_', ' '))
         
-        # Find the item with enhanced matching
-        if order_type == 'coffee':
-            # Try enhanced matching first
-            item = coffee_menu.get_coffee_by_id_enhanced(item_id)
-            # Fallback to original method
-            if not item:
-                item = coffee_menu.get_coffee_by_id(item_id)
-            # Final fallback - search by name components
-            if not item:
-                item = coffee_menu.find_coffee(item_id.replace('_', ' '))
-            
-            if not item:
-                print(f"❌ Coffee not found: {item_id}")
-                print(f"📋 Available coffee items: {[i.coffeeName for i in coffee_menu.menu[:3]]}...")
-                return jsonify({'error': f'Coffee not found: {item_id}'}), 404
-                
-        elif order_type == 'food':
-            # Try enhanced matching first
-            item = bakery_menu.get_food_by_id_enhanced(item_id)
-            # Fallback to original method
-            if not item:
-                item = bakery_menu.get_food_by_id(item_id)
-            # Final fallback - search by name components
-            if not item:
-                item = bakery_menu.find_food(item_id.replace('_', ' '))
+        if not item:
+            print(f"❌ Coffee not found: {item_id}")
+            print(f"📋 Available coffee items: {[i.coffeeName for i in coffee_menu.menu[:3]]}...")
+            return jsonify({'error': f'Coffee not found: {item_id}'}), 404
             
-            if not item:
-                print(f"❌ Food item not found: {item_id}")
-                print(f"📋 Available food items: {[i.food for i in bakery_menu.menu]}")
-                return jsonify({'error': f'Food item not found: {item_id}'}), 404
-        else:
-            return jsonify({'error': 'Invalid order type'}), 400
+    elif order_type == 'food':
+        # Try enhanced matching first
+        item = bakery_menu.get_food_by_id_enhanced(item_id)
+        # Fallback to original method
+        if not item:
+            item = bakery_menu.get_food_by_id(item_id)
+        # Final fallback - search by name components
+        if not item:
+            item = bakery_menu.find_food(item_id.replace('_', ' '))
         
-        print(f"✅ Found item: {getattr(item, 'coffeeName', None) or getattr(item, 'food', 'Unknown')}")
-        
-        # For basic systems, create item object if it's just a dict
-        if isinstance(item, dict):
-            item_price = item['price']
-            item_name = item['name']
-        else:
-            item_price = getattr(item, 'price', 4.50)
-            item_name = getattr(item, 'coffeeName', None) or getattr(item, 'food', 'Unknown Item')
-        
-        # 🆕 INVENTORY CHECK: Verify we have enough ingredients before processing
-        if hasattr(item, 'ingredients') and item.ingredients:
-            if not shop_info.resource_check(item.ingredients):
-                return jsonify({'error': 'Insufficient ingredients in inventory. Please restock!'}), 400
-        
-        # Process payment
-        payment_result = money_machine.process_web_payment(
-            payment_method, item_price, payment_details
-        )
-        
-        if not payment_result.get('success'):
-            return jsonify({'error': payment_result.get('message', 'Payment failed')}), 400
-        
-        # 🆕 INVENTORY DEDUCTION: Fulfill the order and deduct inventory
+        if not item:
+            print(f"❌ Food item not found: {item_id}")
+            print(f"📋 Available food items: {[i.food for i in bakery_menu.menu]}")
+            return jsonify({'error': f'Food item not found: {item_id}'}), 404
+    else:
+        return jsonify({'error': 'Invalid order type'}), 400
+    
+    print(f"✅ Found item: {getattr(item, 'coffeeName', None) or getattr(item, 'food', 'Unknown')}")
+    
+    # For basic systems, create item object if it's just a dict
+    if isinstance(item, dict):
+        order['item_price'] = item['price']
+        order['item_name'] = item['name']
+    else:
+        order['item_price'] = getattr(item, 'price', 4.50)
+        order['item_name'] = getattr(item, 'coffeeName', None) or getattr(item, 'food', 'Unknown Item')
+    order['item'] = item
+    order['ingredients'] = dict(getattr(item, 'ingredients', None) or {})
+
+def order_reserve(order):
+    """Hold the recipe's ingredients before taking payment"""
+    shop = order['shop']
+    ingredients = order['ingredients']
+    with shop.lock:
+        if not ingredients:
+            return
+        reserve = getattr(shop.shop_info, 'reserve', None)
+        held = reserve(ingredients) if reserve else shop.shop_info.resource_check(ingredients)
+        if not held:
+            return jsonify({'error': 'Insufficient ingredients in inventory. Please restock!'}), 400
+        order['reserved'] = reserve is not None
+
+def release_reservation(order):
+    """Give back the ingredients order_reserve held (callers hold shop.lock)"""
+    if order.pop('reserved', False):
+        order['shop'].shop_info.release(order['ingredients'])
+
+def void_authorization(order):
+    """Give back an approved card charge at the processor (call without holding shop.lock)"""
+    authorization = order.pop('authorization', None)
+    if authorization and authorization.get('approved') and hasattr(order['shop'].money_machine, 'void_card'):
+        key = order.get('idempotency_key')
+        if not order['shop'].money_machine.void_card(
+                authorization, f"{order['shop'].shop_id}:{key}:refund" if key else None):
+            print(f"⚠️ Card charge {authorization.get('charge_id')} needs a manual refund")
+
+def order_charge(order):
+    """Take payment; the card processor is asked without holding the shop lock"""
+    shop = order['shop']
+    money_machine = shop.money_machine
+    extra = {}
+    try:
+        if order['payment_method'] == 'card' and hasattr(money_machine, 'authorize_card'):
+            key = order.get('idempotency_key')
+            extra['authorization'] = order['authorization'] = money_machine.authorize_card(
+                order['item_price'], order['payment_details'],
+                f"{shop.shop_id}:{key}" if key else None
+            )
+        with shop.lock:
+            payment_result = money_machine.process_web_payment(
+                order['payment_method'], order['item_price'], order['payment_details'], **extra
+            )
+            if not payment_result.get('success'):
+                release_reservation(order)
+    except Exception:
+        with shop.lock:
+            release_reservation(order)
+        void_authorization(order)
+        raise
+    if not payment_result.get('success'):
+        void_authorization(order)
+    if not payment_result.get('success'):
+        return jsonify({'error': payment_result.get('message', 'Payment failed')}), 400
+    order['payment_result'] = payment_result
+
+def order_fulfil(order):
+    """Deduct the held recipe from inventory; refund the payment if it can't be served"""
+    shop, item = order['shop'], order['item']
+    with shop.lock:
+        release_reservation(order)
         try:
-            if order_type == 'coffee':
-                shop_info.coffee_return(item)
+            if order['ingredients'] and not shop.shop_info.resource_check(order['ingredients']):
+                raise LookupError('ingredients ran out before the order was made')
+            if order['order_type'] == 'coffee':
+                shop.shop_info.coffee_return(item)
                 print(f"✅ Coffee order fulfilled: {getattr(item, 'coffeeName', 'Unknown')}")
-                
             else:  # food/bakery order
-                shop_info.food_return(item)
+                shop.shop_info.food_return(item)
                 print(f"✅ Food order fulfilled: {getattr(item, 'food', 'Unknown')}")
-                
+            return None
         except Exception as e:
-            print(f"⚠️ Order fulfillment had issues: {e}, but continuing...")
-            # Still count as success for demo, but log the issue
-        
-        # Emit real-time updates
-        try:
-            # 🆕 EMIT UPDATED INVENTORY after order fulfillment
-            socketio.emit('inventory_updated', shop_info.get_real_time_stats())
-            socketio.emit('order_completed', {
-                'type': order_type,
-                'item': item if isinstance(item, dict) else {'name': item_name, 'price': item_price},
-                'session_id': session_id,
-                'payment_result': payment_result,
-                'inventory_updated': True  # Flag that inventory was updated
-            })
-        except Exception as e:
-            print(f"⚠️ WebSocket emit failed: {e}, but order processed")
+            print(f"❌ Order fulfillment failed: {e}, refunding")
+            error = e
+            payment_result = order['payment_result']
+            refunded = payment_result.get('total_earned', order['item_price'])
+            if hasattr(shop.money_machine, 'refund'):
+                shop.money_machine.refund(order['payment_method'], order['item_price'],
+                                         payment_result.get('tip', 0.0), payment_result.get('quality_bonus', 0.0))
+    void_authorization(order)
+    status = 409 if isinstance(error, LookupError) else 500
+    return jsonify({'error': f'Order could not be made: {error}', 'refunded': refunded}), status
+
+def order_summary(order):
+    item = order['item']
+    return item if isinstance(item, dict) else {'name': order['item_name'], 'price': order['item_price']}
+
+def order_notify(order):
+    """Push inventory, availability, alerts and the completed order to the shop's clients"""
+    shop = order['shop']
+    room = shop_room(shop)
+    with shop.lock:
+        emit_inventory(shop, to=room)
+        emit_availability_changes(shop)
+        emit_stock_alerts(shop)
+    emit_compact('order_completed', {
+        'type': order['order_type'],
+        'item': order_summary(order),
+        'session_id': order['session_id'],
+        'payment_result': order['payment_result'],
+        'inventory_updated': True  # Flag that inventory was updated
+    }, to=room)
+
+def order_analytics(order):
+    """Best sellers, live dashboards and shift rollups (default shop only)"""
+    if order['shop'] is not default_shop:
+        return
+    item, item_name, item_price = order['item'], order['item_name'], order['item_price']
+    tip = order['payment_result'].get('tip', 0.0)
+    
+    # 🆕 Count the sale for live best sellers
+    if best_sellers and hasattr(item, 'id'):
+        best_sellers.record(item.id, order['session_id'])
+    
+    # 🆕 Push to live dashboards
+    if event_tail:
+        event_tail.publish('transaction', {
+            'type': order['order_type'],
+            'item': item_name,
+            'amount': item_price,
+            'payment_method': order['payment_method'],
+            'tip': tip,
+            'session_id': order['session_id']
+        })
+        publish_stock_events(order['ingredients'], item_name)
+    
+    # 🆕 Feed the analytics rollups
+    if shift_analytics:
+        shift_analytics.record_order(order['order_type'], item_price, tip, order['ingredients'])
+
+def order_leaderboard(order):
+    """Credit the session's totals and its place on the leaderboard (only sessions the server started)"""
+    game_session = game_sessions.get(order['session_id']) if order['session_id'] else None
+    if game_session is None:
+        return
+    session_id = order['session_id']
+    payment_result = order['payment_result']
+    earned = payment_result.get('total_earned', order['item_price'])
+    
+    game_session['orders_completed'] += 1
+    game_session['total_earnings'] += earned
+    
+    if leaderboard:
+        leaderboard.record(session_id, earned)
+
+ORDER_COMMIT_STAGES = (('validate', order_validate), ('reserve', order_reserve),
+                       ('charge', order_charge), ('fulfil', order_fulfil))
+ORDER_POST_STAGES = (('notify', order_notify), ('analytics', order_analytics),
+                     ('leaderboard', order_leaderboard))
+
+# 🆕 Card processor client (set PAYMENT_GATEWAY_URL; without it card payments use the demo check)
+def setup_payment_gateway():
+    url = os.environ.get('PAYMENT_GATEWAY_URL')
+    if not url:
+        return None
+    try:
+        from enhanced_models.money_machine import MoneyMachineWeb
+        from enhanced_models.payment_gateway import CircuitBreaker, HttpGateway
+    except ImportError as e:
+        print(f"⚠️ Payment gateway not available: {e}")
+        return None
+    
+    options = {}
+    if socketio.async_mode == 'eventlet':
+        # Green sockets: a charge waiting on the processor yields to other requests
+        from eventlet.green.http import client as green_http_client
+        from eventlet.semaphore import BoundedSemaphore
+        options['http_module'] = green_http_client
+        options['semaphore_class'] = BoundedSemaphore
+    try:
+        gateway = HttpGateway(
+            url,
+            pool_size=int(os.environ.get('PAYMENT_POOL_SIZE', 10)),
+            max_in_flight=int(os.environ.get('PAYMENT_MAX_IN_FLIGHT', 0)) or None,
+            timeout=float(os.environ.get('PAYMENT_TIMEOUT', 2.0)),
+            total_timeout=float(os.environ.get('PAYMENT_TOTAL_TIMEOUT', 5.0)),
+            retries=int(os.environ.get('PAYMENT_RETRIES', 2)),
+            breaker=CircuitBreaker(int(os.environ.get('PAYMENT_BREAKER_FAILURES', 5)),
+                                   float(os.environ.get('PAYMENT_BREAKER_RESET', 30.0))),
+            sleep=socketio.sleep,
+            **options
+        )
+    except ValueError as e:
+        print(f"⚠️ Payment gateway not available: {e}")
+        return None
+    MoneyMachineWeb.gateway = gateway  # Every shop's money machine charges through it
+    print(f"💳 Card payments via {url}")
+    return gateway
+
+payment_gateway = setup_payment_gateway()
+
+def setup_order_pipeline():
+    try:
+        from enhanced_models.order_pipeline import OrderPipeline, DEFAULT_MAX_QUEUE
+    except ImportError as e:
+        print(f"⚠️ Order pipeline not available, orders run inline: {e}")
+        return None
+    
+    max_queue = int(os.environ.get('ORDER_QUEUE_SIZE', DEFAULT_MAX_QUEUE))
+    shed_at = os.environ.get('ORDER_SHED_DEPTH')
+    pipeline = OrderPipeline(ORDER_COMMIT_STAGES, ORDER_POST_STAGES, max_queue=max_queue,
+                             shed_at=int(shed_at) if shed_at else None)
+    
+    def pump():
+        while True:
+            try:
+                ran = pipeline.drain()
+            except Exception as e:
+                print(f"⚠️ Order pipeline pump error: {e}")
+                ran = 0
+            socketio.sleep(0 if ran else 0.01)
+    
+    socketio.start_background_task(pump)
+    return pipeline
+
+order_pipeline = setup_order_pipeline()
+
+def handle_order(shop, data, session_id):
+    """Match, pay for and fulfil one order in a shop; updates are pushed after the response"""
+    order = {'shop': shop, 'data': data, 'session_id': session_id,
+             'idempotency_key': request.headers.get('Idempotency-Key')}
+    try:
+        if order_pipeline:
+            if not order_pipeline.admit():
+                response = jsonify({'error': 'The shop is too busy right now, please retry'})
+                response.headers['Retry-After'] = '1'
+                return response, 503
+            # Each stage takes the shop lock itself, so a slow card processor doesn't hold it
+            rejection = order_pipeline.run(order)
+        else:
+            rejection = None
+            for _, stage in ORDER_COMMIT_STAGES:
+                rejection = stage(order)
+                if rejection is not None:
+                    break
+            if rejection is None:
+                for name, stage in ORDER_POST_STAGES:
+                    try:
+                        stage(order)
+                    except Exception as e:
+                        print(f"⚠️ Order stage '{name}' failed: {e}, but order processed")
+        if rejection is not None:
+            return rejection
         
         return jsonify({
             'success': True,
-            'item': item if isinstance(item, dict) else {'name': item_name, 'price': item_price},
-            'payment_result': payment_result,
+            'item': order_summary(order),
+            'payment_result': order['payment_result'],
             'inventory_updated': True
         })
     
@@ -475,8 +1375,263 @@ def process_order():
         traceback.print_exc()
         return jsonify({'error': f'Order processing failed: {str(e)}'}), 500
 
+# 🆕 MULTI-SHOP ROUTES (/api/shops/<shop_id>/...)
+def shop_route(rule, locked=True, **options):
+    """Register a per-shop route; the view gets the shop, which stays loaded until it returns
+    
+    With locked=False the view takes shop.lock itself where it needs it.
+    """
+    def decorator(func):
+        def view(shop_id):
+            if not shop_registry:
+                return jsonify({'error': 'Multi-shop hosting not available'}), 503
+            from enhanced_models.shop_registry import ShopError
+            try:
+                with shop_registry.checkout(shop_id) as shop:
+                    if shop is None:
+                        return jsonify({'error': f'Shop not found: {shop_id}'}), 404
+                    if not locked:
+                        return func(shop)
+                    with shop.lock:
+                        return func(shop)
+            except ShopError as e:
+                return jsonify({'error': str(e)}), shop_error_status(e)
+        view.__name__ = f"shop_{func.__name__}"
+        return app.route(f'/api/shops/<shop_id>{rule}', **options)(safe_route(view))
+    return decorator
+
+@app.route('/api/shops')
+@safe_route
+def shops():
+    """Registry stats"""
+    if not shop_registry:
+        return jsonify({'error': 'Multi-shop hosting not available'}), 503
+    return jsonify(shop_registry.stats())
+
+@app.route('/api/shops', methods=['POST'])
+@safe_route
+@admin_required
+def create_shop():
+    """Open a new shop ({shop_id, catalog}); every shop costs the server memory and disk, so admins only"""
+    if not shop_registry:
+        return jsonify({'error': 'Multi-shop hosting not available'}), 503
+    
+    from enhanced_models.shop_registry import ShopError
+    data = request.get_json(silent=True) or {}
+    try:
+        shop = shop_registry.create(data.get('shop_id'), data.get('catalog'))
+    except ShopError as e:
+        status = 409 if 'already exists' in str(e) else shop_error_status(e)
+        return jsonify({'error': str(e)}), status
+    
+    return jsonify({
+        'success': True,
+        'shop_id': shop.shop_id,
+        'menu_version': getattr(shop.coffee_menu, 'menu_version', 1)
+    }), 201
+
+@shop_route('/menu/coffee')
+def coffee_menu_for_shop(shop):
+    response = jsonify(shop.coffee_menu.get_menu_by_category())
+    response.headers['X-Menu-Version'] = str(getattr(shop.coffee_menu, 'menu_version', 1))
+    return response
+
+@shop_route('/menu/bakery')
+def bakery_menu_for_shop(shop):
+    response = jsonify(shop.bakery_menu.get_menu_by_category())
+    response.headers['X-Menu-Version'] = str(getattr(shop.bakery_menu, 'menu_version', 1))
+    return response
+
+@shop_route('/bootstrap')
+def bootstrap_for_shop(shop):
+    return bootstrap_response(shop)
+
+@shop_route('/inventory')
+def inventory_for_shop(shop):
+    return inventory_response(shop)
+
+@shop_route('/availability')
+def availability_for_shop(shop):
+    return availability_response(shop)
+
+@shop_route('/alerts')
+def alerts_for_shop(shop):
+    return alerts_response(shop)
+
+@shop_route('/earnings')
+def earnings_for_shop(shop):
+    return jsonify(shop.money_machine.get_earnings_summary())
+
+@shop_route('/purchase', locked=False, methods=['POST'])
+def purchase_for_shop(shop):
+    data = request.get_json()
+    return run_idempotent(shop, 'purchase', data, lambda: handle_purchase(shop, data))
+
+@shop_route('/order', locked=False, methods=['POST'])
+def order_for_shop(shop):
+    data = request.get_json()
+    session_id = session.get('session_id', 'default')
+    return run_idempotent(shop, 'order', data, lambda: handle_order(shop, data, session_id))
+
+# 🆕 SHARD HANDOFF (called by shard_router.py when workers are added or removed)
+@app.route('/api/admin/shards/release', methods=['POST'])
+@safe_route
+@admin_required
+def release_shards():
+    """Snapshot and unload the shops this worker stops owning under the new ring"""
+    if not shop_registry:
+        return jsonify({'error': 'Multi-shop hosting not available'}), 503
+    from enhanced_models.sharding import DEFAULT_SHOP_ID, HashRing, moving_away
+    
+    data = request.get_json(silent=True) or {}
+    node = data.get('node') or os.environ.get('WORKER_ID')
+    if not node or 'old_ring' not in data or 'new_ring' not in data:
+        return jsonify({'error': 'node, old_ring and new_ring required'}), 400
+    
+    moving = moving_away(HashRing.from_dict(data['old_ring']), HashRing.from_dict(data['new_ring']), node)
+    if data.get('release_default'):
+        # The primary worker changes: the default shop goes to the new one
+        ring_moving = moving
+        moving = lambda shop_id: shop_id == DEFAULT_SHOP_ID or ring_moving(shop_id)
+    snapshots = shop_registry.handoff(moving)
+    shop_registry.owns = shard_owner(node, data['new_ring'])
+    print(f"🔀 Handing off {len(snapshots)} shops from {node}")
+    return jsonify({'node': node, 'snapshots': snapshots})
+
+@app.route('/api/admin/shards/accept', methods=['POST'])
+@safe_route
+@admin_required
+def accept_shards():
+    """Take ownership of shops handed off by another worker, under the new ring ({ring, node})"""
+    if not shop_registry:
+        return jsonify({'error': 'Multi-shop hosting not available'}), 503
+    from enhanced_models.shop_registry import ShopError
+    
+    data = request.get_json(silent=True) or {}
+    node = data.get('node') or os.environ.get('WORKER_ID')
+    if data.get('ring') and node:
+        shop_registry.owns = shard_owner(node, data['ring'])
+    try:
+        accepted = shop_registry.accept(data.get('snapshots', []))
+    except ShopError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'accepted': accepted})
+
+# 🆕 TIME TRAVEL: a shop rebuilt from its event log as of a moment in the past
+@app.route('/api/admin/shops/<shop_id>/replay')
+@safe_route
+@admin_required
+def replay_shop(shop_id):
+    """Inventory and earnings as of ?until=<ISO time or unix seconds> (default: now)"""
+    if not shop_registry:
+        return jsonify({'error': 'Multi-shop hosting not available'}), 503
+    from enhanced_models.shop_registry import ShopError
+    from enhanced_models.event_log import log_stats
+    
+    until = request.args.get('until')
+    try:
+        if until:
+            until = float(until) if until.replace('.', '', 1).isdigit() else datetime.fromisoformat(until).timestamp()
+        rebuilt = shop_registry.state_at(shop_id, until or None)
+    except (ShopError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    if rebuilt is None:
+        return jsonify({'error': f'No event log for shop: {shop_id}'}), 404
+    
+    rebuilt_info, rebuilt_money, result = rebuilt
+    return jsonify({
+        'shop_id': shop_id,
+        'until': until,
+        'events_applied': result['events'],
+        'log': log_stats(shop_registry.store.log_path(shop_id)),
+        'inventory': rebuilt_info.get_real_time_stats(),
+        'earnings': rebuilt_money.get_earnings_summary()
+    })
+
+@app.route('/api/analytics/series')
+@safe_route
+def get_analytics_series():
+    """Get a chart series, e.g. ?metric=revenue&resolution=minute&points=60&max_points=12"""
+    if not shift_analytics:
+        return jsonify({'error': 'Analytics not available'}), 503
+    
+    metric = request.args.get('metric', 'revenue')
+    resolution = request.args.get('resolution', 'minute')
+    points = request.args.get('points', 60, type=int)
+    max_points = request.args.get('max_points', type=int)
+    
+    try:
+        series = shift_analytics.get_series(metric, resolution, points, max_points)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    series['available_metrics'] = shift_analytics.metrics()
+    return jsonify(series)
+
+@app.route('/api/admin/export-history', methods=['POST'])
+@safe_route
+@admin_required
+def export_history_now():
+    """Export log rows added since the last export to columnar files"""
+    if not history_export_job:
+        return jsonify({'error': 'History export not available'}), 503
+    
+    from enhanced_models.history_export import ExportError
+    data = request.get_json(silent=True) or {}
+    fmt = data.get('format', history_export_job.fmt)
+    if fmt not in ('parquet', 'arrow'):
+        return jsonify({'error': 'format must be parquet or arrow'}), 400
+    
+    try:
+        history_export_job.fmt = fmt
+        files = history_export_job.run_once()
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    return jsonify({
+        'success': True,
+        'files': files,
+        'message': None if files else 'Nothing new to export',
+        'exported_at': history_export_job.last_run
+    })
+
+@app.route('/api/history/<log_name>')
+@safe_route
+@admin_required
+def stream_history(log_name):
+    """Stream a history log as NDJSON, e.g. ?cursor=1000&limit=500 or ?tail=50"""
+    try:
+        from enhanced_models.history_stream import HISTORY_LOGS, resolve_window, iter_ndjson, page_info
+    except ImportError as e:
+        return jsonify({'error': f'History streaming not available: {e}'}), 503
+    
+    if log_name not in HISTORY_LOGS:
+        return jsonify({'error': f'Unknown log: {log_name}', 'available_logs': sorted(HISTORY_LOGS)}), 404
+    
+    owner, attribute = HISTORY_LOGS[log_name]
+    records = getattr(shop_info if owner == 'shop' else money_machine, attribute, None)
+    if records is None:
+        return jsonify({'error': f'{log_name} history not available'}), 503
+    
+    start, end = resolve_window(
+        records,
+        cursor=request.args.get('cursor', type=int),
+        limit=request.args.get('limit', type=int),
+        tail=request.args.get('tail', type=int)
+    )
+    info = page_info(start, end, len(records))
+    
+    response = Response(
+        stream_with_context(iter_ndjson(records, start, end, redact=('card_number',))),
+        mimetype='application/x-ndjson'
+    )
+    response.headers['X-Cursor'] = str(info['cursor'])
+    response.headers['X-Next-Cursor'] = str(info['next_cursor'])
+    response.headers['X-Has-More'] = 'true' if info['has_more'] else 'false'
+    return response
+
 # === WEBSOCKET EVENTS ===
-@socketio.on('connect')
+@on_socket_event('connect')
 def handle_connect():
     """Handle client connection"""
     session_id = session.get('session_id')
@@ -486,38 +1641,244 @@ def handle_connect():
     
     # Initialize game session
     if session_id not in game_sessions:
-        game_sessions[session_id] = {
-            'start_time': datetime.now(),
-            'orders_completed': 0,
-            'total_earnings': 0.0,
-            'quality_scores': []
-        }
+        game_sessions[session_id] = new_game_session()
+    
+    # 🆕 Wire format negotiation: old clients send nothing and stay on JSON
+    wire = 'json'
+    if request.args.get('wire') == 'msgpack' and wire_codec:
+        wire = 'msgpack'
+        wire_clients.add(request.sid)
+        emit('wire_format', wire_codec.schema())
+    join_wire_room()
     
     print(f"🔌 Client connected: {session_id}")
-    emit('connected', {'session_id': session_id})
+    emit('connected', {'session_id': session_id, 'wire': wire})
+    
+    # 🆕 ?shop_id= is also the shard routing key: a franchise client joins its shop straight away
+    shop_id = request.args.get('shop_id')
+    if shop_registry and shop_id and shop_id != default_shop.shop_id:
+        join_shop_room(shop_id)
+        return
     
     try:
-        emit('inventory_updated', shop_info.get_real_time_stats())
+        emit_inventory(to=request.sid)
     except:
         emit('inventory_updated', {})
+    
+    if hasattr(shop_info, 'get_feasibility'):
+        emit('availability_updated', {'changed': shop_info.get_feasibility()['servings'], 'full': True})
 
-@socketio.on('disconnect')
+@on_socket_event('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
     session_id = session.get('session_id', 'unknown')
+    if event_tail:
+        event_tail.unsubscribe(request.sid)
+    wire_clients.discard(request.sid)
     print(f"🔌 Client disconnected: {session_id}")
 
 # 🆕 INVENTORY WEBSOCKET EVENTS
-@socketio.on('request_inventory_update')
+@on_socket_event('request_inventory_update')
 def handle_inventory_request():
     """Handle manual inventory update requests"""
     try:
-        emit('inventory_updated', shop_info.get_real_time_stats())
+        emit_inventory(to=request.sid)
         print("📦 Inventory update sent to client")
     except Exception as e:
         print(f"❌ Error sending inventory update: {e}")
         emit('inventory_error', {'error': str(e)})
 
+# 🆕 PER-SHOP LIVE UPDATES
+@on_socket_event('join_shop')
+def handle_join_shop(data=None):
+    """Receive one franchise's inventory/order updates instead of the default shop's"""
+    shop_id = (data or {}).get('shop_id')
+    if not shop_registry or not shop_id:
+        emit('shop_error', {'error': 'shop_id required'})
+        return
+    join_shop_room(shop_id)
+
+def join_shop_room(shop_id):
+    """Put this client in a shop's room (only a shop this worker owns) and send its inventory"""
+    from enhanced_models.shop_registry import ShopError
+    try:
+        with shop_registry.checkout(shop_id) as shop:
+            if shop is None:
+                emit('shop_error', {'error': f'Shop not found: {shop_id}'})
+                return
+            join_room(shop.room)
+            join_wire_room(shop.room)
+            emit_inventory(shop, to=request.sid)
+            if hasattr(shop.shop_info, 'get_feasibility'):
+                emit('availability_updated', {'changed': shop.shop_info.get_feasibility()['servings'],
+                                              'full': True})
+    except ShopError as e:
+        emit('shop_error', {'error': str(e)})
+
+@on_socket_event('leave_shop')
+def handle_leave_shop(data=None):
+    shop_id = (data or {}).get('shop_id')
+    if shop_id:
+        leave_room(f"shop:{shop_id}")
+        for room in wire_rooms(f"shop:{shop_id}"):
+            leave_room(room)
+
+# 🆕 LIVE EVENT TAIL
+@on_socket_event('subscribe_tail')
+def handle_subscribe_tail(data=None):
+    """Subscribe to pushed transaction/usage/purchase/alert events"""
+    if not event_tail:
+        emit('tail_error', {'error': 'Event tail not available'})
+        return
+    
+    data = data or {}
+    result = event_tail.subscribe(
+        request.sid,
+        types=data.get('types'),
+        policy=data.get('policy', 'drop_oldest'),
+        max_queue=int(data.get('max_queue', 500)),
+        resume_from=data.get('resume_from')
+    )
+    emit('tail_subscribed', result)
+
+@on_socket_event('unsubscribe_tail')
+def handle_unsubscribe_tail():
+    if event_tail:
+        event_tail.unsubscribe(request.sid)
+
+@app.route('/api/admin/order-pipeline')
+@safe_route
+@admin_required
+def get_order_pipeline_stats():
+    """Per-stage latency, queue depths and shed orders"""
+    if not order_pipeline:
+        return jsonify({'error': 'Order pipeline not available'}), 503
+    return jsonify(order_pipeline.stats())
+
+@app.route('/api/admin/payment-gateway')
+@safe_route
+@admin_required
+def get_payment_gateway_stats():
+    """Card processor calls, retries, pool and circuit breaker state"""
+    if not payment_gateway:
+        return jsonify({'error': 'No payment gateway configured (set PAYMENT_GATEWAY_URL)'}), 503
+    return jsonify(payment_gateway.stats())
+
+@app.route('/api/admin/traffic-recorder')
+@safe_route
+@admin_required
+def get_traffic_recorder_stats():
+    """Records captured so far (start the server with RECORD_TRAFFIC=<file>)"""
+    if not traffic_recorder:
+        return jsonify({'recording': False})
+    return jsonify(traffic_recorder.stats())
+
+# 🆕 MEMORY ACCOUNTING: nothing is measured or traced until one of these is called
+@app.route('/api/admin/memory')
+@safe_route
+@admin_required
+def get_memory_report():
+    """Deep sizes of the growing structures (?shop_id= for another loaded shop, ?sample=N)"""
+    if not allocation_tracker:
+        return jsonify({'error': 'Memory accounting not available'}), 503
+    from enhanced_models.memory_report import structure_sizes, process_memory, DEFAULT_SAMPLE
+    
+    shop_id = request.args.get('shop_id')
+    shop = shop_registry.shops.get(shop_id) if shop_registry and shop_id else default_shop
+    if shop is None:
+        return jsonify({'error': f'Shop not loaded: {shop_id}'}), 404
+    sample = max(1, request.args.get('sample', DEFAULT_SAMPLE, type=int))
+    
+    with shop.lock:
+        report = structure_sizes({
+            'usage_history': shop.shop_info.usage_history,
+            'transaction_history': shop.money_machine.transaction_history,
+            'purchase_history': shop.shop_info.purchase_history,
+            'restock_log': shop.shop_info.restock_log,
+            'ledger': getattr(shop.money_machine, 'ledger', None),
+            'game_sessions': game_sessions,
+            'leaderboard': leaderboard,
+            'coffee_menu': shop.coffee_menu,
+            'bakery_menu': shop.bakery_menu
+        }, sample)
+    report.update({
+        'shop_id': shop.shop_id,
+        'sample': sample,
+        'loaded_shops': len(shop_registry.shops) if shop_registry else 1,
+        'process': process_memory(),
+        'tracemalloc': allocation_tracker.stats()
+    })
+    return jsonify(report)
+
+@app.route('/api/admin/memory/tracemalloc', methods=['GET', 'POST'])
+@safe_route
+@admin_required
+def tracemalloc_control():
+    """GET: tracing state and snapshots. POST {action: start|stop, frames}"""
+    if not allocation_tracker:
+        return jsonify({'error': 'Memory accounting not available'}), 503
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        action = data.get('action')
+        if action == 'start':
+            allocation_tracker.start(data.get('frames', 1))
+        elif action == 'stop':
+            allocation_tracker.stop()
+        else:
+            return jsonify({'error': "action must be 'start' or 'stop'"}), 400
+    return jsonify(allocation_tracker.stats())
+
+@app.route('/api/admin/memory/snapshots', methods=['POST'])
+@safe_route
+@admin_required
+def take_memory_snapshot():
+    """Store a tracemalloc snapshot {label} to diff against later"""
+    if not allocation_tracker:
+        return jsonify({'error': 'Memory accounting not available'}), 503
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(allocation_tracker.take(data.get('label'))), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+
+@app.route('/api/admin/memory/top')
+@safe_route
+@admin_required
+def get_top_allocators():
+    """Largest allocation sites: ?snapshot=<id> (default: now), ?limit=20, ?group_by=lineno|filename|traceback"""
+    if not allocation_tracker:
+        return jsonify({'error': 'Memory accounting not available'}), 503
+    try:
+        top = allocation_tracker.top(request.args.get('snapshot'), request.args.get('limit', 20, type=int),
+                                     request.args.get('group_by', 'lineno'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'top': top})
+
+@app.route('/api/admin/memory/diff')
+@safe_route
+@admin_required
+def diff_memory_snapshots():
+    """Growth between ?from=<id> and ?to=<id> (default: now), biggest first"""
+    if not allocation_tracker:
+        return jsonify({'error': 'Memory accounting not available'}), 503
+    try:
+        diff = allocation_tracker.diff(request.args.get('from'), request.args.get('to'),
+                                       request.args.get('limit', 20, type=int),
+                                       request.args.get('group_by', 'lineno'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'diff': diff})
+
+@app.route('/api/admin/tail-stats')
+@safe_route
+@admin_required
+def get_tail_stats():
+    """Subscriber queue depths, drops and coalescing counts"""
+    if not event_tail:
+        return jsonify({'error': 'Event tail not available'}), 503
+    return jsonify(event_tail.stats())
+
 # === ERROR HANDLERS ===
 @app.errorhandler(404)
 def not_found(error):
@@ -590,10 +1951,17 @@ if __name__ == '__main__':
     print("   - 🆕 Complete inventory purchasing system")
     print("   - 🆕 Real-time ingredient deduction")
     print("   - 🆕 Smart cost management")
-    print(f"\n🌐 Access the game at: http://localhost:5000")
-    print("🎮 Direct game link: http://localhost:5000/pixel")
-    print("📊 API test: http://localhost:5000/api/test")
-    print("📦 Inventory API: http://localhost:5000/api/shop/inventory")
+    # Shard workers (started by shard_router.py) get their port from the environment
+    port = int(os.environ.get('PORT', 5000))
+    worker_id = os.environ.get('WORKER_ID')
+    
+    print(f"\n🌐 Access the game at: http://localhost:{port}")
+    print(f"🎮 Direct game link: http://localhost:{port}/pixel")
+    print(f"📊 API test: http://localhost:{port}/api/test")
+    print(f"📦 Inventory API: http://localhost:{port}/api/shop/inventory")
+    if worker_id:
+        print(f"🔀 Running as shard worker {worker_id}")
     
     # Start the server
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    socketio.run(app, debug=not worker_id, use_reloader=not worker_id,
+                 host='127.0.0.1' if worker_id else '0.0.0.0', port=port)
\ No newline at end of file
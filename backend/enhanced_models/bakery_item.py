@@ -2,43 +2,139 @@
 """
 Enhanced Bakery Item - Preserves original CLI functionality while adding web features
 """
-import json
+import sys
 from datetime import datetime
+from types import MappingProxyType
+
+try:
+    from .fast_json import dumps_str
+except ImportError:
+    from fast_json import dumps_str
+
+# Shared lookup tables, recipe vectors and dietary records. Every item with the
+# same recipe or dietary profile points at the same read-only object.
+BAKERY_INGREDIENT_ORDER = ("Plain Bagel", "Strawberry Cake", "Sesameseed Bagel",
+                           "Honey Bun", "Cinnamon Roll", "Croissant")
+_RECIPE_CACHE = {}
+_DIETARY_CACHE = {}
+
+PREP_TIMES = {
+    "Plain Bagel": 60,      # Slice and toast
+    "Strawberry Cake": 30,   # Just plate
+    "Sesameseed Bagel": 60,  # Slice and toast
+    "Honey Bun": 45,        # Warm slightly
+    "Cinnamon Roll": 90,    # Warm and glaze
+    "Croissant": 75         # Warm and prepare
+}
+
+DESCRIPTIONS = {
+    "Plain Bagel": "Freshly baked bagel, toasted to perfection. Simple and satisfying.",
+    "Strawberry Cake": "Moist vanilla cake layered with fresh strawberry filling and cream.",
+    "Sesameseed Bagel": "Traditional bagel topped with toasted sesame seeds for extra flavor.",
+    "Honey Bun": "Sweet, soft pastry glazed with golden honey. A morning favorite.",
+    "Cinnamon Roll": "Warm, spiral pastry with cinnamon sugar filling and sweet glaze.",
+    "Croissant": "Buttery, flaky French pastry with golden, crispy layers."
+}
+
+# Based on typical bakery popularity and price point
+POPULARITY = {
+    "Plain Bagel": 8,      # Classic choice
+    "Croissant": 7,        # Popular but pricier
+    "Cinnamon Roll": 9,    # Very popular
+    "Strawberry Cake": 6,  # Dessert item
+    "Sesameseed Bagel": 7, # Good alternative
+    "Honey Bun": 5         # Less common
+}
+
+WARM_ITEMS = frozenset(["Honey Bun", "Cinnamon Roll", "Croissant"])
+
+PREPARATION_STEPS = {
+    "Plain Bagel": (
+        {"action": "slice", "duration": 10, "description": "Slice bagel in half"},
+        {"action": "toast", "duration": 45, "description": "Toast until golden brown"},
+        {"action": "serve", "duration": 5, "description": "Place on plate"}
+    ),
+    "Strawberry Cake": (
+        {"action": "slice", "duration": 15, "description": "Cut perfect slice"},
+        {"action": "plate", "duration": 10, "description": "Place on dessert plate"},
+        {"action": "garnish", "duration": 5, "description": "Add finishing touches"}
+    ),
+    "Cinnamon Roll": (
+        {"action": "warm", "duration": 60, "description": "Warm in oven"},
+        {"action": "glaze", "duration": 20, "description": "Apply fresh glaze"},
+        {"action": "serve", "duration": 10, "description": "Serve while warm"}
+    )
+}
+
+
+def shared_bakery_recipe(amounts):
+    """Return the shared read-only ingredients mapping for a recipe vector"""
+    amounts = tuple(amounts)
+    recipe = _RECIPE_CACHE.get(amounts)
+    if recipe is None:
+        recipe = MappingProxyType(dict(zip(BAKERY_INGREDIENT_ORDER, amounts)))
+        _RECIPE_CACHE[amounts] = recipe
+    return recipe
+
+
+def shared_dietary_info(vegetarian, vegan, gluten_free, nut_free, allergens):
+    """Return the shared read-only dietary record for a dietary profile"""
+    key = (vegetarian, vegan, gluten_free, nut_free, tuple(allergens))
+    info = _DIETARY_CACHE.get(key)
+    if info is None:
+        info = MappingProxyType({
+            "vegetarian": vegetarian,
+            "vegan": vegan,
+            "gluten_free": gluten_free,
+            "nut_free": nut_free,
+            "allergens": key[4]
+        })
+        _DIETARY_CACHE[key] = info
+    return info
+
 
 class BakeryItemWeb:
-    """Enhanced version of original BakeryItem with web-ready features"""
+    """Enhanced version of original BakeryItem with web-ready features
+
+    Items are immutable and slotted: names are interned, ingredients and
+    dietary records are shared between items, and every derived field is
+    computed once at construction.
+    """
+    __slots__ = ('food', 'price', 'ingredients', 'id', 'prep_time', 'category',
+                 'dietary_info', 'description', 'popularity_score',
+                 'warming_required', '_dict', '_steps')
+
     def __init__(self, food, price, plainbagels, strawberrycake, sesbagel, honeybun, cinnamonroll, croissant):
         # PRESERVE: Original attributes exactly as they were
-        self.food = food
-        self.price = price
-        self.ingredients = {
-            "Plain Bagel": plainbagels,
-            "Strawberry Cake": strawberrycake,
-            "Sesameseed Bagel": sesbagel,
-            "Honey Bun": honeybun,
-            "Cinnamon Roll": cinnamonroll,
-            "Croissant": croissant
-        }
+        _set = object.__setattr__
+        _set(self, 'food', sys.intern(food))
+        _set(self, 'price', price)
+        _set(self, 'ingredients', shared_bakery_recipe(
+            (plainbagels, strawberrycake, sesbagel, honeybun, cinnamonroll, croissant)))
+        _set(self, 'id', sys.intern(food.lower().replace(' ', '_')))
         
         # NEW: Web-specific attributes
-        self.prep_time = self._calculate_prep_time()
-        self.category = self._get_category()
-        self.dietary_info = self._get_dietary_info()
-        self.description = self._generate_description()
-        self.popularity_score = self._calculate_popularity()
-        self.warming_required = self._needs_warming()
+        _set(self, 'prep_time', self._calculate_prep_time())
+        _set(self, 'category', sys.intern(self._get_category()))
+        _set(self, 'dietary_info', self._get_dietary_info())
+        _set(self, 'description', sys.intern(self._generate_description()))
+        _set(self, 'popularity_score', self._calculate_popularity())
+        _set(self, 'warming_required', self._needs_warming())
+        _set(self, '_dict', None)
+        _set(self, '_steps', None)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+    
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+    
+    def __repr__(self):
+        return f"BakeryItemWeb({self.food!r}, ${self.price:.2f})"
     
     def _calculate_prep_time(self):
         """Calculate preparation time based on item type"""
-        prep_times = {
-            "Plain Bagel": 60,      # Slice and toast
-            "Strawberry Cake": 30,   # Just plate
-            "Sesameseed Bagel": 60,  # Slice and toast
-            "Honey Bun": 45,        # Warm slightly
-            "Cinnamon Roll": 90,    # Warm and glaze
-            "Croissant": 75         # Warm and prepare
-        }
-        return prep_times.get(self.food, 45)
+        return PREP_TIMES.get(self.food, 45)
     
     def _get_category(self):
         """Categorize the bakery item"""
@@ -55,110 +151,91 @@ class BakeryItemWeb:
     
     def _get_dietary_info(self):
         """Get dietary information for web display"""
-        info = {
-            "vegetarian": True,  # All bakery items are vegetarian
-            "vegan": False,      # Most contain dairy/eggs
-            "gluten_free": False, # All contain wheat
-            "nut_free": True     # No nuts in these items
-        }
-        
-        # Special cases
+        # All bakery items are vegetarian, most contain dairy/eggs,
+        # all contain wheat and none contain nuts
         if "sesame" in self.food.lower():
-            info["allergens"] = ["sesame", "gluten"]
+            allergens = ("sesame", "gluten")
         else:
-            info["allergens"] = ["gluten", "dairy", "eggs"]
-            
-        return info
+            allergens = ("gluten", "dairy", "eggs")
+        
+        return shared_dietary_info(True, False, False, True, allergens)
     
     def _generate_description(self):
         """Generate appealing description for web display"""
-        descriptions = {
-            "Plain Bagel": "Freshly baked bagel, toasted to perfection. Simple and satisfying.",
-            "Strawberry Cake": "Moist vanilla cake layered with fresh strawberry filling and cream.",
-            "Sesameseed Bagel": "Traditional bagel topped with toasted sesame seeds for extra flavor.",
-            "Honey Bun": "Sweet, soft pastry glazed with golden honey. A morning favorite.",
-            "Cinnamon Roll": "Warm, spiral pastry with cinnamon sugar filling and sweet glaze.",
-            "Croissant": "Buttery, flaky French pastry with golden, crispy layers."
-        }
-        return descriptions.get(self.food, "Delicious bakery item made fresh daily.")
+        return DESCRIPTIONS.get(self.food, "Delicious bakery item made fresh daily.")
     
     def _calculate_popularity(self):
         """Calculate popularity score for recommendations (1-10)"""
-        # Based on typical bakery popularity and price point
-        popularity = {
-            "Plain Bagel": 8,      # Classic choice
-            "Croissant": 7,        # Popular but pricier
-            "Cinnamon Roll": 9,    # Very popular
-            "Strawberry Cake": 6,  # Dessert item
-            "Sesameseed Bagel": 7, # Good alternative
-            "Honey Bun": 5         # Less common
-        }
-        return popularity.get(self.food, 5)
+        return POPULARITY.get(self.food, 5)
     
     def _needs_warming(self):
         """Check if item should be warmed before serving"""
-        warm_items = ["Honey Bun", "Cinnamon Roll", "Croissant"]
-        return self.food in warm_items
+        return self.food in WARM_ITEMS
     
     def to_dict(self):
         """Convert to dictionary for JSON serialization"""
-        return {
-            'id': self.food.lower().replace(' ', '_'),
-            'name': self.food,
-            'price': self.price,
-            'ingredients': self.ingredients,
-            'prep_time': self.prep_time,
-            'category': self.category,
-            'description': self.description,
-            'dietary_info': self.dietary_info,
-            'popularity_score': self.popularity_score,
-            'warming_required': self.warming_required,
-            'image_url': f"/static/images/bakery/{self.category}.jpg"
-        }
+        # Built once per item; callers get a copy (nested ingredients and dietary info too) they may modify
+        if self._dict is None:
+            dietary_info = dict(self.dietary_info)
+            dietary_info["allergens"] = list(dietary_info["allergens"])
+            object.__setattr__(self, '_dict', {
+                'id': self.id,
+                'name': self.food,
+                'price': self.price,
+                'ingredients': dict(self.ingredients),
+                'prep_time': self.prep_time,
+                'category': self.category,
+                'description': self.description,
+                'dietary_info': dietary_info,
+                'popularity_score': self.popularity_score,
+                'warming_required': self.warming_required,
+                'image_url': f"/static/images/bakery/{self.category}.jpg"
+            })
+        result = dict(self._dict)
+        result['ingredients'] = dict(result['ingredients'])
+        dietary_info = result['dietary_info'] = dict(result['dietary_info'])
+        dietary_info['allergens'] = list(dietary_info['allergens'])
+        return result
     
     def get_preparation_steps(self):
         """Get step-by-step preparation for mini-games"""
-        steps = {
-            "Plain Bagel": [
-                {"action": "slice", "duration": 10, "description": "Slice bagel in half"},
-                {"action": "toast", "duration": 45, "description": "Toast until golden brown"},
-                {"action": "serve", "duration": 5, "description": "Place on plate"}
-            ],
-            "Strawberry Cake": [
-                {"action": "slice", "duration": 15, "description": "Cut perfect slice"},
-                {"action": "plate", "duration": 10, "description": "Place on dessert plate"},
-                {"action": "garnish", "duration": 5, "description": "Add finishing touches"}
-            ],
-            "Cinnamon Roll": [
-                {"action": "warm", "duration": 60, "description": "Warm in oven"},
-                {"action": "glaze", "duration": 20, "description": "Apply fresh glaze"},
-                {"action": "serve", "duration": 10, "description": "Serve while warm"}
-            ]
-        }
+        if self._steps is None:
+            steps = PREPARATION_STEPS.get(self.food)
+            if steps is None:
+                # Default steps for items not specifically defined
+                steps = (
+                    {"action": "prepare", "duration": 20, "description": f"Prepare {self.food}"},
+                    {"action": "warm", "duration": 25, "description": "Warm if needed"},
+                    {"action": "serve", "duration": 5, "description": "Present to customer"}
+                )
+            object.__setattr__(self, '_steps', steps)
         
-        # Default steps for items not specifically defined
-        default_steps = [
-            {"action": "prepare", "duration": 20, "description": f"Prepare {self.food}"},
-            {"action": "warm", "duration": 25, "description": "Warm if needed"},
-            {"action": "serve", "duration": 5, "description": "Present to customer"}
-        ]
-        
-        return steps.get(self.food, default_steps)
+        return list(self._steps)
+
+
+def _default_catalog():
+    try:
+        from .menu_catalog import get_default_catalog
+    except ImportError:
+        from menu_catalog import get_default_catalog
+    return get_default_catalog()
 
 
 class BakeryMenuWeb:
     """Enhanced version of original BakeryMenu with web capabilities"""
     
-    def __init__(self):
-        # PRESERVE: All original menu items but use enhanced class
-        self.menu = [
-            BakeryItemWeb(food="Plain Bagel", price=3.00, plainbagels=1, strawberrycake=0, sesbagel=0, honeybun=0, cinnamonroll=0, croissant=0),
-            BakeryItemWeb(food="Strawberry Cake", price=4.00, plainbagels=0, strawberrycake=1, sesbagel=0, honeybun=0, cinnamonroll=0, croissant=0),
-            BakeryItemWeb(food="Sesameseed Bagel", price=3.50, plainbagels=0, strawberrycake=0, sesbagel=1, honeybun=0, cinnamonroll=0, croissant=0),
-            BakeryItemWeb(food="Honey Bun", price=4.00, plainbagels=0, strawberrycake=0, sesbagel=0, honeybun=1, cinnamonroll=0, croissant=0),
-            BakeryItemWeb(food="Cinnamon Roll", price=3.70, plainbagels=0, strawberrycake=0, sesbagel=0, honeybun=0, cinnamonroll=2, croissant=0),
-            BakeryItemWeb(food="Croissant", price=3.00, plainbagels=0, strawberrycake=0, sesbagel=0, honeybun=0, cinnamonroll=0, croissant=1),
-        ]
+    def __init__(self, catalog=None):
+        # Menu items come from the data-file catalog; items are immutable,
+        # so every menu copy shares the same item objects
+        if catalog is None:
+            catalog = _default_catalog()
+        self.apply_catalog(catalog)
+    
+    def apply_catalog(self, catalog):
+        """Swap in the bakery items of a (re)loaded catalog"""
+        self.catalog = catalog
+        self.menu = list(catalog.bakery)
+        self.menu_version = catalog.version
     
     # PRESERVE: Original method for backward compatibility
     def find_food(self, orderName):
@@ -178,7 +255,7 @@ class BakeryMenuWeb:
     
     def get_menu_json(self):
         """Return menu as JSON for web API"""
-        return json.dumps([item.to_dict() for item in self.menu], indent=2)
+        return dumps_str([item.to_dict() for item in self.menu])
     
     def get_menu_by_category(self):
         """Group menu items by category for web display"""
@@ -190,34 +267,29 @@ class BakeryMenuWeb:
             categories[category].append(item.to_dict())
         return categories
     
-    def get_popular_items(self, count=3):
+    def get_popular_items(self, count=3, best_sellers=None):
         """Get most popular bakery items"""
-        popular = sorted(self.menu, key=lambda x: x.popularity_score, reverse=True)[:count]
+        if best_sellers is not None:
+            # Live best sellers first, then the static popularity scores
+            popular = best_sellers.rank_items(self.menu, count, lambda x: x.popularity_score)
+        else:
+            popular = self.catalog.popular_bakery[:count]
         return [item.to_dict() for item in popular]
     
     def get_quick_items(self):
         """Get items that can be prepared quickly"""
-        quick_items = [item for item in self.menu if item.prep_time <= 60]
+        quick_items = self.catalog.facet_index.filter_items({'type': ['food']}, prep_time_max=60)
         return [item.to_dict() for item in quick_items]
     
     def search_menu(self, query):
-        """Enhanced search for web interface"""
-        results = []
-        query_lower = query.lower()
-        
-        for item in self.menu:
-            # Search in name, category, and description
-            if (query_lower in item.food.lower() or 
-                query_lower in item.category.lower() or 
-                query_lower in item.description.lower()):
-                results.append(item.to_dict())
-        
-        return results
+        """Enhanced search for web interface, ranked best match first"""
+        items = self.catalog.search_index.search_items(query, 'food')
+        return [item.to_dict() for item in items]
     
     def get_food_by_id(self, food_id):
         """Find food by web-friendly ID"""
         for item in self.menu:
-            if item.food.lower().replace(' ', '_') == food_id:
+            if item.id == food_id:
                 return item
         return None
     def get_food_by_id_enhanced(self, food_id):
@@ -226,8 +298,7 @@ class BakeryMenuWeb:
         
         # Strategy 1: Exact ID match (web-friendly format)
         for item in self.menu:
-            item_id = item.food.lower().replace(' ', '_')
-            if item_id == food_id:
+            if item.id == food_id:
                 print(f"✅ Found exact ID match: {item.food}")
                 return item
         
@@ -258,28 +329,12 @@ class BakeryMenuWeb:
         return None
     def get_dietary_filtered_menu(self, dietary_restrictions):
         """Filter menu by dietary restrictions"""
-        filtered = []
-        
-        for item in self.menu:
-            dietary_info = item.dietary_info
-            suitable = True
-            
-            # Check each restriction
-            for restriction in dietary_restrictions:
-                if restriction == 'vegetarian' and not dietary_info.get('vegetarian', False):
-                    suitable = False
-                    break
-                elif restriction == 'vegan' and not dietary_info.get('vegan', False):
-                    suitable = False
-                    break
-                elif restriction == 'gluten_free' and not dietary_info.get('gluten_free', False):
-                    suitable = False
-                    break
-            
-            if suitable:
-                filtered.append(item.to_dict())
+        filters = {'type': ['food']}
+        for restriction in dietary_restrictions:
+            if restriction in ('vegetarian', 'vegan', 'gluten_free'):
+                filters[restriction] = ['true']
         
-        return filtered
+        return [item.to_dict() for item in self.catalog.facet_index.filter_items(filters)]
     
     def get_preparation_queue(self, orders):
         """Optimize preparation order for efficiency"""
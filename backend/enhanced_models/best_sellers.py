@@ -0,0 +1,142 @@
+# backend/enhanced_models/best_sellers.py
+"""
+Best Sellers - Approximate top-K tracking of what is selling right now
+NEW: Space-Saving heavy hitters over sliding windows, shop-wide and per session
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class SpaceSaving:
+    """Space-Saving sketch: keeps at most `capacity` counters
+
+    Any item sold more than total/capacity times is guaranteed to be tracked;
+    a count may be overestimated by at most its recorded error.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.counters = {}  # item -> [count, error]
+        self.total = 0
+
+    def add(self, item: str, weight: int = 1):
+        self.total += weight
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+        else:
+            # Evict the smallest counter; the newcomer inherits its count as error
+            victim = min(self.counters, key=lambda k: self.counters[k][0])
+            min_count = self.counters.pop(victim)[0]
+            self.counters[item] = [min_count + weight, min_count]
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[str, int]]:
+        ranked = sorted(self.counters.items(), key=lambda x: (-x[1][0], x[0]))
+        return [(item, counter[0]) for item, counter in ranked[:k]]
+
+
+class WindowedTopK:
+    """Top-K over a sliding window made of fixed panes, one sketch per pane"""
+
+    def __init__(self, window_seconds: int = 3600, panes: int = 12, capacity: int = 64,
+                 clock=time.time):
+        self.pane_seconds = max(1, window_seconds // panes)
+        self.capacity = capacity
+        self.clock = clock
+        self.panes = [None] * panes      # pane index -> (pane id, SpaceSaving)
+        self.all_time = SpaceSaving(capacity)
+
+    def _pane(self, pane_id: int) -> SpaceSaving:
+        slot = pane_id % len(self.panes)
+        pane = self.panes[slot]
+        if pane is None or pane[0] != pane_id:
+            pane = (pane_id, SpaceSaving(self.capacity))
+            self.panes[slot] = pane
+        return pane[1]
+
+    def add(self, item: str, weight: int = 1):
+        pane_id = int(self.clock() // self.pane_seconds)
+        self._pane(pane_id).add(item, weight)
+        self.all_time.add(item, weight)
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Merge the panes still inside the window"""
+        current = int(self.clock() // self.pane_seconds)
+        oldest = current - len(self.panes) + 1
+        merged = {}
+        for pane in self.panes:
+            if pane is not None and pane[0] >= oldest:
+                for item, counter in pane[1].counters.items():
+                    merged[item] = merged.get(item, 0) + counter[0]
+        ranked = sorted(merged.items(), key=lambda x: (-x[1], x[0]))
+        return ranked[:k]
+
+
+class BestSellerTracker:
+    """Live best sellers for the whole shop and for each recent session"""
+
+    def __init__(self, window_seconds: int = 3600, capacity: int = 64,
+                 session_capacity: int = 16, max_sessions: int = 1000, clock=time.time):
+        self.window_seconds = window_seconds
+        self.session_capacity = session_capacity
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.shop = WindowedTopK(window_seconds, capacity=capacity, clock=clock)
+        self.sessions = OrderedDict()  # session id -> WindowedTopK, least recent first
+        self._lock = threading.Lock()
+
+    def record(self, item_id: str, session_id: Optional[str] = None, quantity: int = 1):
+        """Count one sale; called from the order path"""
+        with self._lock:
+            self.shop.add(item_id, quantity)
+            if session_id:
+                tracker = self.sessions.get(session_id)
+                if tracker is None:
+                    tracker = WindowedTopK(self.window_seconds, capacity=self.session_capacity,
+                                           clock=self.clock)
+                    self.sessions[session_id] = tracker
+                    if len(self.sessions) > self.max_sessions:
+                        self.sessions.popitem(last=False)
+                else:
+                    self.sessions.move_to_end(session_id)
+                tracker.add(item_id, quantity)
+
+    def top(self, k: Optional[int] = 5, window: str = 'recent',
+            session_id: Optional[str] = None) -> List[Tuple[str, int]]:
+        """(item id, sales) pairs, best first; window is 'recent' or 'all'"""
+        with self._lock:
+            tracker = self.sessions.get(session_id) if session_id else self.shop
+            if tracker is None:
+                return []
+            if window == 'all':
+                return tracker.all_time.top(k)
+            return tracker.top(k)
+
+    def rank_items(self, items, count: int, fallback_key, window: str = 'recent') -> List:
+        """Order menu items by live sales, filling any gap with the static ranking"""
+        by_id = {item.id: item for item in items}
+        ranked = [by_id[item_id] for item_id, _ in self.top(None, window) if item_id in by_id][:count]
+        if len(ranked) < count:
+            chosen = set(id(item) for item in ranked)
+            for item in sorted(items, key=fallback_key, reverse=True):
+                if id(item) not in chosen:
+                    ranked.append(item)
+                    if len(ranked) >= count:
+                        break
+        return ranked
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    tracker = BestSellerTracker(window_seconds=600)
+    sales = ['croissant'] * 5 + ['medium_oatmilk_hot_latte'] * 8 + ['plain_bagel'] * 2
+    for i, item_id in enumerate(sales):
+        tracker.record(item_id, session_id='session_a' if i % 2 else 'session_b')
+
+    print("=== BEST SELLERS ===")
+    print(f"Shop-wide (last 10 min): {tracker.top(3)}")
+    print(f"Session A: {tracker.top(3, session_id='session_a')}")
@@ -0,0 +1,73 @@
+# backend/enhanced_models/bootstrap.py
+"""
+Bootstrap - Everything a new game client needs, in one cached response
+NEW: Serialized and gzipped once per menu/stock version, shared by every join
+
+ETags carry a per-boot id: version counters restart with the process, so
+without it a client could get a 304 for a body the new process never sent.
+"""
+import gzip
+import threading
+import uuid
+from typing import Callable, Dict, Hashable
+
+try:
+    from .fast_json import dumps
+except ImportError:
+    from fast_json import dumps
+
+BOOT_ID = uuid.uuid4().hex[:12]
+
+
+class BootstrapPayload:
+    """One serialized bootstrap body plus its lazily gzipped form"""
+    __slots__ = ('etag', 'body', '_gzipped')
+
+    def __init__(self, etag: str, body: bytes):
+        self.etag = etag
+        self.body = body
+        self._gzipped = None
+
+    @property
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6)
+        return self._gzipped
+
+
+class BootstrapCache:
+    """Rebuilds the payload only when its version key changes"""
+
+    def __init__(self, build: Callable[[], Dict], boot_id: str = BOOT_ID):
+        self.build = build
+        self.boot_id = boot_id
+        self.builds = 0
+        self._key = None
+        self._payload = None
+        self._lock = threading.Lock()
+
+    def get(self, version_key: Hashable) -> BootstrapPayload:
+        payload = self._payload
+        if payload is not None and self._key == version_key:
+            return payload
+        with self._lock:
+            if self._payload is None or self._key != version_key:
+                body = dumps(self.build())
+                etag = '-'.join([self.boot_id, *(str(part) for part in version_key)])
+                self._payload = BootstrapPayload(etag, body)
+                self._key = version_key
+                self.builds += 1
+            return self._payload
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    state = {'version': 1}
+    cache = BootstrapCache(lambda: {'menu': ['Latte'] * 50, 'version': state['version']})
+
+    print("=== BOOTSTRAP CACHE ===")
+    first = cache.get((1, state['version']))
+    print(f"ETag {first.etag}: {len(first.body)} bytes, {len(first.gzipped)} gzipped")
+    print(f"Cached: {cache.get((1, state['version'])) is first}")
+    state['version'] = 2
+    print(f"After a stock change: {cache.get((1, state['version'])).etag} (builds: {cache.builds})")
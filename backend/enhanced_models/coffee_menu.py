@@ -2,29 +2,71 @@
 """
 Enhanced Coffee Menu - Preserves original CLI functionality while adding web features
 """
-import json
+import sys
 from datetime import datetime
+from types import MappingProxyType
+
+try:
+    from .fast_json import dumps_str
+except ImportError:
+    from fast_json import dumps_str
+
+# Recipe vectors are stored once per distinct recipe and shared by every item
+# (and every menu copy) that uses them.
+INGREDIENT_ORDER = ("Water", "Regular Milk", "Oat Milk", "Almond Milk", "Coffee Beans", "Sugar")
+_RECIPE_CACHE = {}
+
+CATEGORY_DESCRIPTIONS = {
+    "latte": "Smooth espresso with steamed milk and a light foam layer",
+    "cappuccino": "Rich espresso topped with thick, creamy foam",
+    "espresso": "Pure, concentrated coffee shot with rich crema",
+    "specialty": "Our signature coffee creation"
+}
+
+
+def shared_recipe(amounts):
+    """Return the shared read-only ingredients mapping for a recipe vector"""
+    amounts = tuple(amounts)
+    recipe = _RECIPE_CACHE.get(amounts)
+    if recipe is None:
+        recipe = MappingProxyType(dict(zip(INGREDIENT_ORDER, amounts)))
+        _RECIPE_CACHE[amounts] = recipe
+    return recipe
+
 
 class MenulistWeb:
-    """Enhanced version of original Menulist with web-ready features"""
+    """Enhanced version of original Menulist with web-ready features
+
+    Items are immutable and slotted: names are interned, the ingredients
+    mapping is shared between items with the same recipe, and every derived
+    field is computed once at construction.
+    """
+    __slots__ = ('coffeeName', 'ingredients', 'price', 'id', 'prep_time',
+                 'complexity', 'category', 'description', '_dict')
+
     def __init__(self, coffeeName, water, oatmilk, almondmilk, regmilk, coffeebeans, sugar, price):
         # Preserve original attributes
-        self.coffeeName = coffeeName
-        self.ingredients = {
-            "Water": water,
-            "Regular Milk": regmilk,
-            "Oat Milk": oatmilk,
-            "Almond Milk": almondmilk,
-            "Coffee Beans": coffeebeans,
-            "Sugar": sugar
-        }
-        self.price = price
+        _set = object.__setattr__
+        _set(self, 'coffeeName', sys.intern(coffeeName))
+        _set(self, 'ingredients', shared_recipe((water, regmilk, oatmilk, almondmilk, coffeebeans, sugar)))
+        _set(self, 'price', price)
+        _set(self, 'id', sys.intern(coffeeName.lower().replace(' ', '_')))
         
         # NEW: Web-specific attributes
-        self.prep_time = self._calculate_prep_time()
-        self.complexity = self._calculate_complexity()
-        self.category = self._get_category()
-        self.description = self._generate_description()
+        _set(self, 'prep_time', self._calculate_prep_time())
+        _set(self, 'complexity', self._calculate_complexity())
+        _set(self, 'category', sys.intern(self._get_category()))
+        _set(self, 'description', sys.intern(self._generate_description()))
+        _set(self, '_dict', None)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+    
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+    
+    def __repr__(self):
+        return f"MenulistWeb({self.coffeeName!r}, ${self.price:.2f})"
     
     def _calculate_prep_time(self):
         """Calculate preparation time based on drink complexity"""
@@ -78,13 +120,6 @@ class MenulistWeb:
     
     def _generate_description(self):
         """Generate appealing description for web display"""
-        descriptions = {
-            "latte": "Smooth espresso with steamed milk and a light foam layer",
-            "cappuccino": "Rich espresso topped with thick, creamy foam",
-            "espresso": "Pure, concentrated coffee shot with rich crema",
-            "specialty": "Our signature coffee creation"
-        }
-        
         size = "Large" if "large" in self.coffeeName.lower() else "Medium"
         milk_type = ""
         
@@ -97,21 +132,26 @@ class MenulistWeb:
         
         temperature = "hot" if "ice" not in self.coffeeName.lower() else "iced"
         
-        return f"{size} {temperature} {descriptions[self.category]}{milk_type}"
+        return f"{size} {temperature} {CATEGORY_DESCRIPTIONS[self.category]}{milk_type}"
     
     def to_dict(self):
         """Convert to dictionary for JSON serialization"""
-        return {
-            'id': self.coffeeName.lower().replace(' ', '_'),
-            'name': self.coffeeName,
-            'price': self.price,
-            'ingredients': self.ingredients,
-            'prep_time': self.prep_time,
-            'complexity': self.complexity,
-            'category': self.category,
-            'description': self.description,
-            'image_url': f"/static/images/coffee/{self.category}.jpg"
-        }
+        # Built once per item; callers get a copy (nested ingredients too) they may modify
+        if self._dict is None:
+            object.__setattr__(self, '_dict', {
+                'id': self.id,
+                'name': self.coffeeName,
+                'price': self.price,
+                'ingredients': dict(self.ingredients),
+                'prep_time': self.prep_time,
+                'complexity': self.complexity,
+                'category': self.category,
+                'description': self.description,
+                'image_url': f"/static/images/coffee/{self.category}.jpg"
+            })
+        result = dict(self._dict)
+        result['ingredients'] = dict(result['ingredients'])
+        return result
     
     def get_mini_game_config(self):
         """Return configuration for coffee-making mini-games"""
@@ -132,39 +172,29 @@ class MenulistWeb:
         }
 
 
+def _default_catalog():
+    try:
+        from .menu_catalog import get_default_catalog
+    except ImportError:
+        from menu_catalog import get_default_catalog
+    return get_default_catalog()
+
+
 class CoffeeMenuWeb:
     """Enhanced version of original CoffeeMenu with web capabilities"""
     
-    def __init__(self):
-        # Preserve all original menu items but use enhanced class
-        self.menu = [
-            MenulistWeb(coffeeName="medium regularmilk hot latte", water=160, regmilk=110, oatmilk=0, almondmilk=0, coffeebeans=14, sugar=2, price=4.50),
-            MenulistWeb(coffeeName="medium oatmilk hot latte", water=160, oatmilk=110, regmilk=0, almondmilk=0, coffeebeans=14, sugar=2, price=4.70),
-            MenulistWeb(coffeeName="medium almondmilk hot latte", water=160, almondmilk=110, oatmilk=0, regmilk=0, coffeebeans=14, sugar=2, price=4.70),
-            MenulistWeb(coffeeName="medium regularmilk ice latte", water=170, regmilk=80, oatmilk=0, almondmilk=0, coffeebeans=14, sugar=2, price=4.50),
-            MenulistWeb(coffeeName="medium oatmilk ice latte", water=170, oatmilk=80, regmilk=0, almondmilk=0, coffeebeans=14, sugar=2, price=4.70),
-            MenulistWeb(coffeeName="medium almondmilk ice latte", water=170, almondmilk=80, oatmilk=0, regmilk=0, coffeebeans=14, sugar=2, price=4.70),
-            MenulistWeb(coffeeName="large regularmilk hot latte", water=200, regmilk=150, oatmilk=0, almondmilk=0, coffeebeans=24, sugar=3, price=5.50),
-            MenulistWeb(coffeeName="large oatmilk hot latte", water=200, oatmilk=150, regmilk=0, almondmilk=0, coffeebeans=24, sugar=3, price=5.70),
-            MenulistWeb(coffeeName="large almondmilk hot latte", water=200, almondmilk=150, oatmilk=0, regmilk=0, coffeebeans=24, sugar=3, price=5.70),
-            MenulistWeb(coffeeName="large regularmilk ice latte", water=210, regmilk=110, oatmilk=0, almondmilk=0, coffeebeans=24, sugar=3, price=5.50),
-            MenulistWeb(coffeeName="large oatmilk ice latte", water=210, oatmilk=110, regmilk=0, almondmilk=0, coffeebeans=24, sugar=3, price=5.70),
-            MenulistWeb(coffeeName="large almondmilk ice latte", water=210, almondmilk=110, oatmilk=0, regmilk=0, coffeebeans=24, sugar=3, price=5.70),
-            MenulistWeb(coffeeName="medium hot expresso", water=50, regmilk=0, oatmilk=0, almondmilk=0, sugar=2, coffeebeans=24, price=4.70),
-            MenulistWeb(coffeeName="large hot expresso", water=50, regmilk=0, oatmilk=0, almondmilk=0, sugar=3, coffeebeans=24, price=5.70),
-            MenulistWeb(coffeeName="medium regularmilk hot cappuccino", water=200, regmilk=50, oatmilk=0, almondmilk=0, coffeebeans=18, sugar=2, price=4.70),
-            MenulistWeb(coffeeName="medium oatmilk hot cappuccino", water=200, oatmilk=50, regmilk=0, almondmilk=0, coffeebeans=18, sugar=2, price=4.90),
-            MenulistWeb(coffeeName="medium almondmilk hot cappuccino", water=200, almondmilk=50, oatmilk=0, regmilk=0, coffeebeans=18, sugar=2, price=4.90),
-            MenulistWeb(coffeeName="medium regularmilk ice cappuccino", water=210, regmilk=50, oatmilk=0, almondmilk=0, coffeebeans=18, sugar=2, price=4.70),
-            MenulistWeb(coffeeName="medium oatmilk ice cappuccino", water=210, oatmilk=50, regmilk=0, almondmilk=0, coffeebeans=18, sugar=2, price=4.90),
-            MenulistWeb(coffeeName="medium almondmilk ice cappuccino", water=210, almondmilk=50, oatmilk=0, regmilk=0, coffeebeans=18, sugar=2, price=4.90),
-            MenulistWeb(coffeeName="large regularmilk hot cappuccino", water=250, regmilk=70, oatmilk=0, almondmilk=0, coffeebeans=24, sugar=3, price=5.70),
-            MenulistWeb(coffeeName="large oatmilk hot cappuccino", water=250, oatmilk=70, regmilk=0, almondmilk=0, coffeebeans=24, sugar=3, price=5.90),
-            MenulistWeb(coffeeName="large almondmilk hot cappuccino", water=250, almondmilk=70, oatmilk=0, regmilk=0, coffeebeans=24, sugar=3, price=5.90),
-            MenulistWeb(coffeeName="large regularmilk ice cappuccino", water=260, regmilk=50, oatmilk=0, almondmilk=0, coffeebeans=24, sugar=3, price=5.70),
-            MenulistWeb(coffeeName="large oatmilk ice cappuccino", water=260, oatmilk=50, regmilk=0, almondmilk=0, coffeebeans=24, sugar=3, price=5.90),
-            MenulistWeb(coffeeName="large almondmilk ice cappuccino", water=260, almondmilk=50, oatmilk=0, regmilk=0, coffeebeans=24, sugar=3, price=5.90),
-        ]
+    def __init__(self, catalog=None):
+        # Menu items come from the data-file catalog; items are immutable,
+        # so every menu copy shares the same item objects
+        if catalog is None:
+            catalog = _default_catalog()
+        self.apply_catalog(catalog)
+    
+    def apply_catalog(self, catalog):
+        """Swap in the coffee items of a (re)loaded catalog"""
+        self.catalog = catalog
+        self.menu = list(catalog.coffee)
+        self.menu_version = catalog.version
     
     # PRESERVE: Original method for backward compatibility
     def coffee(self):
@@ -185,7 +215,7 @@ class CoffeeMenuWeb:
     # NEW: Web-specific methods
     def get_menu_json(self):
         """Return menu as JSON for web API"""
-        return json.dumps([item.to_dict() for item in self.menu], indent=2)
+        return dumps_str([item.to_dict() for item in self.menu])
     
     def get_menu_by_category(self):
         """Group menu items by category for web display"""
@@ -197,30 +227,33 @@ class CoffeeMenuWeb:
             categories[category].append(item.to_dict())
         return categories
     
-    def get_featured_items(self, count=3):
+    def get_featured_items(self, count=3, best_sellers=None):
         """Get featured menu items for homepage"""
-        # Sort by complexity and price for featured selection
-        featured = sorted(self.menu, key=lambda x: (x.complexity, x.price), reverse=True)[:count]
+        if best_sellers is not None:
+            # Live best sellers first, then the static ranking
+            featured = best_sellers.rank_items(self.menu, count, lambda x: (x.complexity, x.price))
+        else:
+            # Sort by complexity and price for featured selection
+            featured = sorted(self.menu, key=lambda x: (x.complexity, x.price), reverse=True)[:count]
         return [item.to_dict() for item in featured]
     
+    def filter_menu(self, prep_time_max=None, **filters):
+        """Filter drinks by facets, e.g. filter_menu(milk='oat', temp='iced')"""
+        filters = {facet: [value] if isinstance(value, str) else list(value)
+                   for facet, value in filters.items()}
+        filters['type'] = ['coffee']
+        items = self.catalog.facet_index.filter_items(filters, prep_time_max)
+        return [item.to_dict() for item in items]
+    
     def search_menu(self, query):
-        """Enhanced search for web interface"""
-        results = []
-        query_lower = query.lower()
-        
-        for item in self.menu:
-            # Search in name, category, and description
-            if (query_lower in item.coffeeName.lower() or 
-                query_lower in item.category.lower() or 
-                query_lower in item.description.lower()):
-                results.append(item.to_dict())
-        
-        return results
+        """Enhanced search for web interface, ranked best match first"""
+        items = self.catalog.search_index.search_items(query, 'coffee')
+        return [item.to_dict() for item in items]
     
     def get_coffee_by_id(self, coffee_id):
         """Find coffee by web-friendly ID"""
         for item in self.menu:
-            if item.coffeeName.lower().replace(' ', '_') == coffee_id:
+            if item.id == coffee_id:
                 return item
         return None
     def get_coffee_by_id_enhanced(self, coffee_id):
@@ -229,8 +262,7 @@ class CoffeeMenuWeb:
         
         # Strategy 1: Exact ID match (web-friendly format)
         for item in self.menu:
-            item_id = item.coffeeName.lower().replace(' ', '_')
-            if item_id == coffee_id:
+            if item.id == coffee_id:
                 print(f"✅ Found exact ID match: {item.coffeeName}")
                 return item
         
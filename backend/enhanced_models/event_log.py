@@ -0,0 +1,296 @@
+# backend/enhanced_models/event_log.py
+"""
+Event Log - Append-only binary journal of shop state changes
+NEW: Durable shops, time-travel debugging and deterministic replays
+
+ShopInfoWeb and MoneyMachineWeb report each mutation (ingredients used, a
+refill, a payment, a tip, a profit adjustment) to their `journal`. Each one
+becomes a length-prefixed binary record:
+
+    <u32 length> <u8 type> <f64 unix time> <fields...>
+
+The first record of a log is a BASE event holding the shop's full state, so
+replaying a log from offset 0 rebuilds the shop at any point in its history.
+Snapshots (ShopStore's JSON files) remember the log offset they cover.
+A snapshot of a journaled shop holds its stock and ledger but not its
+histories, which stay in the log; recovery rebuilds them by replaying the
+log (through mmap) from the start. `on_snapshot_due` is called from the
+append that makes a snapshot due, so every journaled shop is snapshotted
+regularly however its changes arrive.
+"""
+import mmap
+import os
+import struct
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    from .fast_json import dumps, loads
+except ImportError:
+    from fast_json import dumps, loads
+
+DEFAULT_SNAPSHOT_EVERY = 1000
+
+# Event types
+BASE = 0        # Full state the log starts from
+CONSUMED = 1    # Ingredients used by an order
+REFILLED = 2    # Ingredient bought back up to capacity
+PAID = 3        # Payment attempt (successful or not)
+TIPPED = 4      # Tip outside a payment
+ADJUSTED = 5    # Direct change to profit
+REFUNDED = 6    # Payment given back for an order that couldn't be served
+EVENT_NAMES = ('base', 'consumed', 'refilled', 'paid', 'tipped', 'adjusted', 'refunded')
+
+ORDER_TYPES = ('coffee', 'food')
+
+_LENGTH = struct.Struct('<I')
+_HEADER = struct.Struct('<Bd')
+_STR = struct.Struct('<H')
+_COUNT = struct.Struct('<BH')
+_QUANTITY = struct.Struct('<d')
+_REFILL = struct.Struct('<dd')
+_PAYMENT = struct.Struct('<Bddddd')
+_CENTS = struct.Struct('<q')
+_REFUND = struct.Struct('<ddd')
+
+
+def _pack_str(value) -> bytes:
+    data = str(value if value is not None else '').encode('utf-8')
+    return _STR.pack(len(data)) + data
+
+
+def _unpack_str(buffer, pos: int) -> Tuple[str, int]:
+    (length,) = _STR.unpack_from(buffer, pos)
+    pos += _STR.size
+    return buffer[pos:pos + length].decode('utf-8'), pos + length
+
+
+def _number(value: float):
+    """Whole quantities come back as ints, as they went in"""
+    return int(value) if value.is_integer() else value
+
+
+class EventLog:
+    """One shop's journal file; the models call the recording methods as they change state"""
+
+    def __init__(self, path: str, snapshot_every: int = DEFAULT_SNAPSHOT_EVERY, fsync: bool = False):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.since_snapshot = 0
+        self.appended = 0
+        self.on_snapshot_due = None   # called (under the shop's lock) once snapshot_every records are in
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'ab')
+
+    @property
+    def offset(self) -> int:
+        """End of the log: where the next record goes"""
+        return self._file.tell()
+
+    @property
+    def snapshot_due(self) -> bool:
+        return self.since_snapshot >= self.snapshot_every
+
+    def snapshot_taken(self):
+        self.since_snapshot = 0
+
+    def truncate(self, offset: int):
+        """Drop a torn record left at the end by a crash"""
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def close(self):
+        self._file.close()
+
+    def _append(self, event_type: int, ts: float, fields: bytes = b''):
+        body = _HEADER.pack(event_type, ts) + fields
+        self._file.write(_LENGTH.pack(len(body)) + body)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.since_snapshot += 1
+        self.appended += 1
+        if self.on_snapshot_due is not None and self.since_snapshot >= self.snapshot_every:
+            self.on_snapshot_due()
+
+    # Recording (called by the models)
+    def base(self, state: Dict, ts: Optional[float] = None):
+        self._append(BASE, ts if ts is not None else time.time(), dumps(state))
+
+    def consumed(self, ts: float, order_type: str, product: str, used: Dict):
+        parts = [_COUNT.pack(ORDER_TYPES.index(order_type), len(used)), _pack_str(product)]
+        for item, quantity in used.items():
+            parts.append(_pack_str(item))
+            parts.append(_QUANTITY.pack(quantity))
+        self._append(CONSUMED, ts, b''.join(parts))
+
+    def refilled(self, ts: float, item: str, amount, cost: float):
+        self._append(REFILLED, ts, _pack_str(item) + _REFILL.pack(amount, cost))
+
+    def paid(self, ts: float, payment_method: str, amount: float, input_amount: float, change: float,
+             success: bool, card_last4: Optional[str], tip: float, bonus: float):
+        self._append(PAID, ts, _PAYMENT.pack(success, amount, input_amount, change, tip, bonus) +
+                     _pack_str(payment_method) + _pack_str(card_last4))
+
+    def tipped(self, ts: float, amount: float, source: str):
+        self._append(TIPPED, ts, _QUANTITY.pack(amount) + _pack_str(source))
+
+    def adjusted(self, ts: float, cents: int):
+        self._append(ADJUSTED, ts, _CENTS.pack(cents))
+
+    def refunded(self, ts: float, payment_method: str, amount: float, tip: float, bonus: float):
+        self._append(REFUNDED, ts, _REFUND.pack(amount, tip, bonus) + _pack_str(payment_method))
+
+
+def _decode(event_type: int, buffer, pos: int):
+    """Fields of one record as the arguments its apply_* method takes"""
+    if event_type == CONSUMED:
+        order_type, count = _COUNT.unpack_from(buffer, pos)
+        product, pos = _unpack_str(buffer, pos + _COUNT.size)
+        used = {}
+        for _ in range(count):
+            item, pos = _unpack_str(buffer, pos)
+            used[item] = _number(_QUANTITY.unpack_from(buffer, pos)[0])
+            pos += _QUANTITY.size
+        return ORDER_TYPES[order_type], product, used
+    if event_type == REFILLED:
+        item, pos = _unpack_str(buffer, pos)
+        amount, cost = _REFILL.unpack_from(buffer, pos)
+        return item, _number(amount), cost
+    if event_type == PAID:
+        success, amount, input_amount, change, tip, bonus = _PAYMENT.unpack_from(buffer, pos)
+        payment_method, pos = _unpack_str(buffer, pos + _PAYMENT.size)
+        card_last4, pos = _unpack_str(buffer, pos)
+        return payment_method, amount, input_amount, change, bool(success), card_last4 or None, tip, bonus
+    if event_type == TIPPED:
+        (amount,) = _QUANTITY.unpack_from(buffer, pos)
+        source, pos = _unpack_str(buffer, pos + _QUANTITY.size)
+        return amount, source
+    if event_type == ADJUSTED:
+        return _CENTS.unpack_from(buffer, pos)
+    if event_type == REFUNDED:
+        amount, tip, bonus = _REFUND.unpack_from(buffer, pos)
+        payment_method, pos = _unpack_str(buffer, pos + _REFUND.size)
+        return payment_method, amount, tip, bonus
+    raise ValueError(f"Unknown event type {event_type}")
+
+
+def read_events(path: str, start: int = 0) -> Iterator[Tuple[int, int, float, mmap.mmap, int]]:
+    """(record end, type, time, buffer, field position) for each complete record from `start`
+
+    A record cut short at the end of the file (a crash mid-write) ends the
+    iteration; the last complete record's end is where appending should
+    resume.
+    """
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= start:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                pos = start
+                header_end = _LENGTH.size + _HEADER.size
+                while pos + header_end <= size:
+                    (length,) = _LENGTH.unpack_from(buffer, pos)
+                    end = pos + _LENGTH.size + length
+                    if end > size:
+                        break
+                    event_type, ts = _HEADER.unpack_from(buffer, pos + _LENGTH.size)
+                    yield end, event_type, ts, buffer, pos + header_end
+                    pos = end
+    except FileNotFoundError:
+        return
+
+
+def replay(path: str, shop_info, money_machine, start: int = 0, until: Optional[float] = None) -> Dict:
+    """Apply a log's records from `start` (up to time `until`) to a shop's models
+
+    Derived data (stats, feasibility, alerts) is rebuilt once at the end.
+    Returns how many events were applied and the offset just past the last one.
+    """
+    applied = 0
+    end = start
+    shop_apply = {CONSUMED: shop_info.apply_consumed, REFILLED: shop_info.apply_refilled}
+    money_apply = {PAID: money_machine.apply_paid, TIPPED: money_machine.apply_tipped,
+                   ADJUSTED: money_machine.apply_adjusted, REFUNDED: money_machine.apply_refunded}
+    for record_end, event_type, ts, buffer, pos in read_events(path, start):
+        if until is not None and ts > until:
+            break
+        if event_type == BASE:
+            state = loads(buffer[pos:record_end])
+            shop_info.load_state(state.get('shop', {}))
+            money_machine.load_state(state.get('money', {}))
+        else:
+            apply = shop_apply.get(event_type) or money_apply[event_type]
+            apply(ts, *_decode(event_type, buffer, pos))
+        applied += 1
+        end = record_end
+    if applied:
+        shop_info.rebuild_derived()
+    return {'events': applied, 'end': end}
+
+
+def log_stats(path: str, start: int = 0) -> Dict:
+    """Event counts by type and the time span of a log"""
+    counts = dict.fromkeys(EVENT_NAMES, 0)
+    first = last = None
+    for _, event_type, ts, _, _ in read_events(path, start):
+        counts[EVENT_NAMES[event_type]] += 1
+        first = ts if first is None else first
+        last = ts
+    return {'counts': counts, 'first': first, 'last': last,
+            'bytes': os.path.getsize(path) if os.path.exists(path) else 0}
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import tempfile
+
+    try:
+        from .shop_info import ShopInfoWeb
+        from .money_machine import MoneyMachineWeb
+    except ImportError:
+        from shop_info import ShopInfoWeb
+        from money_machine import MoneyMachineWeb
+
+    path = os.path.join(tempfile.mkdtemp(), 'demo.events')
+    log = EventLog(path)
+    shop, money = ShopInfoWeb(), MoneyMachineWeb()
+    log.base({'shop': shop.get_state(), 'money': money.get_state()})
+
+    recipe = {'Water': 160, 'Regular Milk': 110, 'Coffee Beans': 14, 'Sugar': 2}
+    count = 200_000
+    start = time.perf_counter()
+    ts = time.time()
+    for i in range(count):
+        if i % 4 == 0:
+            log.consumed(ts + i, 'coffee', 'medium regularmilk hot latte', recipe)
+        elif i % 4 == 1:
+            log.refilled(ts + i, 'Regular Milk', 110, 0.55)
+        elif i % 4 == 2:
+            log.paid(ts + i, 'card', 4.5, 5.0, 0.0, True, '4242', 0.5, 0.0)
+        else:
+            log.tipped(ts + i, 0.25, 'web')
+    elapsed = time.perf_counter() - start
+    log.close()
+
+    print("=== EVENT LOG ===")
+    print(f"Wrote {count:,} events in {elapsed:.2f}s ({os.path.getsize(path) / count:.0f} bytes/event)")
+
+    start = time.perf_counter()
+    scanned = sum(1 for _ in read_events(path))
+    elapsed = time.perf_counter() - start
+    print(f"Scanned {scanned:,} records in {elapsed:.3f}s ({scanned / elapsed:,.0f}/s)")
+
+    shop, money = ShopInfoWeb(), MoneyMachineWeb()
+    start = time.perf_counter()
+    result = replay(path, shop, money)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {result['events']:,} events in {elapsed:.2f}s ({result['events'] / elapsed:,.0f}/s)")
+    print(f"Profit ${money.profit:,.2f}, tips ${money.tips_collected:,.2f}, "
+          f"milk {shop.storage['Regular Milk']}ml")
+
+    midway = MoneyMachineWeb()
+    replay(path, ShopInfoWeb(), midway, until=ts + count / 2)
+    print(f"Halfway through: profit ${midway.profit:,.2f}")
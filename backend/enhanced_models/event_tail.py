@@ -0,0 +1,174 @@
+# backend/enhanced_models/event_tail.py
+"""
+Event Tail - Push feed of shop events for dashboards, with backpressure
+NEW: Per-subscriber bounded queues, drop-oldest or coalescing, resume-from-sequence
+
+Publishing only appends to in-memory queues, so a slow dashboard can never
+stall the order path. A subscriber gets its next batch only after it has
+acknowledged the previous one; while it lags, its queue stays bounded.
+
+Client side (Socket.IO):
+    socket.emit('subscribe_tail', {types: ['transaction', 'alert'], resume_from: lastSeq});
+    socket.on('tail_events', (batch, ack) => { handle(batch.events); ack(); });
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, Optional
+
+EVENT_TYPES = ('transaction', 'usage', 'purchase', 'alert')
+POLICIES = ('drop_oldest', 'coalesce')
+
+DEFAULT_QUEUE_SIZE = 500
+MAX_QUEUE_SIZE = 5000
+DEFAULT_HISTORY_SIZE = 10000   # Recent events kept for resume-from-sequence
+ACK_TIMEOUT = 10.0             # Seconds before an unacknowledged batch is given up on
+
+
+class TailSubscriber:
+    """One dashboard connection and its bounded queue"""
+
+    def __init__(self, sid: str, types: Optional[Iterable[str]] = None,
+                 policy: str = 'drop_oldest', max_queue: int = DEFAULT_QUEUE_SIZE):
+        self.sid = sid
+        self.types = set(types) if types else set(EVENT_TYPES)
+        self.policy = policy if policy in POLICIES else 'drop_oldest'
+        self.max_queue = max(1, min(max_queue, MAX_QUEUE_SIZE))
+        self.queue = OrderedDict()   # queue key -> event, oldest first
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_seq = 0
+        self.in_flight_since = None
+
+    def offer(self, event: Dict):
+        """Queue an event without ever blocking the publisher"""
+        if event['type'] not in self.types:
+            return
+        if self.policy == 'coalesce' and event.get('key') is not None:
+            # Keep only the newest event per (type, key), e.g. one stock level per ingredient
+            key = (event['type'], event['key'])
+            if key in self.queue:
+                del self.queue[key]
+                self.coalesced += 1
+        else:
+            key = event['seq']
+        self.queue[key] = event
+        if len(self.queue) > self.max_queue:
+            self.queue.popitem(last=False)
+            self.dropped += 1
+
+    def take(self, limit: int) -> List[Dict]:
+        events = []
+        while self.queue and len(events) < limit:
+            events.append(self.queue.popitem(last=False)[1])
+        if events:
+            self.last_seq = events[-1]['seq']
+        return events
+
+    def ready(self, now: float) -> bool:
+        """True when there is something to send and nothing unacknowledged"""
+        if not self.queue:
+            return False
+        if self.in_flight_since is not None and now - self.in_flight_since < ACK_TIMEOUT:
+            return False
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            'types': sorted(self.types),
+            'policy': self.policy,
+            'queued': len(self.queue),
+            'max_queue': self.max_queue,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'last_seq': self.last_seq,
+        }
+
+
+class EventTail:
+    """Sequenced event feed with a replay buffer and bounded subscribers"""
+
+    def __init__(self, history_size: int = DEFAULT_HISTORY_SIZE, clock=time.time):
+        self.clock = clock
+        self.seq = 0
+        self.history = deque(maxlen=history_size)
+        self.subscribers = {}  # sid -> TailSubscriber
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, data: Dict, key: Optional[str] = None) -> int:
+        """Append an event and hand it to every subscriber's queue"""
+        with self._lock:
+            self.seq += 1
+            event = {'seq': self.seq, 'type': event_type, 'ts': self.clock(), 'data': data}
+            if key is not None:
+                event['key'] = key
+            self.history.append(event)
+            for subscriber in self.subscribers.values():
+                subscriber.offer(event)
+            return self.seq
+
+    def subscribe(self, sid: str, types: Optional[Iterable[str]] = None, policy: str = 'drop_oldest',
+                  max_queue: int = DEFAULT_QUEUE_SIZE, resume_from: Optional[int] = None) -> Dict:
+        """Register a subscriber, optionally replaying events after `resume_from`"""
+        with self._lock:
+            subscriber = TailSubscriber(sid, types, policy, max_queue)
+            gap = False
+            if resume_from is not None:
+                oldest = self.history[0]['seq'] if self.history else self.seq + 1
+                # Events between resume_from and the buffer start are gone
+                gap = resume_from + 1 < oldest and resume_from < self.seq
+                for event in self.history:
+                    if event['seq'] > resume_from:
+                        subscriber.offer(event)
+            self.subscribers[sid] = subscriber
+            return {'seq': self.seq, 'gap': gap, 'replayed': len(subscriber.queue)}
+
+    def unsubscribe(self, sid: str) -> bool:
+        with self._lock:
+            return self.subscribers.pop(sid, None) is not None
+
+    def acknowledge(self, sid: str):
+        subscriber = self.subscribers.get(sid)
+        if subscriber is not None:
+            subscriber.in_flight_since = None
+
+    def drain(self, send: Callable[[TailSubscriber, List[Dict]], None], batch_size: int = 100) -> int:
+        """Send one batch to every subscriber that is ready; returns events sent"""
+        now = self.clock()
+        batches = []
+        with self._lock:
+            for subscriber in self.subscribers.values():
+                if subscriber.ready(now):
+                    subscriber.in_flight_since = now
+                    batches.append((subscriber, subscriber.take(batch_size)))
+
+        # Send outside the lock so publishers never wait on the network
+        sent = 0
+        for subscriber, events in batches:
+            send(subscriber, events)
+            sent += len(events)
+        return sent
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'seq': self.seq,
+                'buffered': len(self.history),
+                'subscribers': {sid: sub.stats() for sid, sub in self.subscribers.items()},
+            }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    tail = EventTail(history_size=100)
+    tail.subscribe('fast', policy='drop_oldest', max_queue=3)
+    tail.subscribe('coalescing', types=['usage'], policy='coalesce')
+
+    for i in range(5):
+        tail.publish('usage', {'item': 'Oat Milk', 'remaining': 700 - i * 110}, key='Oat Milk')
+        tail.publish('transaction', {'amount': 4.70})
+
+    print("=== EVENT TAIL ===")
+    tail.drain(lambda sub, events: print(f"{sub.sid}: {[e['seq'] for e in events]}"))
+    print(tail.stats()['subscribers'])
+    print(f"Resume from 7: {tail.subscribe('late', resume_from=7)}")
@@ -0,0 +1,277 @@
+# backend/enhanced_models/history_export.py
+"""
+History Export - Streams shop logs into columnar Arrow IPC or Parquet files
+NEW: Bounded-memory chunks, dictionary-encoded names, numeric timestamps
+
+Requires pyarrow (pip install pyarrow). Usage:
+    python history_export.py --url http://localhost:5000 --format parquet
+    python history_export.py --input state.json --out exports/ --format arrow
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PYARROW_AVAILABLE = False
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# log name -> (source attribute, [(column, record key, kind)])
+# kind: 'ts' (ISO string -> timestamp[us]), 'dict' (dictionary-encoded string),
+#       'f64', 'bool'
+LOG_SCHEMAS = {
+    'usage': ('usage_history', [
+        ('timestamp', 'timestamp', 'ts'),
+        ('item', 'item', 'dict'),
+        ('quantity', 'quantity', 'f64'),
+        ('order_type', 'order_type', 'dict'),
+        ('product', 'product', 'dict'),
+        ('remaining', 'remaining', 'f64'),
+    ]),
+    'purchases': ('purchase_history', [
+        ('timestamp', 'timestamp', 'ts'),
+        ('item', 'item', 'dict'),
+        ('amount_purchased', 'amount_purchased', 'f64'),
+        ('cost', 'cost', 'f64'),
+        ('new_total', 'new_total', 'f64'),
+    ]),
+    'restocks': ('restock_log', [
+        ('timestamp', 'timestamp', 'ts'),
+        ('item', 'item', 'dict'),
+        ('requested', 'requested', 'f64'),
+        ('actual', 'actual', 'f64'),
+        ('new_total', 'new_total', 'f64'),
+        ('method', 'method', 'dict'),
+        ('cost', 'cost', 'f64'),
+    ]),
+    # Card digits are deliberately not exported
+    'transactions': ('transaction_history', [
+        ('timestamp', 'timestamp', 'ts'),
+        ('payment_method', 'payment_method', 'dict'),
+        ('amount', 'amount', 'f64'),
+        ('input_amount', 'input_amount', 'f64'),
+        ('change', 'change', 'f64'),
+        ('success', 'success', 'bool'),
+        ('source', 'source', 'dict'),
+    ]),
+}
+
+
+class ExportError(RuntimeError):
+    """Raised when an export can't run (e.g. pyarrow missing)"""
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise ExportError("pyarrow is required for history export: pip install pyarrow")
+
+
+def _to_micros(value) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value * 1_000_000)
+    return int(datetime.fromisoformat(value).timestamp() * 1_000_000)
+
+
+class _RunningDictionary:
+    """Dictionary that only grows, so each chunk's dictionary extends the last"""
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def encode(self, column: List) -> 'pa.DictionaryArray':
+        indices = []
+        for value in column:
+            if value is None:
+                indices.append(None)
+                continue
+            value = str(value)
+            code = self.index.get(value)
+            if code is None:
+                code = self.index[value] = len(self.values)
+                self.values.append(value)
+            indices.append(code)
+        return pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int32()),
+                                              pa.array(self.values, type=pa.string()))
+
+
+def arrow_schema(log_name: str) -> 'pa.Schema':
+    _require_pyarrow()
+    types = {
+        'ts': pa.timestamp('us'),
+        'dict': pa.dictionary(pa.int32(), pa.string()),
+        'f64': pa.float64(),
+        'bool': pa.bool_(),
+    }
+    return pa.schema([(column, types[kind]) for column, _, kind in LOG_SCHEMAS[log_name][1]])
+
+
+class _ChunkEncoder:
+    """Turns slices of log records into record batches"""
+
+    def __init__(self, log_name: str):
+        self.columns = LOG_SCHEMAS[log_name][1]
+        self.schema = arrow_schema(log_name)
+        self.dictionaries = {column: _RunningDictionary() for column, _, kind in self.columns if kind == 'dict'}
+
+    def encode(self, records: List[Dict]) -> 'pa.RecordBatch':
+        arrays = []
+        for column, key, kind in self.columns:
+            values = [record.get(key) for record in records]
+            if kind == 'ts':
+                arrays.append(pa.array([_to_micros(v) for v in values], type=pa.timestamp('us')))
+            elif kind == 'dict':
+                arrays.append(self.dictionaries[column].encode(values))
+            elif kind == 'bool':
+                arrays.append(pa.array(values, type=pa.bool_()))
+            else:
+                arrays.append(pa.array([None if v is None else float(v) for v in values], type=pa.float64()))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+
+def export_log(records: List[Dict], log_name: str, path: str, fmt: str = 'parquet',
+               start: int = 0, end: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Write records[start:end] to one columnar file, chunk by chunk; returns rows written"""
+    _require_pyarrow()
+    end = len(records) if end is None else end
+    encoder = _ChunkEncoder(log_name)
+
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(path, encoder.schema, compression='zstd')
+        write = writer.write_batch
+    elif fmt == 'arrow':
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        writer = pa.ipc.new_file(path, encoder.schema, options=options)
+        write = writer.write_batch
+    else:
+        raise ExportError(f"Unknown export format: {fmt}")
+
+    rows = 0
+    try:
+        for chunk_start in range(start, end, chunk_size):
+            # Only one chunk of rows is materialised at a time
+            batch = encoder.encode(records[chunk_start:min(chunk_start + chunk_size, end)])
+            write(batch)
+            rows += batch.num_rows
+    finally:
+        writer.close()
+    return rows
+
+
+def export_history(sources, out_dir: str, fmt: str = 'parquet', offsets: Optional[Dict] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+    """Export every log found on the sources (ShopInfoWeb, MoneyMachineWeb or dicts)
+
+    With `offsets`, only rows after the previous export are written and the
+    offsets are advanced, so repeated exports produce incremental part files.
+    """
+    _require_pyarrow()
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    extension = 'parquet' if fmt == 'parquet' else 'arrow'
+    written = {}
+
+    for log_name, (attribute, _) in LOG_SCHEMAS.items():
+        records = None
+        for source in sources:
+            records = source.get(attribute) if isinstance(source, dict) else getattr(source, attribute, None)
+            if records is not None:
+                break
+        if records is None:
+            continue
+
+        # Logs are append-only: snapshot the length and export up to it
+        start = offsets.get(log_name, 0) if offsets is not None else 0
+        end = len(records)
+        if end <= start:
+            continue
+
+        path = os.path.join(out_dir, f"{log_name}-{stamp}.{extension}")
+        rows = export_log(records, log_name, path, fmt, start, end, chunk_size)
+        written[log_name] = {'path': path, 'rows': rows}
+        if offsets is not None:
+            offsets[log_name] = end
+
+    return written
+
+
+class HistoryExportJob:
+    """Periodic background export of new log rows into part files"""
+
+    def __init__(self, sources, out_dir: str, fmt: str = 'parquet', interval: float = 3600):
+        self.sources = sources
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.interval = interval
+        self.offsets = {}
+        self.last_run = None
+        self.last_result = {}
+
+    def run_once(self) -> Dict:
+        self.last_result = export_history(self.sources, self.out_dir, self.fmt, self.offsets)
+        self.last_run = datetime.now().isoformat()
+        return self.last_result
+
+    def run_forever(self, sleep=time.sleep):
+        while True:
+            sleep(self.interval)
+            try:
+                result = self.run_once()
+                if result:
+                    summary = ', '.join(f"{name}={info['rows']}" for name, info in result.items())
+                    print(f"📦 History export: {summary}")
+            except Exception as e:
+                print(f"⚠️ History export failed: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Coffee Simulator logs to Parquet/Arrow")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--url', help="Running server; it writes the files to its export directory")
+    source.add_argument('--input', help="JSON file with usage_history, purchase_history, restock_log "
+                                        "and/or transaction_history lists")
+    parser.add_argument('--out', default='exports', help="Output directory (with --input)")
+    parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--token', default=os.environ.get('ADMIN_TOKEN'),
+                        help="Server's admin token (with --url; default: $ADMIN_TOKEN)")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        from urllib.request import Request, urlopen
+        request = Request(args.url.rstrip('/') + '/api/admin/export-history',
+                          data=json.dumps({'format': args.format}).encode(),
+                          headers={'Content-Type': 'application/json', 'X-Admin-Token': args.token or ''},
+                          method='POST')
+        with urlopen(request) as response:
+            result = json.load(response)
+    else:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        try:
+            result = {'files': export_history([data], args.out, args.format, chunk_size=args.chunk_size)}
+        except ExportError as e:
+            print(f"❌ {e}")
+            return 1
+
+    for log_name, info in result.get('files', {}).items():
+        print(f"✅ {log_name}: {info['rows']} rows -> {info['path']}")
+    if not result.get('files'):
+        print(result.get('message') or result.get('error') or "Nothing new to export")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# backend/enhanced_models/history_stream.py
+"""
+History Stream - Cursor-paginated NDJSON streaming over append-only logs
+NEW: Constant server memory and first-byte latency independent of history size
+
+A record's cursor is its sequence id: its position in the append-only log.
+Sequence ids never change, so a client can page forward or tail from any
+cursor and never sees a record twice.
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    from .fast_json import dumps_str
+except ImportError:
+    from fast_json import dumps_str
+
+MAX_PAGE_SIZE = 10000
+
+# URL name -> (owner, attribute on the owning model)
+HISTORY_LOGS = {
+    'usage': ('shop', 'usage_history'),
+    'purchases': ('shop', 'purchase_history'),
+    'restocks': ('shop', 'restock_log'),
+    'transactions': ('money', 'transaction_history'),
+}
+
+
+def resolve_window(records: List, cursor: Optional[int] = None, limit: Optional[int] = None,
+                   tail: Optional[int] = None) -> Tuple[int, int]:
+    """Turn cursor/limit/tail into a [start, end) range over the log as it is now"""
+    length = len(records)  # Snapshot: records appended later belong to the next page
+    if tail is not None:
+        start = max(0, length - max(tail, 0))
+    else:
+        start = min(max(cursor or 0, 0), length)
+
+    limit = MAX_PAGE_SIZE if limit is None else max(0, min(limit, MAX_PAGE_SIZE))
+    return start, min(length, start + limit)
+
+
+def iter_ndjson(records: List, start: int, end: int, redact: Tuple[str, ...] = ()) -> Iterator[str]:
+    """Yield one JSON line per record, tagged with its sequence id"""
+    for seq in range(start, end):
+        record = records[seq]
+        line = {'seq': seq}
+        for key, value in record.items():
+            if key not in redact:
+                line[key] = value
+        yield dumps_str(line) + '\n'
+
+
+def page_info(start: int, end: int, total: int) -> Dict:
+    return {
+        'cursor': start,
+        'next_cursor': end,
+        'count': end - start,
+        'has_more': end < total,
+    }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    log = [{'item': 'Water', 'quantity': 160}, {'item': 'Oat Milk', 'quantity': 110},
+           {'item': 'Coffee Beans', 'quantity': 14}]
+
+    print("=== HISTORY STREAM ===")
+    start, end = resolve_window(log, cursor=1, limit=5)
+    print(page_info(start, end, len(log)))
+    for line in iter_ndjson(log, start, end):
+        print(line, end='')
+    print(f"Tail 1: {resolve_window(log, tail=1)}")
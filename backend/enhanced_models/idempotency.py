@@ -0,0 +1,110 @@
+# backend/enhanced_models/idempotency.py
+"""
+Idempotency - Remembers recent order results by client-supplied key
+NEW: Bounded TTL/LRU cache so a retried order is answered, not charged again
+
+A client sends the same Idempotency-Key on every retry of one order. The
+first request runs; later ones get the stored response while it is cached.
+Keys of requests still running are kept apart and never evicted or expired,
+so a retry can't slip past a charge that hasn't finished yet.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+DEFAULT_MAX_KEYS = 10000
+DEFAULT_TTL_SECONDS = 600
+MAX_KEY_LENGTH = 128
+
+# begin() outcomes
+NEW = 'new'
+REPLAY = 'replay'
+IN_PROGRESS = 'in_progress'
+MISMATCH = 'mismatch'
+
+
+def fingerprint(payload) -> str:
+    """Stable digest of a request body, to catch one key reused for a different order"""
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class IdempotencyCache:
+    """Recent idempotency keys -> stored responses, oldest evicted first; running requests are never evicted"""
+
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 clock=time.time):
+        self.max_keys = max_keys
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.entries = OrderedDict()   # key -> [fingerprint, expires_at, (body, status)], oldest first
+        self.pending = {}              # key -> fingerprint, for requests still running
+        self.replays = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        # Entries are kept in insertion order, and every entry has the same TTL
+        while self.entries:
+            key, entry = next(iter(self.entries.items()))
+            if entry[1] > now:
+                break
+            del self.entries[key]
+
+    def begin(self, key, request_fingerprint: str) -> Tuple[str, Optional[Tuple[str, int]]]:
+        """Claim a key for a new request, or return what happened to it before"""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            pending = self.pending.get(key)
+            if pending is not None:
+                return (IN_PROGRESS if pending == request_fingerprint else MISMATCH), None
+            entry = self.entries.get(key)
+            if entry is None:
+                self.pending[key] = request_fingerprint
+                return NEW, None
+            if entry[0] != request_fingerprint:
+                return MISMATCH, None
+            self.replays += 1
+            return REPLAY, entry[2]
+
+    def complete(self, key, body: str, status: int):
+        """Store the response for a claimed key"""
+        with self._lock:
+            request_fingerprint = self.pending.pop(key, None)
+            if request_fingerprint is None:
+                return
+            self.entries[key] = [request_fingerprint, self.clock() + self.ttl_seconds, (body, status)]
+            while len(self.entries) > self.max_keys:
+                self.entries.popitem(last=False)
+
+    def release(self, key):
+        """Forget a claimed key (the request failed before doing anything final)"""
+        with self._lock:
+            self.pending.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'keys': len(self.entries),
+                'in_progress': len(self.pending),
+                'max_keys': self.max_keys,
+                'ttl_seconds': self.ttl_seconds,
+                'replays': self.replays
+            }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    cache = IdempotencyCache(max_keys=2, ttl_seconds=60)
+    order = {'type': 'food', 'item_id': 'croissant'}
+
+    print("=== IDEMPOTENCY CACHE ===")
+    print(cache.begin(('default', 'k1'), fingerprint(order)))
+    print(cache.begin(('default', 'k1'), fingerprint(order)))
+    cache.complete(('default', 'k1'), '{"success": true}', 200)
+    print(cache.begin(('default', 'k1'), fingerprint(order)))
+    print(cache.begin(('default', 'k1'), fingerprint({'type': 'coffee'})))
+    print(cache.stats())
@@ -0,0 +1,284 @@
+# backend/enhanced_models/leaderboard.py
+"""
+Leaderboard - Sessions ranked by earnings, all time and over the last hour/day
+NEW: Server-side standings kept sorted as orders come in
+
+Each board keeps its (-earnings, session) keys in a blocked sorted list. The
+keys sit in short sorted blocks with a bisect index over the block maxima.
+An update moves one key, which is a bisect plus a shift inside one block.
+A rank is a bisect plus the count of keys in the earlier blocks.
+
+Windowed boards add each order to a time pane and take whole panes back out
+as they leave the window, so "last hour" is exact to the minute and "last
+day" to the quarter hour.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .ledger import from_cents, to_cents
+except ImportError:
+    from ledger import from_cents, to_cents
+
+BLOCK_SIZE = 512    # Blocks split past twice this and merge below half of it
+
+# name -> (window seconds, panes); None is all time
+WINDOWS = {
+    'all': None,
+    'hour': (3600, 60),
+    'day': (86400, 96)
+}
+
+
+class SortedBoard:
+    """Sorted keys with positional access: a list of short sorted blocks"""
+
+    def __init__(self, block_size: int = BLOCK_SIZE):
+        self.block_size = block_size
+        self._blocks: List[List] = []
+        self._maxes: List = []
+        self._offsets: Optional[List[int]] = None   # keys before each block, rebuilt lazily
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key):
+        self._offsets = None
+        self._len += 1
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._blocks[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._blocks[i], key)
+        block = self._blocks[i]
+        if len(block) > 2 * self.block_size:
+            tail = block[self.block_size:]
+            del block[self.block_size:]
+            self._maxes[i] = block[-1]
+            self._blocks.insert(i + 1, tail)
+            self._maxes.insert(i + 1, tail[-1])
+
+    def _locate(self, key) -> Tuple[int, int]:
+        i = bisect_left(self._maxes, key)
+        if i < len(self._blocks):
+            j = bisect_left(self._blocks[i], key)
+            if self._blocks[i][j] == key:
+                return i, j
+        raise KeyError(key)
+
+    def remove(self, key):
+        i, j = self._locate(key)
+        block = self._blocks[i]
+        del block[j]
+        self._offsets = None
+        self._len -= 1
+        if not block:
+            del self._blocks[i]
+            del self._maxes[i]
+            return
+        self._maxes[i] = block[-1]
+        if len(block) < self.block_size // 2 and i + 1 < len(self._blocks):
+            block.extend(self._blocks.pop(i + 1))
+            self._maxes[i] = self._maxes.pop(i + 1)
+
+    def _offsets_list(self) -> List[int]:
+        if self._offsets is None:
+            self._offsets = [0, *accumulate(len(block) for block in self._blocks)][:-1]
+        return self._offsets
+
+    def index(self, key) -> int:
+        """0-based position of key"""
+        i, j = self._locate(key)
+        return self._offsets_list()[i] + j
+
+    def slice(self, start: int, stop: int) -> List:
+        """Keys at positions start..stop-1"""
+        start, stop = max(0, start), min(stop, self._len)
+        if start >= stop:
+            return []
+        offsets = self._offsets_list()
+        i = bisect_right(offsets, start) - 1
+        j = start - offsets[i]
+        keys = []
+        while len(keys) < stop - start:
+            keys.extend(self._blocks[i][j:j + stop - start - len(keys)])
+            i, j = i + 1, 0
+        return keys
+
+
+class Standings:
+    """One board: each session's earnings (in cents) and order count, kept ranked"""
+
+    def __init__(self, block_size: int = BLOCK_SIZE):
+        self.board = SortedBoard(block_size)
+        self.totals: Dict[str, List[int]] = {}   # session -> [cents, orders]
+
+    def __len__(self) -> int:
+        return len(self.totals)
+
+    def add(self, session_id: str, cents: int, orders: int = 1):
+        total = self.totals.get(session_id)
+        if total is None:
+            total = self.totals[session_id] = [0, 0]
+        else:
+            self.board.remove((-total[0], session_id))
+        total[0] += cents
+        total[1] += orders
+        if total[1] <= 0:
+            del self.totals[session_id]   # every order it had left the window
+        else:
+            self.board.add((-total[0], session_id))
+
+    def _entries(self, start: int, stop: int) -> List[Dict]:
+        return [{'rank': rank, 'session_id': session_id, 'earnings': from_cents(-neg_cents),
+                 'orders': self.totals[session_id][1]}
+                for rank, (neg_cents, session_id) in enumerate(self.board.slice(start, stop), start + 1)]
+
+    def top(self, limit: int) -> List[Dict]:
+        return self._entries(0, limit)
+
+    def position(self, session_id: str) -> Optional[int]:
+        total = self.totals.get(session_id)
+        return None if total is None else self.board.index((-total[0], session_id))
+
+    def around(self, session_id: str, radius: int) -> Optional[Dict]:
+        """A session's standing and the `radius` sessions either side of it"""
+        position = self.position(session_id)
+        if position is None:
+            return None
+        cents, orders = self.totals[session_id]
+        return {
+            'rank': position + 1,
+            'earnings': from_cents(cents),
+            'orders': orders,
+            'neighbors': self._entries(position - radius, position + radius + 1)
+        }
+
+
+class WindowedStandings(Standings):
+    """Standings over the last `window_seconds`, added up per pane"""
+
+    def __init__(self, window_seconds: int, panes: int, block_size: int = BLOCK_SIZE):
+        super().__init__(block_size)
+        self.pane_seconds = max(1, window_seconds // panes)
+        self.panes = panes
+        self._panes = deque()   # (pane id, {session: [cents, orders]}), oldest first
+
+    def expire(self, now: float):
+        """Take out the panes that have left the window"""
+        oldest = int(now // self.pane_seconds) - self.panes + 1
+        while self._panes and self._panes[0][0] < oldest:
+            _, sessions = self._panes.popleft()
+            for session_id, (cents, orders) in sessions.items():
+                super().add(session_id, -cents, -orders)
+
+    def record(self, session_id: str, cents: int, orders: int, ts: float):
+        pane_id = int(ts // self.pane_seconds)
+        if not self._panes or pane_id > self._panes[-1][0]:
+            self._panes.append((pane_id, {}))   # (a late order counts in the newest pane)
+        pane = self._panes[-1][1].setdefault(session_id, [0, 0])
+        pane[0] += cents
+        pane[1] += orders
+        self.add(session_id, cents, orders)
+
+
+class Leaderboard:
+    """Sessions ranked by earnings, all time and per window"""
+
+    def __init__(self, windows: Dict = WINDOWS, block_size: int = BLOCK_SIZE, clock=time.time):
+        self.clock = clock
+        self.boards = {name: Standings(block_size) if spec is None else WindowedStandings(*spec, block_size)
+                       for name, spec in windows.items()}
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def _board(self, window: str) -> Standings:
+        board = self.boards.get(window)
+        if board is None:
+            raise ValueError(f"Unknown window: {window} (use one of {', '.join(self.boards)})")
+        if isinstance(board, WindowedStandings):
+            board.expire(self.clock())
+        return board
+
+    def record(self, session_id: str, amount: float, orders: int = 1, ts: Optional[float] = None):
+        """Credit a session with one order's earnings"""
+        ts = self.clock() if ts is None else ts
+        cents = to_cents(amount)
+        with self._lock:
+            for board in self.boards.values():
+                if isinstance(board, WindowedStandings):
+                    board.expire(ts)
+                    board.record(session_id, cents, orders, ts)
+                else:
+                    board.add(session_id, cents, orders)
+            self.recorded += 1
+
+    def top(self, limit: int = 10, window: str = 'all') -> Dict:
+        with self._lock:
+            board = self._board(window)
+            return {'window': window, 'sessions': len(board), 'top': board.top(limit)}
+
+    def standing(self, session_id: str, window: str = 'all', radius: int = 2) -> Optional[Dict]:
+        """A session's rank and its neighbors, or None if it has no orders in the window"""
+        with self._lock:
+            board = self._board(window)
+            standing = board.around(session_id, radius)
+            if standing is not None:
+                standing.update({'window': window, 'session_id': session_id, 'sessions': len(board)})
+            return standing
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'recorded': self.recorded,
+                    'sessions': {name: len(self._board(name)) for name in self.boards}}
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import random
+
+    now = [1_000_000.0]
+    leaderboard = Leaderboard(clock=lambda: now[0])
+    sessions = [f"session_{i}" for i in range(100_000)]
+    rng = random.Random(7)
+
+    count = 300_000
+    start = time.perf_counter()
+    for i in range(count):
+        now[0] += 0.5
+        leaderboard.record(rng.choice(sessions), rng.choice((2.5, 3.75, 4.5, 5.25)) + rng.random())
+    elapsed = time.perf_counter() - start
+
+    print("=== LEADERBOARD ===")
+    print(f"Recorded {count:,} orders over {len(sessions):,} sessions in {elapsed:.2f}s "
+          f"({elapsed / count * 1e6:.1f}µs each, 3 boards)")
+    print(leaderboard.stats())
+
+    start = time.perf_counter()
+    for _ in range(10_000):
+        leaderboard.standing(rng.choice(sessions), 'all', 2)
+    elapsed = time.perf_counter() - start
+    print(f"Rank + neighbors: {elapsed / 10_000 * 1e6:.1f}µs each")
+
+    for window in ('all', 'hour', 'day'):
+        board = leaderboard.top(3, window)
+        print(f"{window}: {board['sessions']:,} sessions, top {[(e['session_id'], e['earnings']) for e in board['top']]}")
+
+    # Cross-check the all-time board against a full sort
+    totals = leaderboard.boards['all'].totals
+    ranked = sorted(totals, key=lambda s: (-totals[s][0], s))
+    assert [e['session_id'] for e in leaderboard.top(50)['top']] == ranked[:50]
+    probe = ranked[12_345]
+    assert leaderboard.standing(probe)['rank'] == 12_346
+    print("✅ Ranks match a full sort")
@@ -0,0 +1,161 @@
+# backend/enhanced_models/ledger.py
+"""
+Ledger - Append-only integer-cent money entries for MoneyMachineWeb
+NEW: Typed arrays instead of float accumulators, totals settled in batches
+
+Every sale, tip, bonus or adjustment is one entry: a few bytes across
+parallel arrays, amounts in whole cents so long shifts stay exact. Totals
+by kind, by day and by payment method are folded in every SETTLE_BATCH
+entries; reads combine those settled totals with the short unsettled tail.
+A refund is a negative entry of the kind it reverses; a negative SALE also
+takes one sale back from its payment method's count.
+"""
+import base64
+from array import array
+from datetime import date
+from typing import Dict, Iterator, Optional, Tuple
+
+SETTLE_BATCH = 256
+
+# Entry kinds
+SALE = 0        # Price of an item sold (counts toward daily earnings and the method's sales)
+TIP = 1
+BONUS = 2       # Quality bonus
+ADJUST = 3      # Manual correction to profit
+KINDS = ('sale', 'tip', 'bonus', 'adjust')
+
+METHODS = ('cash', 'card', 'web', 'other')
+_METHOD_CODES = {method: code for code, method in enumerate(METHODS)}
+
+
+def to_cents(amount) -> int:
+    return int(round(float(amount) * 100))
+
+
+def from_cents(cents: int) -> float:
+    return cents / 100
+
+
+class Ledger:
+    """Parallel typed arrays of entries plus settled aggregates"""
+
+    def __init__(self, settle_batch: int = SETTLE_BATCH):
+        self.settle_batch = settle_batch
+        self.amounts = array('q')   # cents
+        self.kinds = array('b')
+        self.methods = array('b')
+        self.days = array('i')      # date ordinal
+        self.settled = 0            # entries [0, settled) are folded into the totals below
+        self.kind_totals = [0] * len(KINDS)
+        self.daily_sales = {}       # day ordinal -> sale cents
+        self.method_sales = [0] * len(METHODS)   # number of sales per method
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def append(self, kind: int, cents: int, method: str = 'other', day: Optional[int] = None):
+        self.amounts.append(cents)
+        self.kinds.append(kind)
+        self.methods.append(_METHOD_CODES.get(method, _METHOD_CODES['other']))
+        self.days.append(day if day is not None else date.today().toordinal())
+        if len(self.amounts) - self.settled >= self.settle_batch:
+            self.settle()
+
+    def _tail(self) -> Iterator[Tuple[int, int, int, int]]:
+        return zip(self.kinds[self.settled:], self.amounts[self.settled:],
+                   self.methods[self.settled:], self.days[self.settled:])
+
+    def settle(self):
+        """Fold unsettled entries into the totals"""
+        kind_totals, daily_sales, method_sales = self.kind_totals, self.daily_sales, self.method_sales
+        for kind, cents, method, day in self._tail():
+            kind_totals[kind] += cents
+            if kind == SALE:
+                daily_sales[day] = daily_sales.get(day, 0) + cents
+                method_sales[method] += 1 if cents >= 0 else -1
+        self.settled = len(self.amounts)
+
+    # Reads: settled totals plus the unsettled tail
+    def total(self, *kinds: int) -> int:
+        cents = sum(self.kind_totals[kind] for kind in kinds)
+        for kind, amount, _, _ in self._tail():
+            if kind in kinds:
+                cents += amount
+        return cents
+
+    def daily(self) -> Dict[int, int]:
+        daily = dict(self.daily_sales)
+        for kind, cents, _, day in self._tail():
+            if kind == SALE:
+                daily[day] = daily.get(day, 0) + cents
+        return daily
+
+    def day_total(self, day: int) -> int:
+        cents = self.daily_sales.get(day, 0)
+        for kind, amount, _, entry_day in self._tail():
+            if kind == SALE and entry_day == day:
+                cents += amount
+        return cents
+
+    def sales_by_method(self) -> Dict[str, int]:
+        counts = list(self.method_sales)
+        for kind, cents, method, _ in self._tail():
+            if kind == SALE:
+                counts[method] += 1 if cents >= 0 else -1
+        return dict(zip(METHODS, counts))
+
+    def open_with(self, kind_totals: Dict[int, int], daily_sales: Dict[int, int] = None,
+                  method_sales: Dict[str, int] = None):
+        """Start from opening totals with no entries behind them (state saved before the ledger)"""
+        for kind, cents in kind_totals.items():
+            self.kind_totals[kind] += cents
+        for day, cents in (daily_sales or {}).items():
+            self.daily_sales[day] = self.daily_sales.get(day, 0) + cents
+        for method, count in (method_sales or {}).items():
+            self.method_sales[_METHOD_CODES.get(method, _METHOD_CODES['other'])] += count
+
+    def to_state(self) -> Dict:
+        self.settle()
+        return {
+            'amounts': base64.b64encode(self.amounts.tobytes()).decode('ascii'),
+            'kinds': base64.b64encode(self.kinds.tobytes()).decode('ascii'),
+            'methods': base64.b64encode(self.methods.tobytes()).decode('ascii'),
+            'days': base64.b64encode(self.days.tobytes()).decode('ascii'),
+            'kind_totals': list(self.kind_totals),
+            'daily_sales': {str(day): cents for day, cents in self.daily_sales.items()},
+            'method_sales': list(self.method_sales)
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict, settle_batch: int = SETTLE_BATCH) -> 'Ledger':
+        ledger = cls(settle_batch)
+        for name in ('amounts', 'kinds', 'methods', 'days'):
+            getattr(ledger, name).frombytes(base64.b64decode(state.get(name, '')))
+        ledger.settled = len(ledger.amounts)
+        ledger.kind_totals = list(state.get('kind_totals', ledger.kind_totals))
+        ledger.daily_sales = {int(day): cents for day, cents in state.get('daily_sales', {}).items()}
+        ledger.method_sales = list(state.get('method_sales', ledger.method_sales))
+        return ledger
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import time
+
+    ledger = Ledger()
+    today = date.today().toordinal()
+    start = time.perf_counter()
+    for i in range(1_000_000):
+        ledger.append(SALE, 450, 'card' if i % 3 else 'cash', today)
+        if i % 10 == 0:
+            ledger.append(TIP, 10, 'card', today)
+    elapsed = time.perf_counter() - start
+
+    print("=== LEDGER ===")
+    print(f"{len(ledger):,} entries in {elapsed:.2f}s, "
+          f"{(ledger.amounts.itemsize + ledger.kinds.itemsize + ledger.methods.itemsize + ledger.days.itemsize) * len(ledger) / 1e6:.1f} MB")
+    print(f"Sales: ${from_cents(ledger.total(SALE)):,.2f} (exactly {ledger.total(SALE)} cents)")
+    print(f"Tips: ${from_cents(ledger.total(TIP)):,.2f}")
+    print(f"Sales by method: {ledger.sales_by_method()}")
+    restored = Ledger.from_state(ledger.to_state())
+    print(f"Round trip ok: {restored.total(SALE, TIP) == ledger.total(SALE, TIP)}")
@@ -0,0 +1,242 @@
+# backend/enhanced_models/memory_report.py
+"""
+Memory Report - Where a long-running server's memory goes
+NEW: Deep sizes of the growing structures plus tracemalloc snapshots and diffs
+
+Nothing here runs on the request path. Deep sizes are measured only when
+asked for. tracemalloc is off until start() is called, because tracing slows
+every allocation down.
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import types
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Optional
+
+DEFAULT_SAMPLE = 10000      # Larger containers are measured from this many items and scaled up
+DEFAULT_FRAMES = 1
+MAX_SNAPSHOTS = 8           # Each snapshot holds every traced allocation, so keep few
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+# Shared code and module-level objects are not part of any one structure
+_SKIP = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+         types.CodeType, types.FrameType)
+_SEQUENCES = (list, tuple)
+
+
+def _children(obj, sample: int):
+    """Referents of obj and the weight each stands for (>1 when only a sample is walked)"""
+    size = len(obj) if isinstance(obj, (_SEQUENCES, dict)) else 0
+    if isinstance(obj, dict):
+        # gc.get_referents skips the keys of string-keyed dicts, so walk items instead
+        step = size // sample if size > sample else 1
+        picked = [part for key, value in islice(obj.items(), 0, None, step) for part in (key, value)]
+        return picked, (size / (len(picked) / 2) if step > 1 else 1.0)
+    if size <= sample:
+        return gc.get_referents(obj), 1.0
+    step = size // sample
+    picked = list(islice(obj, 0, None, step))
+    return picked, size / len(picked)
+
+
+def deep_sizeof(obj, sample: int = DEFAULT_SAMPLE, seen: Optional[set] = None) -> Dict:
+    """Bytes held by obj and everything it references that `seen` doesn't already hold
+
+    Containers longer than `sample` are measured from an evenly spaced sample
+    and the result is marked as estimated.
+    """
+    seen = set() if seen is None else seen
+    total = 0.0
+    objects = 0
+    estimated = False
+    stack = [(obj, 1.0)]
+    while stack:
+        current, weight = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current) * weight
+        objects += weight
+        children, scale = _children(current, sample)
+        if scale != 1.0:
+            estimated = True
+        stack.extend((child, weight * scale) for child in children)
+    return {'bytes': int(total), 'objects': int(objects), 'estimated': estimated}
+
+
+def structure_sizes(structures: Dict[str, object], sample: int = DEFAULT_SAMPLE) -> Dict:
+    """Deep size of each named structure, largest first
+
+    An object reachable from several structures (a shared catalog, interned
+    keys) is counted once, under the first structure that reaches it.
+    """
+    seen = set()
+    sizes = {}
+    start = time.perf_counter()
+    for name, obj in structures.items():
+        size = deep_sizeof(obj, sample, seen)
+        if hasattr(obj, '__len__'):
+            size['length'] = len(obj)
+        sizes[name] = size
+    ordered = dict(sorted(sizes.items(), key=lambda item: item[1]['bytes'], reverse=True))
+    return {
+        'structures': ordered,
+        'total_bytes': sum(size['bytes'] for size in sizes.values()),
+        'measure_ms': round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+def process_memory() -> Dict:
+    """Resident set size and garbage collector counters of this process"""
+    rss = None
+    try:
+        with open('/proc/self/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            rss = peak if sys.platform == 'darwin' else peak * 1024   # peak, not current
+        except ImportError:
+            pass
+    return {'rss_bytes': rss, 'gc_counts': gc.get_count(), 'gc_objects': len(gc.get_objects())}
+
+
+def _format_stat(stat, group_by: str) -> Dict:
+    frames = stat.traceback.format() if group_by == 'traceback' else None
+    frame = stat.traceback[-1]   # where the memory was allocated
+    entry = {
+        'where': f"{frame.filename}:{frame.lineno}" if group_by != 'filename' else frame.filename,
+        'size': stat.size,
+        'count': stat.count
+    }
+    if frames:
+        entry['traceback'] = frames
+    if hasattr(stat, 'size_diff'):
+        entry['size_diff'] = stat.size_diff
+        entry['count_diff'] = stat.count_diff
+    return entry
+
+
+class AllocationTracker:
+    """tracemalloc on demand, with a few numbered snapshots to compare"""
+
+    def __init__(self, max_snapshots: int = MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self._snapshots = OrderedDict()   # id -> (label, taken_at, Snapshot)
+        self._next_id = 1
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = DEFAULT_FRAMES):
+        if not self.tracing:
+            tracemalloc.start(max(1, int(frames)))
+
+    def stop(self):
+        """Stop tracing; the snapshots taken so far stay available"""
+        if self.tracing:
+            tracemalloc.stop()
+
+    def _capture(self):
+        if not self.tracing:
+            raise ValueError("tracemalloc is not running")
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+
+    def take(self, label: Optional[str] = None) -> Dict:
+        """Keep a snapshot of the current allocations; the oldest is dropped past max_snapshots"""
+        snapshot = self._capture()
+        snapshot_id = self._next_id
+        self._next_id += 1
+        self._snapshots[snapshot_id] = (label, time.time(), snapshot)
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+        return self._describe(snapshot_id)
+
+    def _describe(self, snapshot_id: int) -> Dict:
+        label, taken_at, snapshot = self._snapshots[snapshot_id]
+        return {'id': snapshot_id, 'label': label, 'taken_at': taken_at,
+                'traced_bytes': sum(trace.size for trace in snapshot.traces)}
+
+    def _snapshot(self, snapshot_id):
+        try:
+            return self._snapshots[int(snapshot_id)][2]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Unknown snapshot: {snapshot_id}")
+
+    def top(self, snapshot_id=None, limit: int = 20, group_by: str = 'lineno') -> List[Dict]:
+        """Largest allocation sites in a stored snapshot (or a fresh one)"""
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {GROUP_BY}")
+        snapshot = self._capture() if snapshot_id is None else self._snapshot(snapshot_id)
+        return [_format_stat(stat, group_by) for stat in snapshot.statistics(group_by)[:limit]]
+
+    def diff(self, old_id, new_id=None, limit: int = 20, group_by: str = 'lineno') -> List[Dict]:
+        """Allocation sites that grew the most between two snapshots (new defaults to now)"""
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {GROUP_BY}")
+        old = self._snapshot(old_id)
+        new = self._capture() if new_id is None else self._snapshot(new_id)
+        return [_format_stat(stat, group_by) for stat in new.compare_to(old, group_by)[:limit]]
+
+    def stats(self) -> Dict:
+        stats = {
+            'tracing': self.tracing,
+            'snapshots': [self._describe(snapshot_id) for snapshot_id in self._snapshots]
+        }
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            stats.update({
+                'frames': tracemalloc.get_traceback_limit(),
+                'traced_bytes': current,
+                'peak_bytes': peak,
+                'tracemalloc_overhead_bytes': tracemalloc.get_tracemalloc_memory()
+            })
+        return stats
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    try:
+        from .shop_info import ShopInfoWeb
+        from .money_machine import MoneyMachineWeb
+    except ImportError:
+        from shop_info import ShopInfoWeb
+        from money_machine import MoneyMachineWeb
+
+    shop, money = ShopInfoWeb(), MoneyMachineWeb()
+    tracker = AllocationTracker()
+    tracker.start()
+    before = tracker.take('before orders')
+
+    recipe = {'Water': 160, 'Regular Milk': 110, 'Coffee Beans': 14, 'Sugar': 2}
+    for i in range(100_000):
+        shop.apply_consumed(time.time(), 'coffee', 'medium regularmilk hot latte', recipe)
+        money.apply_paid(time.time(), 'card', 4.5, 5.0, 0.0, True, '4242', 0.5, 0.0)
+
+    print("=== MEMORY REPORT ===")
+    for sample in (DEFAULT_SAMPLE, sys.maxsize):
+        report = structure_sizes({
+            'usage_history': shop.usage_history,
+            'transaction_history': money.transaction_history,
+            'ledger': money.ledger
+        }, sample)
+        print(f"sample={'all' if sample == sys.maxsize else sample}: measured in {report['measure_ms']}ms")
+        for name, size in report['structures'].items():
+            print(f"   {name}: {size['bytes'] / 1e6:.1f} MB, {size['length']:,} entries"
+                  f"{' (estimated)' if size['estimated'] else ''}")
+
+    print("Growth since the first snapshot:")
+    for stat in tracker.diff(before['id'], limit=3):
+        print(f"   {stat['where']}: +{stat['size_diff'] / 1e6:.1f} MB ({stat['count_diff']:+,} blocks)")
+    print(process_memory())
+    tracker.stop()
@@ -0,0 +1,278 @@
+# backend/enhanced_models/menu_catalog.py
+"""
+Menu Catalog - Loads menus, recipes, prices and ingredients from a data file
+NEW: Compiled, validated catalog with hot reload and menu versioning
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .coffee_menu import MenulistWeb, INGREDIENT_ORDER
+    from .bakery_item import BakeryItemWeb, BAKERY_INGREDIENT_ORDER
+    from .menu_search import MenuSearchIndex
+    from .menu_facets import MenuFacetIndex
+except ImportError:
+    from coffee_menu import MenulistWeb, INGREDIENT_ORDER
+    from bakery_item import BakeryItemWeb, BAKERY_INGREDIENT_ORDER
+    from menu_search import MenuSearchIndex
+    from menu_facets import MenuFacetIndex
+
+DEFAULT_CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'menu_catalog.json'
+)
+
+SUPPORTED_SCHEMA = 1
+
+
+class CatalogError(ValueError):
+    """Raised when a catalog file is missing fields or inconsistent"""
+
+
+class MenuCatalog:
+    """Compiled, immutable catalog: menu items plus the ingredient table"""
+    __slots__ = ('version', 'source', 'loaded_at', 'coffee', 'bakery',
+                 'ingredients', 'coffee_by_id', 'bakery_by_id', '_search_index',
+                 '_facet_index', '_recipe_index', 'popular_bakery')
+
+    def __init__(self, coffee, bakery, ingredients, version=1, source=None):
+        self.version = version
+        self.source = source
+        self.loaded_at = datetime.now().isoformat()
+        self.coffee = tuple(coffee)
+        self.bakery = tuple(bakery)
+        self.ingredients = ingredients  # name -> {'stock', 'low_threshold', 'price', 'unit'}
+        self.coffee_by_id = {item.id: item for item in self.coffee}
+        self.bakery_by_id = {item.id: item for item in self.bakery}
+        self._search_index = None
+        self._facet_index = None
+        self._recipe_index = None
+        self.popular_bakery = tuple(sorted(self.bakery, key=lambda x: x.popularity_score, reverse=True))
+
+    @property
+    def search_index(self) -> MenuSearchIndex:
+        """Search index over both menus, built on first use and shared"""
+        if self._search_index is None:
+            self._search_index = MenuSearchIndex(
+                [('coffee', item) for item in self.coffee] +
+                [('food', item) for item in self.bakery]
+            )
+        return self._search_index
+
+    @property
+    def facet_index(self) -> MenuFacetIndex:
+        """Facet bitsets over both menus, built on first use and shared"""
+        if self._facet_index is None:
+            self._facet_index = MenuFacetIndex(
+                [('coffee', item) for item in self.coffee] +
+                [('food', item) for item in self.bakery]
+            )
+        return self._facet_index
+
+    @property
+    def recipe_index(self):
+        """(item id -> needed ingredients, ingredient -> item ids), shared by every shop"""
+        if self._recipe_index is None:
+            needs_by_item = {}
+            items_by_ingredient = {}
+            for menu_item in self.coffee + self.bakery:
+                needs = {item: quantity for item, quantity in menu_item.ingredients.items() if quantity > 0}
+                needs_by_item[menu_item.id] = needs
+                for item in needs:
+                    items_by_ingredient.setdefault(item, []).append(menu_item.id)
+            self._recipe_index = (needs_by_item, {item: tuple(ids) for item, ids in items_by_ingredient.items()})
+        return self._recipe_index
+
+    def initial_storage(self) -> Dict:
+        """Starting stock for a fresh shop"""
+        return {name: info['stock'] for name, info in self.ingredients.items()}
+
+    def low_stock_thresholds(self) -> Dict:
+        return {name: info['low_threshold'] for name, info in self.ingredients.items()}
+
+    def ingredient_prices(self) -> Dict:
+        return {name: info['price'] for name, info in self.ingredients.items()}
+
+    def ingredient_units(self) -> Dict:
+        return {name: info['unit'] for name, info in self.ingredients.items()}
+
+    def summary(self) -> Dict:
+        return {
+            'version': self.version,
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'coffee_items': len(self.coffee),
+            'bakery_items': len(self.bakery),
+            'ingredients': len(self.ingredients)
+        }
+
+
+def _require(entry: Dict, field: str, where: str):
+    if field not in entry:
+        raise CatalogError(f"{where}: missing '{field}'")
+    return entry[field]
+
+
+def _compile_recipe(recipe: Dict, allowed, ingredients: Dict, where: str) -> List:
+    """Validate a sparse recipe and expand it to a full vector in slot order"""
+    if not isinstance(recipe, dict):
+        raise CatalogError(f"{where}: 'recipe' must be an object")
+    for name, amount in recipe.items():
+        if name not in allowed:
+            raise CatalogError(f"{where}: unknown recipe ingredient '{name}'")
+        if name not in ingredients:
+            raise CatalogError(f"{where}: '{name}' is not in the ingredient catalog")
+        if not isinstance(amount, (int, float)) or amount < 0:
+            raise CatalogError(f"{where}: invalid amount for '{name}'")
+    return [recipe.get(name, 0) for name in allowed]
+
+
+def compile_catalog(data: Dict, version: int = 1, source: Optional[str] = None) -> MenuCatalog:
+    """Validate raw catalog data and build the in-memory catalog"""
+    schema = data.get('schema', SUPPORTED_SCHEMA)
+    if schema != SUPPORTED_SCHEMA:
+        raise CatalogError(f"Unsupported catalog schema: {schema}")
+
+    ingredients = {}
+    for name, info in _require(data, 'ingredients', 'catalog').items():
+        where = f"ingredient '{name}'"
+        stock = _require(info, 'stock', where)
+        ingredients[name] = {
+            'stock': stock,
+            'low_threshold': info.get('low_threshold', 0),
+            'price': float(info.get('price', 0)),
+            'unit': info.get('unit', 'units')
+        }
+        if stock <= 0:
+            raise CatalogError(f"{where}: 'stock' must be positive")
+
+    coffee = []
+    for entry in _require(data, 'coffee', 'catalog'):
+        name = _require(entry, 'name', 'coffee item')
+        where = f"coffee '{name}'"
+        water, regmilk, oatmilk, almondmilk, coffeebeans, sugar = _compile_recipe(
+            _require(entry, 'recipe', where), INGREDIENT_ORDER, ingredients, where)
+        coffee.append(MenulistWeb(coffeeName=name, water=water, oatmilk=oatmilk, almondmilk=almondmilk,
+                                  regmilk=regmilk, coffeebeans=coffeebeans, sugar=sugar,
+                                  price=float(_require(entry, 'price', where))))
+
+    bakery = []
+    for entry in _require(data, 'bakery', 'catalog'):
+        name = _require(entry, 'name', 'bakery item')
+        where = f"bakery '{name}'"
+        amounts = _compile_recipe(_require(entry, 'recipe', where), BAKERY_INGREDIENT_ORDER, ingredients, where)
+        bakery.append(BakeryItemWeb(name, float(_require(entry, 'price', where)), *amounts))
+
+    for label, items in (('coffee', coffee), ('bakery', bakery)):
+        ids = [item.id for item in items]
+        if len(ids) != len(set(ids)):
+            raise CatalogError(f"Duplicate {label} item names in catalog")
+
+    return MenuCatalog(coffee, bakery, ingredients, version=version, source=source)
+
+
+def load_catalog(path: str = DEFAULT_CATALOG_PATH, version: int = 1) -> MenuCatalog:
+    """Read and compile a catalog file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise CatalogError(f"{path}: invalid JSON ({e})")
+    return compile_catalog(data, version=version, source=path)
+
+
+_default_catalog = None
+_default_lock = threading.Lock()
+
+
+def get_default_catalog() -> MenuCatalog:
+    """Catalog shared by every menu and shop built without an explicit one"""
+    global _default_catalog
+    if _default_catalog is None:
+        with _default_lock:
+            if _default_catalog is None:
+                _default_catalog = load_catalog(DEFAULT_CATALOG_PATH)
+    return _default_catalog
+
+
+class CatalogManager:
+    """Owns the live catalog and swaps in a new one when the file changes"""
+
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH, catalog: Optional[MenuCatalog] = None):
+        self.path = path
+        self.catalog = catalog or load_catalog(path)
+        self._mtime = self._read_mtime()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self.last_error = None
+
+    @property
+    def version(self) -> int:
+        return self.catalog.version
+
+    def _read_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def add_listener(self, callback: Callable[[MenuCatalog], None]):
+        """Register a callback that receives each newly swapped-in catalog"""
+        self._listeners.append(callback)
+
+    def reload(self) -> bool:
+        """Build a new catalog from the file and swap it in if it is valid"""
+        with self._lock:
+            mtime = self._read_mtime()
+            try:
+                new_catalog = load_catalog(self.path, version=self.catalog.version + 1)
+                # Prebuild indexes before readers can see the new catalog
+                new_catalog.search_index
+                new_catalog.facet_index
+                new_catalog.recipe_index
+            except (OSError, ValueError, TypeError, KeyError, AttributeError) as e:
+                # A bad file (unreadable, malformed or invalid values) keeps the current
+                # catalog serving; retry on the next file change
+                self._mtime = mtime
+                self.last_error = str(e)
+                print(f"❌ Catalog reload failed: {e}")
+                return False
+
+            self.catalog = new_catalog
+            self._mtime = mtime
+            self.last_error = None
+
+        print(f"✅ Catalog reloaded: version {new_catalog.version}")
+        for callback in self._listeners:
+            try:
+                callback(new_catalog)
+            except Exception as e:
+                print(f"⚠️ Catalog listener failed: {e}")
+        return True
+
+    def check_for_changes(self) -> bool:
+        """Reload if the file's modification time moved"""
+        if self._read_mtime() != self._mtime:
+            return self.reload()
+        return False
+
+    def watch(self, interval: float = 2.0, sleep: Callable[[float], None] = time.sleep):
+        """Poll the catalog file forever; run this off the request path"""
+        while True:
+            sleep(interval)
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                print(f"⚠️ Catalog watcher error: {e}")
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    catalog = load_catalog()
+    print("=== MENU CATALOG ===")
+    print(catalog.summary())
+    print(f"First coffee: {catalog.coffee[0].coffeeName} - ${catalog.coffee[0].price:.2f}")
+    print(f"First bakery item: {catalog.bakery[0].food} - ${catalog.bakery[0].price:.2f}")
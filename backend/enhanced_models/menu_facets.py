@@ -0,0 +1,153 @@
+# backend/enhanced_models/menu_facets.py
+"""
+Menu Facets - Precomputed bitsets for faceted menu filtering
+NEW: Any filter combination is a bitwise AND, with per-facet counts
+"""
+from typing import Dict, Iterable, List, Optional
+
+# Boolean dietary facets read from BakeryItemWeb.dietary_info
+DIETARY_FACETS = ("vegetarian", "vegan", "gluten_free", "nut_free")
+
+
+def popcount(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+def _coffee_attributes(item) -> Dict[str, str]:
+    """Parse size, milk type and temperature out of the coffee name"""
+    words = item.coffeeName.lower().split()
+    milk = "none"
+    for word in words:
+        if word.endswith("milk"):
+            # "regularmilk" -> "regular", "oatmilk" -> "oat", plain "milk" -> "regular"
+            milk = word[:-len("milk")] or "regular"
+            break
+
+    return {
+        'size': "large" if "large" in words else "medium",
+        'milk': milk,
+        'temp': "iced" if "ice" in words or "iced" in words else "hot",
+    }
+
+
+def _bakery_attributes(item) -> Dict[str, str]:
+    attributes = {'warming': "true" if item.warming_required else "false"}
+    for facet in DIETARY_FACETS:
+        attributes[facet] = "true" if item.dietary_info.get(facet, False) else "false"
+    return attributes
+
+
+class MenuFacetIndex:
+    """Per-facet bitsets over menu items, built once per catalog version"""
+
+    def __init__(self, items: Iterable):
+        # items: iterable of (item_type, item) pairs; bit i is the i-th item
+        self.items = list(items)
+        self.all_bits = (1 << len(self.items)) - 1
+        self.facets = {}            # facet -> {value: bits}
+        self._prep_thresholds = []  # sorted (prep_time, bits of items at or below it)
+
+        prep_times = {}
+        for doc_id, (item_type, item) in enumerate(self.items):
+            attributes = {'type': item_type, 'category': item.category}
+            if item_type == 'coffee':
+                attributes.update(_coffee_attributes(item))
+            else:
+                attributes.update(_bakery_attributes(item))
+
+            bit = 1 << doc_id
+            for facet, value in attributes.items():
+                values = self.facets.setdefault(facet, {})
+                values[value] = values.get(value, 0) | bit
+            prep_times[item.prep_time] = prep_times.get(item.prep_time, 0) | bit
+
+        cumulative = 0
+        for prep_time in sorted(prep_times):
+            cumulative |= prep_times[prep_time]
+            self._prep_thresholds.append((prep_time, cumulative))
+
+    def _prep_time_bits(self, prep_time_max: Optional[int]) -> int:
+        if prep_time_max is None:
+            return self.all_bits
+        bits = 0
+        for prep_time, cumulative in self._prep_thresholds:
+            if prep_time > prep_time_max:
+                break
+            bits = cumulative
+        return bits
+
+    def _facet_bits(self, facet: str, values: List[str]) -> int:
+        """Items matching any of the selected values of one facet"""
+        known = self.facets.get(facet, {})
+        bits = 0
+        for value in values:
+            bits |= known.get(str(value).lower(), 0)
+        return bits
+
+    def match(self, filters: Dict[str, List[str]], prep_time_max: Optional[int] = None,
+              exclude: Optional[str] = None) -> int:
+        """Bitset of items matching every filter (values within a facet are OR'd)"""
+        bits = self._prep_time_bits(prep_time_max)
+        for facet, values in filters.items():
+            if facet != exclude and values:
+                bits &= self._facet_bits(facet, values)
+                if not bits:
+                    break
+        return bits
+
+    def items_for(self, bits: int) -> List:
+        """Menu items for a bitset, in menu order"""
+        result = []
+        while bits:
+            lowest = bits & -bits
+            result.append(self.items[lowest.bit_length() - 1][1])
+            bits ^= lowest
+        return result
+
+    def filter_items(self, filters: Dict[str, List[str]], prep_time_max: Optional[int] = None) -> List:
+        return self.items_for(self.match(filters, prep_time_max))
+
+    def facet_counts(self, filters: Dict[str, List[str]], prep_time_max: Optional[int] = None) -> Dict:
+        """Count per facet value, applying every filter except the facet's own"""
+        counts = {}
+        for facet, values in self.facets.items():
+            base = self.match(filters, prep_time_max, exclude=facet)
+            counts[facet] = {value: popcount(base & bits) for value, bits in values.items()}
+        return counts
+
+    def filter(self, filters: Dict[str, List[str]], prep_time_max: Optional[int] = None) -> Dict:
+        """Filtered items plus facet counts for the web API"""
+        bits = self.match(filters, prep_time_max)
+        results = []
+        for item in self.items_for(bits):
+            result = item.to_dict()
+            result['type'] = 'coffee' if hasattr(item, 'coffeeName') else 'food'
+            results.append(result)
+
+        return {
+            'filters': filters,
+            'prep_time_max': prep_time_max,
+            'results': results,
+            'total': len(results),
+            'facets': self.facet_counts(filters, prep_time_max)
+        }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    try:
+        from .menu_catalog import load_catalog
+    except ImportError:
+        from menu_catalog import load_catalog
+
+    catalog = load_catalog()
+    index = MenuFacetIndex([('coffee', item) for item in catalog.coffee] +
+                           [('food', item) for item in catalog.bakery])
+
+    print("=== MENU FACETS ===")
+    print(f"Facets: {sorted(index.facets)}")
+    iced_oat = index.filter_items({'milk': ['oat'], 'temp': ['iced']})
+    print(f"Iced oat milk drinks: {[item.coffeeName for item in iced_oat]}")
+    quick_food = index.filter_items({'type': ['food']}, prep_time_max=60)
+    print(f"Quick bakery items: {[item.food for item in quick_food]}")
+    print(f"Milk counts: {index.facet_counts({'temp': ['iced']})['milk']}")
@@ -0,0 +1,205 @@
+# backend/enhanced_models/menu_search.py
+"""
+Menu Search - Prebuilt inverted index for menu search and autocomplete
+NEW: BM25 ranking, prefix matching, typo tolerance, cached results and pagination
+"""
+import math
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Field weights: a hit in the item name counts more than one in the description
+FIELD_WEIGHTS = (("name", 3.0), ("category", 2.0), ("description", 1.0))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+MIN_PREFIX = 2          # Shortest prefix indexed for autocomplete
+PREFIX_WEIGHT = 0.8     # Score multiplier for prefix matches
+TYPO_WEIGHT = 0.5       # Score multiplier for one-edit typo matches
+MIN_TYPO_LENGTH = 4     # Don't try typo matching on very short words
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def _deletes(term: str) -> set:
+    """All strings one deletion away from term (SymSpell-style)"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class MenuSearchIndex:
+    """Inverted index over menu items, built once per catalog version"""
+
+    def __init__(self, items, cache_size: int = 256):
+        # items: iterable of (item_type, item) pairs
+        self.items = []
+        self.postings = {}      # term -> {doc_id: weighted term frequency}
+        self.prefixes = {}      # prefix -> set of terms
+        self.typo_map = {}      # one-deletion variant -> set of terms
+        self.doc_lengths = []
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+        for item_type, item in items:
+            self._add(item_type, item)
+
+        self.doc_count = len(self.items)
+        self.avg_length = (sum(self.doc_lengths) / self.doc_count) if self.doc_count else 0.0
+        self.idf = {
+            term: math.log(1 + (self.doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+        for term in self.postings:
+            for end in range(MIN_PREFIX, len(term)):
+                self.prefixes.setdefault(term[:end], set()).add(term)
+            if len(term) >= MIN_TYPO_LENGTH:
+                for variant in _deletes(term):
+                    self.typo_map.setdefault(variant, set()).add(term)
+
+    def _add(self, item_type: str, item):
+        doc_id = len(self.items)
+        self.items.append((item_type, item))
+
+        fields = {
+            'name': getattr(item, 'coffeeName', None) or getattr(item, 'food', ''),
+            'category': item.category,
+            'description': item.description
+        }
+        length = 0.0
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(fields[field]):
+                docs = self.postings.setdefault(token, {})
+                docs[doc_id] = docs.get(doc_id, 0.0) + weight
+                length += weight
+        self.doc_lengths.append(length)
+
+    def _expand(self, token: str) -> Dict[str, float]:
+        """Map a query token to index terms with a match-quality multiplier"""
+        terms = {}
+        if token in self.postings:
+            terms[token] = 1.0
+        for term in self.prefixes.get(token, ()):
+            terms.setdefault(term, PREFIX_WEIGHT)
+        if terms or len(token) < MIN_TYPO_LENGTH:
+            return terms
+
+        # Typo tolerance: terms within one insertion, deletion or substitution,
+        # plus terms whose prefix is one extra keystroke away (autocomplete)
+        candidates = set(self.typo_map.get(token, ()))
+        for variant in _deletes(token):
+            if variant in self.postings:
+                candidates.add(variant)
+            candidates |= self.typo_map.get(variant, set())
+            if len(variant) > MIN_PREFIX:
+                candidates |= self.prefixes.get(variant, set())
+        for term in candidates:
+            terms[term] = TYPO_WEIGHT
+        return terms
+
+    def _score_term(self, term: str, doc_id: int, tf: float) -> float:
+        norm = 1 - BM25_B + BM25_B * (self.doc_lengths[doc_id] / self.avg_length)
+        return self.idf[term] * (tf * (BM25_K1 + 1)) / (tf + BM25_K1 * norm)
+
+    def _rank(self, query: str) -> tuple:
+        tokens = tokenize(query)
+        if not tokens:
+            return ()
+
+        scores = None
+        for token in tokens:
+            token_scores = {}
+            for term, multiplier in self._expand(token).items():
+                for doc_id, tf in self.postings[term].items():
+                    score = self._score_term(term, doc_id, tf) * multiplier
+                    if score > token_scores.get(doc_id, 0.0):
+                        token_scores[doc_id] = score
+
+            # Every query word has to match something in the item
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc_id: scores[doc_id] + s for doc_id, s in token_scores.items() if doc_id in scores}
+            if not scores:
+                return ()
+
+        return tuple(sorted(scores.items(), key=lambda x: (-x[1], x[0])))
+
+    def ranked(self, query: str) -> tuple:
+        """Ranked (doc_id, score) pairs for a query, served from an LRU cache"""
+        key = " ".join(tokenize(query))
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        result = self._rank(key)
+        self._cache[key] = result
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def search_items(self, query: str, item_type: Optional[str] = None) -> List:
+        """Matching menu items, best first"""
+        return [self.items[doc_id][1] for doc_id, _ in self.ranked(query)
+                if item_type is None or self.items[doc_id][0] == item_type]
+
+    def search(self, query: str, item_type: Optional[str] = None,
+               page: int = 1, per_page: int = 10) -> Dict:
+        """Paginated search results for the web API"""
+        ranked = self.ranked(query)
+        if item_type is not None:
+            ranked = [r for r in ranked if self.items[r[0]][0] == item_type]
+
+        page = max(page, 1)
+        per_page = max(1, min(per_page, 100))
+        start = (page - 1) * per_page
+
+        results = []
+        for doc_id, score in ranked[start:start + per_page]:
+            result_type, item = self.items[doc_id]
+            result = item.to_dict()
+            result['type'] = result_type
+            result['score'] = round(score, 3)
+            results.append(result)
+
+        return {
+            'query': query,
+            'results': results,
+            'total': len(ranked),
+            'page': page,
+            'per_page': per_page,
+            'has_more': start + per_page < len(ranked)
+        }
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[str]:
+        """Autocomplete: item names matching a partial query"""
+        names = []
+        for doc_id, _ in self.ranked(prefix):
+            item = self.items[doc_id][1]
+            names.append(getattr(item, 'coffeeName', None) or item.food)
+            if len(names) >= limit:
+                break
+        return names
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    try:
+        from .menu_catalog import load_catalog
+    except ImportError:
+        from menu_catalog import load_catalog
+
+    catalog = load_catalog()
+    index = MenuSearchIndex([('coffee', item) for item in catalog.coffee] +
+                            [('food', item) for item in catalog.bakery])
+
+    print("=== MENU SEARCH ===")
+    for query in ["oat latte", "capu", "bagle", "iced almond"]:
+        page = index.search(query, per_page=3)
+        print(f"'{query}': {page['total']} results -> {[r['name'] for r in page['results']]}")
+    print(f"Suggestions for 'cin': {index.suggest('cin')}")
@@ -2,26 +2,68 @@
 """
 Enhanced Money Machine - Preserves original CLI functionality while adding web features
 """
-import json
-from datetime import datetime
+import time
+from datetime import date, datetime
 from typing import List, Dict, Optional
 
+try:
+    from .fast_json import dumps_str
+    from .ledger import ADJUST, BONUS, SALE, TIP, Ledger, from_cents, to_cents
+except ImportError:
+    from fast_json import dumps_str
+    from ledger import ADJUST, BONUS, SALE, TIP, Ledger, from_cents, to_cents
+
 class MoneyMachineWeb:
     """Enhanced version of original MoneyMachine with web-ready features"""
     
+    # 🆕 Card processor client (payment_gateway.HttpGateway); None keeps the built-in demo check
+    gateway = None
+    
+    journal = None  # 🆕 EventLog recording every money change, when the shop is durable
+    clock = time.time  # 🆕 Time source for recorded changes (replays swap in a virtual clock)
+    
     def __init__(self):
         # PRESERVE: Original attributes
         self.currency = "$"
-        self.profit = 0.0
+        self.currency_code = "USD"  # 🆕 ISO 4217 code sent to the card processor
+        
+        # 🆕 Money is kept in integer cents in an append-only ledger; profit,
+        # tips_collected, daily_earnings and payment_methods_used read from it
+        self.ledger = Ledger()
         
         # NEW: Web-specific attributes
         self.transaction_history = []
-        self.daily_earnings = {}
-        self.payment_methods_used = {"cash": 0, "card": 0}
-        self.tips_collected = 0.0
         self.shift_start_time = datetime.now()
         self.target_earnings = 100.0  # Daily target
     
+    # Totals derived from the ledger
+    @property
+    def profit(self) -> float:
+        return from_cents(self.ledger.total(SALE, BONUS, ADJUST))
+    
+    @profit.setter
+    def profit(self, value: float):
+        # Direct writes (profit = x / profit += x) become an adjustment entry
+        ts = self.clock()
+        cents = to_cents(value) - self.ledger.total(SALE, BONUS, ADJUST)
+        self.apply_adjusted(ts, cents)
+        if self.journal is not None:
+            self.journal.adjusted(ts, cents)
+    
+    @property
+    def tips_collected(self) -> float:
+        return from_cents(self.ledger.total(TIP))
+    
+    @property
+    def daily_earnings(self) -> Dict[str, float]:
+        return {date.fromordinal(day).strftime('%Y-%m-%d'): from_cents(cents)
+                for day, cents in sorted(self.ledger.daily().items())}
+    
+    @property
+    def payment_methods_used(self) -> Dict[str, int]:
+        counts = self.ledger.sales_by_method()
+        return {'cash': counts['cash'], 'card': counts['card']}
+    
     # PRESERVE: Original methods for backward compatibility
     def profit_report(self):
         """Original CLI profit report method"""
@@ -34,7 +76,6 @@ class MoneyMachineWeb:
             
             if cash_input >= amount:
                 change = cash_input - amount
-                self.profit += amount
                 
                 # NEW: Log the transaction
                 self._log_transaction("cash", amount, cash_input, change, True)
@@ -66,7 +107,6 @@ class MoneyMachineWeb:
                 continue
             
             if card_balance >= amount:
-                self.profit += amount
                 remaining_balance = card_balance - amount
                 
                 # NEW: Log the transaction
@@ -82,73 +122,151 @@ class MoneyMachineWeb:
     # NEW: Web-specific methods
     def _log_transaction(self, payment_method: str, amount: float, 
                         input_amount: float, change: float, success: bool, 
-                        card_number: Optional[int] = None):
-        """Log transaction details for analytics"""
-        transaction = {
-            'timestamp': datetime.now().isoformat(),
+                        card_number: Optional[int] = None, tip: float = 0.0, bonus: float = 0.0):
+        """Log transaction details for analytics and book the money it brought in"""
+        ts = self.clock()
+        card_last4 = str(card_number)[-4:] if card_number else None  # Last 4 digits only
+        self.apply_paid(ts, payment_method, amount, input_amount, change, success, card_last4, tip, bonus)
+        if self.journal is not None:
+            self.journal.paid(ts, payment_method, amount, input_amount, change, success, card_last4, tip, bonus)
+    
+    # 🆕 State changes as events: live calls and log replay share these
+    def apply_paid(self, ts: float, payment_method: str, amount: float, input_amount: float,
+                   change: float, success: bool, card_last4: Optional[str], tip: float, bonus: float):
+        when = datetime.fromtimestamp(ts)
+        self.transaction_history.append({
+            'timestamp': when.isoformat(),
             'payment_method': payment_method,
             'amount': amount,
             'input_amount': input_amount,
             'change': change,
             'success': success,
-            'card_number': str(card_number)[-4:] if card_number else None  # Last 4 digits only
-        }
-        
-        self.transaction_history.append(transaction)
+            'card_number': card_last4
+        })
         
         if success:
-            self.payment_methods_used[payment_method] += 1
-            
-            # Track daily earnings
-            today = datetime.now().strftime('%Y-%m-%d')
-            if today not in self.daily_earnings:
-                self.daily_earnings[today] = 0.0
-            self.daily_earnings[today] += amount
+            # Profit, daily earnings and the method's sale count all come from these entries
+            day = when.toordinal()
+            self.ledger.append(SALE, to_cents(amount), payment_method, day)
+            if tip > 0:
+                self.ledger.append(TIP, to_cents(tip), payment_method, day)
+            if bonus > 0:
+                self.ledger.append(BONUS, to_cents(bonus), payment_method, day)
+    
+    def apply_tipped(self, ts: float, amount: float, source: str):
+        when = datetime.fromtimestamp(ts)
+        self.ledger.append(TIP, to_cents(amount), 'web', when.toordinal())
+        
+        # Log tip as special transaction
+        self.transaction_history.append({
+            'timestamp': when.isoformat(),
+            'payment_method': 'tip',
+            'amount': amount,
+            'input_amount': amount,
+            'change': 0,
+            'success': True,
+            'source': source
+        })
+    
+    def apply_adjusted(self, ts: float, cents: int):
+        self.ledger.append(ADJUST, cents, 'other', datetime.fromtimestamp(ts).toordinal())
+    
+    def apply_refunded(self, ts: float, payment_method: str, amount: float, tip: float, bonus: float):
+        # Each entry the payment booked is reversed in kind, so tips, daily and per-method totals drop too
+        when = datetime.fromtimestamp(ts)
+        day = when.toordinal()
+        self.ledger.append(SALE, -to_cents(amount), payment_method, day)
+        if tip > 0:
+            self.ledger.append(TIP, -to_cents(tip), payment_method, day)
+        if bonus > 0:
+            self.ledger.append(BONUS, -to_cents(bonus), payment_method, day)
+        
+        self.transaction_history.append({
+            'timestamp': when.isoformat(),
+            'payment_method': 'refund',
+            'amount': -(amount + tip + bonus),
+            'input_amount': 0,
+            'change': 0,
+            'success': True,
+            'source': payment_method
+        })
+    
+    def refund(self, payment_method: str, amount: float, tip: float = 0.0, bonus: float = 0.0):
+        """Take back the sale, tip and bonus booked by a payment for an order that couldn't be served"""
+        ts = self.clock()
+        self.apply_refunded(ts, payment_method, amount, tip, bonus)
+        if self.journal is not None:
+            self.journal.refunded(ts, payment_method, amount, tip, bonus)
+    
+    def void_card(self, authorization: Optional[Dict], idempotency_key: Optional[str] = None) -> bool:
+        """Give an approved card charge back at the processor; False if it has to be done by hand"""
+        charge_id = (authorization or {}).get('charge_id')
+        if self.gateway is None or not charge_id:
+            return True   # the demo check charges nothing
+        try:
+            self.gateway.refund(charge_id, idempotency_key)
+            return True
+        except Exception as e:
+            print(f"⚠️ Card refund for {charge_id} failed: {e}")
+            return False
+    
+    def authorize_card(self, amount: float, payment_details: Dict,
+                       idempotency_key: Optional[str] = None) -> Dict:
+        """Ask the card processor to approve a charge; no bookkeeping, so callers can run it unlocked"""
+        card_number = payment_details.get('card_number', '1234')
+        if self.gateway is None:
+            # In real app, you'd integrate with payment processor
+            # For demo, we'll simulate successful payment
+            if len(str(card_number)) >= 4:  # Basic validation
+                return {'approved': True, 'message': "Card payment successful!", 'charge_id': None}
+            return {'approved': False, 'message': "Invalid card number", 'charge_id': None}
+        
+        total_amount = amount + payment_details.get('tip', 0.0)
+        try:
+            return self.gateway.charge(total_amount, self.currency_code, card_number, idempotency_key)
+        except Exception as e:
+            print(f"⚠️ Card processor error: {e}")
+            return {'approved': False, 'message': f"Card processor unavailable, please retry ({e})",
+                    'charge_id': None}
     
     def process_web_payment(self, payment_method: str, amount: float, 
-                           payment_details: Dict) -> Dict:
-        """Process payment from web interface"""
+                           payment_details: Dict, authorization: Optional[Dict] = None) -> Dict:
+        """Process payment from web interface
+        
+        Card payments use `authorization` from authorize_card when given,
+        otherwise they are authorized here.
+        """
         success = False
         message = ""
         change = 0.0
         tip = payment_details.get('tip', 0.0)
+        quality_bonus = payment_details.get('quality_bonus', 0.0)
         total_amount = amount + tip
         
         if payment_method == "cash":
             cash_given = payment_details.get('cash_amount', 0.0)
             if cash_given >= total_amount:
                 change = cash_given - total_amount
-                self.profit += amount
-                if tip > 0:
-                    self.tips_collected += tip
                 success = True
                 message = f"Payment successful! Change: {self.currency}{change:.2f}"
             else:
                 message = f"Insufficient cash. Need {self.currency}{total_amount:.2f}, got {self.currency}{cash_given:.2f}"
             
-            self._log_transaction("cash", amount, cash_given, change, success)
+            self._log_transaction("cash", amount, cash_given, change, success, tip=tip, bonus=quality_bonus)
             
         elif payment_method == "card":
-            # Simulate card processing
             card_number = payment_details.get('card_number', '1234')
+            if authorization is None:
+                authorization = self.authorize_card(amount, payment_details)
             
-            # In real app, you'd integrate with payment processor
-            # For demo, we'll simulate successful payment
-            if len(str(card_number)) >= 4:  # Basic validation
-                self.profit += amount
-                if tip > 0:
-                    self.tips_collected += tip
-                success = True
-                message = "Card payment successful!"
-            else:
-                message = "Invalid card number"
+            success = authorization['approved']
+            message = authorization['message']
             
-            self._log_transaction("card", amount, total_amount, 0, success, int(card_number))
+            self._log_transaction("card", amount, total_amount, 0, success, int(card_number),
+                                  tip=tip, bonus=quality_bonus)
         
-        # Calculate quality bonus if provided
-        quality_bonus = payment_details.get('quality_bonus', 0.0)
+        # Quality bonus, if provided, was booked with the sale
         if success and quality_bonus > 0:
-            self.profit += quality_bonus
             message += f" Quality bonus: {self.currency}{quality_bonus:.2f}"
         
         return {
@@ -156,24 +274,27 @@ class MoneyMachineWeb:
             'message': message,
             'change': change,
             'tip': tip,
+            'quality_bonus': quality_bonus,
             'total_earned': amount + tip + quality_bonus,
             'transaction_id': len(self.transaction_history)
         }
     
     def get_earnings_summary(self) -> Dict:
         """Get comprehensive earnings summary for web dashboard"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        today_earnings = self.daily_earnings.get(today, 0.0)
+        now = datetime.now()
+        today = now.strftime('%Y-%m-%d')
+        today_earnings = from_cents(self.ledger.day_total(now.date().toordinal()))
+        profit = self.profit
         
         # Calculate hourly rate
-        hours_worked = (datetime.now() - self.shift_start_time).total_seconds() / 3600
-        hourly_rate = self.profit / max(hours_worked, 0.1)  # Avoid division by zero
+        hours_worked = (now - self.shift_start_time).total_seconds() / 3600
+        hourly_rate = profit / max(hours_worked, 0.1)  # Avoid division by zero
         
         # Calculate progress toward target
         target_progress = (today_earnings / self.target_earnings) * 100
         
         return {
-            'total_profit': self.profit,
+            'total_profit': profit,
             'today_earnings': today_earnings,
             'tips_collected': self.tips_collected,
             'hours_worked': round(hours_worked, 2),
@@ -203,10 +324,12 @@ class MoneyMachineWeb:
         """Get daily earnings breakdown for charts"""
         from datetime import timedelta
         
+        daily = self.ledger.daily()
+        today = datetime.now().date()
         breakdown = {}
         for i in range(days):
-            date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-            breakdown[date] = self.daily_earnings.get(date, 0.0)
+            day = today - timedelta(days=i)
+            breakdown[day.strftime('%Y-%m-%d')] = from_cents(daily.get(day.toordinal(), 0))
         
         return dict(sorted(breakdown.items()))
     
@@ -233,19 +356,10 @@ class MoneyMachineWeb:
     def add_tip(self, amount: float, source: str = "web") -> bool:
         """Add tip from customer"""
         if amount > 0:
-            self.tips_collected += amount
-            
-            # Log tip as special transaction
-            tip_transaction = {
-                'timestamp': datetime.now().isoformat(),
-                'payment_method': 'tip',
-                'amount': amount,
-                'input_amount': amount,
-                'change': 0,
-                'success': True,
-                'source': source
-            }
-            self.transaction_history.append(tip_transaction)
+            ts = self.clock()
+            self.apply_tipped(ts, amount, source)
+            if self.journal is not None:
+                self.journal.tipped(ts, amount, source)
             return True
         return False
     
@@ -272,15 +386,44 @@ class MoneyMachineWeb:
         
         return metrics
     
+    def get_state(self, histories: bool = True) -> Dict:
+        """Ledger state for persistence (histories=False leaves out the transaction log)"""
+        state = {
+            'ledger': self.ledger.to_state(),
+            'target_earnings': self.target_earnings,
+            'shift_start_time': self.shift_start_time.isoformat()
+        }
+        if histories:
+            state['transaction_history'] = self.transaction_history
+        return state
+    
+    def load_state(self, state: Dict):
+        """Restore state saved by get_state"""
+        if 'ledger' in state:
+            self.ledger = Ledger.from_state(state['ledger'])
+        else:
+            # Saved before the ledger: open it with the old float totals
+            daily = {date.fromisoformat(day).toordinal(): to_cents(amount)
+                     for day, amount in state.get('daily_earnings', {}).items()}
+            sales = sum(daily.values())
+            self.ledger = Ledger()
+            self.ledger.open_with({SALE: sales, ADJUST: to_cents(state.get('profit', 0.0)) - sales,
+                                   TIP: to_cents(state.get('tips_collected', 0.0))},
+                                  daily, state.get('payment_methods_used', {}))
+        self.target_earnings = state.get('target_earnings', self.target_earnings)
+        if state.get('shift_start_time'):
+            self.shift_start_time = datetime.fromisoformat(state['shift_start_time'])
+        self.transaction_history = list(state.get('transaction_history', []))
+    
     def to_json(self) -> str:
         """Convert current state to JSON for web API"""
-        return json.dumps({
+        return dumps_str({
             'earnings_summary': self.get_earnings_summary(),
             'payment_analytics': self.get_payment_analytics(),
             'performance_metrics': self.get_performance_metrics(),
             'recent_transactions': self.get_transaction_history(1),  # Today only
             'last_updated': datetime.now().isoformat()
-        }, indent=2)
+        })
 
 
 # Example usage and testing
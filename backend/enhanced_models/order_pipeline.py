@@ -0,0 +1,214 @@
+# backend/enhanced_models/order_pipeline.py
+"""
+Order Pipeline - Orders as explicit stages joined by bounded queues
+NEW: The response returns after commit; follow-up stages run in the background
+
+Commit stages (validate -> reserve -> charge -> fulfil) run in the request.
+Once they pass, the order is queued for the post-commit stages (notify,
+analytics), which a background pump drains through one bounded queue per
+stage. When the queues back up, new orders are shed instead of piling up.
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+DEFAULT_MAX_QUEUE = 1000
+SHED_FRACTION = 0.8      # Start shedding orders when queues are 80% full
+LATENCY_SAMPLES = 512    # Recent latencies kept per stage for percentiles
+
+Stage = Tuple[str, Callable]
+
+
+class StageMetrics:
+    """Call counts and latency of one stage"""
+    __slots__ = ('count', 'rejected', 'errors', 'total', 'max', 'recent', 'wait_total')
+
+    def __init__(self):
+        self.count = 0
+        self.rejected = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=LATENCY_SAMPLES)
+        self.wait_total = 0.0   # Time spent queued before the stage (post-commit stages)
+
+    def record(self, elapsed: float, rejected: bool = False, failed: bool = False, waited: float = 0.0):
+        self.count += 1
+        self.rejected += rejected
+        self.errors += failed
+        self.total += elapsed
+        self.wait_total += waited
+        if elapsed > self.max:
+            self.max = elapsed
+        self.recent.append(elapsed)
+
+    def to_dict(self) -> Dict:
+        recent = sorted(self.recent)
+
+        def percentile(p):
+            return round(recent[min(len(recent) - 1, int(len(recent) * p))] * 1000, 3) if recent else 0.0
+
+        return {
+            'count': self.count,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(self.max * 1000, 3),
+            'avg_wait_ms': round(self.wait_total / self.count * 1000, 3) if self.count else 0.0
+        }
+
+
+class OrderPipeline:
+    """Runs commit stages inline and hands committed orders to queued post-commit stages
+
+    A stage is (name, fn). Commit stages return None to continue or a
+    rejection (e.g. an error response) to stop the order. Post-commit stages
+    can't reject; their exceptions are counted and the order moves on.
+    """
+
+    def __init__(self, commit_stages: Iterable[Stage], post_stages: Iterable[Stage] = (),
+                 max_queue: int = DEFAULT_MAX_QUEUE, shed_at: Optional[int] = None,
+                 clock=time.perf_counter):
+        self.commit_stages = tuple(commit_stages)
+        self.post_stages = tuple(post_stages)
+        self.max_queue = max_queue
+        self.shed_at = shed_at if shed_at is not None else max(1, int(max_queue * SHED_FRACTION))
+        self.clock = clock
+        self.queues = [deque() for _ in self.post_stages]   # queue i feeds post stage i
+        self.metrics = {name: StageMetrics() for name, _ in self.commit_stages + self.post_stages}
+        self.committed = 0
+        self.completed = 0
+        self.shed = 0
+        self.overflowed = 0
+        self._lock = threading.Lock()
+
+    def depth(self) -> int:
+        return sum(len(queue) for queue in self.queues)
+
+    def admit(self) -> bool:
+        """False (and counted as shed) when the post-commit queues are too deep to take more"""
+        if self.depth() >= self.shed_at:
+            with self._lock:
+                self.shed += 1
+            return False
+        return True
+
+    def run(self, order):
+        """Run the commit stages; returns the first rejection, or None once committed"""
+        for name, stage in self.commit_stages:
+            start = self.clock()
+            try:
+                rejection = stage(order)
+            except Exception:
+                self._record(name, self.clock() - start, failed=True)
+                raise
+            self._record(name, self.clock() - start, rejected=rejection is not None)
+            if rejection is not None:
+                return rejection
+
+        with self._lock:
+            self.committed += 1
+        if self.queues:
+            self._enqueue(0, order)
+        else:
+            self._finish()
+        return None
+
+    def drain(self, max_jobs: int = 100) -> int:
+        """Advance queued orders through the post-commit stages; returns stages run"""
+        ran = 0
+        # In stage order, so an order can pass every stage in one drain
+        for index in range(len(self.queues)):
+            queue = self.queues[index]
+            next_queue = self.queues[index + 1] if index + 1 < len(self.queues) else None
+            for _ in range(max_jobs):
+                if not queue or (next_queue is not None and len(next_queue) >= self.max_queue):
+                    break
+                queued_at, order = queue.popleft()
+                self._run_post(index, order, self.clock() - queued_at)
+                ran += 1
+                if next_queue is not None:
+                    next_queue.append((self.clock(), order))
+                else:
+                    self._finish()
+        return ran
+
+    def _enqueue(self, index: int, order):
+        if len(self.queues[index]) < self.max_queue:
+            self.queues[index].append((self.clock(), order))
+            return
+        # Never lose a committed order's follow-up work: run the rest inline
+        with self._lock:
+            self.overflowed += 1
+        for stage_index in range(index, len(self.post_stages)):
+            self._run_post(stage_index, order, 0.0)
+        self._finish()
+
+    def _run_post(self, index: int, order, waited: float):
+        name, stage = self.post_stages[index]
+        start = self.clock()
+        failed = False
+        try:
+            stage(order)
+        except Exception as e:
+            failed = True
+            print(f"⚠️ Order stage '{name}' failed: {e}")
+        self._record(name, self.clock() - start, failed=failed, waited=waited)
+
+    def _record(self, name: str, elapsed: float, **outcome):
+        with self._lock:
+            self.metrics[name].record(elapsed, **outcome)
+
+    def _finish(self):
+        with self._lock:
+            self.completed += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'stages': {name: metrics.to_dict() for name, metrics in self.metrics.items()},
+                'queues': {name: len(queue) for (name, _), queue in zip(self.post_stages, self.queues)},
+                'depth': self.depth(),
+                'max_queue': self.max_queue,
+                'shed_at': self.shed_at,
+                'committed': self.committed,
+                'completed': self.completed,
+                'shed': self.shed,
+                'overflowed': self.overflowed
+            }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    stock = {'beans': 3}
+    sent = []
+
+    def validate(order):
+        return None if order.get('item') else 'no item'
+
+    def reserve(order):
+        return None if stock['beans'] > 0 else 'out of beans'
+
+    def fulfil(order):
+        stock['beans'] -= 1
+
+    pipeline = OrderPipeline(
+        [('validate', validate), ('reserve', reserve), ('fulfil', fulfil)],
+        [('notify', sent.append), ('analytics', lambda order: time.sleep(0.001))],
+        max_queue=4, shed_at=2
+    )
+
+    print("=== ORDER PIPELINE ===")
+    for i in range(5):
+        if i == 3:
+            pipeline.drain()   # the background pump catches up
+        if not pipeline.admit():
+            print(f"Order {i}: shed (queue depth {pipeline.depth()})")
+            continue
+        print(f"Order {i}: {pipeline.run({'item': 'latte', 'n': i}) or 'committed'}")
+    while pipeline.drain():
+        pass
+    print(f"Notified {len(sent)} orders; stats: {pipeline.stats()['stages']['notify']}")
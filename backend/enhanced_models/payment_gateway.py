@@ -0,0 +1,320 @@
+# backend/enhanced_models/payment_gateway.py
+"""
+Payment Gateway - Card processor client for MoneyMachineWeb
+NEW: Pooled keep-alive connections, per-call timeouts, retries with jitter, circuit breaker
+
+Every charge carries an Idempotency-Key, so a retried request can't charge
+twice. When the processor keeps failing, the breaker opens and charges fail
+fast until it has had time to recover. http:// and https:// URLs are
+supported; pass eventlet.green.http.client as http_module (and eventlet's
+BoundedSemaphore as semaphore_class) to run charges as greenlets under eventlet.
+
+At most `max_in_flight` requests are out at once; a call waits for a free
+slot within its timeout. http.client keeps one request outstanding per
+connection (no HTTP/1.1 pipelining), so this cap and keep-alive reuse are
+what bound the load on the processor.
+
+Try it against the local stand-in processor:
+    python backend/mock_gateway.py --port 5900 --latency-ms 150
+    PAYMENT_GATEWAY_URL=http://127.0.0.1:5900 python backend/app.py
+"""
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# scheme -> (connection class name in the http module, default port)
+SCHEMES = {'http': ('HTTPConnection', 80), 'https': ('HTTPSConnection', 443)}
+
+
+class GatewayError(Exception):
+    """The card processor couldn't give an answer (not a decline)"""
+
+
+class CircuitOpenError(GatewayError):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` failures in a row; lets one trial call through after `reset_timeout`
+
+    A trial that hasn't reported back within another `reset_timeout` is
+    given up on, and the next caller gets to try.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started = 0.0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+            self.trial_started = self.clock()
+            return True
+        if self.state == HALF_OPEN and self.clock() - self.trial_started >= self.reset_timeout:
+            self.trial_started = self.clock()   # the last trial never reported back
+            return True
+        # Closed, or half open with its trial call still out: only one trial at a time
+        return self.state == CLOSED
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.trips += 1
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+    def to_dict(self) -> Dict:
+        return {'state': self.state, 'failures': self.failures, 'trips': self.trips}
+
+
+def _json_object(payload: bytes) -> Dict:
+    try:
+        data = json.loads(payload or b'{}')
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+class HttpGateway:
+    """JSON-over-HTTP card processor client
+
+    POST {base_url}/v1/charges {amount, currency, card_last4}
+        200 {"id": ..., "status": "approved"}
+        402 {"status": "declined", "reason": ...}
+    POST {base_url}/v1/charges/{id}/refunds
+        200 {"id": ..., "status": "refunded"}
+
+    Any other answer means the processor (or our request) is broken: it
+    counts against the breaker and raises GatewayError.
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 10, timeout: float = 2.0, total_timeout: float = 5.0,
+                 retries: int = 2, backoff: float = 0.05, max_backoff: float = 1.0,
+                 breaker: Optional[CircuitBreaker] = None, http_module=http.client, connection_class=None,
+                 max_in_flight: Optional[int] = None, semaphore_class=threading.BoundedSemaphore,
+                 sleep=time.sleep, rng=random.random, clock=time.monotonic):
+        parts = urlsplit(base_url)
+        if parts.scheme not in SCHEMES or not parts.hostname:
+            raise ValueError(f"Payment gateway URL must be http:// or https://, got {base_url!r}")
+        class_name, default_port = SCHEMES[parts.scheme]
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port or default_port
+        self.path = parts.path.rstrip('/') + '/v1/charges'
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.total_timeout = total_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.connection_class = connection_class or getattr(http_module, class_name)
+        self.sleep = sleep
+        self.rng = rng
+        self.clock = clock
+        self._idle = []   # keep-alive connections ready for reuse (LIFO)
+        self.max_in_flight = max_in_flight or pool_size
+        self._slots = semaphore_class(self.max_in_flight)
+        self.in_flight = 0
+        self.slot_waits = 0
+        self.calls = 0
+        self.attempts = 0
+        self.retried = 0
+        self.failures = 0
+        self.refunds = 0
+        self.connections_opened = 0
+
+    # Connection pool: reuse idle keep-alive connections, keep at most pool_size idle
+    def _acquire(self):
+        if self._idle:
+            return self._idle.pop()
+        self.connections_opened += 1
+        return self.connection_class(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, connection, reusable: bool):
+        if reusable and len(self._idle) < self.pool_size:
+            self._idle.append(connection)
+        else:
+            connection.close()
+
+    def _post(self, path: str, body: bytes, idempotency_key: str, timeout: float):
+        if not self._slots.acquire(blocking=False):
+            self.slot_waits += 1
+            if not self._slots.acquire(timeout=timeout):
+                raise TimeoutError(f"all {self.max_in_flight} processor connections busy")
+        self.in_flight += 1
+        try:
+            connection = self._acquire()
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+            try:
+                connection.request('POST', path, body=body, headers={
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': idempotency_key
+                })
+                response = connection.getresponse()
+                payload = response.read()
+            except BaseException:
+                self._release(connection, False)
+                raise
+            self._release(connection, not response.will_close)
+            return response.status, payload
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def _send(self, path: str, body: bytes, idempotency_key: str):
+        """POST with retries; returns (status, payload), raises GatewayError when there's no answer"""
+        if not self.breaker.allow():
+            raise CircuitOpenError("card processor circuit is open")
+
+        deadline = self.clock() + self.total_timeout
+        last_error = None
+        for attempt in range(self.retries + 1):
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                break
+            self.attempts += 1
+            try:
+                status, payload = self._post(path, body, idempotency_key, min(self.timeout, remaining))
+            except (OSError, http.client.HTTPException) as e:
+                last_error = f"{type(e).__name__}: {e}"
+            else:
+                if status not in RETRYABLE_STATUSES:
+                    return status, payload
+                last_error = f"HTTP {status}"
+
+            if attempt < self.retries:
+                # Full jitter: spread retries out so a recovering processor isn't stampeded
+                delay = self.rng() * min(self.max_backoff, self.backoff * (2 ** attempt))
+                if self.clock() + delay >= deadline:
+                    break
+                self.sleep(delay)
+                self.retried += 1
+
+        self._failed()
+        raise GatewayError(last_error or "card processor timed out")
+
+    def _failed(self):
+        self.failures += 1
+        self.breaker.record_failure()
+
+    def _exchange(self, path: str, body: bytes, idempotency_key: str, answer: Callable[[int, bytes], Dict]) -> Dict:
+        """_send, then read the answer; anything else escaping (a greenlet timeout, a bug) counts as a failure
+
+        GatewayErrors have already told the breaker; without this, an
+        unexpected error in a half-open trial would leave the breaker
+        waiting for it.
+        """
+        try:
+            status, payload = self._send(path, body, idempotency_key)
+            return answer(status, payload)
+        except GatewayError:
+            raise
+        except BaseException:
+            self._failed()
+            raise
+
+    def charge(self, amount: float, currency: str, card_number: str,
+               idempotency_key: Optional[str] = None) -> Dict:
+        """Charge a card; returns {approved, message, charge_id}, raises GatewayError when there's no answer"""
+        self.calls += 1
+        body = json.dumps({'amount': round(amount, 2), 'currency': currency,
+                           'card_last4': str(card_number)[-4:]}).encode('utf-8')
+        return self._exchange(self.path, body, idempotency_key or uuid.uuid4().hex, self._result)
+
+    def refund(self, charge_id: str, idempotency_key: Optional[str] = None) -> Dict:
+        """Give a whole approved charge back; raises GatewayError unless the processor confirms it"""
+        self.calls += 1
+        self.refunds += 1
+        return self._exchange(f"{self.path}/{charge_id}/refunds", b'{}', idempotency_key or f"refund-{charge_id}",
+                              lambda status, payload: self._refund_result(charge_id, status, payload))
+
+    def _refund_result(self, charge_id: str, status: int, payload: bytes) -> Dict:
+        data = _json_object(payload)
+        if status == 200 and data.get('status') == 'refunded':
+            self.breaker.record_success()
+            return {'refunded': True, 'refund_id': data.get('id'), 'charge_id': charge_id}
+        self._failed()
+        raise GatewayError(f"HTTP {status}: {data.get('error') or 'refund not confirmed'}")
+
+    def _result(self, status: int, payload: bytes) -> Dict:
+        data = _json_object(payload)
+        if status == 200 and data.get('status') == 'approved':
+            self.breaker.record_success()
+            return {'approved': True, 'message': "Card payment successful!", 'charge_id': data.get('id')}
+        if status == 402 or (status < 300 and data.get('status') == 'declined'):
+            # A decline is a healthy answer from the processor too
+            self.breaker.record_success()
+            return {'approved': False, 'message': f"Card declined: {data.get('reason', f'HTTP {status}')}",
+                    'charge_id': data.get('id')}
+        # 400/401/404/422 or an unreadable 200: no answer about the card, and not worth retrying
+        self._failed()
+        raise GatewayError(f"HTTP {status}: {data.get('error') or data.get('reason') or 'unexpected response'}")
+
+    def stats(self) -> Dict:
+        return {
+            'url': f"{self.scheme}://{self.host}:{self.port}{self.path}",
+            'calls': self.calls,
+            'attempts': self.attempts,
+            'retries': self.retried,
+            'failures': self.failures,
+            'refunds': self.refunds,
+            'connections_opened': self.connections_opened,
+            'idle_connections': len(self._idle),
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'slot_waits': self.slot_waits,
+            'breaker': self.breaker.to_dict()
+        }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    clock = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: clock[0])
+
+    print("=== CIRCUIT BREAKER ===")
+    for _ in range(2):
+        breaker.record_failure()
+    print(f"After 2 failures: {breaker.state}, allow={breaker.allow()}")
+    clock[0] = 11
+    print(f"After reset timeout: allow={breaker.allow()} ({breaker.state}), second caller allow={breaker.allow()}")
+    breaker.record_success()
+    print(f"Trial call succeeded: {breaker.state}")
+
+    print("\n=== GATEWAY WITH NOTHING LISTENING ===")
+    gateway = HttpGateway('http://127.0.0.1:9', timeout=0.2, retries=2,
+                          breaker=CircuitBreaker(failure_threshold=2))
+    for _ in range(3):
+        try:
+            gateway.charge(4.5, 'USD', '4242424242424242')
+        except GatewayError as e:
+            print(f"{type(e).__name__}: {e}")
+    print(gateway.stats())
+    print(f"https default port: {HttpGateway('https://processor.example').port}")
@@ -0,0 +1,114 @@
+# backend/enhanced_models/sharding.py
+"""
+Sharding - Consistent-hash ring that maps shop ids to worker processes
+NEW: Virtual nodes for even spread, minimal key movement when workers change
+
+Every request for a shop lands on the worker that owns its id, so each
+worker only holds the shops it owns. The original single-shop game (the
+'default' shop) always lives on the primary worker.
+"""
+import bisect
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_REPLICAS = 100   # virtual nodes per worker
+DEFAULT_SHOP_ID = 'default'
+
+_SHOP_PATH = re.compile(r'^/api/shops/([^/]+)')
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent-hash ring of worker names"""
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self._points = []   # sorted hashes
+        self._owners = []   # node owning each point
+        self._nodes = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._nodes)
+
+    def add(self, node: str):
+        if node in self._nodes:
+            return
+        self._nodes.append(node)
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str):
+        if node not in self._nodes:
+            return
+        self._nodes.remove(node)
+        kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in kept]
+        self._owners = [o for _, o in kept]
+
+    def node_for(self, key: str) -> Optional[str]:
+        """First node clockwise from the key's hash"""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def to_dict(self) -> Dict:
+        return {'nodes': self.nodes, 'replicas': self.replicas}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'HashRing':
+        return cls(data.get('nodes', []), data.get('replicas', DEFAULT_REPLICAS))
+
+
+def moving_away(old_ring: HashRing, new_ring: HashRing, node: str):
+    """Predicate for shop ids `node` owns under old_ring but not under new_ring
+
+    The default shop isn't on the ring; it moves only with the primary worker.
+    """
+    def moving(shop_id: str) -> bool:
+        return (shop_id != DEFAULT_SHOP_ID and old_ring.node_for(shop_id) == node
+                and new_ring.node_for(shop_id) != node)
+    return moving
+
+
+def shop_id_for_request(path: str, query: Dict, body: Optional[Dict] = None) -> str:
+    """Routing key for a request: the shop it acts on, else the default shop
+
+    Socket.IO clients pass ?shop_id=... when connecting; the client repeats
+    the query on every polling request, which keeps the connection sticky.
+    """
+    match = _SHOP_PATH.match(path)
+    if match:
+        return match.group(1)
+    if query.get('shop_id'):
+        return query['shop_id']
+    if path == '/api/shops' and body and body.get('shop_id'):
+        return str(body['shop_id'])
+    return DEFAULT_SHOP_ID
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    shop_ids = [f"shop-{i}" for i in range(10000)]
+    ring = HashRing(['w0', 'w1', 'w2'])
+    counts = {}
+    for shop_id in shop_ids:
+        node = ring.node_for(shop_id)
+        counts[node] = counts.get(node, 0) + 1
+
+    print("=== HASH RING ===")
+    print(f"Spread over 3 workers: {counts}")
+    bigger = HashRing(['w0', 'w1', 'w2', 'w3'])
+    moved = sum(1 for shop_id in shop_ids if ring.node_for(shop_id) != bigger.node_for(shop_id))
+    print(f"Adding w3 moves {moved / len(shop_ids):.0%} of shops (ideal 25%)")
+    print(f"Route /api/shops/airport/order -> {shop_id_for_request('/api/shops/airport/order', {})}")
@@ -0,0 +1,151 @@
+# backend/enhanced_models/shift_analytics.py
+"""
+Shift Analytics - Streaming rollups of revenue, orders and ingredient burn
+NEW: Tumbling windows per minute/hour/day kept in fixed-size circular arrays
+"""
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+# resolution -> (bucket length in seconds, number of buckets kept)
+RESOLUTIONS = {
+    'minute': (60, 24 * 60),      # last 24 hours by minute
+    'hour': (3600, 14 * 24),      # last 14 days by hour
+    'day': (86400, 366),          # last year by day
+}
+
+
+class RollingSeries:
+    """Fixed-size ring of tumbling-window sums for any number of metrics"""
+
+    def __init__(self, bucket_seconds: int, size: int):
+        self.bucket_seconds = bucket_seconds
+        self.size = size
+        self.bucket_ids = array('q', [-1]) * size   # which bucket each slot holds
+        self.metrics = {}                           # metric -> array('d') of sums
+
+    def _slot(self, bucket: int) -> int:
+        """Slot for a bucket, clearing it if it still holds an older window"""
+        slot = bucket % self.size
+        if self.bucket_ids[slot] != bucket:
+            self.bucket_ids[slot] = bucket
+            for values in self.metrics.values():
+                values[slot] = 0.0
+        return slot
+
+    def add(self, timestamp: float, values: Dict[str, float]):
+        bucket = int(timestamp // self.bucket_seconds)
+        slot = self._slot(bucket)
+        for metric, value in values.items():
+            series = self.metrics.get(metric)
+            if series is None:
+                series = self.metrics[metric] = array('d', [0.0]) * self.size
+            series[slot] += value
+
+    def series(self, metric: str, now: float, points: int) -> List[float]:
+        """Values for the last `points` buckets ending at `now`, oldest first"""
+        points = max(1, min(points, self.size))
+        values = self.metrics.get(metric)
+        last_bucket = int(now // self.bucket_seconds)
+        result = []
+        for bucket in range(last_bucket - points + 1, last_bucket + 1):
+            slot = bucket % self.size
+            if values is not None and bucket >= 0 and self.bucket_ids[slot] == bucket:
+                result.append(values[slot])
+            else:
+                result.append(0.0)
+        return result
+
+
+def downsample(values: List[float], max_points: int) -> List[float]:
+    """Sum consecutive buckets so at most max_points remain"""
+    if max_points <= 0 or len(values) <= max_points:
+        return values
+    group = -(-len(values) // max_points)  # ceiling division
+    return [sum(values[i:i + group]) for i in range(0, len(values), group)]
+
+
+class ShiftAnalytics:
+    """Streaming analytics stage fed by the order and payment path"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.rollups = {name: RollingSeries(seconds, size) for name, (seconds, size) in RESOLUTIONS.items()}
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, values: Dict[str, float], timestamp: Optional[float] = None):
+        """Add metric values to every resolution at once"""
+        timestamp = self.clock() if timestamp is None else timestamp
+        with self._lock:
+            for rollup in self.rollups.values():
+                rollup.add(timestamp, values)
+            for metric, value in values.items():
+                self.totals[metric] = self.totals.get(metric, 0.0) + value
+
+    def record_order(self, order_type: str, amount: float, tip: float = 0.0,
+                     ingredients: Optional[Dict] = None, timestamp: Optional[float] = None):
+        """Roll up one completed order: revenue, count and ingredient burn"""
+        values = {
+            'revenue': amount,
+            'tips': tip,
+            'orders': 1,
+            f'orders:{order_type}': 1,
+        }
+        for item, quantity in (ingredients or {}).items():
+            if quantity:
+                values[f'burn:{item}'] = quantity
+        self.record(values, timestamp)
+
+    def record_purchase(self, item: str, cost: float, amount: float, timestamp: Optional[float] = None):
+        """Roll up one ingredient purchase"""
+        self.record({'purchase_spend': cost, f'restock:{item}': amount}, timestamp)
+
+    def metrics(self) -> List[str]:
+        return sorted(self.totals)
+
+    def get_series(self, metric: str, resolution: str = 'minute', points: int = 60,
+                   max_points: Optional[int] = None) -> Dict:
+        """Chart-ready series; cost depends on points requested, not history length"""
+        if resolution not in self.rollups:
+            raise ValueError(f"Unknown resolution: {resolution}")
+
+        rollup = self.rollups[resolution]
+        now = self.clock()
+        with self._lock:
+            values = rollup.series(metric, now, points)
+
+        points = len(values)
+        first_bucket = int(now // rollup.bucket_seconds) - points + 1
+        step = rollup.bucket_seconds
+        if max_points and points > max_points:
+            values = downsample(values, max_points)
+            step = rollup.bucket_seconds * (-(-points // max_points))
+
+        return {
+            'metric': metric,
+            'resolution': resolution,
+            'start': first_bucket * rollup.bucket_seconds,
+            'step_seconds': step,
+            'values': [round(v, 4) for v in values],
+            'total': round(sum(values), 4)
+        }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    analytics = ShiftAnalytics()
+    start = time.time() - 3600
+
+    # Simulate an hour of orders, one every 90 seconds
+    for i in range(40):
+        analytics.record_order('coffee', 4.70, tip=0.5,
+                               ingredients={'Water': 160, 'Oat Milk': 110, 'Coffee Beans': 14},
+                               timestamp=start + i * 90)
+
+    print("=== SHIFT ANALYTICS ===")
+    print(f"Metrics: {analytics.metrics()}")
+    revenue = analytics.get_series('revenue', 'minute', points=60, max_points=6)
+    print(f"Revenue last hour (10-minute buckets): {revenue['values']}")
+    print(f"Coffee beans burned today: {analytics.get_series('burn:Coffee Beans', 'day', points=1)['total']}g")
@@ -3,66 +3,58 @@
 Enhanced Shop Info - Preserves original CLI functionality while adding web features
 ENHANCED: Added inventory purchasing system with earnings integration
 """
-import json
+import time
 from datetime import datetime
 from typing import Dict, List, Optional
 
+try:
+    from .fast_json import dumps_str
+    from .stock_alerts import StockAlertEngine
+except ImportError:
+    from fast_json import dumps_str
+    from stock_alerts import StockAlertEngine
+
 class ShopInfoWeb:
     """Enhanced version of original ShopInfo with real-time web capabilities"""
     
-    def __init__(self):
+    journal = None  # 🆕 EventLog recording every stock change, when the shop is durable
+    clock = time.time  # 🆕 Time source for recorded changes (replays swap in a virtual clock)
+    
+    def __init__(self, catalog=None):
+        # Starting stock, thresholds, prices and units come from the catalog
+        if catalog is None:
+            try:
+                from .menu_catalog import get_default_catalog
+            except ImportError:
+                from menu_catalog import get_default_catalog
+            catalog = get_default_catalog()
+        
         # PRESERVE: Original storage dictionary
-        self.storage = {
-            "Water": 100000000,
-            "Oat Milk": 700,
-            "Regular Milk": 800,
-            "Almond Milk": 700,
-            "Sugar": 100,
-            "Coffee Beans": 100,
-            "Plain Bagel": 4,
-            "Strawberry Cake": 3,
-            "Sesameseed Bagel": 4,
-            "Honey Bun": 2,
-            "Cinnamon Roll": 2,
-            "Croissant": 4
-        }
+        self.storage = catalog.initial_storage()
         
         # PRESERVE: Web-specific attributes
         self.max_storage = self.storage.copy()  # Track maximum capacity
-        self.low_stock_threshold = {
-            "Water": 1000000,
-            "Oat Milk": 100,
-            "Regular Milk": 100,
-            "Almond Milk": 100,
-            "Sugar": 20,
-            "Coffee Beans": 20,
-            "Plain Bagel": 1,
-            "Strawberry Cake": 1,
-            "Sesameseed Bagel": 1,
-            "Honey Bun": 1,
-            "Cinnamon Roll": 1,
-            "Croissant": 1
-        }
+        self.low_stock_threshold = catalog.low_stock_thresholds()
         
         # NEW: Ingredient purchasing system
-        self.ingredient_prices = {
-            "Water": 0.001,  # Very cheap since it's in ml
-            "Oat Milk": 0.008,  # $5.60 to refill from 0
-            "Regular Milk": 0.006,  # $4.80 to refill from 0
-            "Almond Milk": 0.009,  # $6.30 to refill from 0
-            "Sugar": 0.05,  # $5.00 to refill from 0
-            "Coffee Beans": 0.15,  # $15.00 to refill from 0
-            "Plain Bagel": 1.50,  # $6.00 to refill from 0
-            "Strawberry Cake": 2.00,  # $6.00 to refill from 0
-            "Sesameseed Bagel": 1.75,  # $7.00 to refill from 0
-            "Honey Bun": 2.50,  # $5.00 to refill from 0
-            "Cinnamon Roll": 2.25,  # $4.50 to refill from 0
-            "Croissant": 1.50   # $6.00 to refill from 0
-        }
+        self.ingredient_prices = catalog.ingredient_prices()
+        self.ingredient_units = catalog.ingredient_units()
+        self.catalog_version = catalog.version
         
         self.usage_history = []  # Track ingredient usage over time
         self.restock_log = []   # Track restocking events
         self.purchase_history = []  # Track ingredient purchases
+        self.reserved = {}  # 🆕 Ingredients held by orders between reserve and fulfil
+        
+        # NEW: Materialized inventory stats and which menu items can be made right now,
+        # both maintained incrementally as stock changes
+        self.stock_version = 0  # Bumped on every stock change, for caches built on top
+        self._build_stats()
+        self._build_feasibility(catalog)
+        
+        # NEW: Edge-triggered stock alerts, re-evaluated only for touched ingredients
+        self.alert_engine = StockAlertEngine(self)
+        self.alert_engine.reset()
     
     # PRESERVE: Original methods for backward compatibility
     def storagereport(self):
@@ -88,27 +80,83 @@ class ShopInfoWeb:
                 return False
         return True
     
+    # 🆕 Holds taken before payment, so two orders can't both be promised the last unit
+    def reserve(self, ingredients: Dict) -> bool:
+        """Hold a recipe if stock not already held by other orders covers it"""
+        for item, quantity in ingredients.items():
+            if quantity > self.storage.get(item, 0) - self.reserved.get(item, 0):
+                print(f"Sorry, we have run out of {item}. Please choose something else.")
+                return False
+        for item, quantity in ingredients.items():
+            self.reserved[item] = self.reserved.get(item, 0) + quantity
+        return True
+    
+    def release(self, ingredients: Dict):
+        """Drop a hold taken by reserve (payment failed, or the order is being fulfilled)"""
+        for item, quantity in ingredients.items():
+            left = self.reserved.get(item, 0) - quantity
+            if left > 0:
+                self.reserved[item] = left
+            else:
+                self.reserved.pop(item, None)
+    
     def coffee_return(self, coffee_order):
         """Original coffee fulfillment method"""
-        for item, quantity in coffee_order.ingredients.items():
-            if self.storage.get(item, 0) >= quantity:
-                self.storage[item] -= quantity
-                self._log_usage(item, quantity, 'coffee', coffee_order.coffeeName)
+        self._consume(coffee_order.ingredients, 'coffee', coffee_order.coffeeName)
         print(f"Here is your {coffee_order.coffeeName}. Enjoy!")
     
     def food_return(self, food_order):
         """Original food fulfillment method"""
-        for item, quantity in food_order.ingredients.items():
-            if self.storage.get(item, 0) >= quantity:
-                self.storage[item] -= quantity
-                self._log_usage(item, quantity, 'food', food_order.food)
+        self._consume(food_order.ingredients, 'food', food_order.food)
         print(f"Here is your {food_order.food}. Enjoy!")
     
+    def _consume(self, ingredients: Dict, order_type: str, product_name: str):
+        """Deduct whatever of the recipe is in stock, journal it and refresh derived data"""
+        ts = self.clock()
+        used = {item: quantity for item, quantity in ingredients.items()
+                if self.storage.get(item, 0) >= quantity}
+        self.apply_consumed(ts, order_type, product_name, used)
+        if self.journal is not None:
+            self.journal.consumed(ts, order_type, product_name, used)
+        self._ingredients_changed(ingredients)
+    
+    # 🆕 State changes as events: live calls and log replay share these
+    def apply_consumed(self, ts: float, order_type: str, product_name: str, used: Dict):
+        timestamp = datetime.fromtimestamp(ts).isoformat()
+        for item, quantity in used.items():
+            self.storage[item] -= quantity
+            self._log_usage(item, quantity, order_type, product_name, timestamp)
+    
+    def apply_refilled(self, ts: float, item: str, amount: int, cost: float):
+        timestamp = datetime.fromtimestamp(ts).isoformat()
+        self.storage[item] += amount
+        
+        # Log the purchase
+        self.purchase_history.append({
+            'timestamp': timestamp,
+            'item': item,
+            'amount_purchased': amount,
+            'cost': cost,
+            'new_total': self.storage[item]
+        })
+        
+        # Log as restock event too
+        self.restock_log.append({
+            'timestamp': timestamp,
+            'item': item,
+            'requested': amount,
+            'actual': amount,
+            'new_total': self.storage[item],
+            'method': 'purchase',
+            'cost': cost
+        })
+    
     # PRESERVE: Web-specific methods
-    def _log_usage(self, item: str, quantity: int, order_type: str, product_name: str):
+    def _log_usage(self, item: str, quantity: int, order_type: str, product_name: str,
+                   timestamp: Optional[str] = None):
         """Log ingredient usage for analytics"""
         self.usage_history.append({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': timestamp or datetime.now().isoformat(),
             'item': item,
             'quantity': quantity,
             'order_type': order_type,
@@ -117,38 +165,142 @@ class ShopInfoWeb:
         })
     
     def get_real_time_stats(self) -> Dict:
-        """Return real-time inventory stats for web dashboard"""
-        stats = {}
+        """Return real-time inventory stats for web dashboard
         
-        for item, current_amount in self.storage.items():
-            max_amount = self.max_storage[item]
-            low_threshold = self.low_stock_threshold[item]
-            
-            percentage = (current_amount / max_amount) * 100
-            status = 'good'
-            
-            if current_amount <= 0:
-                status = 'out'
-            elif current_amount <= low_threshold:
-                status = 'low'
-            elif percentage < 30:
-                status = 'warning'
-            
-            stats[item] = {
-                'current': current_amount,
-                'max': max_amount,
-                'percentage': round(percentage, 1),
-                'status': status,
-                'low_threshold': low_threshold,
-                'unit': self._get_unit(item),
-                'price_per_unit': self.ingredient_prices.get(item, 0),
-                'refill_cost': self._calculate_refill_cost(item, current_amount)
-            }
+        The snapshot is kept up to date as stock changes, so this is just a
+        reference: treat it as read-only.
+        """
+        return self._stats
+    
+    def get_real_time_stats_json(self) -> str:
+        """The stats snapshot serialized once per change"""
+        if self._stats_json is None:
+            self._stats_json = dumps_str(self._stats)
+        return self._stats_json
+    
+    def get_real_time_stats_packed(self, codec) -> bytes:
+        """The stats snapshot in a WireCodec's compact format, packed once per change"""
+        if self._stats_packed is None or self._stats_packed[0] != codec.version:
+            self._stats_packed = (codec.version, codec.encode(self._stats))
+        return self._stats_packed[1]
+    
+    def _stat_entry(self, item: str) -> Dict:
+        current_amount = self.storage[item]
+        max_amount = self.max_storage[item]
+        low_threshold = self.low_stock_threshold[item]
+        
+        percentage = (current_amount / max_amount) * 100
+        status = 'good'
         
-        return stats
+        if current_amount <= 0:
+            status = 'out'
+        elif current_amount <= low_threshold:
+            status = 'low'
+        elif percentage < 30:
+            status = 'warning'
+        
+        return {
+            'current': current_amount,
+            'max': max_amount,
+            'percentage': round(percentage, 1),
+            'status': status,
+            'low_threshold': low_threshold,
+            'unit': self._get_unit(item),
+            'price_per_unit': self.ingredient_prices.get(item, 0),
+            'refill_cost': self._calculate_refill_cost(item, current_amount)
+        }
+    
+    def _refresh_stats(self, items):
+        """Recompute the stats entries of the given ingredients only"""
+        for item in items:
+            if item in self.storage:
+                self._stats[item] = self._stat_entry(item)
+        self._stats_json = None
+        self._stats_packed = None
+        self.stock_version += 1
+    
+    def _build_stats(self):
+        self._stats = {}
+        self._refresh_stats(self.storage)
+    
+    def apply_catalog(self, catalog):
+        """Pick up a reloaded catalog without touching current stock levels"""
+        for item, info in catalog.ingredients.items():
+            if item not in self.storage:
+                # New ingredient: start it full
+                self.storage[item] = info['stock']
+            self.max_storage[item] = info['stock']
+            self.low_stock_threshold[item] = info['low_threshold']
+            self.ingredient_prices[item] = info['price']
+            self.ingredient_units[item] = info['unit']
+        self.catalog_version = catalog.version
+        self._build_stats()
+        self._build_feasibility(catalog)
+        # Thresholds may have moved, so every ingredient gets a fresh look
+        self.alert_engine.evaluate(list(self.storage))
+    
+    # NEW: Recipe feasibility (which items are makeable and how many times)
+    def _build_feasibility(self, catalog):
+        """Compute servings for every item from the catalog's shared recipe index"""
+        self._recipes, self._recipes_by_ingredient = catalog.recipe_index
+        
+        self.max_servings = {}
+        self.makeable_items = set()
+        self._feasibility_changes = {}
+        self._refresh_feasibility(self._recipes)
+        self._feasibility_changes = {}
+    
+    def _refresh_feasibility(self, item_ids):
+        """Recompute servings for the given menu items and record any changes"""
+        for item_id in item_ids:
+            needs = self._recipes[item_id]
+            servings = min((int(self.storage.get(item, 0) // quantity) for item, quantity in needs.items()),
+                           default=0)
+            if self.max_servings.get(item_id) != servings:
+                self.max_servings[item_id] = servings
+                self._feasibility_changes[item_id] = servings
+                if servings > 0:
+                    self.makeable_items.add(item_id)
+                else:
+                    self.makeable_items.discard(item_id)
+    
+    def _ingredients_changed(self, items):
+        """Refresh only the recipes that use the changed ingredients"""
+        affected = set()
+        for item in items:
+            affected.update(self._recipes_by_ingredient.get(item, ()))
+        self._refresh_stats(items)
+        self._refresh_feasibility(affected)
+        self.alert_engine.evaluate(items)
+    
+    def refresh_feasibility(self):
+        """Full recompute, for callers that edit storage directly"""
+        self._build_stats()
+        self._refresh_feasibility(self._recipes)
+        self.alert_engine.evaluate(list(self.storage))
+    
+    def pop_alert_transitions(self) -> List[Dict]:
+        """Stock state changes (e.g. low → out) since the last call"""
+        return self.alert_engine.pop_transitions()
+    
+    def pop_feasibility_changes(self) -> Dict:
+        """Servings that changed since the last call (item id -> servings)"""
+        changes = self._feasibility_changes
+        self._feasibility_changes = {}
+        return changes
+    
+    def get_feasibility(self) -> Dict:
+        """Max servings for every menu item plus the items that can't be made"""
+        return {
+            'servings': dict(self.max_servings),
+            'unavailable': sorted(item_id for item_id in self._recipes if item_id not in self.makeable_items)
+        }
     
     def _get_unit(self, item: str) -> str:
         """Get appropriate unit for each ingredient"""
+        unit = self.ingredient_units.get(item)
+        if unit:
+            return unit
         if item in ["Water", "Oat Milk", "Regular Milk", "Almond Milk"]:
             return "ml"
         elif item in ["Coffee Beans", "Sugar"]:
@@ -208,29 +360,12 @@ class ShopInfoWeb:
         cost = purchase_check['cost']
         needed_amount = purchase_check['needed_amount']
         
-        # Update inventory
-        self.storage[item] = self.max_storage[item]
-        
-        # Log the purchase
-        purchase_record = {
-            'timestamp': datetime.now().isoformat(),
-            'item': item,
-            'amount_purchased': needed_amount,
-            'cost': cost,
-            'new_total': self.storage[item]
-        }
-        self.purchase_history.append(purchase_record)
-        
-        # Log as restock event too
-        self.restock_log.append({
-            'timestamp': datetime.now().isoformat(),
-            'item': item,
-            'requested': needed_amount,
-            'actual': needed_amount,
-            'new_total': self.storage[item],
-            'method': 'purchase',
-            'cost': cost
-        })
+        # Update inventory (back to maximum) and log the purchase
+        ts = self.clock()
+        self.apply_refilled(ts, item, needed_amount, cost)
+        if self.journal is not None:
+            self.journal.refilled(ts, item, needed_amount, cost)
+        self._ingredients_changed((item,))
         
         return {
             'success': True,
@@ -274,47 +409,12 @@ class ShopInfoWeb:
     
     def get_low_stock_items(self) -> List[Dict]:
         """Get items that are running low and need restocking"""
-        low_stock = []
-        
-        for item, current_amount in self.storage.items():
-            threshold = self.low_stock_threshold[item]
-            if current_amount <= threshold:
-                low_stock.append({
-                    'item': item,
-                    'current': current_amount,
-                    'threshold': threshold,
-                    'max': self.max_storage[item],
-                    'urgency': 'critical' if current_amount <= 0 else 'low',
-                    'refill_cost': self._calculate_refill_cost(item, current_amount),
-                    'unit': self._get_unit(item)
-                })
-        
-        return sorted(low_stock, key=lambda x: (x['urgency'] != 'critical', x['current']))
+        return self.alert_engine.get_low_stock()
     
     # PRESERVE: Existing web methods (updated with purchase info)
     def get_inventory_alerts(self) -> List[Dict]:
-        """Get list of inventory items needing attention"""
-        alerts = []
-        
-        for item, current_amount in self.storage.items():
-            if current_amount <= 0:
-                alerts.append({
-                    'item': item,
-                    'level': 'critical',
-                    'message': f"{item} is out of stock!",
-                    'action': 'restock_immediately',
-                    'cost': self._calculate_refill_cost(item, current_amount)
-                })
-            elif current_amount <= self.low_stock_threshold[item]:
-                alerts.append({
-                    'item': item,
-                    'level': 'warning',
-                    'message': f"{item} is running low ({current_amount} {self._get_unit(item)} remaining)",
-                    'action': 'restock_soon',
-                    'cost': self._calculate_refill_cost(item, current_amount)
-                })
-        
-        return sorted(alerts, key=lambda x: x['level'] == 'critical', reverse=True)
+        """Get list of inventory items needing attention (maintained as stock changes)"""
+        return self.alert_engine.get_alerts()
     
     def get_purchase_history(self, days: int = 7) -> List[Dict]:
         """Get recent purchase history"""
@@ -329,13 +429,45 @@ class ShopInfoWeb:
         
         return sorted(recent_purchases, key=lambda x: x['timestamp'], reverse=True)
     
+    def get_state(self, histories: bool = True) -> Dict:
+        """Mutable shop state for persistence; catalog-derived data is not included
+
+        histories=False leaves out the logs, for snapshots of a journaled shop
+        whose event log already holds them.
+        """
+        state = {'storage': dict(self.storage)}
+        if histories:
+            state.update({
+                'usage_history': self.usage_history,
+                'restock_log': self.restock_log,
+                'purchase_history': self.purchase_history
+            })
+        return state
+    
+    def load_state(self, state: Dict):
+        """Restore state saved by get_state without raising stock alerts for it"""
+        for item, amount in state.get('storage', {}).items():
+            if item in self.storage:
+                self.storage[item] = amount
+        self.usage_history = list(state.get('usage_history', []))
+        self.restock_log = list(state.get('restock_log', []))
+        self.purchase_history = list(state.get('purchase_history', []))
+        self.rebuild_derived()
+    
+    def rebuild_derived(self):
+        """Recompute stats, feasibility and alerts after bulk changes, without raising alerts"""
+        self._build_stats()
+        self._refresh_feasibility(self._recipes)
+        self._feasibility_changes = {}
+        self.alert_engine.reset()
+    
     def to_json(self) -> str:
         """Convert current state to JSON for web API"""
-        return json.dumps({
+        return dumps_str({
             'inventory': self.get_real_time_stats(),
             'alerts': self.get_inventory_alerts(),
             'last_updated': datetime.now().isoformat()
-        }, indent=2)
+        })
 
 
 # Example usage and testing
@@ -353,6 +485,8 @@ if __name__ == "__main__":
     # Simulate some usage to create low stock
     shop.storage["Coffee Beans"] = 5  # Low stock
     shop.storage["Plain Bagel"] = 0   # Out of stock
+    shop.refresh_feasibility()
+    print(f"Unavailable items: {shop.get_feasibility()['unavailable']}")
     
     # Get shopping list
     shopping_list = shop.get_shopping_list(player_money)
@@ -0,0 +1,641 @@
+# backend/enhanced_models/shop_registry.py
+"""
+Shop Registry - Many independent shops (franchises) in one server process
+NEW: Lazy loading from a per-shop store, LRU unloading, shared catalog data
+
+Shops built from the same catalog file share the compiled catalog, the menu
+objects and every index built on them; only inventory and ledger state is
+per shop. Idle shops are saved and dropped from memory, and loaded again on
+their next request.
+
+With a store, every stock and money change is also appended to the shop's
+event log, and a snapshot is saved every `snapshot_every` records. Snapshots
+hold stock and ledger only; each one appends the history entries added since
+the last to the shop's history file and records how far that file goes, so
+recovery reads the histories back and replays only the log after the
+snapshot. A shop whose log is lost still comes back with its stock and money
+from the snapshot.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    from .menu_catalog import DEFAULT_CATALOG_PATH, get_default_catalog, load_catalog
+    from .coffee_menu import CoffeeMenuWeb
+    from .bakery_item import BakeryMenuWeb
+    from .shop_info import ShopInfoWeb
+    from .money_machine import MoneyMachineWeb
+    from .event_log import DEFAULT_SNAPSHOT_EVERY, EventLog, replay
+except ImportError:
+    from menu_catalog import DEFAULT_CATALOG_PATH, get_default_catalog, load_catalog
+    from coffee_menu import CoffeeMenuWeb
+    from bakery_item import BakeryMenuWeb
+    from shop_info import ShopInfoWeb
+    from money_machine import MoneyMachineWeb
+    from event_log import DEFAULT_SNAPSHOT_EVERY, EventLog, replay
+
+DEFAULT_SHOP_ID = 'default'
+SHOP_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+CATALOG_DIR = os.path.dirname(DEFAULT_CATALOG_PATH)
+# The append-only histories kept in a shop's history file: (model attribute, history attribute)
+SAVED_HISTORIES = (('shop_info', 'usage_history'), ('shop_info', 'restock_log'),
+                   ('shop_info', 'purchase_history'), ('money_machine', 'transaction_history'))
+
+
+class ShopError(ValueError):
+    """Raised for invalid shop ids or catalogs, or shops that already exist"""
+
+
+class ShopNotOwned(ShopError):
+    """Raised for a shop another shard worker owns"""
+
+
+def validate_shop_id(shop_id: str) -> str:
+    if not isinstance(shop_id, str) or not SHOP_ID_PATTERN.match(shop_id):
+        raise ShopError("Shop id must be 1-64 letters, digits, '-' or '_'")
+    return shop_id
+
+
+def resolve_catalog(name: Optional[str]) -> Optional[str]:
+    """Catalog name (a JSON file in backend/data) -> path; None means the default catalog"""
+    if not name:
+        return None
+    if not SHOP_ID_PATTERN.match(name):
+        raise ShopError(f"Invalid catalog name: {name}")
+    path = os.path.join(CATALOG_DIR, f"{name}.json")
+    if path == DEFAULT_CATALOG_PATH:
+        return None
+    if not os.path.exists(path):
+        raise ShopError(f"Unknown catalog: {name}")
+    return path
+
+
+class Shop:
+    """One shop's menus (shared) and inventory and ledger (its own)"""
+    __slots__ = ('shop_id', 'catalog_path', 'coffee_menu', 'bakery_menu', 'shop_info',
+                 'money_machine', 'last_access', 'active', 'pinned', 'lock', 'journal', 'bootstrap_cache',
+                 'history_saved')
+
+    def __init__(self, shop_id, catalog_path, coffee_menu, bakery_menu, shop_info, money_machine,
+                 pinned=False):
+        self.shop_id = shop_id
+        self.catalog_path = catalog_path
+        self.coffee_menu = coffee_menu
+        self.bakery_menu = bakery_menu
+        self.shop_info = shop_info
+        self.money_machine = money_machine
+        self.last_access = time.time()
+        self.active = 0          # requests currently using this shop
+        self.pinned = pinned     # pinned shops are never unloaded
+        self.lock = threading.RLock()
+        self.journal = None      # EventLog, for shops kept in a store
+        self.bootstrap_cache = None   # the app's cached /bootstrap payload for this shop
+        self.history_saved = None     # history entry counts and file offset of the last snapshot
+
+    @property
+    def room(self) -> str:
+        """Socket.IO room for this shop's live updates"""
+        return f"shop:{self.shop_id}"
+
+    def get_state(self, histories: bool = True) -> Dict:
+        """Full state, or a snapshot without the histories its event log already holds"""
+        histories = histories or self.journal is None
+        state = {
+            'shop_id': self.shop_id,
+            'catalog': self.catalog_path,
+            'saved_at': datetime.now().isoformat(),
+            'shop': self.shop_info.get_state(histories),
+            'money': self.money_machine.get_state(histories)
+        }
+        if self.journal is not None:
+            state['log_offset'] = self.journal.offset  # the log records this state covers
+        return state
+
+    def attach_journal(self, journal: Optional[EventLog]):
+        self.journal = journal
+        self.shop_info.journal = journal
+        self.money_machine.journal = journal
+
+
+class ShopStore:
+    """One JSON file per shop, spread over subdirectories by id hash"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, shop_id: str, extension: str = 'json') -> str:
+        bucket = hashlib.md5(shop_id.encode('utf-8')).hexdigest()[:2]
+        return os.path.join(self.root, bucket, f"{shop_id}.{extension}")
+
+    def log_path(self, shop_id: str) -> str:
+        """The shop's event log, next to its snapshot"""
+        return self._path(shop_id, 'events')
+
+    def history_path(self, shop_id: str) -> str:
+        """The shop's history file: one JSON [history name, entry] pair per line"""
+        return self._path(shop_id, 'history')
+
+    def append_history(self, shop_id: str, offset: int, entries: List) -> int:
+        """Write entries after the first `offset` bytes of the history file; returns its new length"""
+        path = self.history_path(shop_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.seek(offset)
+            f.truncate()   # drop anything written after the last snapshot
+            f.write(b''.join(json.dumps(entry, separators=(',', ':')).encode('utf-8') + b'\n'
+                             for entry in entries))
+            return f.tell()
+
+    def history_size(self, shop_id: str) -> int:
+        try:
+            return os.path.getsize(self.history_path(shop_id))
+        except FileNotFoundError:
+            return 0
+
+    def load_history(self, shop_id: str, offset: int) -> Optional[List]:
+        """The entries in the first `offset` bytes of the history file; None if it's shorter"""
+        try:
+            with open(self.history_path(shop_id), 'rb') as f:
+                data = f.read(offset)
+        except FileNotFoundError:
+            return None
+        if len(data) < offset:
+            return None
+        return [json.loads(line) for line in data.splitlines()]
+
+    def remove_history(self, shop_id: str):
+        try:
+            os.remove(self.history_path(shop_id))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, shop_id: str) -> bool:
+        return os.path.exists(self._path(shop_id))
+
+    def ids(self) -> Iterator[str]:
+        """Every stored shop id"""
+        if not os.path.isdir(self.root):
+            return
+        for bucket in os.listdir(self.root):
+            bucket_dir = os.path.join(self.root, bucket)
+            if os.path.isdir(bucket_dir):
+                for name in os.listdir(bucket_dir):
+                    if name.endswith('.json'):
+                        yield name[:-len('.json')]
+
+    def load(self, shop_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(shop_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, shop_id: str, state: Dict):
+        path = self._path(shop_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp_path, path)  # Readers never see a half-written file
+
+
+class ShopRegistry:
+    """Shops keyed by id: loaded on demand, least recently used unloaded first"""
+
+    def __init__(self, store: Optional[ShopStore] = None, max_loaded: int = 1000,
+                 idle_seconds: float = 900, clock=time.time, snapshot_every: int = DEFAULT_SNAPSHOT_EVERY):
+        self.store = store
+        self.max_loaded = max_loaded
+        self.idle_seconds = idle_seconds
+        self.snapshot_every = snapshot_every
+        self.clock = clock
+        self.shops = OrderedDict()   # shop id -> Shop, least recently used first
+        self.menus = {}              # catalog path (None = default) -> (catalog, coffee menu, bakery menu)
+        self.loads = 0
+        self.unloads = 0
+        self.snapshots = 0
+        self.replayed = 0
+        self.owns: Optional[Callable[[str], bool]] = None   # shard ownership; None owns every shop
+        self._lock = threading.RLock()
+        self._loading = {}           # shop id -> Event set when the shop being loaded is in self.shops
+
+    def register(self, shop_id: str, coffee_menu, bakery_menu, shop_info, money_machine,
+                 durable: bool = False) -> Shop:
+        """Add an already-built, pinned shop (the app's original single shop)
+
+        A durable shop is restored from the store and journaled like the others.
+        """
+        with self._lock:
+            shop = Shop(shop_id, None, coffee_menu, bakery_menu, shop_info, money_machine, pinned=True)
+            self.shops[shop_id] = shop
+            catalog = getattr(coffee_menu, 'catalog', None)
+            if catalog is not None:
+                self.menus[None] = (catalog, coffee_menu, bakery_menu)
+            if durable and self.store is not None:
+                state = self.store.load(shop_id)
+                if state:
+                    shop_info.load_state(state.get('shop', {}))
+                    money_machine.load_state(state.get('money', {}))
+                self._open_journal(shop, state)
+                if not state:
+                    self._save(shop)
+            return shop
+
+    def _menus_for(self, catalog_path: Optional[str]):
+        entry = self.menus.get(catalog_path)
+        if entry is None:
+            catalog = get_default_catalog() if catalog_path is None else load_catalog(catalog_path)
+            entry = (catalog, CoffeeMenuWeb(catalog), BakeryMenuWeb(catalog))
+            self.menus[catalog_path] = entry
+        return entry
+
+    def _build(self, shop_id: str, catalog_path: Optional[str], state: Optional[Dict] = None) -> Shop:
+        with self._lock:
+            catalog, coffee_menu, bakery_menu = self._menus_for(catalog_path)
+        shop_info = ShopInfoWeb(catalog)
+        money_machine = MoneyMachineWeb()
+        if state:
+            shop_info.load_state(state.get('shop', {}))
+            money_machine.load_state(state.get('money', {}))
+        return Shop(shop_id, catalog_path, coffee_menu, bakery_menu, shop_info, money_machine)
+
+    def _restore_histories(self, shop: Shop, saved: Dict) -> bool:
+        """Read a compact snapshot's histories back from the history file"""
+        entries = self.store.load_history(shop.shop_id, saved['offset'])
+        if entries is None:
+            return False
+        histories = {name: [] for _, name in SAVED_HISTORIES}
+        for name, entry in entries:
+            histories[name].append(entry)
+        if any(len(records) != saved['counts'].get(name, 0) for name, records in histories.items()):
+            return False
+        for owner, name in SAVED_HISTORIES:
+            setattr(getattr(shop, owner), name, histories[name])
+        return True
+
+    def _recover(self, shop: Shop, state: Dict) -> Optional[Dict]:
+        """Put back a snapshot's histories and replay the log after it; None without a log"""
+        restored = 'histories' in state and self._restore_histories(shop, state['histories'])
+        path = self.store.log_path(shop.shop_id)
+        if 'log_offset' not in state or not os.path.exists(path):
+            return None
+        # Without its history file a compact snapshot still has the whole log to fall back on
+        start = state['log_offset'] if restored or 'histories' not in state else 0
+        result = replay(path, shop.shop_info, shop.money_machine, start)
+        result['start'] = start
+        return result
+
+    def _open_journal(self, shop: Shop, state: Optional[Dict]):
+        """Replay the shop's log after its snapshot, or start a new log based on the current state"""
+        path = self.store.log_path(shop.shop_id)
+        result = self._recover(shop, state) if state else None
+        if result is not None:
+            self.replayed += result['events']
+            journal = EventLog(path, self.snapshot_every)
+            if journal.offset > result['end']:
+                journal.truncate(result['end'])
+            journal.since_snapshot = result['events'] if result['start'] else 0
+            # Entries up to the snapshot are in the history file; a full replay rewrites it
+            shop.history_saved = state.get('histories') if result['start'] else None
+        else:
+            # New shop, a snapshot from another process, or a lost log: the log starts here
+            if os.path.exists(path):
+                os.remove(path)
+            self.store.remove_history(shop.shop_id)
+            shop.history_saved = None
+            journal = EventLog(path, self.snapshot_every)
+            journal.base({'shop': shop.shop_info.get_state(), 'money': shop.money_machine.get_state()})
+        journal.on_snapshot_due = lambda: self._snapshot_due(shop)
+        shop.attach_journal(journal)
+
+    def _snapshot_due(self, shop: Shop):
+        # Called from the append that made it due; the mutation already holds shop.lock
+        with shop.lock:
+            try:
+                self._save(shop)
+            except OSError as e:
+                print(f"⚠️ Snapshot of {shop.shop_id} failed: {e}")
+
+    def _save_histories(self, shop: Shop) -> Dict:
+        """Append the history entries added since the last snapshot to the history file"""
+        saved = shop.history_saved or {'counts': {}, 'offset': 0}
+        owners = [(name, getattr(getattr(shop, owner), name)) for owner, name in SAVED_HISTORIES]
+        if (any(len(records) < saved['counts'].get(name, 0) for name, records in owners)
+                or self.store.history_size(shop.shop_id) < saved['offset']):
+            saved = {'counts': {}, 'offset': 0}   # a history was replaced or the file lost: write them all again
+        entries = [[name, entry] for name, records in owners
+                   for entry in records[saved['counts'].get(name, 0):]]
+        offset = self.store.append_history(shop.shop_id, saved['offset'], entries)
+        return {'counts': {name: len(records) for name, records in owners}, 'offset': offset}
+
+    def _save(self, shop: Shop):
+        """Snapshot a shop to the store (callers hold shop.lock)"""
+        state = shop.get_state(histories=False)
+        if shop.journal is not None:
+            state['histories'] = self._save_histories(shop)
+        self.store.save(shop.shop_id, state)
+        if shop.journal is not None:
+            shop.history_saved = state['histories']
+            shop.journal.snapshot_taken()
+        self.snapshots += 1
+
+    def _insert(self, shop: Shop):
+        shop.last_access = self.clock()
+        self.shops[shop.shop_id] = shop
+        self._evict()
+
+    def _evict(self):
+        """Unload least recently used shops beyond max_loaded, skipping busy ones"""
+        excess = len(self.shops) - self.max_loaded
+        if excess <= 0:
+            return
+        for shop_id in list(self.shops):
+            if excess <= 0:
+                break
+            shop = self.shops[shop_id]
+            if not shop.pinned and shop.active == 0:
+                self._unload(shop)
+                excess -= 1
+
+    def _unload(self, shop: Shop):
+        with shop.lock:
+            if self.store is not None:
+                self._save(shop)
+            if shop.journal is not None:
+                shop.journal.close()
+                shop.attach_journal(None)
+            del self.shops[shop.shop_id]
+        self.unloads += 1
+
+    def _check_owner(self, shop_id: str):
+        if self.owns is not None and not self.owns(shop_id):
+            raise ShopNotOwned(f"Shop {shop_id} belongs to another worker")
+
+    def create(self, shop_id: str, catalog: Optional[str] = None) -> Shop:
+        """Open a new shop with full starting stock"""
+        validate_shop_id(shop_id)
+        self._check_owner(shop_id)
+        catalog_path = resolve_catalog(catalog)
+        with self._lock:
+            if shop_id in self.shops or (self.store is not None and self.store.exists(shop_id)):
+                raise ShopError(f"Shop already exists: {shop_id}")
+            shop = self._build(shop_id, catalog_path)
+            if self.store is not None:
+                self._open_journal(shop, None)
+                self._save(shop)
+            self._insert(shop)
+            return shop
+
+    def get(self, shop_id: str) -> Optional[Shop]:
+        """Loaded shop, or load it from the store; None if it doesn't exist
+
+        Loading (reading the snapshot and replaying the log) happens outside
+        the registry lock, so other shops are served meanwhile; concurrent
+        requests for the shop being loaded wait for that one load.
+        """
+        validate_shop_id(shop_id)
+        while True:
+            with self._lock:
+                shop = self.shops.get(shop_id)
+                if shop is None or not shop.pinned:
+                    self._check_owner(shop_id)
+                if shop is not None:
+                    self.shops.move_to_end(shop_id)
+                    shop.last_access = self.clock()
+                    return shop
+                if self.store is None:
+                    return None
+                loading = self._loading.get(shop_id)
+                if loading is None:
+                    loading = self._loading[shop_id] = threading.Event()
+                    break
+            loading.wait()
+
+        shop = None
+        try:
+            shop = self._load(shop_id)
+        finally:
+            with self._lock:
+                del self._loading[shop_id]
+                if shop is not None:
+                    self.loads += 1
+                    self._insert(shop)
+            loading.set()   # waiters find the shop loaded, or try loading it themselves
+        return shop
+
+    def _load(self, shop_id: str) -> Optional[Shop]:
+        state = self.store.load(shop_id)
+        if state is None:
+            return None
+        shop = self._build(shop_id, state.get('catalog'), state)
+        self._open_journal(shop, state)
+        return shop
+
+    @contextmanager
+    def checkout(self, shop_id: str):
+        """Use a shop for the length of a request; it can't be unloaded meanwhile"""
+        while True:
+            shop = self.get(shop_id)
+            if shop is None:
+                break
+            with self._lock:
+                if self.shops.get(shop_id) is shop:
+                    shop.active += 1
+                    break
+            # Unloaded between get() and here: load it again
+        try:
+            yield shop
+        finally:
+            if shop is not None:
+                with self._lock:
+                    shop.active -= 1
+
+    def unload(self, shop_id: str) -> bool:
+        with self._lock:
+            shop = self.shops.get(shop_id)
+            if shop is None or shop.pinned or shop.active:
+                return False
+            self._unload(shop)
+            return True
+
+    def unload_idle(self) -> int:
+        """Save and drop shops not used for idle_seconds"""
+        cutoff = self.clock() - self.idle_seconds
+        unloaded = 0
+        with self._lock:
+            for shop in list(self.shops.values()):
+                if shop.last_access >= cutoff:
+                    break  # LRU order: everything after this is more recent
+                if not shop.pinned and shop.active == 0:
+                    self._unload(shop)
+                    unloaded += 1
+        return unloaded
+
+    def handoff(self, moving: Callable[[str], bool]) -> List[Dict]:
+        """Snapshot and unload the shops leaving this process (shard rebalance)
+
+        Stored shops are included too, so the new owner needs no access to
+        this process's store. Local copies are kept; they are only read again
+        if the shop moves back, and then the incoming snapshot replaces them.
+        A pinned shop `moving` selects is sent but stays loaded here.
+        """
+        snapshots = []
+        with self._lock:
+            for shop in list(self.shops.values()):
+                if moving(shop.shop_id):
+                    with shop.lock:
+                        snapshots.append(shop.get_state())
+                    if not shop.pinned:
+                        self._unload(shop)
+            if self.store is not None:
+                taken = {state['shop_id'] for state in snapshots}
+                for shop_id in self.store.ids():
+                    if shop_id not in taken and moving(shop_id):
+                        state = self._full_state(shop_id, self.store.load(shop_id))
+                        if state is not None:
+                            snapshots.append(state)
+        return snapshots
+
+    def _full_state(self, shop_id: str, state: Optional[Dict]) -> Optional[Dict]:
+        """A stored snapshot with its histories and logged changes put back, to send to another process"""
+        if not state or 'log_offset' not in state:
+            return state
+        shop = self._build(shop_id, state.get('catalog'), state)
+        self._recover(shop, state)
+        state = {key: value for key, value in state.items() if key != 'histories'}
+        state.update({'shop': shop.shop_info.get_state(), 'money': shop.money_machine.get_state()})
+        return state
+
+    def accept(self, snapshots: List[Dict]) -> int:
+        """Take ownership of shops handed off by another process
+
+        A pinned shop (the default shop following the primary worker) keeps
+        its models and takes over the snapshot's state.
+        """
+        accepted = 0
+        with self._lock:
+            for state in snapshots:
+                shop_id = validate_shop_id(state.get('shop_id'))
+                if shop_id in self.shops and self.shops[shop_id].pinned:
+                    self._replace_state(self.shops[shop_id], state)
+                    accepted += 1
+                    continue
+                stale = self.shops.pop(shop_id, None)  # a stale loaded copy loses to the snapshot
+                if stale is not None and stale.journal is not None:
+                    stale.journal.close()
+                # The offset points into the sender's log; this process starts its own on load
+                state = {key: value for key, value in state.items()
+                         if key not in ('log_offset', 'histories')}
+                if self.store is not None:
+                    self.store.save(shop_id, state)
+                else:
+                    self._insert(self._build(shop_id, state.get('catalog'), state))
+                accepted += 1
+        return accepted
+
+    def _replace_state(self, shop: Shop, state: Dict):
+        with shop.lock:
+            shop.shop_info.load_state(state.get('shop', {}))
+            shop.money_machine.load_state(state.get('money', {}))
+            shop.bootstrap_cache = None
+            if shop.journal is not None:
+                # The old log no longer leads to this state: start a new one from it
+                shop.journal.close()
+                self._open_journal(shop, None)
+                self._save(shop)
+
+    def save_all(self) -> int:
+        if self.store is None:
+            return 0
+        with self._lock:
+            shops = [shop for shop in self.shops.values() if not shop.pinned or shop.journal is not None]
+        for shop in shops:
+            with shop.lock:
+                self._save(shop)
+        return len(shops)
+
+    def state_at(self, shop_id: str, until: Optional[float] = None):
+        """Rebuild a shop from its event log as of `until` (unix time), apart from the live shop
+
+        Returns (shop_info, money_machine, replay result), or None without a log.
+        """
+        validate_shop_id(shop_id)
+        if self.store is None or not os.path.exists(self.store.log_path(shop_id)):
+            return None
+        with self._lock:
+            shop = self.shops.get(shop_id)
+            catalog_path = shop.catalog_path if shop is not None else (self.store.load(shop_id) or {}).get('catalog')
+            catalog = self._menus_for(catalog_path)[0]
+        shop_info = ShopInfoWeb(catalog)
+        money_machine = MoneyMachineWeb()
+        result = replay(self.store.log_path(shop_id), shop_info, money_machine, 0, until)
+        return shop_info, money_machine, result
+
+    def apply_catalog(self, catalog, catalog_path: Optional[str] = None):
+        """Hand a reloaded catalog to the shared menus and every loaded shop using it"""
+        with self._lock:
+            entry = self.menus.get(catalog_path)
+            if entry is not None:
+                _, coffee_menu, bakery_menu = entry
+                for menu in (coffee_menu, bakery_menu):
+                    if getattr(menu, 'catalog', None) is not catalog:
+                        menu.apply_catalog(catalog)
+                self.menus[catalog_path] = (catalog, coffee_menu, bakery_menu)
+            shops = [shop for shop in self.shops.values() if shop.catalog_path == catalog_path]
+        for shop in shops:
+            if not shop.pinned:
+                with shop.lock:
+                    shop.shop_info.apply_catalog(catalog)
+
+    def watch_idle(self, interval: float = 60, sleep=time.sleep):
+        """Unload idle shops forever; run this off the request path"""
+        while True:
+            sleep(interval)
+            try:
+                unloaded = self.unload_idle()
+                if unloaded:
+                    print(f"💤 Unloaded {unloaded} idle shops")
+            except Exception as e:
+                print(f"⚠️ Shop unloading failed: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'loaded': len(self.shops),
+                'max_loaded': self.max_loaded,
+                'idle_seconds': self.idle_seconds,
+                'catalogs': len(self.menus),
+                'loads': self.loads,
+                'unloads': self.unloads,
+                'snapshots': self.snapshots,
+                'replayed_events': self.replayed,
+                'snapshot_every': self.snapshot_every,
+                'persistent': self.store is not None
+            }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import tempfile
+
+    registry = ShopRegistry(ShopStore(tempfile.mkdtemp()), max_loaded=2)
+    for shop_id in ('downtown', 'airport', 'campus'):
+        registry.create(shop_id)
+
+    with registry.checkout('downtown') as shop:
+        shop.shop_info.food_return(shop.bakery_menu.menu[0])
+
+    print("=== SHOP REGISTRY ===")
+    print(registry.stats())
+    print(f"Loaded: {list(registry.shops)}")
+    downtown = registry.get('downtown')
+    print(f"Downtown {downtown.bakery_menu.menu[0].food}: {downtown.shop_info.storage[downtown.bakery_menu.menu[0].food]}")
+    print(f"Shared menus: {registry.get('airport').coffee_menu is downtown.coffee_menu}")
@@ -0,0 +1,175 @@
+# backend/enhanced_models/stock_alerts.py
+"""
+Stock Alerts - Edge-triggered low-stock alerts driven by stock changes
+NEW: Per-ingredient state machine with hysteresis and a materialized alert set
+
+Only ingredients touched by a deduction or purchase are re-evaluated, an
+event is produced only when an ingredient changes state, and the current
+alerts are kept ready to read instead of being rebuilt per request.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+STATES = ('good', 'warning', 'low', 'out')
+LEVELS = {state: level for level, state in enumerate(STATES)}
+
+WARNING_PERCENTAGE = 30      # Same cut-off as the inventory stats
+RECOVERY_MARGIN = 0.05       # Fraction of capacity stock must climb past a threshold to recover
+
+
+class StockAlertEngine:
+    """Tracks good→warning→low→out per ingredient and the alerts that follow"""
+
+    def __init__(self, shop, recovery_margin: float = RECOVERY_MARGIN):
+        self.shop = shop
+        self.recovery_margin = recovery_margin
+        self.states = {}        # ingredient -> state
+        self.alerts = {}        # ingredient -> alert dict (low/out only)
+        self.low_stock = {}     # ingredient -> low stock entry (low/out only)
+        self.critical = set()   # ingredients that are out
+        self._transitions = []
+        self._sorted_alerts = None
+        self._sorted_low_stock = None
+
+    def _classify(self, item: str, current: float, margin: float = 0.0) -> int:
+        max_amount = self.shop.max_storage[item]
+        band = max_amount * margin
+        if current <= 0:
+            return LEVELS['out']
+        if current <= self.shop.low_stock_threshold[item] + band:
+            return LEVELS['low']
+        if max_amount and (current - band) / max_amount * 100 < WARNING_PERCENTAGE:
+            return LEVELS['warning']
+        return LEVELS['good']
+
+    def _next_state(self, item: str, current: float) -> str:
+        previous = self.states.get(item)
+        level = self._classify(item, current)
+        if previous is not None and level < LEVELS[previous]:
+            # Improving: only step down once stock is clear of the threshold by the margin
+            level = min(LEVELS[previous], self._classify(item, current, self.recovery_margin))
+        return STATES[level]
+
+    def evaluate(self, items, record: bool = True):
+        """Re-evaluate the given ingredients, recording a transition for each state change"""
+        for item in items:
+            if item not in self.shop.storage:
+                continue
+            current = self.shop.storage[item]
+            previous = self.states.get(item)
+            state = self._next_state(item, current)
+            self.states[item] = state
+            self._refresh_entries(item, state, current)
+
+            if record and previous is not None and state != previous:
+                self._transitions.append({
+                    'timestamp': datetime.now().isoformat(),
+                    'item': item,
+                    'from': previous,
+                    'to': state,
+                    'current': current,
+                    'unit': self.shop._get_unit(item),
+                    'escalated': LEVELS[state] > LEVELS[previous]
+                })
+
+    def reset(self):
+        """Evaluate every ingredient from scratch without producing events"""
+        self.states = {}
+        self.alerts = {}
+        self.low_stock = {}
+        self.critical = set()
+        self._sorted_alerts = None
+        self._sorted_low_stock = None
+        self.evaluate(list(self.shop.storage), record=False)
+
+    def _refresh_entries(self, item: str, state: str, current: float):
+        """Keep the materialized alert entries for one ingredient in step with its stock"""
+        had_entry = item in self.alerts
+        if state == 'out':
+            self.critical.add(item)
+        else:
+            self.critical.discard(item)
+        if state in ('low', 'out'):
+            cost = self.shop._calculate_refill_cost(item, current)
+            unit = self.shop._get_unit(item)
+            if state == 'out':
+                alert = {
+                    'item': item,
+                    'level': 'critical',
+                    'message': f"{item} is out of stock!",
+                    'action': 'restock_immediately',
+                    'cost': cost
+                }
+            else:
+                alert = {
+                    'item': item,
+                    'level': 'warning',
+                    'message': f"{item} is running low ({current} {unit} remaining)",
+                    'action': 'restock_soon',
+                    'cost': cost
+                }
+            self.alerts[item] = alert
+            self.low_stock[item] = {
+                'item': item,
+                'current': current,
+                'threshold': self.shop.low_stock_threshold[item],
+                'max': self.shop.max_storage[item],
+                'urgency': 'critical' if state == 'out' else 'low',
+                'refill_cost': cost,
+                'unit': unit
+            }
+        elif had_entry:
+            del self.alerts[item]
+            del self.low_stock[item]
+        else:
+            return
+        self._sorted_alerts = None
+        self._sorted_low_stock = None
+
+    def get_alerts(self) -> List[Dict]:
+        """Current alerts, critical first; rebuilt only after an entry changed"""
+        if self._sorted_alerts is None:
+            self._sorted_alerts = sorted(self.alerts.values(), key=lambda x: x['level'] == 'critical',
+                                         reverse=True)
+        return self._sorted_alerts
+
+    def get_low_stock(self) -> List[Dict]:
+        if self._sorted_low_stock is None:
+            self._sorted_low_stock = sorted(self.low_stock.values(),
+                                            key=lambda x: (x['urgency'] != 'critical', x['current']))
+        return self._sorted_low_stock
+
+    def state_of(self, item: str) -> Optional[str]:
+        return self.states.get(item)
+
+    def pop_transitions(self) -> List[Dict]:
+        """State changes since the last call, oldest first"""
+        transitions = self._transitions
+        self._transitions = []
+        return transitions
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    class _Shop:
+        storage = {'Oat Milk': 1000}
+        max_storage = {'Oat Milk': 1000}
+        low_stock_threshold = {'Oat Milk': 200}
+
+        def _get_unit(self, item):
+            return 'ml'
+
+        def _calculate_refill_cost(self, item, current):
+            return round((1000 - current) * 0.003, 2)
+
+    shop = _Shop()
+    engine = StockAlertEngine(shop)
+    engine.reset()
+
+    print("=== STOCK ALERTS ===")
+    for level in (700, 250, 190, 0, 210, 260, 1000):
+        shop.storage['Oat Milk'] = level
+        engine.evaluate(['Oat Milk'])
+        print(f"{level:>5}ml -> {engine.state_of('Oat Milk')}")
+    for transition in engine.pop_transitions():
+        print(f"  {transition['from']} → {transition['to']} at {transition['current']}ml")
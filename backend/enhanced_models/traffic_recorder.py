@@ -0,0 +1,161 @@
+# backend/enhanced_models/traffic_recorder.py
+"""
+Traffic Recorder - Capture of live /api/* requests and Socket.IO events
+NEW: Real traffic shapes to replay locally with backend/traffic_replay.py
+
+Each request or event is one length-prefixed record:
+
+    <u32 length> <u8 kind> <f64 unix time> <JSON array>
+
+HTTP:      [session_id, method, path, query, body, status, elapsed_ms, idempotency_key]
+Socket.IO: [session_id, sid, event, args, query]
+
+Records go through a large write buffer that is flushed in the background,
+so a request only pays for encoding one small array. Values of the `redact`
+keys (card numbers) are cut to their last 4 characters before they are
+written, wherever they appear in a body or event arguments.
+"""
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    from .fast_json import dumps, loads
+except ImportError:
+    from fast_json import dumps, loads
+
+HTTP = 0
+SOCKET = 1
+KINDS = ('http', 'socket')
+
+BUFFER_SIZE = 256 * 1024
+MAX_BODY = 64 * 1024   # Larger request bodies are cut off
+
+_LENGTH = struct.Struct('<I')
+_HEADER = struct.Struct('<Bd')
+
+
+def redact_value(value, keys: Tuple[str, ...]):
+    """A copy of decoded JSON with the values of `keys` cut to their last 4 characters"""
+    if isinstance(value, dict):
+        return {key: (str(item)[-4:] if key in keys and item is not None else redact_value(item, keys))
+                for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact_value(item, keys) for item in value]
+    return value
+
+
+class TrafficRecorder:
+    """Appends requests and events to a capture file"""
+
+    def __init__(self, path: str, clock=time.time, redact: Tuple[str, ...] = ()):
+        self.path = path
+        self.clock = clock
+        self.redact = tuple(redact)
+        self._redact_markers = tuple(key.encode('utf-8') for key in self.redact)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'ab', buffering=BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self.records = {kind: 0 for kind in KINDS}
+        self.bytes = 0
+        self.started = clock()
+        self.closed = False
+
+    def _write(self, kind: int, fields: List, ts: Optional[float] = None):
+        body = _HEADER.pack(kind, ts if ts is not None else self.clock()) + dumps(fields)
+        record = _LENGTH.pack(len(body)) + body
+        with self._lock:
+            if self.closed:
+                return
+            self._file.write(record)
+            self.records[KINDS[kind]] += 1
+            self.bytes += len(record)
+
+    def record_http(self, session_id: Optional[str], method: str, path: str, query: str, body: bytes,
+                    status: int, elapsed_ms: float, idempotency_key: Optional[str] = None,
+                    ts: Optional[float] = None):
+        if body and any(marker in body for marker in self._redact_markers):
+            try:
+                body = dumps(redact_value(loads(body), self.redact))
+            except Exception:
+                body = b''   # not JSON, so the values can't be found: keep none of it
+        text = body[:MAX_BODY].decode('utf-8', 'replace') if body else ''
+        self._write(HTTP, [session_id, method, path, query, text, status, round(elapsed_ms, 3),
+                           idempotency_key], ts)
+
+    def record_socket(self, session_id: Optional[str], sid: str, event: str, args: List, query: str = '',
+                      ts: Optional[float] = None):
+        args = redact_value(list(args), self.redact) if self.redact else list(args)
+        self._write(SOCKET, [session_id, sid, event, args, query], ts)
+
+    def flush(self):
+        with self._lock:
+            if not self.closed:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self.closed:
+                self._file.close()
+                self.closed = True
+
+    def watch(self, interval: float = 1.0, sleep=time.sleep):
+        """Flush forever; run this off the request path"""
+        while not self.closed:
+            sleep(interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Traffic capture flush failed: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            'path': self.path,
+            'records': dict(self.records),
+            'bytes': self.bytes,
+            'seconds': round(self.clock() - self.started, 1),
+            'recording': not self.closed
+        }
+
+
+def read_traffic(path: str) -> Iterator[Tuple[int, float, List]]:
+    """(kind, time, fields) for each complete record in a capture file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    pos, size = 0, len(data)
+    while pos + _LENGTH.size + _HEADER.size <= size:
+        (length,) = _LENGTH.unpack_from(data, pos)
+        end = pos + _LENGTH.size + length
+        if end > size:
+            break   # cut short by a crash mid-write
+        kind, ts = _HEADER.unpack_from(data, pos + _LENGTH.size)
+        yield kind, ts, loads(data[pos + _LENGTH.size + _HEADER.size:end])
+        pos = end
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), 'demo.traffic')
+    recorder = TrafficRecorder(path, redact=('card_number',))
+    body = b'{"type":"coffee","item_id":"medium_regularmilk_hot_latte","payment_method":"cash"}'
+
+    count = 100_000
+    start = time.perf_counter()
+    for i in range(count):
+        if i % 10:
+            recorder.record_http(f"session_{i % 50}", 'POST', '/api/game/order', '', body, 200, 1.5)
+        else:
+            recorder.record_socket(f"session_{i % 50}", f"sid{i % 50}", 'request_inventory_update', [])
+    elapsed = time.perf_counter() - start
+    recorder.close()
+
+    print("=== TRAFFIC RECORDER ===")
+    print(f"Recorded {count:,} in {elapsed:.2f}s ({elapsed / count * 1e6:.1f}µs each), "
+          f"{recorder.bytes / count:.0f} bytes each")
+    print(recorder.stats())
+    kind, ts, fields = next(read_traffic(path))
+    print(f"First record: {KINDS[kind]} {fields}")
@@ -0,0 +1,140 @@
+# backend/enhanced_models/wire_codec.py
+"""
+Wire Codec - Compact MessagePack payloads for high-fanout Socket.IO events
+NEW: Short field codes and integer ingredient ids instead of repeated strings
+
+Clients opt in when connecting (io({query: {wire: 'msgpack'}})). They get
+one 'wire_format' event with the code tables, then the compact events arrive
+as binary MessagePack. Everyone else keeps receiving plain JSON.
+Requires msgpack (pip install msgpack).
+"""
+import threading
+from typing import Dict, Iterable
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+WIRE_FORMATS = ('json', 'msgpack')
+COMPACT_EVENTS = ('inventory_updated', 'order_completed', 'purchase_completed')
+
+# Payload key -> short code. Codes never change meaning; add new ones at the end.
+FIELD_CODES = {
+    # inventory stats entry
+    'current': 'c', 'max': 'm', 'percentage': 'p', 'status': 's', 'low_threshold': 'l',
+    'unit': 'u', 'price_per_unit': 'pu', 'refill_cost': 'rc',
+    # menu item
+    'id': 'i', 'name': 'n', 'price': 'pr', 'ingredients': 'ig', 'prep_time': 'pt',
+    'complexity': 'cx', 'category': 'ct', 'description': 'd', 'dietary_info': 'di',
+    'popularity_score': 'ps', 'warming_required': 'w', 'image_url': 'im',
+    # order_completed / purchase_completed
+    'type': 't', 'item': 'it', 'session_id': 'sid', 'payment_result': 'pay',
+    'inventory_updated': 'iu', 'success': 'ok', 'message': 'msg', 'change': 'ch', 'tip': 'tp',
+    'total_earned': 'te', 'transaction_id': 'tx', 'cost': 'co', 'new_inventory': 'ni',
+    'money_remaining': 'mr',
+}
+FIELD_NAMES = {code: field for field, code in FIELD_CODES.items()}
+
+# Stock status values travel as their index
+STATUS_CODES = ('good', 'warning', 'low', 'out')
+_STATUS_IDS = {status: index for index, status in enumerate(STATUS_CODES)}
+
+
+class WireCodec:
+    """Renames payload keys to codes and ingredient names to ids, then packs them"""
+
+    def __init__(self, ingredients: Iterable[str] = ()):
+        self.ingredients = []
+        self.ingredient_ids = {}
+        self.version = 0
+        self._lock = threading.Lock()
+        self.add_ingredients(ingredients)
+
+    def add_ingredients(self, ingredients: Iterable[str]) -> bool:
+        """Give new ingredient names ids; existing ids never change. True if any were added"""
+        with self._lock:
+            added = False
+            for name in ingredients:
+                if name not in self.ingredient_ids:
+                    self.ingredient_ids[name] = len(self.ingredients)
+                    self.ingredients.append(name)
+                    added = True
+            if added:
+                self.version += 1
+            return added
+
+    def schema(self) -> Dict:
+        """Tables a client needs to expand compact payloads (sent as 'wire_format')"""
+        return {
+            'format': 'msgpack',
+            'version': self.version,
+            'fields': FIELD_CODES,
+            'statuses': list(STATUS_CODES),
+            'ingredients': list(self.ingredients)
+        }
+
+    def compact(self, value):
+        if isinstance(value, dict):
+            ids = self.ingredient_ids
+            packed = {}
+            for key, item in value.items():
+                if key == 'status' and item in _STATUS_IDS:
+                    packed['s'] = _STATUS_IDS[item]
+                else:
+                    packed[ids[key] if key in ids else FIELD_CODES.get(key, key)] = self.compact(item)
+            return packed
+        if isinstance(value, (list, tuple)):
+            return [self.compact(item) for item in value]
+        if isinstance(value, float) and value.is_integer() and abs(value) < 2 ** 53:
+            # 100.0 packs into 1 byte as an int, 9 as a double; JavaScript can't tell them apart
+            return int(value)
+        return value
+
+    def expand(self, value):
+        """Inverse of compact (what the browser shim does)"""
+        if isinstance(value, dict):
+            expanded = {}
+            for key, item in value.items():
+                if key == 's' and isinstance(item, int):
+                    expanded['status'] = STATUS_CODES[item]
+                else:
+                    name = self.ingredients[key] if isinstance(key, int) else FIELD_NAMES.get(key, key)
+                    expanded[name] = self.expand(item)
+            return expanded
+        if isinstance(value, list):
+            return [self.expand(item) for item in value]
+        return value
+
+    def encode(self, data) -> bytes:
+        return msgpack.packb(self.compact(data), use_bin_type=True)
+
+    def decode(self, packed: bytes):
+        return self.expand(msgpack.unpackb(packed, raw=False, strict_map_key=False))
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import json
+
+    try:
+        from .shop_info import ShopInfoWeb
+    except ImportError:
+        from shop_info import ShopInfoWeb
+
+    shop = ShopInfoWeb()
+    stats = shop.get_real_time_stats()
+    codec = WireCodec(shop.storage)
+
+    print("=== WIRE CODEC ===")
+    as_json = json.dumps(stats).encode('utf-8')
+    print(f"inventory_updated as JSON: {len(as_json)} bytes")
+    if MSGPACK_AVAILABLE:
+        packed = codec.encode(stats)
+        print(f"inventory_updated as MessagePack: {len(packed)} bytes "
+              f"({len(as_json) / len(packed):.1f}x smaller)")
+        print(f"Round trip ok: {codec.decode(packed) == stats}")
+    else:
+        print("msgpack not installed: pip install msgpack")
@@ -0,0 +1,213 @@
+# backend/mock_gateway.py
+"""
+Mock Gateway - Local stand-in card processor with injectable latency and failures
+
+Serve it and point the game at it:
+    python backend/mock_gateway.py --port 5900 --latency-ms 150 --jitter-ms 50 --error-rate 0.02
+    PAYMENT_GATEWAY_URL=http://127.0.0.1:5900 python backend/app.py
+
+Change behaviour while running (e.g. simulate an outage, then recovery):
+    curl -X POST localhost:5900/_config -H 'Content-Type: application/json' -d '{"error_rate": 1.0}'
+
+Measure order throughput through the game server:
+    python backend/mock_gateway.py bench --url http://localhost:5000 --orders 500 --concurrency 20
+
+Cards ending in 0000 are always declined. The bench opens bench-* shops on
+the game server (they are saved with the other shops).
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+CONFIG_FIELDS = ('latency_ms', 'jitter_ms', 'error_rate', 'decline_rate')
+
+
+class MockGateway:
+    """Card processor behaviour: POST /v1/charges, POST /v1/charges/<id>/refunds, GET/POST /_config"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 decline_rate: float = 0, seed=None):
+        self.config = {'latency_ms': latency_ms, 'jitter_ms': jitter_ms,
+                       'error_rate': error_rate, 'decline_rate': decline_rate}
+        self.random = random.Random(seed)
+        self.charges = {}   # Idempotency-Key -> (status, body)
+        self.approved = {}  # charge id -> refund body once refunded, else None
+        self.counts = {'approved': 0, 'declined': 0, 'errors': 0, 'replayed': 0, 'refunded': 0}
+        self._lock = threading.Lock()
+
+    def charge(self, request: Dict, key: Optional[str]) -> Tuple[int, Dict]:
+        config = dict(self.config)
+        delay = config['latency_ms'] + self.random.uniform(0, config['jitter_ms'])
+        time.sleep(delay / 1000)
+
+        with self._lock:
+            if key and key in self.charges:
+                self.counts['replayed'] += 1
+                return self.charges[key]
+            if self.random.random() < config['error_rate']:
+                self.counts['errors'] += 1
+                return 503, {'error': 'processor unavailable'}
+
+            charge_id = f"ch_{uuid.uuid4().hex[:16]}"
+            if str(request.get('card_last4', '')).endswith('0000') or \
+                    self.random.random() < config['decline_rate']:
+                result = 402, {'id': charge_id, 'status': 'declined', 'reason': 'insufficient funds'}
+                self.counts['declined'] += 1
+            else:
+                result = 200, {'id': charge_id, 'status': 'approved', 'amount': request.get('amount')}
+                self.approved[charge_id] = None
+                self.counts['approved'] += 1
+            if key:
+                self.charges[key] = result
+        return result
+
+    def refund(self, charge_id: str) -> Tuple[int, Dict]:
+        """Refund a whole approved charge; refunding it again returns the same refund"""
+        with self._lock:
+            if charge_id not in self.approved:
+                return 404, {'error': f'no approved charge {charge_id}'}
+            if self.approved[charge_id] is None:
+                self.approved[charge_id] = {'id': f"re_{uuid.uuid4().hex[:16]}", 'status': 'refunded',
+                                            'charge_id': charge_id}
+                self.counts['refunded'] += 1
+            return 200, self.approved[charge_id]
+
+    def configure(self, update: Dict) -> Dict:
+        for field in CONFIG_FIELDS:
+            if field in update:
+                self.config[field] = float(update[field])
+        return {**self.config, 'counts': self.counts}
+
+
+def make_handler(gateway: MockGateway):
+    """HTTP/1.1 request handler, so the game's pooled keep-alive connections get reused"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _respond(self, status: int, payload: Dict):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> Optional[Dict]:
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                return json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return None
+
+        def do_POST(self):
+            data = self._read_json()
+            if data is None:
+                return self._respond(400, {'error': 'invalid JSON'})
+            if self.path == '/v1/charges':
+                return self._respond(*gateway.charge(data, self.headers.get('Idempotency-Key')))
+            if self.path.startswith('/v1/charges/') and self.path.endswith('/refunds'):
+                return self._respond(*gateway.refund(self.path[len('/v1/charges/'):-len('/refunds')]))
+            if self.path == '/_config':
+                return self._respond(200, gateway.configure(data))
+            self._respond(404, {'error': 'not found'})
+
+        def do_GET(self):
+            if self.path == '/_config':
+                return self._respond(200, gateway.configure({}))
+            self._respond(404, {'error': 'not found'})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _post(url: str, payload: Dict, headers: Dict = None):
+    request = Request(url, data=json.dumps(payload).encode('utf-8'), method='POST',
+                      headers={'Content-Type': 'application/json', **(headers or {})})
+    with urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def _order(url: str, shop_id: str, item_id: str, card_number: str) -> float:
+    """One card order through the game server; returns its latency (negative when it failed)"""
+    start = time.perf_counter()
+    try:
+        _post(f"{url}/api/shops/{shop_id}/order", {
+            'type': 'coffee', 'item_id': item_id, 'payment_method': 'card',
+            'payment_details': {'card_number': card_number}
+        }, {'Idempotency-Key': uuid.uuid4().hex})
+        return time.perf_counter() - start
+    except (HTTPError, OSError):
+        return -(time.perf_counter() - start)
+
+
+def bench(url: str, orders: int, concurrency: int, item_id: str = 'medium_regularmilk_hot_latte',
+          per_shop: int = 4, card_number: str = '4242424242424242') -> Dict:
+    """Send `orders` card orders with `concurrency` in flight; report throughput and latency
+
+    A shop's starting stock covers only a few drinks, so orders are spread
+    over fresh bench-* shops, `per_shop` each, opened before timing starts.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    shop_ids = [f"bench-{run_id}-{i}" for i in range((orders + per_shop - 1) // per_shop)]
+    for shop_id in shop_ids:
+        _post(f"{url}/api/shops", {'shop_id': shop_id})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda n: _order(url, shop_ids[n // per_shop], item_id, card_number),
+                                range(orders)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(abs(r) for r in results)
+    return {
+        'orders': orders,
+        'failed': sum(1 for r in results if r < 0),
+        'seconds': round(elapsed, 2),
+        'orders_per_second': round(orders / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1)
+    }
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] == 'bench':
+        parser = argparse.ArgumentParser(description="Measure card order throughput through the game server")
+        parser.add_argument('--url', default='http://localhost:5000', help="Game server URL")
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--item', default='medium_regularmilk_hot_latte', help="Coffee item id to order")
+        parser.add_argument('--per-shop', type=int, default=4, help="Orders per bench shop (stock limit)")
+        args = parser.parse_args(argv[1:])
+        print(json.dumps(bench(args.url, args.orders, args.concurrency, args.item, args.per_shop), indent=2))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Local stand-in card processor")
+    parser.add_argument('--port', type=int, default=5900)
+    parser.add_argument('--latency-ms', type=float, default=100, help="Delay added to every charge")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Extra random delay, 0..jitter")
+    parser.add_argument('--error-rate', type=float, default=0, help="Fraction of charges answered 503")
+    parser.add_argument('--decline-rate', type=float, default=0, help="Fraction of charges declined")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    gateway = MockGateway(args.latency_ms, args.jitter_ms, args.error_rate, args.decline_rate, args.seed)
+    print(f"💳 Mock card processor at http://localhost:{args.port} "
+          f"({args.latency_ms:g}ms ± {args.jitter_ms:g}ms, {args.error_rate:.0%} errors)")
+    ThreadingHTTPServer(('0.0.0.0', args.port), make_handler(gateway)).serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
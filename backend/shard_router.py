@@ -0,0 +1,320 @@
+# backend/shard_router.py
+"""
+Shard Router - Runs the game across several worker processes
+
+Each shop id is owned by one worker, chosen on a consistent-hash ring, so
+shops spread across cores while every request for a shop (HTTP and
+Socket.IO polling) reaches the process holding its state. The original
+single-shop game stays on the primary worker.
+
+Local multi-process mode:
+    python backend/shard_router.py --workers 4 --port 5000
+
+Rebalance (workers added or removed) while running:
+    curl -X POST localhost:5000/_shards/rebalance -H 'Content-Type: application/json' \\
+         -H "X-Admin-Token: $ADMIN_TOKEN" \\
+         -d '{"workers": {"w0": "http://127.0.0.1:5001", "w1": "http://127.0.0.1:5002"}}'
+
+Rebalancing and the workers' handoff routes need the workers' ADMIN_TOKEN;
+local mode generates one when it isn't set. Each local worker keeps its own
+store (SHOP_STORE_DIR/<worker>) and only serves the shops it owns.
+
+The router proxies plain HTTP, so Socket.IO clients stay on long-polling
+through it. For production, put the same ring in front of the workers in
+the load balancer (hash on the shop id) instead of this proxy.
+"""
+import argparse
+import atexit
+import hmac
+import http.client
+import json
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+from urllib.request import Request, urlopen
+
+from enhanced_models.sharding import DEFAULT_REPLICAS, HashRing, shop_id_for_request
+from enhanced_models.shop_registry import DEFAULT_SHOP_ID
+
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te',
+              'trailers', 'transfer-encoding', 'upgrade'}
+CHUNK_SIZE = 64 * 1024
+DRAIN_TIMEOUT = 30.0      # Seconds a rebalance waits for in-flight requests
+
+
+class RebalanceError(RuntimeError):
+    """Raised when a rebalance is aborted; the old worker set stays in place"""
+
+
+def _post_json(url: str, payload: Dict, token: Optional[str] = None, timeout: float = 60) -> Dict:
+    request = Request(url, data=json.dumps(payload).encode('utf-8'),
+                      headers={'Content-Type': 'application/json', 'X-Admin-Token': token or ''},
+                      method='POST')
+    with urlopen(request, timeout=timeout) as response:
+        return json.load(response)
+
+
+class ShardRouter:
+    """WSGI app that forwards each request to the worker owning its shop"""
+
+    def __init__(self, workers: Dict[str, str], primary: Optional[str] = None,
+                 replicas: int = DEFAULT_REPLICAS, admin_token: Optional[str] = None):
+        self.workers = dict(workers)                  # worker name -> base URL
+        self.admin_token = admin_token                # the workers' ADMIN_TOKEN
+        self.primary = primary or next(iter(self.workers))
+        self.ring = HashRing(self.workers, replicas)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._rebalancing = False
+
+    def worker_for(self, shop_id: str) -> str:
+        if shop_id == DEFAULT_SHOP_ID:
+            return self.primary
+        return self.ring.node_for(shop_id)
+
+    # Requests and rebalances exclude each other
+    def _enter(self):
+        with self._cond:
+            while self._rebalancing:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def _exit(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def rebalance(self, workers: Dict[str, str]) -> Dict:
+        """Switch to a new worker set, handing off the shops that change owner
+
+        Aborts if in-flight requests don't finish within DRAIN_TIMEOUT, and
+        rolls the handoff back if a worker fails part way through.
+        """
+        with self._cond:
+            self._rebalancing = True
+        try:
+            with self._cond:
+                deadline = time.time() + DRAIN_TIMEOUT
+                while self._in_flight and time.time() < deadline:
+                    self._cond.wait(deadline - time.time())
+                if self._in_flight:
+                    raise RebalanceError(f"{self._in_flight} requests still in flight after "
+                                         f"{DRAIN_TIMEOUT:g}s; rebalance aborted")
+            return self._move_shops(workers)
+        finally:
+            with self._cond:
+                self._rebalancing = False
+                self._cond.notify_all()
+
+    def _move_shops(self, workers: Dict[str, str]) -> Dict:
+        old_ring = self.ring
+        new_ring = HashRing(workers, old_ring.replicas)
+        all_workers = {**self.workers, **workers}
+        primary = self.primary if self.primary in workers else next(iter(workers))
+        released = {}    # old worker -> the snapshots it gave up
+        contacted = []
+        try:
+            # 1. Every current worker snapshots and unloads the shops leaving it;
+            #    the default shop goes along if the primary worker changes
+            incoming = {}
+            for node in old_ring.nodes:
+                contacted.append(node)
+                reply = _post_json(f"{self.workers[node]}/api/admin/shards/release", {
+                    'node': node, 'old_ring': old_ring.to_dict(), 'new_ring': new_ring.to_dict(),
+                    'release_default': node == self.primary != primary
+                }, self.admin_token)
+                released[node] = reply.get('snapshots', [])
+                for state in released[node]:
+                    owner = primary if state['shop_id'] == DEFAULT_SHOP_ID else new_ring.node_for(state['shop_id'])
+                    incoming.setdefault(owner, []).append(state)
+
+            # 2. New owners take them over; every worker in the new ring learns its new slice
+            moved = {}
+            for node in new_ring.nodes:
+                if node not in contacted:
+                    contacted.append(node)
+                snapshots = incoming.get(node, [])
+                _post_json(f"{all_workers[node]}/api/admin/shards/accept", {
+                    'node': node, 'ring': new_ring.to_dict(), 'snapshots': snapshots
+                }, self.admin_token)
+                moved[node] = len(snapshots)
+        except (OSError, ValueError) as e:
+            failed = self._roll_back(old_ring, all_workers, contacted, released)
+            message = f"Rebalance failed ({e}); rolled back"
+            if failed:
+                message += f", except on {', '.join(failed)}"
+            raise RebalanceError(message) from e
+
+        # 3. Route with the new ring
+        self.workers = dict(workers)
+        self.primary = primary
+        self.ring = new_ring
+        return {'workers': new_ring.nodes, 'moved': moved, 'primary': primary}
+
+    def _roll_back(self, old_ring: HashRing, all_workers: Dict[str, str], contacted: List[str],
+                   released: Dict[str, List[Dict]]) -> List[str]:
+        """Give released shops back to their old owners and restore the old ring everywhere
+
+        Returns the workers that couldn't be reached.
+        """
+        failed = []
+        for node in contacted:
+            try:
+                _post_json(f"{all_workers[node]}/api/admin/shards/accept", {
+                    'node': node, 'ring': old_ring.to_dict(), 'snapshots': released.get(node, [])
+                }, self.admin_token)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Rollback on {node} failed: {e}")
+                failed.append(node)
+        return failed
+
+    def _read_body(self, environ) -> bytes:
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        return environ['wsgi.input'].read(length) if length else b''
+
+    def _authorized(self, environ) -> bool:
+        supplied = environ.get('HTTP_X_ADMIN_TOKEN', '')
+        authorization = environ.get('HTTP_AUTHORIZATION', '')
+        if authorization.startswith('Bearer '):
+            supplied = authorization[len('Bearer '):]
+        return bool(self.admin_token) and hmac.compare_digest(supplied.encode(), self.admin_token.encode())
+
+    def _admin(self, environ, start_response, body: bytes):
+        if not self._authorized(environ):
+            result, status = {'error': 'Admin token required'}, '401 Unauthorized'
+        elif environ['PATH_INFO'] == '/_shards/rebalance' and environ['REQUEST_METHOD'] == 'POST':
+            try:
+                result = self.rebalance(json.loads(body or b'{}')['workers'])
+                status = '200 OK'
+            except RebalanceError as e:
+                result, status = {'error': str(e)}, '503 Service Unavailable'
+            except (KeyError, ValueError, OSError) as e:
+                result, status = {'error': str(e)}, '400 Bad Request'
+        else:
+            result = {'workers': self.workers, 'primary': self.primary, 'replicas': self.ring.replicas}
+            status = '200 OK'
+        payload = json.dumps(result).encode('utf-8')
+        start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(payload)))])
+        return [payload]
+
+    def __call__(self, environ, start_response):
+        body = self._read_body(environ)
+        if environ['PATH_INFO'].startswith('/_shards'):
+            return self._admin(environ, start_response, body)
+
+        path = environ['PATH_INFO']
+        query = {key: values[0] for key, values in parse_qs(environ.get('QUERY_STRING', '')).items()}
+        parsed_body = None
+        if path == '/api/shops' and body:
+            try:
+                parsed_body = json.loads(body)
+            except ValueError:
+                pass
+
+        self._enter()
+        try:
+            node = self.worker_for(shop_id_for_request(path, query, parsed_body))
+            target = urlsplit(self.workers[node])
+            headers = {
+                key[5:].replace('_', '-').title(): value
+                for key, value in environ.items()
+                if key.startswith('HTTP_') and key[5:].replace('_', '-').lower() not in HOP_BY_HOP
+            }
+            if environ.get('CONTENT_TYPE'):
+                headers['Content-Type'] = environ['CONTENT_TYPE']
+            headers['X-Forwarded-For'] = environ.get('REMOTE_ADDR', '')
+            headers['X-Shard-Worker'] = node
+
+            url = path + (f"?{environ['QUERY_STRING']}" if environ.get('QUERY_STRING') else '')
+            connection = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+            connection.request(environ['REQUEST_METHOD'], url, body=body or None, headers=headers)
+            response = connection.getresponse()
+        except Exception:
+            self._exit()
+            raise
+
+        response_headers = [(key, value) for key, value in response.getheaders()
+                            if key.lower() not in HOP_BY_HOP]
+        start_response(f"{response.status} {response.reason}", response_headers)
+
+        def stream():
+            try:
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                connection.close()
+                self._exit()
+        return stream()
+
+
+def start_local_workers(count: int, base_port: int, admin_token: str,
+                        replicas: int = DEFAULT_REPLICAS) -> Dict[str, str]:
+    """Spawn `count` app.py processes on consecutive ports and wait until they answer
+
+    Each worker gets its own store directory, so two processes never load or
+    journal the same shop, and the ring it should serve its slice of.
+    """
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    store_root = os.environ.get('SHOP_STORE_DIR', os.path.join(project_root, 'shop_data'))
+    names = [f"w{i}" for i in range(count)]
+    ring = json.dumps(HashRing(names, replicas).to_dict())
+    workers = {}
+    processes = []
+    for i, name in enumerate(names):
+        port = base_port + i
+        env = dict(os.environ, PORT=str(port), WORKER_ID=name, SHARD_RING=ring, ADMIN_TOKEN=admin_token,
+                   SHOP_STORE_DIR=os.path.join(store_root, name))
+        processes.append(subprocess.Popen([sys.executable, app_path], env=env))
+        workers[name] = f"http://127.0.0.1:{port}"
+
+    def stop():
+        for process in processes:
+            process.terminate()
+    atexit.register(stop)
+
+    for name, url in workers.items():
+        for _ in range(120):
+            try:
+                with urlopen(f"{url}/api/test", timeout=1):
+                    break
+            except OSError:
+                time.sleep(0.5)
+        else:
+            raise RuntimeError(f"Worker {name} did not start at {url}")
+        print(f"✅ Worker {name} ready at {url}")
+    return workers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Coffee Simulator across sharded worker processes")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help="Local worker processes to start")
+    parser.add_argument('--port', type=int, default=5000, help="Router port")
+    parser.add_argument('--worker-port', type=int, default=5001, help="First worker port")
+    parser.add_argument('--replicas', type=int, default=DEFAULT_REPLICAS, help="Virtual nodes per worker")
+    args = parser.parse_args(argv)
+
+    from werkzeug.serving import run_simple
+
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token:
+        admin_token = secrets.token_urlsafe(24)
+        print(f"🔑 Admin token for rebalancing: {admin_token}")
+    workers = start_local_workers(args.workers, args.worker_port, admin_token, args.replicas)
+    router = ShardRouter(workers, replicas=args.replicas, admin_token=admin_token)
+    print(f"🔀 Routing shops across {len(workers)} workers at http://localhost:{args.port}")
+    run_simple('0.0.0.0', args.port, router, threaded=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+# backend/tests/conftest.py
+"""Run from backend/ or the repo root: python -m pytest -q"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+ADMIN_TOKEN = 'test-admin-token'
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The Flask app, imported once with a throwaway shop store"""
+    os.environ['SHOP_STORE_DIR'] = str(tmp_path_factory.mktemp('shop_data'))
+    os.environ['ADMIN_TOKEN'] = ADMIN_TOKEN
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    """A test client with the default shop fully stocked"""
+    shop_info = app_module.default_shop.shop_info
+    with app_module.default_shop.lock:
+        for item, capacity in shop_info.max_storage.items():
+            shop_info.storage[item] = capacity
+        shop_info.reserved.clear()
+        shop_info.rebuild_derived()
+    return app_module.app.test_client()
@@ -0,0 +1,18 @@
+# backend/tests/test_admin_required.py
+from conftest import ADMIN_TOKEN
+
+ADMIN = {'X-Admin-Token': ADMIN_TOKEN}
+
+
+def test_history_export_needs_the_admin_token(client):
+    assert client.get('/api/history/transactions').status_code == 401
+    assert client.get('/api/history/transactions', headers={'X-Admin-Token': 'wrong'}).status_code == 401
+    response = client.get('/api/history/transactions?tail=5', headers=ADMIN)
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+
+
+def test_opening_a_shop_needs_the_admin_token(client, app_module):
+    assert client.post('/api/shops', json={'shop_id': 'unauthorized'}).status_code == 401
+    assert not app_module.shop_registry.store.exists('unauthorized')
+    assert client.post('/api/shops', json={'shop_id': 'authorized'}, headers=ADMIN).status_code == 201
+    assert client.get('/api/shops').status_code == 200   # stats stay public
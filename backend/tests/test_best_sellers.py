@@ -0,0 +1,59 @@
+# backend/tests/test_best_sellers.py
+import random
+from collections import Counter
+
+from enhanced_models.best_sellers import BestSellerTracker, SpaceSaving, WindowedTopK
+
+
+def skewed_stream(seed=7, length=5000, items=200):
+    rng = random.Random(seed)
+    return [f'item_{min(int(rng.paretovariate(1.2)), items)}' for _ in range(length)]
+
+
+def test_space_saving_error_bounds():
+    stream = skewed_stream()
+    exact = Counter(stream)
+    sketch = SpaceSaving(capacity=20)
+    for item in stream:
+        sketch.add(item)
+
+    assert sketch.total == len(stream) and len(sketch.counters) <= 20
+    for item, (count, error) in sketch.counters.items():
+        # Never under, and over by at most the recorded error (itself <= total / capacity)
+        assert exact[item] <= count <= exact[item] + error
+        assert error <= len(stream) / 20
+    for item, true_count in exact.items():
+        if true_count > len(stream) / 20:
+            assert item in sketch.counters
+
+
+def test_space_saving_is_exact_under_capacity():
+    sketch = SpaceSaving(capacity=10)
+    for item in ['a'] * 3 + ['b'] * 5 + ['c']:
+        sketch.add(item)
+    assert sketch.top() == [('b', 5), ('a', 3), ('c', 1)]
+    assert all(error == 0 for _, error in sketch.counters.values())
+
+
+def test_sales_leave_the_window_but_stay_in_all_time():
+    now = [0.0]
+    window = WindowedTopK(window_seconds=600, panes=6, clock=lambda: now[0])
+    window.add('croissant', 4)
+    now[0] = 300.0
+    window.add('latte', 2)
+    assert window.top() == [('croissant', 4), ('latte', 2)]
+    now[0] = 600.0   # the croissant pane is now older than the window
+    assert window.top() == [('latte', 2)]
+    assert window.all_time.top() == [('croissant', 4), ('latte', 2)]
+
+
+def test_sessions_are_tracked_separately_and_capped():
+    tracker = BestSellerTracker(max_sessions=2, clock=lambda: 0.0)
+    tracker.record('latte', session_id='a')
+    tracker.record('bagel', session_id='b')
+    tracker.record('bagel', session_id='b')
+    assert tracker.top(session_id='a') == [('latte', 1)]
+    assert tracker.top() == [('bagel', 2), ('latte', 1)]
+    tracker.record('muffin', session_id='c')   # evicts 'a', the least recent session
+    assert tracker.top(session_id='a') == []
+    assert tracker.top(session_id='b', window='all') == [('bagel', 2)]
@@ -0,0 +1,51 @@
+# backend/tests/test_bootstrap.py
+import gc
+import gzip
+import json
+import weakref
+
+from enhanced_models.bootstrap import BOOT_ID, BootstrapCache
+
+
+def test_payload_is_rebuilt_only_when_the_version_changes():
+    state = {'stock': 1}
+    cache = BootstrapCache(lambda: {'stock': state['stock']}, boot_id='boot')
+    first = cache.get((1, 1))
+    assert cache.get((1, 1)) is first and cache.builds == 1
+    assert json.loads(gzip.decompress(first.gzipped)) == {'stock': 1}
+    state['stock'] = 2
+    second = cache.get((1, 2))
+    assert cache.builds == 2 and json.loads(second.body) == {'stock': 2}
+    assert first.etag == 'boot-1-1' and second.etag == 'boot-1-2'
+
+
+def test_etags_differ_between_boots():
+    build = lambda: {}
+    assert BootstrapCache(build, 'a').get((1, 1)).etag != BootstrapCache(build, 'b').get((1, 1)).etag
+    assert BootstrapCache(build).get((1, 1)).etag.startswith(BOOT_ID)
+
+
+def test_unchanged_bootstrap_is_a_304(client):
+    first = client.get('/api/bootstrap')
+    assert first.status_code == 200 and first.headers['ETag']
+    again = client.get('/api/bootstrap', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert client.get('/api/bootstrap', headers={'If-None-Match': '"stale-1-1"'}).status_code == 200
+
+
+def test_stock_change_changes_the_etag(client):
+    etag = client.get('/api/bootstrap').headers['ETag']
+    client.post('/api/game/order', json={'type': 'coffee', 'item_id': 'medium_regularmilk_hot_latte',
+                                         'payment_method': 'cash', 'payment_details': {'cash_amount': 10}})
+    response = client.get('/api/bootstrap', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+
+
+def test_unloaded_shop_is_not_kept_alive_by_its_cache(client, app_module):
+    registry = app_module.shop_registry
+    registry.create('bootstrap-leak')
+    assert client.get('/api/shops/bootstrap-leak/bootstrap').status_code == 200
+    shop_info = weakref.ref(registry.shops['bootstrap-leak'].shop_info)
+    assert registry.unload('bootstrap-leak')
+    gc.collect()
+    assert shop_info() is None
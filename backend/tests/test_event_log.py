@@ -0,0 +1,177 @@
+# backend/tests/test_event_log.py
+import os
+
+from enhanced_models.event_log import EventLog, log_stats, read_events, replay
+from enhanced_models.money_machine import MoneyMachineWeb
+from enhanced_models.shop_info import ShopInfoWeb
+from enhanced_models.shop_registry import ShopRegistry, ShopStore
+
+RECIPE = {'Water': 160, 'Regular Milk': 110, 'Coffee Beans': 14, 'Sugar': 2}
+T0 = 1_750_000_000.0
+
+
+def journaled(path):
+    shop, money = ShopInfoWeb(), MoneyMachineWeb()
+    clock = [T0]
+    shop.clock = money.clock = lambda: clock[0]
+    log = EventLog(path)
+    log.base({'shop': shop.get_state(), 'money': money.get_state()}, T0)
+    shop.journal = money.journal = log
+    return shop, money, clock
+
+
+def run_shift(shop, money, clock, orders=5):
+    for _ in range(orders):
+        clock[0] += 60
+        shop._consume(RECIPE, 'coffee', 'medium regularmilk hot latte')
+        money.process_web_payment('cash', 4.5, {'cash_amount': 5.0, 'tip': 0.5})
+    clock[0] += 60
+    shop.purchase_refill('Regular Milk', 100)
+    money.add_tip(1.25)
+    money.profit -= 2
+    money.refund('cash', 4.5, 0.5)
+
+
+def test_replay_rebuilds_the_same_state(tmp_path):
+    path = str(tmp_path / 'shop.events')
+    shop, money, clock = journaled(path)
+    run_shift(shop, money, clock)
+    shop.journal.close()
+
+    replayed_shop, replayed_money = ShopInfoWeb(), MoneyMachineWeb()
+    result = replay(path, replayed_shop, replayed_money)
+    assert result['end'] == os.path.getsize(path)
+    assert replayed_shop.storage == shop.storage
+    assert replayed_shop.usage_history == shop.usage_history
+    assert replayed_shop.purchase_history == shop.purchase_history
+    assert replayed_money.profit == money.profit
+    assert replayed_money.transaction_history == money.transaction_history
+    assert replayed_money.ledger.total(0, 1, 2, 3) == money.ledger.total(0, 1, 2, 3)
+
+
+def test_replay_until_a_moment(tmp_path):
+    path = str(tmp_path / 'shop.events')
+    shop, money, clock = journaled(path)
+    run_shift(shop, money, clock)
+    shop.journal.close()
+
+    past_shop, past_money = ShopInfoWeb(), MoneyMachineWeb()
+    replay(path, past_shop, past_money, until=T0 + 120)   # the base and two orders
+    assert len(past_money.transaction_history) == 2
+    assert past_shop.storage['Coffee Beans'] == ShopInfoWeb().storage['Coffee Beans'] - 2 * 14
+
+
+def test_torn_record_is_ignored_and_truncated(tmp_path):
+    path = str(tmp_path / 'shop.events')
+    shop, money, clock = journaled(path)
+    run_shift(shop, money, clock, orders=2)
+    shop.journal.close()
+    complete = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(b'\x40\x00\x00\x00\x01partial')
+
+    ends = [end for end, *_ in read_events(path)]
+    assert ends[-1] == complete
+    assert log_stats(path)['counts']['consumed'] == 2
+
+
+def test_registry_recovers_a_crashed_shop_from_its_log(tmp_path):
+    store = ShopStore(str(tmp_path))
+    registry = ShopRegistry(store, snapshot_every=4)
+    shop = registry.create('downtown')
+    with shop.lock:
+        for _ in range(7):
+            shop.shop_info._consume(RECIPE, 'coffee', 'medium regularmilk hot latte')
+            shop.money_machine.process_web_payment('card', 4.5, {'card_number': '4242'})
+    assert registry.snapshots >= 3   # created, then every 4 records without a checkout
+    snapshot = store.load('downtown')
+    assert 'usage_history' not in snapshot['shop']
+    assert snapshot['histories']['counts']['usage_history'] > 0
+    expected = (dict(shop.shop_info.storage), list(shop.shop_info.usage_history),
+                list(shop.money_machine.transaction_history), shop.money_machine.profit)
+    shop.journal.close()   # crash: no final save
+
+    registry = ShopRegistry(store, snapshot_every=4)
+    recovered = registry.get('downtown')
+    assert (recovered.shop_info.storage, recovered.shop_info.usage_history,
+            recovered.money_machine.transaction_history, recovered.money_machine.profit) == expected
+    assert registry.stats()['replayed_events'] < 4   # only the records after the last snapshot
+
+
+def test_history_written_after_the_last_snapshot_is_ignored(tmp_path):
+    store = ShopStore(str(tmp_path))
+    registry = ShopRegistry(store, snapshot_every=1000)
+    shop = registry.create('downtown')
+    with shop.lock:
+        for _ in range(3):
+            shop.shop_info._consume(RECIPE, 'coffee', 'medium regularmilk hot latte')
+        registry._save(shop)
+        shop.shop_info._consume(RECIPE, 'coffee', 'medium regularmilk hot latte')
+        registry._save_histories(shop)   # crash between the history file and the snapshot
+    expected = list(shop.shop_info.usage_history)
+    shop.journal.close()
+
+    registry = ShopRegistry(store)
+    recovered = registry.get('downtown')
+    assert recovered.shop_info.usage_history == expected
+    with recovered.lock:
+        recovered.shop_info._consume(RECIPE, 'coffee', 'medium regularmilk hot latte')
+    expected = list(recovered.shop_info.usage_history)
+    assert registry.unload('downtown')   # the next snapshot overwrites the stray entries
+
+    registry = ShopRegistry(store)
+    assert registry.get('downtown').shop_info.usage_history == expected
+    assert registry.stats()['replayed_events'] == 0   # read from the history file, not the log
+
+
+def test_lost_history_file_replays_the_whole_log(tmp_path):
+    store = ShopStore(str(tmp_path))
+    registry = ShopRegistry(store, snapshot_every=2)
+    shop = registry.create('downtown')
+    with shop.lock:
+        for _ in range(3):
+            shop.shop_info._consume(RECIPE, 'coffee', 'medium regularmilk hot latte')
+    expected = list(shop.shop_info.usage_history)
+    shop.journal.close()
+    os.remove(store.history_path('downtown'))
+
+    recovered = ShopRegistry(store).get('downtown')
+    assert recovered.shop_info.usage_history == expected
+
+
+def test_loading_a_shop_leaves_the_registry_unlocked(tmp_path):
+    import threading
+
+    store = ShopStore(str(tmp_path))
+    ShopRegistry(store).create('downtown')
+    registry = ShopRegistry(store)
+    registry.create('airport')
+    seen = []
+    load = registry._load
+
+    def slow_load(shop_id):
+        # Another thread gets a loaded shop while this one is still loading
+        other = threading.Thread(target=lambda: seen.append(registry.get('airport')))
+        other.start()
+        other.join(5)
+        return load(shop_id)
+
+    registry._load = slow_load
+    assert registry.get('downtown').shop_id == 'downtown'
+    assert [shop.shop_id for shop in seen] == ['airport']
+
+
+def test_lost_log_falls_back_to_the_snapshot(tmp_path):
+    store = ShopStore(str(tmp_path))
+    registry = ShopRegistry(store, snapshot_every=2)
+    shop = registry.create('downtown')
+    with shop.lock:
+        shop.shop_info._consume(RECIPE, 'coffee', 'medium regularmilk hot latte')
+        shop.money_machine.process_web_payment('cash', 4.5, {'cash_amount': 5.0})
+    beans, profit = shop.shop_info.storage['Coffee Beans'], shop.money_machine.profit
+    shop.journal.close()
+    os.remove(store.log_path('downtown'))
+
+    recovered = ShopRegistry(store).get('downtown')
+    assert recovered.shop_info.storage['Coffee Beans'] == beans
+    assert recovered.money_machine.profit == profit
@@ -0,0 +1,59 @@
+# backend/tests/test_event_tail.py
+from enhanced_models.event_tail import ACK_TIMEOUT, EventTail
+
+
+def collect(tail):
+    batches = {}
+    tail.drain(lambda subscriber, events: batches.setdefault(subscriber.sid, []).extend(events))
+    return batches
+
+
+def test_drop_oldest_keeps_the_newest_events():
+    tail = EventTail(clock=lambda: 0.0)
+    tail.subscribe('slow', max_queue=3)
+    for i in range(5):
+        tail.publish('transaction', {'n': i})
+    assert [event['data']['n'] for event in collect(tail)['slow']] == [2, 3, 4]
+    assert tail.stats()['subscribers']['slow']['dropped'] == 2
+
+
+def test_coalesce_keeps_one_event_per_key():
+    tail = EventTail(clock=lambda: 0.0)
+    tail.subscribe('dash', policy='coalesce')
+    for remaining in (500, 400, 300):
+        tail.publish('usage', {'remaining': remaining}, key='Oat Milk')
+    tail.publish('usage', {'remaining': 90}, key='Water')
+    tail.publish('transaction', {'amount': 4.7})   # no key: never coalesced
+
+    events = collect(tail)['dash']
+    assert [(event['type'], event.get('key')) for event in events] == [
+        ('usage', 'Oat Milk'), ('usage', 'Water'), ('transaction', None)]
+    assert events[0]['data'] == {'remaining': 300}
+    assert tail.stats()['subscribers']['dash']['coalesced'] == 2
+
+
+def test_next_batch_waits_for_the_ack():
+    now = [0.0]
+    tail = EventTail(clock=lambda: now[0])
+    tail.subscribe('dash', types=['alert'])
+    tail.publish('alert', {'n': 1})
+    tail.publish('usage', {'n': 2})   # filtered out by type
+    assert len(collect(tail)['dash']) == 1
+
+    tail.publish('alert', {'n': 3})
+    assert collect(tail) == {}        # previous batch not acknowledged yet
+    tail.acknowledge('dash')
+    assert [event['data']['n'] for event in collect(tail)['dash']] == [3]
+
+    tail.publish('alert', {'n': 4})
+    now[0] += ACK_TIMEOUT             # a lost ack doesn't stall the feed forever
+    assert [event['data']['n'] for event in collect(tail)['dash']] == [4]
+
+
+def test_resume_replays_missed_events_and_reports_gaps():
+    tail = EventTail(history_size=3, clock=lambda: 0.0)
+    for i in range(5):
+        tail.publish('transaction', {'n': i})   # seq 1..5, buffer keeps 3..5
+    assert tail.subscribe('back', resume_from=3) == {'seq': 5, 'gap': False, 'replayed': 2}
+    assert tail.subscribe('late', resume_from=1) == {'seq': 5, 'gap': True, 'replayed': 3}
+    assert tail.subscribe('current', resume_from=5) == {'seq': 5, 'gap': False, 'replayed': 0}
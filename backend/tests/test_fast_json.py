@@ -0,0 +1,63 @@
+# backend/tests/test_fast_json.py
+import importlib.util
+import json
+import sys
+from datetime import datetime
+
+import pytest
+
+from enhanced_models import fast_json
+
+SAMPLE = {'Oat Milk': {'current': 890.5, 'status': 'good', 'unit': 'ml'}, 'names': ['Café', 'Latte'], 'n': None}
+
+
+def load_without(monkeypatch, *blocked):
+    """A fresh copy of fast_json that can't import the blocked encoders"""
+    for name in blocked:
+        monkeypatch.setitem(sys.modules, name, None)
+    spec = importlib.util.spec_from_file_location('fast_json_under_test', fast_json.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def backends(monkeypatch):
+    modules = [load_without(monkeypatch, 'orjson', 'msgspec')]
+    if importlib.util.find_spec('msgspec') is not None:
+        modules.append(load_without(monkeypatch, 'orjson'))
+    if importlib.util.find_spec('orjson') is not None:
+        modules.append(fast_json)
+    return modules
+
+
+def test_stdlib_fallback_is_used_when_no_encoder_is_installed(monkeypatch):
+    assert load_without(monkeypatch, 'orjson', 'msgspec').BACKEND == 'json'
+
+
+def test_every_backend_gives_the_same_compact_output(monkeypatch):
+    stdlib = json.dumps(SAMPLE, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    for module in backends(monkeypatch):
+        assert module.dumps(SAMPLE) == stdlib, module.BACKEND
+        assert module.loads(module.dumps(SAMPLE)) == SAMPLE
+        assert module.loads(module.dumps_str(SAMPLE)) == SAMPLE
+        assert json.loads(module.dumps(SAMPLE, pretty=True)) == SAMPLE
+        assert b'\n  ' in module.dumps(SAMPLE, pretty=True)
+
+
+def test_model_types_are_encoded(monkeypatch):
+    class Item:
+        def to_dict(self):
+            return {'id': 'croissant'}
+
+    when = datetime(2026, 1, 2, 3, 4, 5)
+    for module in backends(monkeypatch):
+        encoded = module.loads(module.dumps({'item': Item(), 'tags': ('hot',), 'at': when}))
+        assert encoded == {'item': {'id': 'croissant'}, 'tags': ['hot'], 'at': '2026-01-02T03:04:05'}
+
+
+@pytest.mark.skipif(fast_json.FastJSONProvider is None, reason="Flask not installed")
+def test_flask_provider_defers_to_stdlib_for_options():
+    from flask import Flask
+    provider = fast_json.FastJSONProvider(Flask(__name__))
+    assert provider.dumps({'b': 1, 'a': 2}) == '{"b":1,"a":2}'
+    assert provider.dumps({'b': 1, 'a': 2}, sort_keys=True) == '{"a": 2, "b": 1}'
@@ -0,0 +1,54 @@
+# backend/tests/test_feasibility.py
+from enhanced_models.menu_catalog import get_default_catalog
+from enhanced_models.shop_info import ShopInfoWeb
+
+OAT_LATTE = 'medium_oatmilk_hot_latte'
+
+
+def brute_force(shop):
+    """Servings for every item, recomputed from scratch"""
+    recipes, _ = get_default_catalog().recipe_index
+    return {item_id: min(int(shop.storage.get(item, 0) // quantity) for item, quantity in needs.items())
+            for item_id, needs in recipes.items()}
+
+
+def test_servings_track_stock_through_orders_and_refills():
+    shop = ShopInfoWeb()
+    recipes, _ = get_default_catalog().recipe_index
+    assert shop.get_feasibility()['servings'] == brute_force(shop)
+    for _ in range(3):
+        shop._consume(recipes[OAT_LATTE], 'coffee', OAT_LATTE)
+        assert shop.get_feasibility()['servings'] == brute_force(shop)
+    shop.purchase_refill('Oat Milk', 1000.0)
+    assert shop.get_feasibility()['servings'] == brute_force(shop)
+
+
+def test_only_items_sharing_an_ingredient_are_reported():
+    shop = ShopInfoWeb()
+    recipes, by_ingredient = get_default_catalog().recipe_index
+    shop._consume(recipes[OAT_LATTE], 'coffee', OAT_LATTE)
+    affected = set().union(*(by_ingredient[item] for item in recipes[OAT_LATTE]))
+    changes = shop.pop_feasibility_changes()
+    assert OAT_LATTE in changes and set(changes) <= affected
+    assert shop.pop_feasibility_changes() == {}   # popping clears the set
+
+    shop.purchase_refill('Oat Milk', 1000.0)
+    assert set(shop.pop_feasibility_changes()) <= set(by_ingredient['Oat Milk'])
+
+
+def test_items_become_unavailable_when_an_ingredient_runs_out():
+    shop = ShopInfoWeb()
+    _, by_ingredient = get_default_catalog().recipe_index
+    oat_items = set(by_ingredient['Oat Milk'])
+    assert not oat_items & set(shop.get_feasibility()['unavailable'])
+
+    shop.storage['Oat Milk'] = 0
+    shop.refresh_feasibility()
+    feasibility = shop.get_feasibility()
+    assert oat_items <= set(feasibility['unavailable'])
+    assert all(feasibility['servings'][item_id] == 0 for item_id in oat_items)
+    assert set(shop.pop_feasibility_changes()) == oat_items
+
+    shop.purchase_refill('Oat Milk', 1000.0)
+    assert not oat_items & set(shop.get_feasibility()['unavailable'])
+    assert set(shop.pop_feasibility_changes()) == oat_items
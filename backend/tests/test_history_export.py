@@ -0,0 +1,50 @@
+# backend/tests/test_history_export.py
+import pytest
+
+from enhanced_models import history_export
+from enhanced_models.history_export import ExportError, HistoryExportJob, export_log
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def usage(n, start=0):
+    return [{'timestamp': f'2026-01-01T08:{(start + i) % 60:02d}:00', 'item': ['Water', 'Oat Milk'][i % 2],
+             'quantity': 10 + i, 'order_type': 'coffee', 'product': 'latte', 'remaining': 1000 - i}
+            for i in range(n)]
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_chunked_export_round_trips(tmp_path, fmt):
+    records = usage(7)
+    path = str(tmp_path / f'usage.{fmt}')
+    assert export_log(records, 'usage', path, fmt, chunk_size=3) == 7
+
+    if fmt == 'parquet':
+        table = pq.read_table(path)
+    else:
+        table = pa.ipc.open_file(path).read_all()
+    assert table.num_rows == 7
+    assert table.column('item').to_pylist() == [r['item'] for r in records]
+    assert table.column('quantity').to_pylist() == [float(r['quantity']) for r in records]
+    assert pa.types.is_timestamp(table.schema.field('timestamp').type)
+    assert pa.types.is_dictionary(table.schema.field('product').type)
+
+
+def test_job_exports_only_new_rows(tmp_path):
+    source = {'usage_history': usage(4)}
+    job = HistoryExportJob([source], str(tmp_path), fmt='parquet')
+    first = job.run_once()
+    assert first['usage']['rows'] == 4 and job.offsets == {'usage': 4}
+    assert job.run_once() == {}   # nothing appended since
+
+    source['usage_history'].extend(usage(2, start=4))
+    second = job.run_once()
+    assert second['usage']['rows'] == 2
+    assert pq.read_table(second['usage']['path']).column('quantity').to_pylist() == [10.0, 11.0]
+
+
+def test_missing_pyarrow_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_export, 'PYARROW_AVAILABLE', False)
+    with pytest.raises(ExportError):
+        export_log(usage(1), 'usage', str(tmp_path / 'x.parquet'))
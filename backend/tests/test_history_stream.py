@@ -0,0 +1,64 @@
+# backend/tests/test_history_stream.py
+import json
+
+from conftest import ADMIN_TOKEN
+from enhanced_models.history_stream import MAX_PAGE_SIZE, iter_ndjson, page_info, resolve_window
+
+ADMIN = {'X-Admin-Token': ADMIN_TOKEN}
+
+
+def read_all_pages(fetch, limit):
+    """Follow next cursors until the log says there is no more"""
+    seen, cursor = [], 0
+    while True:
+        lines, info = fetch(cursor, limit)
+        seen.extend(lines)
+        if not info['has_more']:
+            return seen
+        cursor = info['next_cursor']
+
+
+def test_windows():
+    log = list(range(10))
+    assert resolve_window(log, cursor=3, limit=4) == (3, 7)
+    assert resolve_window(log, cursor=8, limit=4) == (8, 10)
+    assert resolve_window(log, cursor=50) == (10, 10)
+    assert resolve_window(log, cursor=-5, limit=2) == (0, 2)
+    assert resolve_window(log, tail=3) == (7, 10)
+    assert resolve_window(log, tail=30) == (0, 10)
+    assert resolve_window(list(range(MAX_PAGE_SIZE + 5)))[1] == MAX_PAGE_SIZE
+    assert page_info(3, 7, 10) == {'cursor': 3, 'next_cursor': 7, 'count': 4, 'has_more': True}
+
+
+def test_resuming_from_a_cursor_sees_each_record_once():
+    log = [{'n': i} for i in range(7)]
+
+    def fetch(cursor, limit):
+        start, end = resolve_window(log, cursor, limit)
+        lines = [json.loads(line) for line in iter_ndjson(log, start, end)]
+        if cursor == 3:
+            log.append({'n': len(log)})   # arrives mid-read: belongs to a later page
+        return lines, page_info(start, end, len(log))
+
+    lines = read_all_pages(fetch, limit=3)
+    assert [line['seq'] for line in lines] == list(range(8))
+    assert all(line['seq'] == line['n'] for line in lines)
+
+
+def test_route_pages_with_cursor_headers_and_redacts_cards(client, app_module, monkeypatch):
+    records = [{'amount': float(i), 'card_number': '4111111111111111'} for i in range(5)]
+    monkeypatch.setattr(app_module.money_machine, 'transaction_history', records)
+
+    def fetch(cursor, limit):
+        response = client.get(f'/api/history/transactions?cursor={cursor}&limit={limit}', headers=ADMIN)
+        assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+        assert response.headers['X-Cursor'] == str(cursor)
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        return lines, {'has_more': response.headers['X-Has-More'] == 'true',
+                       'next_cursor': int(response.headers['X-Next-Cursor'])}
+
+    lines = read_all_pages(fetch, limit=2)
+    assert lines == [{'seq': i, 'amount': float(i)} for i in range(5)]
+    tail = client.get('/api/history/transactions?tail=1', headers=ADMIN)
+    assert json.loads(tail.get_data(as_text=True)) == {'seq': 4, 'amount': 4.0}
+    assert client.get('/api/history/nope', headers=ADMIN).status_code == 404
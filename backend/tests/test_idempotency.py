@@ -0,0 +1,89 @@
+# backend/tests/test_idempotency.py
+from enhanced_models.idempotency import (IN_PROGRESS, MISMATCH, NEW, REPLAY, IdempotencyCache,
+                                         fingerprint)
+
+ORDER = {'type': 'coffee', 'item_id': 'medium_regularmilk_hot_latte', 'payment_method': 'cash',
+         'payment_details': {'cash_amount': 10}}
+
+
+def test_fingerprint_ignores_key_order():
+    assert fingerprint({'a': 1, 'b': 2}) == fingerprint({'b': 2, 'a': 1})
+    assert fingerprint({'a': 1}) != fingerprint({'a': 2})
+
+
+def test_begin_complete_replay():
+    cache = IdempotencyCache()
+    assert cache.begin('k', 'fp') == (NEW, None)
+    assert cache.begin('k', 'fp') == (IN_PROGRESS, None)
+    cache.complete('k', '{"success": true}', 200)
+    assert cache.begin('k', 'fp') == (REPLAY, ('{"success": true}', 200))
+    assert cache.begin('k', 'other') == (MISMATCH, None)
+    assert cache.stats()['replays'] == 1
+
+
+def test_release_lets_the_retry_run():
+    cache = IdempotencyCache()
+    cache.begin('k', 'fp')
+    cache.release('k')
+    assert cache.begin('k', 'fp') == (NEW, None)
+
+
+def test_keys_expire_and_are_bounded():
+    now = [0.0]
+    cache = IdempotencyCache(max_keys=2, ttl_seconds=10, clock=lambda: now[0])
+    for key in ('a', 'b', 'c'):
+        cache.begin(key, 'fp')
+        cache.complete(key, '{}', 200)
+    assert list(cache.entries) == ['b', 'c']
+    now[0] = 11
+    assert cache.begin('b', 'fp') == (NEW, None)
+    assert list(cache.entries) == []
+
+
+def test_running_requests_are_never_evicted():
+    now = [0.0]
+    cache = IdempotencyCache(max_keys=2, ttl_seconds=10, clock=lambda: now[0])
+    cache.begin('slow', 'fp')
+    for key in ('a', 'b', 'c'):
+        cache.begin(key, 'fp')
+        cache.complete(key, '{}', 200)
+    now[0] = 60
+    assert cache.begin('slow', 'fp') == (IN_PROGRESS, None)
+    assert cache.begin('slow', 'other') == (MISMATCH, None)
+    cache.complete('slow', '{"success": true}', 200)
+    assert cache.begin('slow', 'fp') == (REPLAY, ('{"success": true}', 200))
+
+
+def test_retried_order_is_replayed_not_charged_twice(client, app_module):
+    money = app_module.default_shop.money_machine
+    headers = {'Idempotency-Key': 'order-replay-1'}
+    first = client.post('/api/game/order', json=ORDER, headers=headers)
+    profit = money.profit
+    second = client.post('/api/game/order', json=ORDER, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert second.headers.get('Idempotent-Replayed') == 'true'
+    assert second.get_data() == first.get_data()
+    assert money.profit == profit
+
+
+def test_key_reused_for_another_order_is_rejected(client):
+    headers = {'Idempotency-Key': 'order-mismatch-1'}
+    assert client.post('/api/game/order', json=ORDER, headers=headers).status_code == 200
+    other = dict(ORDER, item_id='small_regularmilk_hot_latte')
+    assert client.post('/api/game/order', json=other, headers=headers).status_code == 422
+
+
+def test_overlong_key_is_rejected(client):
+    headers = {'Idempotency-Key': 'x' * 129}
+    assert client.post('/api/game/order', json=ORDER, headers=headers).status_code == 400
+
+
+def test_keys_are_scoped_to_the_session(app_module):
+    headers = {'Idempotency-Key': 'order-shared-key'}
+    first, second = app_module.app.test_client(), app_module.app.test_client()
+    for client, session_id in ((first, 'session_key_a'), (second, 'session_key_b')):
+        with client.session_transaction() as client_session:
+            client_session['session_id'] = session_id
+    assert first.post('/api/game/order', json=ORDER, headers=headers).status_code == 200
+    replayed = second.post('/api/game/order', json=ORDER, headers=headers)
+    assert replayed.status_code == 200 and 'Idempotent-Replayed' not in replayed.headers
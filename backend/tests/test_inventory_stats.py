@@ -0,0 +1,45 @@
+# backend/tests/test_inventory_stats.py
+import json
+
+from enhanced_models.menu_catalog import get_default_catalog
+from enhanced_models.shop_info import ShopInfoWeb
+
+OAT_LATTE = 'medium_oatmilk_hot_latte'
+
+
+def fresh_stats(shop):
+    """Every entry recomputed from current stock"""
+    return {item: shop._stat_entry(item) for item in shop.storage}
+
+
+def test_snapshot_matches_a_full_recompute_after_each_change():
+    shop = ShopInfoWeb()
+    recipe = get_default_catalog().recipe_index[0][OAT_LATTE]
+    for _ in range(8):
+        shop._consume(recipe, 'coffee', OAT_LATTE)
+        assert shop.get_real_time_stats() == fresh_stats(shop)
+    shop.purchase_refill('Oat Milk', 1000.0)
+    assert shop.get_real_time_stats() == fresh_stats(shop)
+
+    shop.storage['Water'] = 0   # edited directly, then refreshed in full
+    shop.refresh_feasibility()
+    assert shop.get_real_time_stats()['Water']['status'] == 'out'
+
+
+def test_json_is_serialized_once_per_change():
+    shop = ShopInfoWeb()
+    first = shop.get_real_time_stats_json()
+    assert shop.get_real_time_stats_json() is first
+    assert json.loads(first) == shop.get_real_time_stats()
+
+    version = shop.stock_version
+    shop._consume({'Oat Milk': 110}, 'coffee', OAT_LATTE)
+    assert shop.stock_version > version
+    changed = shop.get_real_time_stats_json()
+    assert changed is not first and json.loads(changed)['Oat Milk']['current'] == shop.storage['Oat Milk']
+
+
+def test_inventory_route_serves_the_snapshot(client, app_module):
+    response = client.get('/api/shop/inventory')
+    assert response.status_code == 200 and response.mimetype == 'application/json'
+    assert response.get_json() == json.loads(json.dumps(app_module.default_shop.shop_info.get_real_time_stats()))
@@ -0,0 +1,80 @@
+# backend/tests/test_leaderboard.py
+import random
+
+import pytest
+
+from enhanced_models.leaderboard import Leaderboard, SortedBoard
+
+ORDER = {'type': 'coffee', 'item_id': 'medium_regularmilk_hot_latte', 'payment_method': 'cash',
+         'payment_details': {'cash_amount': 10}}
+
+
+def test_sorted_board_matches_a_sorted_list():
+    board, expected = SortedBoard(block_size=4), []
+    rng = random.Random(3)
+    for _ in range(500):
+        key = (rng.randint(-50, 0), f"s{rng.randint(0, 80)}")
+        if key in expected:
+            board.remove(key)
+            expected.remove(key)
+        else:
+            board.add(key)
+            expected.append(key)
+        expected.sort()
+    assert len(board) == len(expected)
+    assert board.slice(0, len(board)) == expected
+    assert [board.index(key) for key in expected[::7]] == list(range(0, len(expected), 7))
+    with pytest.raises(KeyError):
+        board.remove((1, 'missing'))
+
+
+def test_ranks_by_earnings_then_session():
+    leaderboard = Leaderboard(clock=lambda: 1000.0)
+    for session_id, amount in (('a', 4.5), ('b', 9.0), ('c', 4.5), ('a', 4.5)):
+        leaderboard.record(session_id, amount)
+    top = leaderboard.top(10)
+    assert [(entry['session_id'], entry['earnings'], entry['orders']) for entry in top['top']] == \
+        [('a', 9.0, 2), ('b', 9.0, 1), ('c', 4.5, 1)]
+    standing = leaderboard.standing('c', radius=1)
+    assert standing['rank'] == 3
+    assert [entry['session_id'] for entry in standing['neighbors']] == ['b', 'c']
+    assert leaderboard.standing('nobody') is None
+
+
+def test_windows_drop_old_orders():
+    now = [0.0]
+    leaderboard = Leaderboard(clock=lambda: now[0])
+    leaderboard.record('early', 10.0)
+    now[0] = 1800
+    leaderboard.record('late', 5.0)
+    now[0] = 3700
+    assert [entry['session_id'] for entry in leaderboard.top(10, 'hour')['top']] == ['late']
+    assert leaderboard.top(10, 'day')['sessions'] == 2
+    assert leaderboard.top(10, 'all')['top'][0]['session_id'] == 'early'
+    with pytest.raises(ValueError):
+        leaderboard.top(10, 'week')
+
+
+def test_orders_credit_only_sessions_the_server_started(client, app_module):
+    with client.session_transaction() as session:
+        session['session_id'] = 'session-not-started'
+    assert client.post('/api/game/order', json=ORDER).status_code == 200
+    app_module.order_pipeline.drain()
+    assert 'session-not-started' not in app_module.game_sessions
+    assert app_module.leaderboard.standing('session-not-started') is None
+
+    app_module.game_sessions['session-started'] = app_module.new_game_session()
+    with client.session_transaction() as session:
+        session['session_id'] = 'session-started'
+    client.post('/api/game/order', json=ORDER)
+    app_module.order_pipeline.drain()
+    assert app_module.game_sessions['session-started']['orders_completed'] == 1
+    assert app_module.leaderboard.standing('session-started')['orders'] == 1
+
+
+def test_standing_is_always_the_callers_own(client, app_module):
+    app_module.leaderboard.record('someone-else', 50.0)
+    with client.session_transaction() as session:
+        session['session_id'] = 'caller-without-orders'
+    body = client.get('/api/leaderboard/standing?session_id=someone-else').get_json()
+    assert body['session_id'] == 'caller-without-orders' and body['rank'] is None
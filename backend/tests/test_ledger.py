@@ -0,0 +1,63 @@
+# backend/tests/test_ledger.py
+from datetime import date
+
+from enhanced_models.ledger import ADJUST, SALE, TIP, Ledger, from_cents, to_cents
+from enhanced_models.money_machine import MoneyMachineWeb
+
+DAY = date(2025, 6, 1).toordinal()
+
+
+def test_cents_round_trip():
+    assert to_cents(4.5) == 450
+    assert to_cents(0.1 + 0.2) == 30
+    assert from_cents(to_cents(19.99)) == 19.99
+
+
+def test_totals_include_the_unsettled_tail():
+    ledger = Ledger(settle_batch=4)
+    for _ in range(6):
+        ledger.append(SALE, 450, 'card', DAY)
+    ledger.append(TIP, 25, 'card', DAY)
+    assert ledger.settled == 4
+    assert ledger.total(SALE) == 2700
+    assert ledger.total(SALE, TIP) == 2725
+    assert ledger.day_total(DAY) == 2700
+    assert ledger.sales_by_method()['card'] == 6
+
+
+def test_tips_are_not_daily_sales():
+    ledger = Ledger()
+    ledger.append(SALE, 300, 'cash', DAY)
+    ledger.append(TIP, 50, 'cash', DAY)
+    ledger.append(ADJUST, -100, 'other', DAY)
+    assert ledger.daily() == {DAY: 300}
+    assert ledger.sales_by_method() == {'cash': 1, 'card': 0, 'web': 0, 'other': 0}
+
+
+def test_state_round_trip():
+    ledger = Ledger(settle_batch=3)
+    for i in range(10):
+        ledger.append(SALE if i % 2 else TIP, 100 + i, 'cash' if i % 3 else 'card', DAY + i % 2)
+    restored = Ledger.from_state(ledger.to_state())
+    assert len(restored) == len(ledger)
+    assert restored.total(SALE, TIP) == ledger.total(SALE, TIP)
+    assert restored.daily() == ledger.daily()
+    assert restored.sales_by_method() == ledger.sales_by_method()
+
+
+def test_open_with_starts_from_old_totals():
+    ledger = Ledger()
+    ledger.open_with({SALE: 1000, TIP: 200}, {DAY: 1000}, {'cash': 3})
+    ledger.append(SALE, 450, 'card', DAY)
+    assert ledger.total(SALE) == 1450
+    assert ledger.day_total(DAY) == 1450
+    assert ledger.sales_by_method()['cash'] == 3
+
+
+def test_money_machine_profit_is_exact_over_many_sales():
+    money = MoneyMachineWeb()
+    for _ in range(1000):
+        money.process_web_payment('cash', 0.1, {'cash_amount': 1.0})
+    assert money.profit == 100.0
+    money.profit += 0.05
+    assert money.profit == 100.05
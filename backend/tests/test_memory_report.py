@@ -0,0 +1,64 @@
+# backend/tests/test_memory_report.py
+import sys
+
+import pytest
+
+from enhanced_models.memory_report import AllocationTracker, deep_sizeof, structure_sizes
+
+
+def records(n):
+    return [{'item': f'item {i}', 'quantity': float(i), 'tags': [i, i + 1]} for i in range(n)]
+
+
+def test_sampled_size_is_close_to_the_exact_size():
+    log = records(20000)
+    exact = deep_sizeof(log, sample=sys.maxsize)
+    sampled = deep_sizeof(log, sample=500)
+    assert not exact['estimated'] and sampled['estimated']
+    assert abs(sampled['bytes'] - exact['bytes']) / exact['bytes'] < 0.05
+    assert abs(sampled['objects'] - exact['objects']) / exact['objects'] < 0.05
+
+    by_key = {f'k{i}': record for i, record in enumerate(log)}
+    exact = deep_sizeof(by_key, sample=sys.maxsize)['bytes']
+    assert abs(deep_sizeof(by_key, sample=500)['bytes'] - exact) / exact < 0.05
+
+
+def test_small_containers_are_measured_exactly():
+    assert deep_sizeof(records(10), sample=100)['estimated'] is False
+
+
+def test_shared_objects_are_counted_once():
+    shared = records(100)
+    report = structure_sizes({'first': {'log': shared}, 'second': [shared]})
+    first, second = report['structures']['first'], report['structures']['second']
+    assert first['bytes'] > second['bytes'] == sys.getsizeof([shared])
+    assert report['total_bytes'] == first['bytes'] + second['bytes']
+    assert list(report['structures']) == ['first', 'second'] and second['length'] == 1
+
+
+def test_dict_keys_are_counted():
+    keys = {f'ingredient number {i}': None for i in range(50)}
+    assert deep_sizeof(keys)['bytes'] >= sys.getsizeof(keys) + sum(sys.getsizeof(key) for key in keys)
+
+
+def test_snapshots_are_capped_and_diffed():
+    tracker = AllocationTracker(max_snapshots=2)
+    with pytest.raises(ValueError):
+        tracker.take()
+    tracker.start()
+    try:
+        first = tracker.take('before')
+        grown = [bytearray(1000) for _ in range(200)]
+        assert sum(entry['size_diff'] for entry in tracker.diff(first['id'], limit=50)) >= 200 * 1000
+
+        tracker.take('after')
+        tracker.take('later')
+        assert [s['label'] for s in tracker.stats()['snapshots']] == ['after', 'later']
+        with pytest.raises(ValueError):
+            tracker.diff(first['id'])   # dropped past max_snapshots
+        with pytest.raises(ValueError):
+            tracker.top(group_by='module')
+        assert tracker.top(limit=3) and len(grown) == 200
+    finally:
+        tracker.stop()
+    assert tracker.stats()['tracing'] is False
@@ -0,0 +1,82 @@
+# backend/tests/test_menu_catalog.py
+import json
+import os
+import shutil
+
+import pytest
+
+from enhanced_models.menu_catalog import (DEFAULT_CATALOG_PATH, CatalogError, CatalogManager, compile_catalog,
+                                          load_catalog)
+
+
+def catalog_data():
+    with open(DEFAULT_CATALOG_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(data if isinstance(data, str) else json.dumps(data))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))   # a visible change
+
+
+@pytest.fixture
+def catalog_file(tmp_path):
+    path = str(tmp_path / 'menu_catalog.json')
+    shutil.copy(DEFAULT_CATALOG_PATH, path)
+    return path
+
+
+def test_default_catalog_compiles():
+    catalog = load_catalog()
+    assert catalog.coffee and catalog.bakery
+    assert catalog.coffee_by_id[catalog.coffee[0].id] is catalog.coffee[0]
+
+
+@pytest.mark.parametrize('break_it, message', [
+    (lambda data: data['coffee'][0].pop('price'), "missing 'price'"),
+    (lambda data: data['coffee'][0]['recipe'].update({'Saffron': 1}), "unknown recipe ingredient"),
+    (lambda data: data['bakery'].append(dict(data['bakery'][0])), "Duplicate bakery"),
+    (lambda data: data.update(schema=99), "Unsupported catalog schema"),
+])
+def test_invalid_catalogs_are_rejected(break_it, message):
+    data = catalog_data()
+    break_it(data)
+    with pytest.raises(CatalogError, match=message):
+        compile_catalog(data)
+
+
+def test_hot_reload_swaps_in_a_new_version(catalog_file):
+    manager = CatalogManager(catalog_file)
+    seen = []
+    manager.add_listener(seen.append)
+    data = catalog_data()
+    data['coffee'][0]['price'] = 9.99
+    write(catalog_file, data)
+
+    assert manager.check_for_changes()
+    assert manager.version == 2 and seen == [manager.catalog]
+    assert manager.catalog.coffee[0].price == 9.99
+    assert not manager.check_for_changes()   # nothing new since
+
+
+def test_bad_file_keeps_the_current_catalog(catalog_file):
+    manager = CatalogManager(catalog_file)
+    serving = manager.catalog
+    seen = []
+    manager.add_listener(seen.append)
+
+    write(catalog_file, '{"schema": 1, "ingredients": ')   # half-written file
+    assert not manager.check_for_changes()
+    assert manager.catalog is serving and seen == [] and 'invalid JSON' in manager.last_error
+    assert not manager.check_for_changes()   # not retried until the file changes again
+
+    data = catalog_data()
+    data['coffee'][0]['recipe'] = {'Coffee Beans': -1}
+    write(catalog_file, data)
+    assert not manager.check_for_changes() and manager.catalog is serving
+
+    write(catalog_file, catalog_data())
+    assert manager.check_for_changes()
+    assert manager.version == serving.version + 1 and manager.last_error is None
@@ -0,0 +1,44 @@
+# backend/tests/test_menu_facets.py
+import itertools
+
+from enhanced_models.menu_catalog import get_default_catalog
+from enhanced_models.menu_facets import _bakery_attributes, _coffee_attributes
+
+
+def attributes(item_type, item):
+    found = {'type': item_type, 'category': item.category}
+    found.update(_coffee_attributes(item) if item_type == 'coffee' else _bakery_attributes(item))
+    return found
+
+
+def brute_force(index, filters, prep_time_max=None):
+    """Items matching the filters, checked one by one"""
+    return [item for item_type, item in index.items
+            if (prep_time_max is None or item.prep_time <= prep_time_max)
+            and all(not values or attributes(item_type, item).get(facet) in values
+                    for facet, values in filters.items())]
+
+
+def test_bitsets_match_a_scan_for_every_filter_combination():
+    index = get_default_catalog().facet_index
+    options = [{}, {'type': ['coffee']}, {'milk': ['oat', 'almond']}, {'temp': ['iced']},
+               {'vegan': ['true']}, {'size': ['large'], 'temp': ['hot']}]
+    for (first, second), prep_time_max in itertools.product(itertools.combinations(options, 2), (None, 60, 1000)):
+        filters = {**first, **second}
+        assert index.filter_items(filters, prep_time_max) == brute_force(index, filters, prep_time_max)
+
+
+def test_counts_ignore_the_facets_own_selection():
+    index = get_default_catalog().facet_index
+    result = index.filter({'type': ['coffee'], 'milk': ['oat']})
+    assert result['total'] == len(brute_force(index, {'type': ['coffee'], 'milk': ['oat']}))
+    # Picking oat milk still shows how many coffees each other milk would give
+    assert result['facets']['milk']['almond'] == len(brute_force(index, {'type': ['coffee'], 'milk': ['almond']}))
+    assert result['facets']['type']['food'] == 0   # no bakery item has oat milk
+    assert all(entry['type'] == 'coffee' for entry in result['results'])
+
+
+def test_unknown_values_match_nothing_and_values_are_case_insensitive():
+    index = get_default_catalog().facet_index
+    assert index.filter_items({'milk': ['soy']}) == []
+    assert index.filter_items({'temp': ['ICED']}) == index.filter_items({'temp': ['iced']}) != []
@@ -0,0 +1,40 @@
+# backend/tests/test_menu_items.py
+import pytest
+
+from enhanced_models.bakery_item import BakeryMenuWeb
+from enhanced_models.coffee_menu import CoffeeMenuWeb
+
+
+def test_coffee_dicts_dont_share_nested_data():
+    item = CoffeeMenuWeb().menu[0]
+    first = item.to_dict()
+    first['ingredients']['Coffee Beans'] = 999
+    first['price'] = 0
+    second = item.to_dict()
+    assert second['ingredients'] == dict(item.ingredients) and second['price'] == item.price
+
+
+def test_bakery_dicts_dont_share_nested_data():
+    item = BakeryMenuWeb().menu[0]
+    first = item.to_dict()
+    first['ingredients'].clear()
+    first['dietary_info']['vegan'] = 'changed'
+    first['dietary_info']['allergens'].append('changed')
+    second = item.to_dict()
+    assert second['ingredients'] == dict(item.ingredients)
+    assert second['dietary_info']['vegan'] == item.dietary_info['vegan']
+    assert 'changed' not in second['dietary_info']['allergens']
+
+
+def test_items_are_slotted_immutable_and_share_recipes():
+    first, second = CoffeeMenuWeb().menu, CoffeeMenuWeb().menu
+    item = first[0]
+    assert not hasattr(item, '__dict__')
+    with pytest.raises(AttributeError):
+        item.price = 0
+    with pytest.raises(TypeError):
+        item.ingredients['Water'] = 0
+    assert item.ingredients is second[0].ingredients   # one recipe mapping for every menu copy
+    bakery_first, bakery_second = BakeryMenuWeb().menu[0], BakeryMenuWeb().menu[0]
+    assert not hasattr(bakery_first, '__dict__')
+    assert bakery_first.dietary_info is bakery_second.dietary_info
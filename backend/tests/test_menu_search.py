@@ -0,0 +1,63 @@
+# backend/tests/test_menu_search.py
+from types import SimpleNamespace
+
+from enhanced_models.menu_catalog import get_default_catalog
+from enhanced_models.menu_search import MenuSearchIndex, tokenize
+
+
+def item(name, category, description):
+    return SimpleNamespace(food=name, category=category, description=description,
+                           to_dict=lambda: {'name': name})
+
+
+def index_of(*items):
+    return MenuSearchIndex([('food', entry) for entry in items])
+
+
+def names(index, query):
+    return [entry.food for entry in index.search_items(query)]
+
+
+def test_name_hits_outrank_description_hits():
+    index = index_of(item('Plain Bagel', 'bread', 'Toasted and served with butter'),
+                     item('Butter Croissant', 'pastry', 'Flaky and golden'))
+    assert names(index, 'butter') == ['Butter Croissant', 'Plain Bagel']
+
+
+def test_rare_terms_weigh_more_than_common_ones():
+    index = index_of(item('Blueberry Muffin', 'muffin', 'Baked fresh'),
+                     item('Bran Muffin', 'muffin', 'Baked fresh'),
+                     item('Chocolate Muffin', 'muffin', 'Baked fresh'))
+    ranked = dict(index.ranked('muffin'))
+    blueberry = dict(index.ranked('blueberry'))
+    assert blueberry[0] > ranked[0]   # in 1 of 3 items vs in every item
+
+
+def test_every_query_word_must_match():
+    index = index_of(item('Blueberry Muffin', 'muffin', ''), item('Blueberry Scone', 'scone', ''))
+    assert names(index, 'blueberry scone') == ['Blueberry Scone']
+    assert names(index, 'blueberry bagel') == []
+
+
+def test_prefix_and_typo_matches_rank_below_exact_ones():
+    index = index_of(item('Croissant', 'pastry', ''), item('Cross Bun', 'bun', ''))
+    assert names(index, 'croi') == ['Croissant']
+    assert names(index, 'crossant') == ['Croissant']   # one deletion away
+    exact = dict(index.ranked('croissant'))[0]
+    assert dict(index.ranked('croi'))[0] < exact and dict(index.ranked('crossant'))[0] < exact
+
+
+def test_results_are_cached_and_paginated():
+    catalog = get_default_catalog()
+    index = catalog.search_index
+    assert index.ranked('Latte') is index.ranked('latte')   # normalized key, same cached tuple
+    first = index.search('latte', page=1, per_page=2)
+    second = index.search('latte', page=2, per_page=2)
+    assert first['total'] == second['total'] >= 3 and first['has_more']
+    assert {r['id'] for r in first['results']}.isdisjoint(r['id'] for r in second['results'])
+    assert all(r['type'] == 'coffee' and 'score' in r for r in first['results'])
+    assert index.suggest('lat', limit=3) and len(index.suggest('lat', limit=3)) <= 3
+
+
+def test_tokenize_lowercases_and_splits_on_punctuation():
+    assert tokenize("Iced Latte (Large), 16oz") == ['iced', 'latte', 'large', '16oz']
@@ -0,0 +1,160 @@
+# backend/tests/test_order_pipeline.py
+import pytest
+
+from enhanced_models.order_pipeline import OrderPipeline
+
+ORDER = {'type': 'coffee', 'item_id': 'medium_regularmilk_hot_latte', 'payment_method': 'cash',
+         'payment_details': {'cash_amount': 10}}
+BEANS = 14   # Coffee Beans in one medium latte
+
+
+@pytest.fixture
+def shop(client, app_module):
+    """The default shop with beans for exactly one latte"""
+    shop = app_module.default_shop
+    with shop.lock:
+        shop.shop_info.storage['Coffee Beans'] = BEANS
+    return shop
+
+
+def test_rejection_stops_the_commit_stages():
+    ran = []
+    pipeline = OrderPipeline([('validate', lambda order: ran.append('validate')),
+                              ('reserve', lambda order: ('rejected', 400)),
+                              ('charge', lambda order: ran.append('charge'))])
+    assert pipeline.run({}) == ('rejected', 400)
+    assert ran == ['validate']
+    assert pipeline.stats()['stages']['reserve']['rejected'] == 1
+
+
+def test_failing_stage_is_counted_and_raised():
+    def charge(order):
+        raise RuntimeError('processor down')
+    pipeline = OrderPipeline([('charge', charge)])
+    with pytest.raises(RuntimeError):
+        pipeline.run({})
+    assert pipeline.stats()['stages']['charge']['errors'] == 1
+
+
+def test_reserved_unit_is_not_sold_twice(client, shop, app_module):
+    held = {'shop': shop, 'data': ORDER}
+    with app_module.app.test_request_context():
+        assert app_module.order_validate(held) is None
+        assert app_module.order_reserve(held) is None
+    assert client.post('/api/game/order', json=ORDER).status_code == 400
+    with shop.lock:
+        app_module.release_reservation(held)
+    assert client.post('/api/game/order', json=ORDER).status_code == 200
+    assert shop.shop_info.storage['Coffee Beans'] == 0
+    assert shop.shop_info.reserved == {}
+
+
+def test_failed_payment_releases_the_hold(client, shop):
+    profit = shop.money_machine.profit
+    order = dict(ORDER, payment_details={'cash_amount': 1})
+    assert client.post('/api/game/order', json=order).status_code == 400
+    assert shop.shop_info.reserved == {}
+    assert shop.shop_info.storage['Coffee Beans'] == BEANS
+    assert shop.money_machine.profit == profit
+
+
+def test_payment_error_releases_the_hold(client, shop, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError('card reader on fire')
+    monkeypatch.setattr(shop.money_machine, 'process_web_payment', broken)
+    assert client.post('/api/game/order', json=ORDER).status_code == 500
+    assert shop.shop_info.reserved == {}
+
+
+def test_stock_gone_at_fulfil_refunds_the_payment(client, shop, monkeypatch):
+    profit = shop.money_machine.profit
+    charge = shop.money_machine.process_web_payment
+
+    def charge_then_lose_stock(*args, **kwargs):
+        result = charge(*args, **kwargs)
+        shop.shop_info.storage['Coffee Beans'] = 0   # e.g. a catalog reload shrank the stock
+        return result
+    monkeypatch.setattr(shop.money_machine, 'process_web_payment', charge_then_lose_stock)
+
+    response = client.post('/api/game/order', json=ORDER)
+    assert response.status_code == 409
+    assert response.get_json()['refunded'] == 4.5
+    assert shop.money_machine.profit == profit
+    assert shop.shop_info.reserved == {}
+
+
+def test_fulfil_error_is_reported_and_refunded(client, shop, monkeypatch):
+    profit = shop.money_machine.profit
+
+    def broken(order):
+        raise RuntimeError('grinder jammed')
+    monkeypatch.setattr(shop.shop_info, 'coffee_return', broken)
+
+    response = client.post('/api/game/order', json=ORDER)
+    assert response.status_code == 500
+    assert 'grinder jammed' in response.get_json()['error']
+    assert shop.money_machine.profit == profit
+    assert shop.shop_info.storage['Coffee Beans'] == BEANS
+
+
+class RecordingGateway:
+    """Approves every charge and remembers what was refunded"""
+
+    def __init__(self):
+        self.refunded = []
+
+    def charge(self, amount, currency, card_number, idempotency_key=None):
+        return {'approved': True, 'message': "Card payment successful!", 'charge_id': f"ch_{amount}"}
+
+    def refund(self, charge_id, idempotency_key=None):
+        self.refunded.append(charge_id)
+        return {'refunded': True, 'charge_id': charge_id}
+
+
+def test_refund_reverses_sale_tip_and_bonus(client, shop, monkeypatch):
+    money = shop.money_machine
+    before = (money.profit, money.tips_collected, money.payment_methods_used['cash'],
+              money.get_earnings_summary()['today_earnings'])
+
+    def broken(order):
+        raise RuntimeError('grinder jammed')
+    monkeypatch.setattr(shop.shop_info, 'coffee_return', broken)
+    order = dict(ORDER, payment_details={'cash_amount': 10, 'tip': 1.0, 'quality_bonus': 0.5})
+    response = client.post('/api/game/order', json=order)
+
+    assert response.status_code == 500
+    assert response.get_json()['refunded'] == 6.0
+    assert (money.profit, money.tips_collected, money.payment_methods_used['cash'],
+            money.get_earnings_summary()['today_earnings']) == before
+
+
+def test_unserved_card_order_is_refunded_at_the_processor(client, shop, monkeypatch):
+    gateway = RecordingGateway()
+    monkeypatch.setattr(type(shop.money_machine), 'gateway', gateway)
+    charge = shop.money_machine.process_web_payment
+
+    def charge_then_lose_stock(*args, **kwargs):
+        result = charge(*args, **kwargs)
+        shop.shop_info.storage['Coffee Beans'] = 0
+        return result
+    monkeypatch.setattr(shop.money_machine, 'process_web_payment', charge_then_lose_stock)
+
+    card_sales = shop.money_machine.payment_methods_used['card']
+    order = dict(ORDER, payment_method='card', payment_details={'card_number': '4242424242424242'})
+    assert client.post('/api/game/order', json=order).status_code == 409
+    assert gateway.refunded == ['ch_4.5']
+    assert shop.money_machine.payment_methods_used['card'] == card_sales
+
+
+def test_card_approval_is_voided_when_booking_fails(client, shop, monkeypatch):
+    gateway = RecordingGateway()
+    monkeypatch.setattr(type(shop.money_machine), 'gateway', gateway)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError('ledger unavailable')
+    monkeypatch.setattr(shop.money_machine, 'process_web_payment', broken)
+
+    order = dict(ORDER, payment_method='card', payment_details={'card_number': '4242424242424242'})
+    assert client.post('/api/game/order', json=order).status_code == 500
+    assert gateway.refunded == ['ch_4.5']
+    assert shop.shop_info.reserved == {}
@@ -0,0 +1,177 @@
+# backend/tests/test_payment_gateway.py
+import http.client
+import json
+
+import pytest
+
+from enhanced_models.money_machine import MoneyMachineWeb
+from enhanced_models.payment_gateway import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError,
+                                             GatewayError, HttpGateway)
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self._body = json.dumps(body).encode('utf-8')
+        self.will_close = False
+
+    def read(self):
+        return self._body
+
+
+def fake_processor(*answers):
+    """A connection class answering each request with the next (status, body), or raising it"""
+    answers = list(answers)
+    sent = []
+
+    class FakeConnection:
+        def __init__(self, host, port, timeout=None):
+            self.host, self.port, self.timeout = host, port, timeout
+            self.sock = None
+
+        def request(self, method, path, body=None, headers=None):
+            sent.append({'path': path, 'body': json.loads(body), 'headers': headers})
+
+        def getresponse(self):
+            answer = answers.pop(0)
+            if isinstance(answer, Exception):
+                raise answer
+            return FakeResponse(*answer)
+
+        def close(self):
+            pass
+
+    return FakeConnection, sent
+
+
+def gateway(connection_class, **options):
+    options.setdefault('breaker', CircuitBreaker(failure_threshold=2, reset_timeout=10))
+    return HttpGateway('http://processor.test', connection_class=connection_class, sleep=lambda _: None,
+                       **options)
+
+
+def test_breaker_opens_then_lets_one_trial_through():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    now[0] = 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()   # only one trial at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.trips == 2   # a failed trial re-opens it
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_approval_and_decline_are_healthy_answers():
+    connection, sent = fake_processor((200, {'id': 'ch_1', 'status': 'approved'}),
+                                      (402, {'id': 'ch_2', 'status': 'declined', 'reason': 'insufficient funds'}))
+    client = gateway(connection)
+    assert client.charge(4.5, 'USD', '4242424242424242', 'key-1') == {
+        'approved': True, 'message': "Card payment successful!", 'charge_id': 'ch_1'}
+    declined = client.charge(4.5, 'USD', '4242424242420000', 'key-2')
+    assert not declined['approved'] and 'insufficient funds' in declined['message']
+    assert client.breaker.failures == 0
+    assert sent[0]['body'] == {'amount': 4.5, 'currency': 'USD', 'card_last4': '4242'}
+    assert sent[0]['headers']['Idempotency-Key'] == 'key-1'
+
+
+def test_retries_keep_the_idempotency_key():
+    connection, sent = fake_processor((503, {}), ConnectionResetError(), (200, {'status': 'approved'}))
+    client = gateway(connection, retries=2)
+    assert client.charge(4.5, 'USD', '4242')['approved']
+    assert client.retried == 2
+    assert len({request['headers']['Idempotency-Key'] for request in sent}) == 1
+
+
+def test_other_client_errors_count_against_the_breaker():
+    connection, _ = fake_processor((404, {'error': 'not found'}), (400, {'error': 'bad currency'}))
+    client = gateway(connection)
+    with pytest.raises(GatewayError):
+        client.charge(4.5, 'USD', '4242')
+    with pytest.raises(GatewayError):
+        client.charge(4.5, 'USD', '4242')
+    assert client.breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        client.charge(4.5, 'USD', '4242')
+
+
+def test_exhausted_retries_open_the_breaker():
+    connection, _ = fake_processor(*[(503, {})] * 6)
+    client = gateway(connection, retries=2)
+    for _ in range(2):
+        with pytest.raises(GatewayError):
+            client.charge(4.5, 'USD', '4242')
+    assert client.attempts == 6 and client.breaker.state == OPEN
+
+
+def test_url_scheme_picks_connection_and_port():
+    assert HttpGateway('http://processor.test').port == 80
+    secure = HttpGateway('https://processor.test/pay')
+    assert secure.port == 443
+    assert secure.connection_class is http.client.HTTPSConnection
+    assert secure.stats()['url'] == 'https://processor.test:443/pay/v1/charges'
+    with pytest.raises(ValueError):
+        HttpGateway('ftp://processor.test')
+
+
+def test_money_machine_sends_an_iso_currency(monkeypatch):
+    connection, sent = fake_processor((200, {'status': 'approved'}))
+    monkeypatch.setattr(MoneyMachineWeb, 'gateway', gateway(connection))
+    money = MoneyMachineWeb()
+    assert money.authorize_card(4.5, {'card_number': '4242424242424242', 'tip': 0.5})['approved']
+    assert sent[0]['body']['currency'] == 'USD'
+    assert sent[0]['body']['amount'] == 5.0
+
+
+def test_refund_posts_to_the_charge_and_needs_confirmation():
+    connection, sent = fake_processor((200, {'id': 're_1', 'status': 'refunded'}), (404, {'error': 'no charge'}))
+    client = gateway(connection)
+    assert client.refund('ch_1', 'key-r')['refund_id'] == 're_1'
+    assert sent[0]['path'] == '/v1/charges/ch_1/refunds'
+    assert sent[0]['headers']['Idempotency-Key'] == 'key-r'
+    with pytest.raises(GatewayError):
+        client.refund('ch_missing')
+    assert client.stats()['refunds'] == 2
+
+
+def test_unexpected_error_in_the_trial_call_reopens_the_breaker():
+    now = [0.0]
+    connection, _ = fake_processor((503, {}), (503, {}), KeyError('bug'))
+    client = gateway(connection, retries=0,
+                     breaker=CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0]))
+    for _ in range(2):
+        with pytest.raises(GatewayError):
+            client.charge(4.5, 'USD', '4242')
+    assert client.breaker.state == OPEN
+    now[0] = 10
+    with pytest.raises(KeyError):
+        client.charge(4.5, 'USD', '4242')   # the trial call blows up in a way _send doesn't expect
+    assert client.breaker.state == OPEN and client.failures == 3
+
+
+def test_trial_that_never_reports_back_is_given_up():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    now[0] = 10
+    assert breaker.allow() and not breaker.allow()
+    now[0] = 20
+    assert breaker.allow() and breaker.state == HALF_OPEN
+
+
+def test_in_flight_requests_are_capped():
+    connection, sent = fake_processor((200, {'id': 'ch_1', 'status': 'approved'}))
+    client = gateway(connection, retries=0, max_in_flight=1, timeout=0.01)
+    client._slots.acquire()   # another call holds the only slot
+    with pytest.raises(GatewayError, match='busy'):
+        client.charge(4.5, 'USD', '4242')
+    assert sent == [] and client.slot_waits == 1
+    client._slots.release()
+    assert client.charge(4.5, 'USD', '4242')['approved']
+    assert client.stats()['in_flight'] == 0
@@ -0,0 +1,174 @@
+# backend/tests/test_sharding.py
+import json
+
+import pytest
+from werkzeug.test import create_environ
+
+from conftest import ADMIN_TOKEN
+import shard_router
+from enhanced_models.bakery_item import BakeryMenuWeb
+from enhanced_models.coffee_menu import CoffeeMenuWeb
+from enhanced_models.money_machine import MoneyMachineWeb
+from enhanced_models.sharding import HashRing, moving_away, shop_id_for_request
+from enhanced_models.shop_info import ShopInfoWeb
+from enhanced_models.shop_registry import ShopNotOwned, ShopRegistry, ShopStore
+from shard_router import RebalanceError, ShardRouter
+
+SHOP_IDS = [f"shop-{i}" for i in range(3000)]
+
+
+def test_ring_spreads_shops_evenly():
+    ring = HashRing(['w0', 'w1', 'w2'])
+    counts = {}
+    for shop_id in SHOP_IDS:
+        counts[ring.node_for(shop_id)] = counts.get(ring.node_for(shop_id), 0) + 1
+    assert set(counts) == {'w0', 'w1', 'w2'}
+    assert min(counts.values()) > len(SHOP_IDS) / 3 * 0.7
+
+
+def test_adding_a_worker_only_moves_shops_to_it():
+    old_ring, new_ring = HashRing(['w0', 'w1', 'w2']), HashRing(['w0', 'w1', 'w2', 'w3'])
+    moved = [shop_id for shop_id in SHOP_IDS if old_ring.node_for(shop_id) != new_ring.node_for(shop_id)]
+    assert all(new_ring.node_for(shop_id) == 'w3' for shop_id in moved)
+    assert len(moved) < len(SHOP_IDS) / 4 * 1.4
+    leaving_w0 = moving_away(old_ring, new_ring, 'w0')
+    assert {shop_id for shop_id in SHOP_IDS if leaving_w0(shop_id)} == \
+        {shop_id for shop_id in moved if old_ring.node_for(shop_id) == 'w0'}
+
+
+def test_ring_round_trips_and_removes():
+    ring = HashRing(['w0', 'w1'], replicas=50)
+    assert HashRing.from_dict(ring.to_dict()).node_for('downtown') == ring.node_for('downtown')
+    ring.remove('w1')
+    assert {ring.node_for(shop_id) for shop_id in SHOP_IDS[:100]} == {'w0'}
+
+
+def test_routing_key():
+    assert shop_id_for_request('/api/shops/downtown/order', {}) == 'downtown'
+    assert shop_id_for_request('/socket.io/', {'shop_id': 'airport'}) == 'airport'
+    assert shop_id_for_request('/api/shops', {}, {'shop_id': 'campus'}) == 'campus'
+    assert shop_id_for_request('/api/shop/inventory', {}) == 'default'
+
+
+def test_handoff_carries_shops_to_the_new_owner(tmp_path):
+    old_ring, new_ring = HashRing(['w0']), HashRing(['w0', 'w1'])
+    sender = ShopRegistry(ShopStore(str(tmp_path / 'w0')))
+    for shop_id in SHOP_IDS[:40]:
+        sender.create(shop_id)
+    shop = sender.get(SHOP_IDS[0])
+    with shop.lock:
+        shop.money_machine.process_web_payment('cash', 4.5, {'cash_amount': 5.0})
+    sender.unload(SHOP_IDS[0])   # stored, not loaded: its histories come back from the log
+
+    snapshots = sender.handoff(moving_away(old_ring, new_ring, 'w0'))
+    moving = {shop_id for shop_id in SHOP_IDS[:40] if new_ring.node_for(shop_id) == 'w1'}
+    assert {state['shop_id'] for state in snapshots} == moving
+    assert all('usage_history' in state['shop'] and 'histories' not in state for state in snapshots)
+
+    receiver = ShopRegistry(ShopStore(str(tmp_path / 'w1')))
+    receiver.owns = lambda shop_id: new_ring.node_for(shop_id) == 'w1'
+    assert receiver.accept(snapshots) == len(moving)
+    for shop_id in moving:
+        assert receiver.get(shop_id) is not None
+    if SHOP_IDS[0] in moving:
+        assert receiver.get(SHOP_IDS[0]).money_machine.profit == 4.5
+        assert len(receiver.get(SHOP_IDS[0]).money_machine.transaction_history) == 1
+
+    staying = next(shop_id for shop_id in SHOP_IDS[:40] if shop_id not in moving)
+    with pytest.raises(ShopNotOwned):
+        receiver.get(staying)
+    with pytest.raises(ShopNotOwned):
+        receiver.create(next(f"new-{i}" for i in range(100) if new_ring.node_for(f"new-{i}") == 'w0'))
+
+
+def test_shard_admin_routes_need_the_token(client, app_module):
+    payload = {'node': 'w0', 'ring': {'nodes': ['w0'], 'replicas': 10}, 'snapshots': []}
+    assert client.post('/api/admin/shards/accept', json=payload).status_code == 401
+    assert client.post('/api/admin/shards/release', json=payload,
+                       headers={'X-Admin-Token': 'wrong'}).status_code == 401
+    try:
+        assert client.post('/api/admin/shards/accept', json=payload,
+                           headers={'Authorization': f'Bearer {ADMIN_TOKEN}'}).status_code == 200
+    finally:
+        app_module.shop_registry.owns = None
+
+
+def test_router_admin_needs_the_token():
+    router = ShardRouter({'w0': 'http://127.0.0.1:1'}, admin_token='secret')
+    replies = []
+
+    def call(headers):
+        environ = create_environ('/_shards', headers=headers)
+        body = b''.join(router(environ, lambda status, _: replies.append(status)))
+        return replies[-1], json.loads(body)
+
+    assert call({})[0].startswith('401')
+    status, body = call({'X-Admin-Token': 'secret'})
+    assert status.startswith('200') and body['primary'] == 'w0'
+    assert router.worker_for('default') == 'w0'
+
+
+def in_memory_workers(monkeypatch, nodes, fail=None):
+    """Registries standing in for workers, reached through the router's _post_json"""
+    registries = {}
+    for node in nodes:
+        registry = ShopRegistry()
+        registry.register('default', CoffeeMenuWeb(), BakeryMenuWeb(), ShopInfoWeb(), MoneyMachineWeb())
+        registries[node] = registry
+
+    def post(url, payload, token=None, timeout=60):
+        node, action = url.split('/')[2], url.rsplit('/', 1)[1]
+        if (node, action) == fail:
+            raise OSError(f"{node} is down")
+        registry = registries[node]
+        if action == 'release':
+            moving = moving_away(HashRing.from_dict(payload['old_ring']), HashRing.from_dict(payload['new_ring']), node)
+            if payload['release_default']:
+                ring_moving = moving
+                moving = lambda shop_id: shop_id == 'default' or ring_moving(shop_id)
+            return {'snapshots': registry.handoff(moving)}
+        ring = HashRing.from_dict(payload['ring'])
+        registry.owns = lambda shop_id: shop_id == 'default' or ring.node_for(shop_id) == node
+        return {'accepted': registry.accept(payload['snapshots'])}
+
+    monkeypatch.setattr(shard_router, '_post_json', post)
+    return registries
+
+
+def test_rebalance_rolls_back_when_a_worker_fails(monkeypatch):
+    registries = in_memory_workers(monkeypatch, ['w0', 'w1'], fail=('w1', 'accept'))
+    router = ShardRouter({'w0': 'http://w0'}, admin_token='secret')
+    registries['w0'].owns = lambda shop_id: True
+    for shop_id in SHOP_IDS[:20]:
+        registries['w0'].create(shop_id)
+
+    with pytest.raises(RebalanceError):
+        router.rebalance({'w0': 'http://w0', 'w1': 'http://w1'})
+    assert router.ring.nodes == ['w0'] and not router._rebalancing
+    for shop_id in SHOP_IDS[:20]:
+        assert registries['w0'].get(shop_id) is not None   # released shops came back, still owned
+
+
+def test_rebalance_aborts_while_requests_are_in_flight(monkeypatch):
+    in_memory_workers(monkeypatch, ['w0', 'w1'])
+    monkeypatch.setattr(shard_router, 'DRAIN_TIMEOUT', 0.01)
+    router = ShardRouter({'w0': 'http://w0'}, admin_token='secret')
+    router._enter()
+    with pytest.raises(RebalanceError):
+        router.rebalance({'w0': 'http://w0', 'w1': 'http://w1'})
+    router._exit()
+    assert router.ring.nodes == ['w0'] and not router._rebalancing
+
+
+def test_removing_the_primary_hands_off_the_default_shop(monkeypatch):
+    registries = in_memory_workers(monkeypatch, ['w0', 'w1'])
+    router = ShardRouter({'w0': 'http://w0', 'w1': 'http://w1'}, admin_token='secret')
+    old_default = registries['w0'].get('default')
+    with old_default.lock:
+        old_default.money_machine.process_web_payment('cash', 4.5, {'cash_amount': 5.0})
+
+    result = router.rebalance({'w1': 'http://w1'})
+    assert result['primary'] == 'w1' and router.worker_for('default') == 'w1'
+    new_default = registries['w1'].get('default')
+    assert new_default.money_machine.profit == 4.5
+    assert len(new_default.money_machine.transaction_history) == 1
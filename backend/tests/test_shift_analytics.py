@@ -0,0 +1,40 @@
+# backend/tests/test_shift_analytics.py
+from enhanced_models.shift_analytics import RollingSeries, ShiftAnalytics, downsample
+
+T0 = 1_750_000_020 - 1_750_000_020 % 3600   # on an hour boundary
+
+
+def test_events_land_in_the_window_their_timestamp_falls_in():
+    rollup = RollingSeries(60, 10)
+    rollup.add(T0, {'orders': 1})             # first second of the window
+    rollup.add(T0 + 59.999, {'orders': 1})    # last instant of the same window
+    rollup.add(T0 + 60, {'orders': 1})        # next window starts here
+    assert rollup.series('orders', T0 + 60, 3) == [0.0, 2.0, 1.0]
+
+
+def test_old_windows_are_cleared_when_the_ring_wraps():
+    rollup = RollingSeries(60, 5)
+    rollup.add(T0, {'orders': 3})
+    rollup.add(T0 + 5 * 60, {'orders': 1})    # same slot, five windows later
+    assert rollup.series('orders', T0 + 5 * 60, 5) == [0.0, 0.0, 0.0, 0.0, 1.0]
+    # A window that fell out of the ring reads as empty, not as a stale sum
+    assert rollup.series('orders', T0 + 10 * 60, 5) == [0.0] * 5
+
+
+def test_series_start_and_downsampling():
+    now = [T0 + 3599]
+    analytics = ShiftAnalytics(clock=lambda: now[0])
+    for minute in range(60):
+        analytics.record_order('coffee', 2.0, timestamp=T0 + minute * 60)
+    analytics.record_order('coffee', 2.0, timestamp=T0 - 1)   # previous hour
+
+    series = analytics.get_series('revenue', 'minute', points=60, max_points=6)
+    assert series['start'] == T0 and series['step_seconds'] == 600
+    assert series['values'] == [20.0] * 6 and series['total'] == 120.0
+    assert analytics.get_series('revenue', 'hour', points=2)['values'] == [2.0, 120.0]
+    assert analytics.totals['orders:coffee'] == 61
+
+
+def test_downsample_sums_groups():
+    assert downsample([1, 2, 3, 4, 5], 2) == [6, 9]
+    assert downsample([1, 2], 5) == [1, 2]
@@ -0,0 +1,66 @@
+# backend/tests/test_shop_registry.py
+import pytest
+
+from enhanced_models.shop_registry import ShopError, ShopRegistry, ShopStore
+
+
+def croissant(shop):
+    return next(item for item in shop.bakery_menu.menu if item.food == 'Croissant')
+
+
+def test_shops_keep_separate_stock_and_money(tmp_path):
+    registry = ShopRegistry(ShopStore(str(tmp_path)))
+    downtown, airport = registry.create('downtown'), registry.create('airport')
+    item = croissant(downtown)
+    before = airport.shop_info.storage[item.food]
+
+    downtown.shop_info.food_return(item)
+    downtown.money_machine.process_web_payment('cash', 3.5, {'cash_amount': 5.0})
+    assert downtown.shop_info.storage[item.food] == before - 1
+    assert airport.shop_info.storage[item.food] == before
+    assert downtown.money_machine.profit == 3.5 and airport.money_machine.profit == 0
+    assert downtown.coffee_menu is airport.coffee_menu   # same catalog: menus are shared
+    assert downtown.room != airport.room
+
+
+def test_least_recently_used_shop_is_unloaded_and_reloads_intact(tmp_path):
+    now = [0.0]
+    registry = ShopRegistry(ShopStore(str(tmp_path)), max_loaded=2, clock=lambda: now[0])
+    for shop_id in ('a', 'b'):
+        registry.create(shop_id)
+    shop_a = registry.get('a')
+    shop_a.shop_info.food_return(croissant(shop_a))
+    left = shop_a.shop_info.storage['Croissant']
+
+    registry.get('b')
+    registry.create('c')            # 'a' is least recently used
+    assert list(registry.shops) == ['b', 'c']
+    assert registry.get('a').shop_info.storage['Croissant'] == left
+    assert registry.stats()['unloads'] >= 1 and registry.stats()['loads'] == 1
+
+
+def test_checked_out_shops_are_never_unloaded(tmp_path):
+    now = [0.0]
+    registry = ShopRegistry(ShopStore(str(tmp_path)), max_loaded=1, idle_seconds=10, clock=lambda: now[0])
+    registry.create('busy')
+    with registry.checkout('busy') as shop:
+        registry.create('other')    # over the limit: 'busy' is in use, so 'other' goes
+        assert list(registry.shops) == ['busy']
+        now[0] = 100.0
+        assert registry.unload('busy') is False
+        assert 'busy' in registry.shops and registry.get('busy') is shop
+    now[0] = 200.0
+    assert registry.unload_idle() == 1 and not registry.shops
+
+
+def test_bad_and_duplicate_ids_are_rejected(tmp_path):
+    registry = ShopRegistry(ShopStore(str(tmp_path)))
+    registry.create('downtown')
+    with pytest.raises(ShopError):
+        registry.create('downtown')
+    for bad in ('', '../etc', 'a' * 65, 'has space'):
+        with pytest.raises(ShopError):
+            registry.create(bad)
+    with pytest.raises(ShopError):
+        registry.create('uptown', catalog='no_such_catalog')
+    assert registry.get('nowhere') is None
@@ -0,0 +1,65 @@
+# backend/tests/test_stock_alerts.py
+from enhanced_models.stock_alerts import StockAlertEngine
+
+
+class FakeShop:
+    """One ingredient: 1000 ml capacity, low below 200 ml"""
+
+    def __init__(self, level=1000):
+        self.storage = {'Oat Milk': level}
+        self.max_storage = {'Oat Milk': 1000}
+        self.low_stock_threshold = {'Oat Milk': 200}
+
+    def _get_unit(self, item):
+        return 'ml'
+
+    def _calculate_refill_cost(self, item, current):
+        return round((1000 - current) * 0.003, 2)
+
+
+def walk(levels, start=1000):
+    shop = FakeShop(start)
+    engine = StockAlertEngine(shop)
+    engine.reset()
+    states = []
+    for level in levels:
+        shop.storage['Oat Milk'] = level
+        engine.evaluate(['Oat Milk'])
+        states.append(engine.state_of('Oat Milk'))
+    return engine, states
+
+
+def test_escalation_is_immediate_and_recovery_needs_the_margin():
+    engine, states = walk([700, 250, 190, 0, 210, 260, 340, 1000])
+    # 210 and 340 clear their thresholds, but not by the 50 ml margin
+    assert states == ['good', 'warning', 'low', 'out', 'low', 'warning', 'warning', 'good']
+    transitions = [(t['from'], t['to'], t['escalated']) for t in engine.pop_transitions()]
+    assert transitions[:4] == [('good', 'warning', True), ('warning', 'low', True),
+                               ('low', 'out', True), ('out', 'low', False)]
+    assert engine.pop_transitions() == []
+
+
+def test_hovering_at_the_threshold_does_not_flap():
+    engine, states = walk([199, 201, 199, 240, 199, 251])
+    assert states == ['low', 'low', 'low', 'low', 'low', 'warning']
+    assert [(t['from'], t['to']) for t in engine.pop_transitions()] == [('good', 'low'), ('low', 'warning')]
+
+
+def test_alert_entries_follow_the_state():
+    engine, _ = walk([150])
+    assert engine.get_alerts() == [{'item': 'Oat Milk', 'level': 'warning', 'action': 'restock_soon',
+                                    'message': 'Oat Milk is running low (150 ml remaining)', 'cost': 2.55}]
+    engine.shop.storage['Oat Milk'] = 0
+    engine.evaluate(['Oat Milk'])
+    assert engine.get_alerts()[0]['level'] == 'critical' and engine.critical == {'Oat Milk'}
+    assert engine.get_low_stock()[0]['urgency'] == 'critical'
+    engine.shop.storage['Oat Milk'] = 1000
+    engine.evaluate(['Oat Milk'])
+    assert engine.get_alerts() == [] and engine.get_low_stock() == [] and not engine.critical
+
+
+def test_reset_produces_no_events():
+    shop = FakeShop(0)
+    engine = StockAlertEngine(shop)
+    engine.reset()
+    assert engine.state_of('Oat Milk') == 'out' and engine.pop_transitions() == []
@@ -0,0 +1,88 @@
+# backend/tests/test_traffic.py
+import json
+
+from enhanced_models.traffic_recorder import HTTP, SOCKET, TrafficRecorder, read_traffic
+from traffic_replay import ModelTarget, VirtualClock, replay
+
+CARD = '4111111111114242'
+T0 = 1_750_000_000.0
+
+
+def capture(tmp_path):
+    """A few orders and an inventory read, as the app would have recorded them"""
+    path = str(tmp_path / 'capture.traffic')
+    recorder = TrafficRecorder(path, clock=lambda: T0, redact=('card_number',))
+    orders = [
+        {'type': 'coffee', 'item_id': 'medium_regularmilk_hot_latte', 'payment_method': 'cash',
+         'payment_details': {'cash_amount': 10.0}},
+        {'type': 'coffee', 'item_id': 'medium_regularmilk_hot_latte', 'payment_method': 'card',
+         'payment_details': {'card_number': CARD}},
+        {'type': 'coffee', 'item_id': 'no_such_drink', 'payment_method': 'cash',
+         'payment_details': {'cash_amount': 10.0}},
+    ]
+    for i, order in enumerate(orders):
+        status = 400 if order['item_id'] == 'no_such_drink' else 200
+        recorder.record_http('session_1', 'POST', '/api/game/order', '', json.dumps(order).encode('utf-8'),
+                             status, 2.0, ts=T0 + i)
+    recorder.record_socket('session_1', 'sid1', 'request_inventory_update', [], ts=T0 + 5)
+    recorder.close()
+    return path
+
+
+def test_card_numbers_never_reach_the_capture(tmp_path):
+    path = str(tmp_path / 'capture.traffic')
+    recorder = TrafficRecorder(path, redact=('card_number',))
+    body = json.dumps({'payment_details': {'card_number': CARD}, 'items': [{'card_number': CARD}]})
+    recorder.record_http('s', 'POST', '/api/game/order', '', body.encode('utf-8'), 200, 1.0)
+    recorder.record_http('s', 'POST', '/api/game/order', '', b'card_number=' + CARD.encode(), 400, 1.0)
+    recorder.record_socket('s', 'sid', 'pay', [{'card_number': CARD}])
+    recorder.close()
+
+    with open(path, 'rb') as f:
+        assert CARD.encode() not in f.read()
+    (_, _, first), (_, _, garbled), (_, _, event) = read_traffic(path)
+    assert json.loads(first[4]) == {'payment_details': {'card_number': '4242'}, 'items': [{'card_number': '4242'}]}
+    assert garbled[4] == ''
+    assert event[3] == [{'card_number': '4242'}]
+
+
+def test_torn_last_record_is_skipped(tmp_path):
+    path = capture(tmp_path)
+    with open(path, 'ab') as f:
+        f.write(b'\x40\x00\x00\x00\x00partial')
+    records = list(read_traffic(path))
+    assert [kind for kind, _, _ in records] == [HTTP, HTTP, HTTP, SOCKET]
+    assert records[0][1] == T0 and records[0][2][:3] == ['session_1', 'POST', '/api/game/order']
+
+
+def test_model_replay_matches_the_recording_and_is_deterministic(tmp_path):
+    records = list(read_traffic(capture(tmp_path)))
+    digests = []
+    for _ in range(2):
+        clock = VirtualClock(0.0)
+        target = ModelTarget(clock)
+        result = replay(records, target, clock=clock)
+        digests.append(target.digest())
+        order = result['operations']['POST /api/game/order']
+        assert order['count'] == 3 and order['mismatched'] == 0   # the redacted card still pays
+        assert result['operations']['socket request_inventory_update']['count'] == 1
+    assert digests[0] == digests[1]
+    assert len(target.shops['default'].money_machine.transaction_history) == 2
+
+
+def test_app_records_socket_events(app_module, tmp_path, monkeypatch):
+    path = str(tmp_path / 'socket.traffic')
+    recorder = TrafficRecorder(path, redact=('card_number',))
+    monkeypatch.setattr(app_module, 'traffic_recorder', recorder)
+    handled = []
+    app_module.on_socket_event('recorded_test_event')(lambda data: handled.append(data))
+
+    socket_client = app_module.socketio.test_client(app_module.app)
+    socket_client.emit('recorded_test_event', {'card_number': CARD})
+    socket_client.disconnect()
+    recorder.close()
+
+    assert handled == [{'card_number': CARD}]   # the handler itself sees the real value
+    events = [fields for kind, _, fields in read_traffic(path) if kind == SOCKET]
+    assert [fields[2] for fields in events] == ['recorded_test_event']
+    assert events[0][3] == [{'card_number': '4242'}]
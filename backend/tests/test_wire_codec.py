@@ -0,0 +1,73 @@
+# backend/tests/test_wire_codec.py
+import json
+
+import pytest
+
+from enhanced_models.menu_catalog import get_default_catalog
+from enhanced_models.shop_info import ShopInfoWeb
+from enhanced_models.wire_codec import WireCodec
+
+pytest.importorskip('msgpack')
+
+
+def test_stats_and_menu_items_round_trip():
+    shop = ShopInfoWeb()
+    codec = WireCodec(shop.storage)
+    stats = shop.get_real_time_stats()
+    packed = codec.encode(stats)
+    assert codec.decode(packed) == stats
+    assert len(packed) < len(json.dumps(stats, separators=(',', ':')))
+
+    items = [item.to_dict() for item in get_default_catalog().bakery[:3]]
+    assert codec.decode(codec.encode({'items': items, 'status': 'custom'})) == {'items': items, 'status': 'custom'}
+
+
+def test_new_ingredients_get_new_ids_and_old_ids_stay():
+    codec = WireCodec(['Water', 'Oat Milk'])
+    version = codec.version
+    assert codec.add_ingredients(['Oat Milk']) is False and codec.version == version
+    assert codec.add_ingredients(['Matcha', 'Water']) is True and codec.version == version + 1
+    assert codec.ingredient_ids == {'Water': 0, 'Oat Milk': 1, 'Matcha': 2}
+    assert codec.schema()['ingredients'] == ['Water', 'Oat Milk', 'Matcha']
+    assert codec.compact({'Matcha': {'status': 'low', 'current': 5.0}}) == {2: {'s': 2, 'c': 5}}
+
+
+def test_packed_stats_follow_stock_and_codec_version():
+    shop = ShopInfoWeb()
+    codec = WireCodec(shop.storage)
+    first = shop.get_real_time_stats_packed(codec)
+    assert shop.get_real_time_stats_packed(codec) is first
+    shop._consume({'Oat Milk': 110}, 'coffee', 'medium_oatmilk_hot_latte')
+    changed = shop.get_real_time_stats_packed(codec)
+    assert changed is not first and codec.decode(changed) == shop.get_real_time_stats()
+    codec.add_ingredients(['Matcha'])
+    assert shop.get_real_time_stats_packed(codec) is not changed
+
+
+def test_compact_events_take_one_emit_per_wire_format(app_module, monkeypatch):
+    socketio = app_module.socketio
+    json_clients = [socketio.test_client(app_module.app) for _ in range(3)]
+    msgpack_clients = [socketio.test_client(app_module.app, query_string='wire=msgpack') for _ in range(2)]
+    for client in json_clients + msgpack_clients:
+        client.get_received()
+
+    emitted = []
+    emit = socketio.emit
+
+    def counting_emit(event, data, to=None):
+        emitted.append(to)
+        emit(event, data, to=to)
+
+    monkeypatch.setattr(socketio, 'emit', counting_emit)
+    app_module.emit_compact('order_completed', {'type': 'coffee', 'item': 'latte'})
+    assert sorted(emitted) == [app_module.JSON_ROOM, app_module.WIRE_ROOM]
+
+    for client in json_clients:
+        [received] = [event for event in client.get_received() if event['name'] == 'order_completed']
+        assert received['args'] == [{'type': 'coffee', 'item': 'latte'}]
+    for client in msgpack_clients:
+        [received] = [event for event in client.get_received() if event['name'] == 'order_completed']
+        assert isinstance(received['args'][0], bytes)
+    for client in json_clients + msgpack_clients:
+        client.disconnect()
+    assert not app_module.wire_clients
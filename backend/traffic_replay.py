@@ -0,0 +1,384 @@
+# backend/traffic_replay.py
+"""
+Traffic Replay - Drive recorded traffic against a server or straight at the models
+
+Record real traffic first:
+    RECORD_TRAFFIC=capture.traffic python backend/app.py
+
+Replay it against a fresh server at recorded pace, 10x, or as fast as possible:
+    python backend/traffic_replay.py capture.traffic --url http://localhost:5000 --speed 1
+    python backend/traffic_replay.py capture.traffic --url http://localhost:5000 --speed 10 --lanes 16
+    python backend/traffic_replay.py capture.traffic --url http://localhost:5000 --speed max
+
+Or straight against the model classes, with no server or network involved:
+    python backend/traffic_replay.py capture.traffic --models --speed max
+
+HTTP replays keep each recorded session on its own cookie jar and lane, so a
+session's requests stay in order while sessions run side by side; Socket.IO
+events are sent over long-polling. Model
+replays run on a virtual clock that starts at --epoch (default: when the
+recording started), so two runs over the same capture end in the same state
+and print the same digest.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import zlib
+from http.cookiejar import CookieJar
+from typing import Dict, List, Optional
+from urllib.error import HTTPError, URLError
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from enhanced_models.traffic_recorder import HTTP, KINDS, SOCKET, read_traffic
+from enhanced_models.shop_registry import DEFAULT_SHOP_ID
+
+SOCKET_READ_EVENTS = {'request_inventory_update', 'join_shop'}
+
+
+def operation(kind: int, fields: List) -> str:
+    """Name a record for the report: method and path with shop ids folded, or the event"""
+    if kind == SOCKET:
+        return f"socket {fields[2]}"
+    parts = fields[2].strip('/').split('/')
+    if len(parts) >= 3 and parts[1] == 'shops':
+        parts[2] = '<shop>'
+    return f"{fields[1]} /{'/'.join(parts)}"
+
+
+def shop_action(path: str):
+    """(shop id, action) for a shop-scoped API path, e.g. ('downtown', 'order')"""
+    parts = path.strip('/').split('/')
+    if len(parts) >= 4 and parts[1] == 'shops':
+        return parts[2], '/'.join(parts[3:])
+    if len(parts) >= 3 and parts[1] in ('shop', 'game', 'menu'):
+        return DEFAULT_SHOP_ID, parts[2] if parts[1] != 'menu' else f"menu/{parts[2]}"
+    return None, '/'.join(parts[1:])
+
+
+class Report:
+    """Per-operation counts and latencies"""
+
+    def __init__(self):
+        self.ops = {}
+        self._lock = threading.Lock()
+
+    def add(self, op: str, elapsed: float, matched: bool = True, recorded_ms: Optional[float] = None,
+            skipped: bool = False):
+        with self._lock:
+            entry = self.ops.setdefault(op, {'count': 0, 'mismatched': 0, 'skipped': 0, 'latencies': [],
+                                             'recorded': []})
+            entry['count'] += 1
+            if skipped:
+                entry['skipped'] += 1
+                return
+            entry['mismatched'] += not matched
+            entry['latencies'].append(elapsed)
+            if recorded_ms is not None:
+                entry['recorded'].append(recorded_ms / 1000)
+
+    def to_dict(self) -> Dict:
+        def percentile(values, p):
+            return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 3) if values else None
+
+        result = {}
+        for op, entry in sorted(self.ops.items()):
+            latencies, recorded = sorted(entry['latencies']), sorted(entry['recorded'])
+            result[op] = {
+                'count': entry['count'],
+                'mismatched': entry['mismatched'],   # succeeded/failed differently than when recorded
+                'skipped': entry['skipped'],
+                'p50_ms': percentile(latencies, 0.5),
+                'p95_ms': percentile(latencies, 0.95),
+                'max_ms': round(latencies[-1] * 1000, 3) if latencies else None
+            }
+            if recorded:
+                # Server time when the traffic was recorded, to compare versions
+                result[op]['recorded_p50_ms'] = percentile(recorded, 0.5)
+                result[op]['recorded_p95_ms'] = percentile(recorded, 0.95)
+        return result
+
+
+class VirtualClock:
+    """Time that moves only when the replay says so"""
+
+    def __init__(self, start: float):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+
+class ModelTarget:
+    """Applies recorded requests to ShopInfoWeb / MoneyMachineWeb / the menus in this process"""
+
+    def __init__(self, clock: VirtualClock):
+        from enhanced_models.shop_registry import ShopRegistry
+        self.clock = clock
+        # No store, so nothing is written to disk, and no limit, so nothing is unloaded
+        self.registry = ShopRegistry(max_loaded=sys.maxsize)
+        self.shops = self.registry.shops
+
+    def shop(self, shop_id: str, catalog: Optional[str] = None):
+        shop = self.shops.get(shop_id)
+        if shop is None:
+            shop = self.registry.create(shop_id, catalog)
+            shop.shop_info.clock = shop.money_machine.clock = self.clock.time
+        return shop
+
+    def handle(self, kind: int, fields: List) -> Optional[bool]:
+        """Whether it succeeded, or None for records with no model equivalent"""
+        if kind == SOCKET:
+            if fields[2] in SOCKET_READ_EVENTS:
+                args = fields[3]
+                shop_id = (args[0] or {}).get('shop_id') if args and isinstance(args[0], dict) else None
+                self.shop(shop_id or DEFAULT_SHOP_ID).shop_info.get_real_time_stats_json()
+                return True
+            return None
+
+        _, method, path, _, body, _, _, _ = fields
+        data = json.loads(body) if body else {}
+        if method == 'POST' and path == '/api/shops':
+            if data.get('shop_id') in self.shops:
+                return False
+            self.shop(data.get('shop_id'), data.get('catalog'))
+            return True
+
+        shop_id, action = shop_action(path)
+        if shop_id is None:
+            return None
+        shop = self.shop(shop_id)
+        if action == 'order' and method == 'POST':
+            return self.order(shop, data)
+        if action == 'purchase' and method == 'POST':
+            return shop.shop_info.purchase_refill(data.get('item'), data.get('player_money', 0))['success']
+        reads = {
+            'inventory': shop.shop_info.get_real_time_stats_json,
+            'availability': shop.shop_info.get_feasibility,
+            'alerts': shop.shop_info.get_inventory_alerts,
+            'earnings': shop.money_machine.get_earnings_summary,
+            'menu/coffee': shop.coffee_menu.get_menu_by_category,
+            'menu/bakery': shop.bakery_menu.get_menu_by_category
+        }
+        if method == 'GET' and action in reads:
+            reads[action]()
+            return True
+        return None
+
+    def order(self, shop, data: Dict) -> bool:
+        """The order pipeline's commit stages: find, check stock, charge, fulfil"""
+        item_id = data.get('item_id') or ''
+        if data.get('type') == 'coffee':
+            item = shop.coffee_menu.get_coffee_by_id_enhanced(item_id) or shop.coffee_menu.get_coffee_by_id(item_id)
+        elif data.get('type') == 'food':
+            item = shop.bakery_menu.get_food_by_id_enhanced(item_id) or shop.bakery_menu.get_food_by_id(item_id)
+        else:
+            item = None
+        if not item or not shop.shop_info.resource_check(item.ingredients):
+            return False
+        payment = shop.money_machine.process_web_payment(data.get('payment_method', 'cash'), item.price,
+                                                         data.get('payment_details', {}))
+        if not payment['success']:
+            return False
+        if data.get('type') == 'coffee':
+            shop.shop_info.coffee_return(item)
+        else:
+            shop.shop_info.food_return(item)
+        return True
+
+    def digest(self) -> str:
+        """Hash of every shop's stock, histories and ledger"""
+        state = {}
+        for shop_id, shop in sorted(self.shops.items()):
+            money = shop.money_machine.get_state()
+            state[shop_id] = [shop.shop_info.get_state(), money['ledger'], money['transaction_history']]
+        return hashlib.sha256(json.dumps(state, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class PollingSocket:
+    """Just enough of a Socket.IO client (Engine.IO v4 long-polling) to send events"""
+
+    def __init__(self, opener, url: str, query: str, timeout: float):
+        self.opener = opener
+        self.timeout = timeout
+        self.base = f"{url}/socket.io/?EIO=4&transport=polling"
+        handshake = self._send(f"{self.base}&{query}" if query else self.base)
+        self.sid = json.loads(handshake[handshake.index('{'):])['sid']
+        self.endpoint = f"{self.base}&sid={self.sid}"
+        self._send(self.endpoint, '40')   # join the default namespace
+
+    def _send(self, url: str, packet: Optional[str] = None) -> str:
+        request = Request(url, data=packet.encode('utf-8') if packet is not None else None,
+                          method='POST' if packet is not None else 'GET',
+                          headers={'Content-Type': 'text/plain;charset=UTF-8'})
+        with self.opener.open(request, timeout=self.timeout) as response:
+            return response.read().decode('utf-8', 'replace')
+
+    def emit(self, event: str, args: List):
+        self._send(self.endpoint, '42' + json.dumps([event, *args]))
+
+    def close(self):
+        self._send(self.endpoint, '41')
+
+
+class HttpTarget:
+    """Sends recorded requests and events to a server, one cookie jar per recorded session"""
+
+    def __init__(self, url: str, timeout: float = 30, admin_token: Optional[str] = None):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.admin_token = admin_token   # for admin-only routes such as POST /api/shops
+        self.openers = {}
+        self.sockets = {}   # recorded sid -> PollingSocket
+
+    def _opener(self, session_id):
+        opener = self.openers.get(session_id)
+        if opener is None:
+            opener = self.openers[session_id] = build_opener(HTTPCookieProcessor(CookieJar()))
+        return opener
+
+    def handle(self, kind: int, fields: List) -> Optional[bool]:
+        if kind == SOCKET:
+            return self.handle_socket(fields)
+        session_id, method, path, query, body, _, _, idempotency_key = fields
+        headers = {'Content-Type': 'application/json'} if body else {}
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
+        if self.admin_token:
+            headers['X-Admin-Token'] = self.admin_token
+        request = Request(f"{self.url}{path}{'?' + query if query else ''}",
+                          data=body.encode('utf-8') if body else None, method=method, headers=headers)
+        try:
+            with self._opener(session_id).open(request, timeout=self.timeout) as response:
+                response.read()
+                replayed_status = response.status
+        except HTTPError as e:
+            e.read()
+            replayed_status = e.code
+        except (URLError, OSError):
+            return False
+        return replayed_status < 400
+
+    def handle_socket(self, fields: List) -> bool:
+        session_id, sid, event, args, query = fields
+        try:
+            if event == 'disconnect':
+                socket = self.sockets.pop(sid, None)
+                if socket is not None:
+                    socket.close()
+                return True
+            socket = self.sockets.get(sid)
+            if socket is None or event == 'connect':
+                # Sockets already open when recording started are opened on their first event
+                socket = self.sockets[sid] = PollingSocket(self._opener(session_id), self.url,
+                                                           query, self.timeout)
+            if event != 'connect':
+                socket.emit(event, args)
+            return True
+        except (HTTPError, URLError, OSError, ValueError):
+            self.sockets.pop(sid, None)   # e.g. the server dropped an idle socket; reopen next time
+            return False
+
+
+def replay(records: List, target, speed: float = 0, lanes: int = 1, clock: Optional[VirtualClock] = None,
+           epoch: Optional[float] = None) -> Dict:
+    """Run records against a target; speed 0 means as fast as possible"""
+    report = Report()
+    if not records:
+        return {'records': 0, 'operations': {}}
+    first = records[0][1]
+    epoch = first if epoch is None else epoch
+
+    def run(kind, ts, fields):
+        if clock is not None:
+            clock.now = epoch + (ts - first)
+        start = time.perf_counter()
+        try:
+            succeeded = target.handle(kind, fields)
+        except Exception:
+            succeeded = False   # e.g. an invalid shop id the server answered with 400
+        elapsed = time.perf_counter() - start
+        if kind == HTTP:
+            report.add(operation(kind, fields), elapsed, succeeded == (fields[5] < 400), fields[6],
+                       skipped=succeeded is None)
+        else:
+            report.add(operation(kind, fields), elapsed, bool(succeeded), skipped=succeeded is None)
+
+    lane_queues = [queue.Queue() for _ in range(lanes)] if lanes > 1 else []
+
+    def lane_worker(lane):
+        while True:
+            record = lane.get()
+            if record is None:
+                return
+            run(*record)
+
+    threads = [threading.Thread(target=lane_worker, args=(lane,), daemon=True) for lane in lane_queues]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    for kind, ts, fields in records:
+        if speed:
+            delay = (ts - first) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        if lane_queues:
+            lane = lane_queues[zlib.crc32(str(fields[0]).encode('utf-8')) % lanes]
+            lane.put((kind, ts, fields))
+        else:
+            run(kind, ts, fields)
+    for lane in lane_queues:
+        lane.put(None)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'records': len(records),
+        'recorded_seconds': round(records[-1][1] - first, 2),
+        'replay_seconds': round(elapsed, 2),
+        'records_per_second': round(len(records) / elapsed, 1) if elapsed else None,
+        'operations': report.to_dict()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay captured traffic against a server or the models")
+    parser.add_argument('capture', help="File written with RECORD_TRAFFIC")
+    target_group = parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument('--url', help="Game server to replay against, e.g. http://localhost:5000")
+    target_group.add_argument('--models', action='store_true', help="Replay straight against the model classes")
+    parser.add_argument('--speed', default='1', help="1 = recorded pace, N = N times faster, max = no waiting")
+    parser.add_argument('--lanes', type=int, default=8, help="Sessions replayed in parallel (HTTP only)")
+    parser.add_argument('--epoch', type=float, default=None,
+                        help="Virtual clock start for --models (default: when recording started)")
+    args = parser.parse_args(argv)
+
+    speed = 0.0 if args.speed == 'max' else float(args.speed)
+    records = list(read_traffic(args.capture))
+    counts = {name: sum(1 for kind, _, _ in records if KINDS[kind] == name) for name in KINDS}
+    pace = 'full speed' if speed == 0 else f"{speed:g}x"
+    print(f"▶️ Replaying {len(records)} records ({counts}) at {pace}", file=sys.stderr)
+
+    if args.models:
+        clock = VirtualClock(0.0)
+        target = ModelTarget(clock)
+        # The models print as they go; keep the report readable
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            result = replay(records, target, speed, 1, clock, args.epoch)
+        result['digest'] = target.digest()
+    else:
+        result = replay(records, HttpTarget(args.url, admin_token=os.environ.get('ADMIN_TOKEN')), speed,
+                        max(1, args.lanes))
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
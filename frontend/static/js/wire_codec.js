@@ -0,0 +1,123 @@
+// Compact Socket.IO events: MessagePack with short field codes and integer ingredient ids.
+// Usage: socket = WireCodec.connect(io);  then socket.on(...) as usual.
+// Handlers always receive plain objects; servers without msgpack keep sending JSON.
+(function (global) {
+    'use strict';
+
+    const textDecoder = new TextDecoder();
+    let fieldNames = {};
+    let ingredients = [];
+    let statuses = [];
+
+    // Minimal MessagePack decoder (everything msgpack-python's packb emits)
+    function unpack(buffer) {
+        const bytes = new Uint8Array(buffer);
+        const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        let pos = 0;
+
+        function str(length) {
+            const value = textDecoder.decode(bytes.subarray(pos, pos + length));
+            pos += length;
+            return value;
+        }
+        function bin(length) {
+            const value = bytes.slice(pos, pos + length);
+            pos += length;
+            return value;
+        }
+        function array(length) {
+            const value = new Array(length);
+            for (let i = 0; i < length; i++) value[i] = read();
+            return value;
+        }
+        function map(length) {
+            const value = {};
+            for (let i = 0; i < length; i++) {
+                const key = read();
+                value[key] = read();
+            }
+            return value;
+        }
+        function read() {
+            const byte = bytes[pos++];
+            if (byte <= 0x7f) return byte;
+            if (byte <= 0x8f) return map(byte & 0x0f);
+            if (byte <= 0x9f) return array(byte & 0x0f);
+            if (byte <= 0xbf) return str(byte & 0x1f);
+            if (byte >= 0xe0) return byte - 0x100;
+            let value;
+            switch (byte) {
+                case 0xc0: return null;
+                case 0xc2: return false;
+                case 0xc3: return true;
+                case 0xc4: value = bytes[pos]; pos += 1; return bin(value);
+                case 0xc5: value = view.getUint16(pos); pos += 2; return bin(value);
+                case 0xc6: value = view.getUint32(pos); pos += 4; return bin(value);
+                case 0xca: value = view.getFloat32(pos); pos += 4; return value;
+                case 0xcb: value = view.getFloat64(pos); pos += 8; return value;
+                case 0xcc: value = view.getUint8(pos); pos += 1; return value;
+                case 0xcd: value = view.getUint16(pos); pos += 2; return value;
+                case 0xce: value = view.getUint32(pos); pos += 4; return value;
+                case 0xcf: value = Number(view.getBigUint64(pos)); pos += 8; return value;
+                case 0xd0: value = view.getInt8(pos); pos += 1; return value;
+                case 0xd1: value = view.getInt16(pos); pos += 2; return value;
+                case 0xd2: value = view.getInt32(pos); pos += 4; return value;
+                case 0xd3: value = Number(view.getBigInt64(pos)); pos += 8; return value;
+                case 0xd9: value = bytes[pos]; pos += 1; return str(value);
+                case 0xda: value = view.getUint16(pos); pos += 2; return str(value);
+                case 0xdb: value = view.getUint32(pos); pos += 4; return str(value);
+                case 0xdc: value = view.getUint16(pos); pos += 2; return array(value);
+                case 0xdd: value = view.getUint32(pos); pos += 4; return array(value);
+                case 0xde: value = view.getUint16(pos); pos += 2; return map(value);
+                case 0xdf: value = view.getUint32(pos); pos += 4; return map(value);
+                default: throw new Error('Unsupported MessagePack byte 0x' + byte.toString(16));
+            }
+        }
+        return read();
+    }
+
+    // Codes -> field names, integer keys -> ingredient names (mirrors WireCodec.expand)
+    function expand(value) {
+        if (Array.isArray(value)) return value.map(expand);
+        if (value === null || typeof value !== 'object' || value instanceof Uint8Array) return value;
+        const expanded = {};
+        for (const key of Object.keys(value)) {
+            const item = value[key];
+            if (key === 's' && typeof item === 'number') {
+                expanded.status = statuses[item];
+            } else if (/^\d+$/.test(key)) {
+                expanded[ingredients[Number(key)] ?? key] = expand(item);
+            } else {
+                expanded[fieldNames[key] ?? key] = expand(item);
+            }
+        }
+        return expanded;
+    }
+
+    function decode(data) {
+        if (data instanceof ArrayBuffer || ArrayBuffer.isView(data)) {
+            return expand(unpack(data));
+        }
+        return data;
+    }
+
+    function useSchema(schema) {
+        fieldNames = {};
+        for (const [field, code] of Object.entries(schema.fields || {})) fieldNames[code] = field;
+        ingredients = schema.ingredients || [];
+        statuses = schema.statuses || [];
+    }
+
+    // Open a Socket.IO connection that asks for the compact format
+    function connect(io, options = {}) {
+        const socket = io({...options, query: {...(options.query || {}), wire: 'msgpack'}});
+        socket.on('wire_format', useSchema);
+        const on = socket.on.bind(socket);
+        socket.on = function (event, handler) {
+            return on(event, (data, ...rest) => handler(decode(data), ...rest));
+        };
+        return socket;
+    }
+
+    global.WireCodec = {connect, decode, unpack, expand, useSchema};
+})(window);